@@ -0,0 +1,45 @@
+"""Helpers for reading typed settings from environment variables."""
+
+from __future__ import annotations
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+_TRUE_VALUES: set[str] = {"1", "true", "yes", "on"}
+
+
+def env_flag(name: str, default: bool) -> bool:
+    """Read a boolean flag, falling back to ``default`` when unset."""
+
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in _TRUE_VALUES
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting, falling back to ``default`` when unset or invalid."""
+
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Ignoring invalid integer for %s: %r", name, value)
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting, falling back to ``default`` when unset or invalid."""
+
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Ignoring invalid number for %s: %r", name, value)
+        return default
@@ -7,6 +7,30 @@ from pathlib import Path
 ALLOWED_FILE_EXTENSIONS: set[str] = {".xlsx", ".xls"}
 MAX_FILE_SIZE_MB: int = 10
 MAX_FILE_SIZE_BYTES: int = MAX_FILE_SIZE_MB * 1024 * 1024
+UPLOAD_CHUNK_SIZE_BYTES: int = 256 * 1024
+MULTIPART_OVERHEAD_BYTES: int = 64 * 1024
+
+ENV_PREFLIGHT_ENABLED: str = "TEMPLATE_SENSE_PREFLIGHT_ENABLED"
+ENV_PREFLIGHT_MAX_UNCOMPRESSED_MB: str = "TEMPLATE_SENSE_PREFLIGHT_MAX_UNCOMPRESSED_MB"
+ENV_PREFLIGHT_MAX_SHEET_ROWS: str = "TEMPLATE_SENSE_PREFLIGHT_MAX_SHEET_ROWS"
+ENV_PREFLIGHT_MAX_SHEET_COLUMNS: str = "TEMPLATE_SENSE_PREFLIGHT_MAX_SHEET_COLUMNS"
+ENV_PREFLIGHT_MAX_CELLS: str = "TEMPLATE_SENSE_PREFLIGHT_MAX_CELLS"
+
+DEFAULT_PREFLIGHT_ENABLED: bool = True
+DEFAULT_PREFLIGHT_MAX_UNCOMPRESSED_MB: int = 200
+DEFAULT_PREFLIGHT_MAX_SHEET_ROWS: int = 100_000
+DEFAULT_PREFLIGHT_MAX_SHEET_COLUMNS: int = 1_000
+DEFAULT_PREFLIGHT_MAX_CELLS: int = 2_000_000
+PREFLIGHT_MAX_ZIP_MEMBERS: int = 10_000
+# Zip bombs: members that inflate more than this ratio are rejected once they
+# are big enough for the ratio to matter.
+PREFLIGHT_MAX_COMPRESSION_RATIO: int = 100
+PREFLIGHT_RATIO_MIN_BYTES: int = 1024 * 1024
+# A sheet's <dimension> element precedes <sheetData>; only this much is read.
+PREFLIGHT_DIMENSION_SCAN_BYTES: int = 64 * 1024
+# Password-protected .xlsx files are OLE2 containers too; only this many
+# directory sectors are searched for their ``EncryptionInfo`` stream.
+PREFLIGHT_OLE2_MAX_DIRECTORY_SECTORS: int = 64
 
 ENV_PROVIDER: str = "TEMPLATE_SENSE_AI_PROVIDER"
 ENV_MODEL: str = "TEMPLATE_SENSE_AI_MODEL"
@@ -17,6 +41,311 @@ DEFAULT_PROVIDER: str = "openai"
 DEFAULT_MODEL: str = "gpt-4o-mini"
 DEFAULT_LOG_LEVEL: str = "INFO"
 
+ENV_LOG_FORMAT: str = "TEMPLATE_SENSE_LOG_FORMAT"
+ENV_LOG_ASYNC: str = "TEMPLATE_SENSE_LOG_ASYNC"
+ENV_LOG_QUEUE_SIZE: str = "TEMPLATE_SENSE_LOG_QUEUE_SIZE"
+ENV_LOG_ERROR_BURST: str = "TEMPLATE_SENSE_LOG_ERROR_BURST"
+ENV_LOG_ERROR_WINDOW_SECONDS: str = "TEMPLATE_SENSE_LOG_ERROR_WINDOW_SECONDS"
+ENV_LOG_ERROR_SAMPLE_EVERY: str = "TEMPLATE_SENSE_LOG_ERROR_SAMPLE_EVERY"
+
+LOG_FORMAT_JSON: str = "json"
+LOG_FORMAT_TEXT: str = "text"
+LOG_FORMATS: tuple[str, ...] = (LOG_FORMAT_JSON, LOG_FORMAT_TEXT)
+LOG_TEXT_FORMAT: str = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+DEFAULT_LOG_FORMAT: str = LOG_FORMAT_JSON
+DEFAULT_LOG_ASYNC: bool = True
+DEFAULT_LOG_QUEUE_SIZE: int = 10000
+# Per logger, message template and exception type: this many warnings or
+# errors pass per window, then one in every ``SAMPLE_EVERY``.
+DEFAULT_LOG_ERROR_BURST: int = 10
+DEFAULT_LOG_ERROR_WINDOW_SECONDS: float = 60.0
+DEFAULT_LOG_ERROR_SAMPLE_EVERY: int = 100
+LOG_RATE_LIMIT_MAX_KEYS: int = 1024
+LOG_DROP_REASON_QUEUE_FULL: str = "queue_full"
+LOG_DROP_REASON_RATE_LIMITED: str = "rate_limited"
+
+REQUEST_ID_HEADER: str = "X-Request-ID"
+REQUEST_ID_MAX_LENGTH: int = 128
+
+ENV_EXECUTION_MODE: str = "TEMPLATE_SENSE_EXECUTION_MODE"
+ENV_PROCESS_POOL_SIZE: str = "TEMPLATE_SENSE_PROCESS_POOL_SIZE"
+ENV_PROCESS_MAX_TASKS_PER_CHILD: str = "TEMPLATE_SENSE_PROCESS_MAX_TASKS_PER_CHILD"
+
+EXECUTION_MODE_THREAD: str = "thread"
+EXECUTION_MODE_PROCESS: str = "process"
+DEFAULT_EXECUTION_MODE: str = EXECUTION_MODE_THREAD
+DEFAULT_PROCESS_MAX_TASKS_PER_CHILD: int = 100
+
+ENV_CACHE_ENABLED: str = "TEMPLATE_SENSE_CACHE_ENABLED"
+ENV_CACHE_MAX_ENTRIES: str = "TEMPLATE_SENSE_CACHE_MAX_ENTRIES"
+ENV_CACHE_TTL_SECONDS: str = "TEMPLATE_SENSE_CACHE_TTL_SECONDS"
+ENV_CACHE_PATH: str = "TEMPLATE_SENSE_CACHE_PATH"
+ENV_CACHE_DISK_MAX_ENTRIES: str = "TEMPLATE_SENSE_CACHE_DISK_MAX_ENTRIES"
+
+DEFAULT_CACHE_ENABLED: bool = True
+DEFAULT_CACHE_MAX_ENTRIES: int = 256
+DEFAULT_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+DEFAULT_CACHE_DISK_MAX_ENTRIES: int = 10_000
+
+ENV_AI_TIMEOUT_SECONDS: str = "TEMPLATE_SENSE_AI_TIMEOUT_SECONDS"
+ENV_AI_MAX_CONNECTIONS: str = "TEMPLATE_SENSE_AI_MAX_CONNECTIONS"
+ENV_AI_MAX_KEEPALIVE_CONNECTIONS: str = "TEMPLATE_SENSE_AI_MAX_KEEPALIVE_CONNECTIONS"
+ENV_AI_KEEPALIVE_EXPIRY_SECONDS: str = "TEMPLATE_SENSE_AI_KEEPALIVE_EXPIRY_SECONDS"
+
+DEFAULT_AI_TIMEOUT_SECONDS: int = 120
+DEFAULT_AI_MAX_CONNECTIONS: int = 20
+DEFAULT_AI_MAX_KEEPALIVE_CONNECTIONS: int = 10
+DEFAULT_AI_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+# Providers kept by the shared pool, least recently used evicted first: one
+# per settings tuple, so a hedged primary and secondary do not evict each other.
+AI_PROVIDER_POOL_MAX_ENTRIES: int = 4
+
+ENV_RATE_LIMIT_ENABLED: str = "TEMPLATE_SENSE_RATE_LIMIT_ENABLED"
+ENV_RATE_LIMIT_RPM: str = "TEMPLATE_SENSE_RATE_LIMIT_RPM"
+ENV_RATE_LIMIT_TPM: str = "TEMPLATE_SENSE_RATE_LIMIT_TPM"
+ENV_RATE_LIMIT_MAX_CONCURRENCY: str = "TEMPLATE_SENSE_RATE_LIMIT_MAX_CONCURRENCY"
+ENV_RATE_LIMIT_MAX_RETRIES: str = "TEMPLATE_SENSE_RATE_LIMIT_MAX_RETRIES"
+ENV_RATE_LIMIT_MAX_BACKOFF_SECONDS: str = (
+    "TEMPLATE_SENSE_RATE_LIMIT_MAX_BACKOFF_SECONDS"
+)
+
+DEFAULT_RATE_LIMIT_ENABLED: bool = True
+DEFAULT_RATE_LIMIT_RPM: int = 500
+DEFAULT_RATE_LIMIT_TPM: int = 200_000
+DEFAULT_RATE_LIMIT_MAX_CONCURRENCY: int = 16
+DEFAULT_RATE_LIMIT_MAX_RETRIES: int = 3
+DEFAULT_RATE_LIMIT_MAX_BACKOFF_SECONDS: float = 30.0
+RATE_LIMIT_BACKOFF_BASE_SECONDS: float = 0.5
+RATE_LIMIT_MIN_CONCURRENCY: int = 1
+RATE_LIMIT_DECREASE_FACTOR: float = 0.5
+# Rough prompt-size estimate used to charge the tokens-per-minute bucket.
+RATE_LIMIT_CHARS_PER_TOKEN: int = 4
+RATE_LIMIT_COMPLETION_TOKENS: int = 1024
+
+ENV_HEDGE_ENABLED: str = "TEMPLATE_SENSE_HEDGE_ENABLED"
+ENV_HEDGE_PROVIDER: str = "TEMPLATE_SENSE_HEDGE_PROVIDER"
+ENV_HEDGE_MODEL: str = "TEMPLATE_SENSE_HEDGE_MODEL"
+ENV_HEDGE_PERCENTILE: str = "TEMPLATE_SENSE_HEDGE_PERCENTILE"
+ENV_HEDGE_INITIAL_DELAY_SECONDS: str = "TEMPLATE_SENSE_HEDGE_INITIAL_DELAY_SECONDS"
+ENV_HEDGE_MIN_DELAY_SECONDS: str = "TEMPLATE_SENSE_HEDGE_MIN_DELAY_SECONDS"
+ENV_CIRCUIT_FAILURE_THRESHOLD: str = "TEMPLATE_SENSE_CIRCUIT_FAILURE_THRESHOLD"
+ENV_CIRCUIT_RESET_SECONDS: str = "TEMPLATE_SENSE_CIRCUIT_RESET_SECONDS"
+
+DEFAULT_HEDGE_ENABLED: bool = False
+DEFAULT_HEDGE_PERCENTILE: float = 95.0
+# Deadline used until enough latencies have been observed for a percentile.
+DEFAULT_HEDGE_INITIAL_DELAY_SECONDS: float = 20.0
+DEFAULT_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD: int = 5
+DEFAULT_CIRCUIT_RESET_SECONDS: float = 30.0
+HEDGE_LATENCY_WINDOW: int = 200
+HEDGE_MIN_SAMPLES: int = 20
+HEDGE_MAX_WORKERS: int = 64
+HEDGE_ROLE_PRIMARY: str = "primary"
+HEDGE_ROLE_SECONDARY: str = "secondary"
+CIRCUIT_CLOSED: str = "closed"
+CIRCUIT_OPEN: str = "open"
+CIRCUIT_HALF_OPEN: str = "half_open"
+
+ENV_AI_CASSETTE_MODE: str = "TEMPLATE_SENSE_AI_CASSETTE_MODE"
+ENV_AI_CASSETTE_DIR: str = "TEMPLATE_SENSE_AI_CASSETTE_DIR"
+ENV_AI_CASSETTE_LATENCY_SCALE: str = "TEMPLATE_SENSE_AI_CASSETTE_LATENCY_SCALE"
+
+CASSETTE_MODE_OFF: str = "off"
+CASSETTE_MODE_RECORD: str = "record"
+CASSETTE_MODE_REPLAY: str = "replay"
+CASSETTE_MODES: tuple[str, ...] = (
+    CASSETTE_MODE_OFF,
+    CASSETTE_MODE_RECORD,
+    CASSETTE_MODE_REPLAY,
+)
+DEFAULT_AI_CASSETTE_MODE: str = CASSETTE_MODE_OFF
+DEFAULT_AI_CASSETTE_DIR: str = "cassettes"
+# Replayed calls sleep their recorded duration times this factor.
+DEFAULT_AI_CASSETTE_LATENCY_SCALE: float = 0.0
+# Bumped when the cassette file layout changes; older files are not replayed.
+CASSETTE_FORMAT_VERSION: int = 1
+
+ENV_ADMISSION_ENABLED: str = "TEMPLATE_SENSE_ADMISSION_ENABLED"
+ENV_ADMISSION_MEMORY_BUDGET_MB: str = "TEMPLATE_SENSE_ADMISSION_MEMORY_BUDGET_MB"
+ENV_ADMISSION_MAX_QUEUE: str = "TEMPLATE_SENSE_ADMISSION_MAX_QUEUE"
+ENV_ADMISSION_MAX_WAIT_SECONDS: str = "TEMPLATE_SENSE_ADMISSION_MAX_WAIT_SECONDS"
+ENV_ADMISSION_BYTES_PER_CELL: str = "TEMPLATE_SENSE_ADMISSION_BYTES_PER_CELL"
+
+DEFAULT_ADMISSION_ENABLED: bool = True
+DEFAULT_ADMISSION_MEMORY_BUDGET_MB: int = 384
+DEFAULT_ADMISSION_MAX_QUEUE: int = 16
+DEFAULT_ADMISSION_MAX_WAIT_SECONDS: float = 10.0
+# openpyxl keeps roughly 400 bytes per loaded cell; the rest covers the grid copy.
+DEFAULT_ADMISSION_BYTES_PER_CELL: int = 512
+# Fixed cost of one analysis (parser state, payloads, result) on top of its cells.
+ADMISSION_BASE_BYTES: int = 16 * 1024 * 1024
+# Loaded size per byte of uncompressed sheet XML, for sheets without a <dimension>.
+ADMISSION_XML_EXPANSION: int = 8
+ADMISSION_RETRY_AFTER_SECONDS: int = 5
+
+ENV_TRIM_ENABLED: str = "TEMPLATE_SENSE_TRIM_ENABLED"
+ENV_TRIM_SAMPLE_ROWS: str = "TEMPLATE_SENSE_TRIM_SAMPLE_ROWS"
+ENV_TRIM_MIN_ROWS: str = "TEMPLATE_SENSE_TRIM_MIN_ROWS"
+
+DEFAULT_TRIM_ENABLED: bool = True
+DEFAULT_TRIM_SAMPLE_ROWS: int = 20
+DEFAULT_TRIM_MIN_ROWS: int = 200
+# Consecutive rows whose filled columns overlap at least this much (Jaccard)
+# belong to the same table.
+TRIM_ROW_SIMILARITY: float = 0.6
+
+ENV_SHEET_SPLIT_ENABLED: str = "TEMPLATE_SENSE_SHEET_SPLIT_ENABLED"
+ENV_SHEET_SPLIT_MAX_WORKERS: str = "TEMPLATE_SENSE_SHEET_SPLIT_MAX_WORKERS"
+
+DEFAULT_SHEET_SPLIT_ENABLED: bool = False
+DEFAULT_SHEET_SPLIT_MAX_WORKERS: int = 4
+# Sheet parts are scanned for formulas in chunks; an Excel formula is at most
+# 8192 characters, so a tail this long always holds an unfinished one.
+SHEET_SCAN_CHUNK_BYTES: int = 64 * 1024
+SHEET_SCAN_TAIL_BYTES: int = 64 * 1024
+
+ENV_LAYOUT_CACHE_ENABLED: str = "TEMPLATE_SENSE_LAYOUT_CACHE_ENABLED"
+ENV_LAYOUT_CACHE_MAX_ENTRIES: str = "TEMPLATE_SENSE_LAYOUT_CACHE_MAX_ENTRIES"
+ENV_LAYOUT_CACHE_TTL_SECONDS: str = "TEMPLATE_SENSE_LAYOUT_CACHE_TTL_SECONDS"
+ENV_LAYOUT_CACHE_PATH: str = "TEMPLATE_SENSE_LAYOUT_CACHE_PATH"
+
+DEFAULT_LAYOUT_CACHE_ENABLED: bool = False
+DEFAULT_LAYOUT_CACHE_MAX_ENTRIES: int = 1024
+DEFAULT_LAYOUT_CACHE_TTL_SECONDS: int = 30 * 24 * 60 * 60
+
+ENV_LEXICAL_MATCHING_ENABLED: str = "TEMPLATE_SENSE_LEXICAL_MATCHING_ENABLED"
+ENV_LEXICAL_MIN_SIMILARITY: str = "TEMPLATE_SENSE_LEXICAL_MIN_SIMILARITY"
+
+DEFAULT_LEXICAL_MATCHING_ENABLED: bool = False
+DEFAULT_LEXICAL_MIN_SIMILARITY: float = 0.9
+LEXICAL_AMBIGUITY_MARGIN: float = 0.1
+# Common invoice abbreviations, applied per token after normalization.
+LEXICAL_ABBREVIATIONS: dict[str, str] = {
+    "#": "number",
+    "no": "number",
+    "nr": "number",
+    "nbr": "number",
+    "num": "number",
+    "inv": "invoice",
+    "dt": "date",
+    "qty": "quantity",
+    "qnty": "quantity",
+    "amt": "amount",
+    "amnt": "amount",
+    "desc": "description",
+    "descr": "description",
+    "wt": "weight",
+    "nw": "net weight",
+    "gw": "gross weight",
+    "ttl": "total",
+    "tot": "total",
+    "pol": "port of loading",
+    "pod": "port of discharge",
+    "ccy": "currency",
+    "cur": "currency",
+    "curr": "currency",
+    "addr": "address",
+    "flt": "flight",
+    "pcs": "quantity",
+    "ctns": "boxes",
+    "cartons": "boxes",
+}
+
+ENV_LABEL_MEMORY_ENABLED: str = "TEMPLATE_SENSE_LABEL_MEMORY_ENABLED"
+ENV_LABEL_MEMORY_PATH: str = "TEMPLATE_SENSE_LABEL_MEMORY_PATH"
+ENV_LABEL_MEMORY_MAX_ENTRIES: str = "TEMPLATE_SENSE_LABEL_MEMORY_MAX_ENTRIES"
+ENV_LABEL_MEMORY_MIN_SIMILARITY: str = "TEMPLATE_SENSE_LABEL_MEMORY_MIN_SIMILARITY"
+
+DEFAULT_LABEL_MEMORY_ENABLED: bool = False
+DEFAULT_LABEL_MEMORY_MAX_ENTRIES: int = 5000
+DEFAULT_LABEL_MEMORY_MIN_SIMILARITY: float = 0.85
+# Hashed character-trigram vector size; 5000 labels take 10 MB as float32.
+LABEL_MEMORY_DIMENSIONS: int = 512
+LABEL_MEMORY_AMBIGUITY_MARGIN: float = 0.05
+# Only confident dictionary matches (0-100 scale) are remembered.
+LABEL_MEMORY_MIN_MATCH_SCORE: float = 90.0
+# Share of entries dropped when the store is full, so eviction stays rare.
+LABEL_MEMORY_EVICT_FRACTION: float = 0.1
+
+ENV_JOB_WORKERS: str = "TEMPLATE_SENSE_JOB_WORKERS"
+ENV_JOB_QUEUE_SIZE: str = "TEMPLATE_SENSE_JOB_QUEUE_SIZE"
+ENV_JOB_RETENTION: str = "TEMPLATE_SENSE_JOB_RETENTION"
+
+DEFAULT_JOB_WORKERS: int = 2
+DEFAULT_JOB_QUEUE_SIZE: int = 32
+DEFAULT_JOB_RETENTION: int = 1000
+JOB_MAX_WAIT_SECONDS: float = 30.0
+
+ENV_BATCH_PARALLELISM: str = "TEMPLATE_SENSE_BATCH_PARALLELISM"
+
+DEFAULT_BATCH_PARALLELISM: int = 4
+MAX_BATCH_PARALLELISM: int = 32
+MAX_BATCH_FILES: int = 500
+MAX_BATCH_ARCHIVE_SIZE_MB: int = 200
+MAX_BATCH_ARCHIVE_SIZE_BYTES: int = MAX_BATCH_ARCHIVE_SIZE_MB * 1024 * 1024
+NDJSON_MEDIA_TYPE: str = "application/x-ndjson"
+SSE_MEDIA_TYPE: str = "text/event-stream"
+SSE_HEARTBEAT_SECONDS: float = 15.0
+SSE_HEARTBEAT: bytes = b": keep-alive\n\n"
+SSE_EVENT_STAGE: str = "stage"
+SSE_EVENT_PARTIAL: str = "partial"
+SSE_EVENT_RESULT: str = "result"
+SSE_EVENT_ERROR: str = "error"
+
+ENV_PROMETHEUS_MULTIPROC_DIR: str = "PROMETHEUS_MULTIPROC_DIR"
+METRICS_NAMESPACE: str = "template_sense"
+METRICS_LATENCY_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+ENV_PROFILE_TOKEN: str = "TEMPLATE_SENSE_PROFILE_TOKEN"
+ENV_PROFILE_SAMPLE_RATE: str = "TEMPLATE_SENSE_PROFILE_SAMPLE_RATE"
+ENV_PROFILE_DIR: str = "TEMPLATE_SENSE_PROFILE_DIR"
+
+DEFAULT_PROFILE_SAMPLE_RATE: float = 0.0
+DEFAULT_PROFILE_DIR_NAME: str = "template-sense-profiles"
+PROFILE_TOP_FUNCTIONS: int = 25
+PROFILE_TOKEN_HEADER: str = "X-Profile-Token"
+PROFILE_OUTPUT_HEADER: str = "X-Profile-Output"
+PROFILE_ID_HEADER: str = "X-Profile-Id"
+PROFILE_OUTPUT_INLINE: str = "inline"
+
+READY_RETRY_AFTER_SECONDS: int = 1
+
+ENV_RESPONSE_COMPRESSION_ENABLED: str = "TEMPLATE_SENSE_RESPONSE_COMPRESSION_ENABLED"
+ENV_RESPONSE_COMPRESSION_MIN_BYTES: str = (
+    "TEMPLATE_SENSE_RESPONSE_COMPRESSION_MIN_BYTES"
+)
+
+DEFAULT_RESPONSE_COMPRESSION_ENABLED: bool = True
+DEFAULT_RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+# Compression level per Content-Encoding, in server preference order. Levels
+# favour speed: the body is compressed on every response.
+RESPONSE_COMPRESSION_LEVELS: dict[str, int] = {"zstd": 3, "br": 4, "gzip": 6}
+
+CACHE_HEADER: str = "X-Cache"
+CACHE_TIER_HEADER: str = "X-Cache-Tier"
+CACHE_STATUS_HIT: str = "HIT"
+CACHE_STATUS_MISS: str = "MISS"
+CACHE_STATUS_BYPASS: str = "BYPASS"
+CACHE_STATUS_COALESCED: str = "COALESCED"
+CACHE_TIER_MEMORY: str = "memory"
+CACHE_TIER_DISK: str = "disk"
+
 APP_VERSION: str = "1.0.0"
 APP_TITLE: str = "Template Sense Integration API"
 
@@ -25,7 +354,43 @@ ERROR_FILE_TOO_LARGE: str = "File is too large. Maximum allowed size is {max_siz
 ERROR_NO_FILE_PROVIDED: str = "No file provided."
 ERROR_INVALID_FILE_TYPE: str = "Invalid file type. Allowed extensions: {extensions}"
 ERROR_ANALYSIS_FAILED: str = "Failed to analyze template. Please try again later."
+ERROR_CASSETTE_MISS: str = "No recorded response for {method} call {key} in {directory}"
+ERROR_NOT_A_WORKBOOK: str = (
+    "File content is not an Excel workbook. Allowed extensions: {extensions}"
+)
+ERROR_LEGACY_XLS: str = (
+    "Legacy .xls (Excel 97-2003) workbooks are not supported. "
+    "Save the file as .xlsx and upload it again."
+)
+ERROR_ENCRYPTED_WORKBOOK: str = (
+    "Workbook is password-protected. Remove the password and upload it again."
+)
+ERROR_CORRUPT_WORKBOOK: str = "Workbook is damaged and cannot be read: {reason}"
+ERROR_WORKBOOK_TOO_MANY_PARTS: str = (
+    "Workbook has {parts} internal parts; the maximum is {max_parts}."
+)
+ERROR_WORKBOOK_UNCOMPRESSED_TOO_LARGE: str = (
+    "Workbook expands to {size_mb} MB when unpacked; the maximum is {max_mb} MB."
+)
+ERROR_WORKBOOK_COMPRESSION_RATIO: str = (
+    "Workbook part {part} is compressed {ratio}:1, which looks like a zip bomb."
+)
+ERROR_SHEET_TOO_LARGE: str = (
+    "Sheet '{sheet}' spans {rows} rows x {columns} columns; "
+    "the maximum is {max_rows} rows x {max_columns} columns."
+)
+ERROR_WORKBOOK_TOO_MANY_CELLS: str = (
+    "Workbook spans {cells} cells across its sheets; the maximum is {max_cells}."
+)
 ERROR_UNEXPECTED: str = "An unexpected error occurred. Please try again later."
+ERROR_BATCH_TOO_MANY_FILES: str = "Too many files. Maximum per batch is {max_files}."
+ERROR_BATCH_EMPTY_ARCHIVE: str = "Archive contains no .xlsx or .xls files."
+ERROR_JOB_QUEUE_FULL: str = "Too many analyses are queued. Please retry later."
+ERROR_JOB_NOT_FOUND: str = "Job not found."
+ERROR_ADMISSION_REJECTED: str = (
+    "Not enough memory to analyze this workbook right now. "
+    "Please retry in {retry_after} seconds."
+)
 
 DEFAULT_FIELD_DICTIONARY: dict[str, dict[str, str]] = {
     "headers": {
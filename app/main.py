@@ -2,44 +2,191 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
+import shutil
 import tempfile
+import time
+from collections.abc import AsyncIterator, Awaitable
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, HTTPException, Request, UploadFile, status
+from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile, status
 from fastapi.concurrency import run_in_threadpool
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from template_sense.errors import AIProviderError
 
+from app.config import env_int
 from app.constants import (
     ALLOWED_FILE_EXTENSIONS,
     APP_TITLE,
     APP_VERSION,
+    CACHE_HEADER,
+    CACHE_STATUS_BYPASS,
+    CACHE_STATUS_COALESCED,
+    CACHE_STATUS_HIT,
+    CACHE_STATUS_MISS,
+    CACHE_TIER_HEADER,
+    DEFAULT_BATCH_PARALLELISM,
+    DEFAULT_JOB_QUEUE_SIZE,
+    DEFAULT_JOB_RETENTION,
+    DEFAULT_JOB_WORKERS,
     DEFAULT_MODEL,
     DEFAULT_PROVIDER,
+    ENV_BATCH_PARALLELISM,
+    ENV_JOB_QUEUE_SIZE,
+    ENV_JOB_RETENTION,
+    ENV_JOB_WORKERS,
     ENV_MODEL,
     ENV_PROVIDER,
     ERROR_ANALYSIS_FAILED,
+    ERROR_BATCH_EMPTY_ARCHIVE,
+    ERROR_BATCH_TOO_MANY_FILES,
     ERROR_FILE_TOO_LARGE,
     ERROR_INVALID_FILE_TYPE,
+    ERROR_JOB_NOT_FOUND,
+    ERROR_JOB_QUEUE_FULL,
     ERROR_NO_FILE_CONTENT,
     ERROR_NO_FILE_PROVIDED,
     ERROR_UNEXPECTED,
+    JOB_MAX_WAIT_SECONDS,
+    MAX_BATCH_ARCHIVE_SIZE_BYTES,
+    MAX_BATCH_ARCHIVE_SIZE_MB,
+    MAX_BATCH_FILES,
+    MAX_BATCH_PARALLELISM,
     MAX_FILE_SIZE_BYTES,
-    MAX_FILE_SIZE_MB,
+    NDJSON_MEDIA_TYPE,
+    PROFILE_ID_HEADER,
+    READY_RETRY_AFTER_SECONDS,
+    SSE_EVENT_ERROR,
+    SSE_EVENT_RESULT,
+    SSE_HEARTBEAT,
+    SSE_HEARTBEAT_SECONDS,
+    SSE_MEDIA_TYPE,
+    UPLOAD_CHUNK_SIZE_BYTES,
+)
+from app.middleware import (
+    MetricsMiddleware,
+    RequestContextMiddleware,
+    UploadSizeLimitMiddleware,
+)
+from app.models import (
+    AdmissionResponse,
+    AnalyzeResponse,
+    CircuitBreakerResponse,
+    ConnectionStatsResponse,
+    HealthResponse,
+    JobResponse,
+    RateLimitStatsResponse,
+    ReadinessResponse,
 )
-from app.models import AnalyzeResponse, HealthResponse
+from app.services.admission import AdmissionRejected, MemoryAdmission
 from app.services.analyzer import AnalyzerService
-from template_sense.errors import AIProviderError
+from app.services.batch import BatchError, BatchItem, extract_zip_archive, stream_batch
+from app.services.cache import ResultCache, build_cache_key
+from app.services.encoding import EncodedJSONResponse, ResponseEncoder
+from app.services.executors import create_process_backend
+from app.services.jobs import InMemoryJobStore, Job, JobManager, QueueFullError
+from app.services.logs import bind_log_context
+from app.services.metrics import (
+    mark_process_dead,
+    observe_stage,
+    record_coalesced,
+    render_metrics,
+    timed_stage,
+    track_analysis,
+)
+from app.services.preflight import Preflight, PreflightError
+from app.services.profiling import RequestProfiler, active_profile
+from app.services.progress import (
+    AnalysisCancelled,
+    ProgressStream,
+    format_event,
+    report_stage,
+)
+from app.services.singleflight import SingleFlight
+from app.services.warmup import WarmUp
+
+if TYPE_CHECKING:
+    from fastapi.templating import Jinja2Templates
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI(title=APP_TITLE)
-templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start background workers and process pools for the application lifetime.
+
+    Slow start-up work runs in the background (see ``/ready``) so the server
+    accepts connections immediately.
+    """
+
+    startup.start()
+    await job_manager.start()
+    try:
+        yield
+    finally:
+        await startup.wait()
+        await job_manager.stop()
+        if process_backend is not None:
+            await run_in_threadpool(process_backend.shutdown)
+        analyzer_service.hedging.shutdown()
+        analyzer_service.provider_pool.close()
+        mark_process_dead()
+
+
+app = FastAPI(title=APP_TITLE, lifespan=lifespan)
+app.add_middleware(
+    UploadSizeLimitMiddleware, paths={"/analyze", "/analyze/stream", "/jobs"}
+)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths={"/analyze/batch"},
+    max_size_mb=MAX_BATCH_ARCHIVE_SIZE_MB,
+)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
 
 analyzer_service = AnalyzerService()
+result_cache = ResultCache.from_env()
+process_backend = create_process_backend(analyzer_service)
+request_profiler = RequestProfiler.from_env()
+preflight = Preflight.from_env()
+response_encoder = ResponseEncoder.from_env()
+analysis_flights = SingleFlight()
+admission = MemoryAdmission.from_env()
+
+
+@lru_cache(maxsize=1)
+def _templates() -> Jinja2Templates:
+    """Build the Jinja2 environment for the upload form on first use."""
+
+    from fastapi.templating import Jinja2Templates
+
+    return Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
+
+
+def _preload_templates() -> None:
+    _templates().get_template("index.html")
+
+
+def _warm_up_steps() -> list[tuple[str, Any]]:
+    steps: list[tuple[str, Any]] = [("templates", _preload_templates)]
+    if process_backend is not None:
+        # Pool workers import and warm Template Sense themselves.
+        steps.append(("process_pool", process_backend.start))
+    else:
+        steps.append(("pipeline_imports", analyzer_service.preload))
+        steps.append(("ai_provider", analyzer_service.warm_up))
+    return steps
+
+
+startup = WarmUp(_warm_up_steps())
 
 
 def _validate_file(upload: UploadFile) -> None:
@@ -55,35 +202,111 @@ def _validate_file(upload: UploadFile) -> None:
         )
 
 
-async def _save_upload_to_temp(upload: UploadFile) -> Path:
-    """Save upload to a temporary file after validating size."""
+def _metric_labels() -> tuple[str, str]:
+    """Return the provider and model labels for analysis metrics."""
+
+    return analyzer_service.effective_provider, analyzer_service.effective_model
+
+
+async def _save_upload_to_temp(
+    upload: UploadFile, max_bytes: int = MAX_FILE_SIZE_BYTES
+) -> tuple[Path, str]:
+    """Stream an upload to a temporary file, enforcing the size limit as it goes.
+
+    The body is copied in fixed-size chunks and hashed incrementally, so memory
+    use stays at one chunk per request regardless of file size. Returns the
+    temporary path and the SHA-256 hex digest of the content. Time spent
+    waiting for the body and writing it out is recorded as separate stages.
+    """
+
+    too_large = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=ERROR_FILE_TOO_LARGE.format(max_size=max_bytes // (1024 * 1024)),
+    )
+    if upload.size is not None and upload.size > max_bytes:
+        raise too_large
+
+    suffix = Path(upload.filename or "").suffix
+    digest = hashlib.sha256()
+    size = 0
+    read_seconds = write_seconds = 0.0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_path = Path(temp_file.name)
+        try:
+            while True:
+                started = time.perf_counter()
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE_BYTES)
+                read_seconds += time.perf_counter() - started
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise too_large
+                started = time.perf_counter()
+                digest.update(chunk)
+                temp_file.write(chunk)
+                write_seconds += time.perf_counter() - started
+        except BaseException:
+            temp_file.close()
+            temp_path.unlink(missing_ok=True)
+            raise
 
-    content = await upload.read()
-    if not content:
+    provider, model = _metric_labels()
+    observe_stage("upload_read", provider, model, read_seconds)
+    observe_stage("temp_write", provider, model, write_seconds)
+
+    if size == 0:
+        temp_path.unlink(missing_ok=True)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=ERROR_NO_FILE_CONTENT,
         )
 
-    if len(content) > MAX_FILE_SIZE_BYTES:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=ERROR_FILE_TOO_LARGE.format(max_size=MAX_FILE_SIZE_MB),
-        )
+    return temp_path, digest.hexdigest()
 
-    suffix = Path(upload.filename or "").suffix
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-        temp_file.write(content)
-        temp_path = Path(temp_file.name)
 
-    return temp_path
+async def _run_analysis(temp_path: Path, may_reject: bool = True) -> dict[str, Any]:
+    """Run the analyzer on the configured execution backend.
+
+    The analysis first waits for its estimated memory to fit the admission
+    budget; with ``may_reject`` it raises ``AdmissionRejected`` instead of
+    waiting longer than the configured limit.
+    """
+
+    provider, model = _metric_labels()
+    with timed_stage("admission_wait", provider, model):
+        footprint = await admission.acquire(temp_path, may_reject=may_reject)
+    try:
+        with track_analysis(provider, model), timed_stage("analysis", provider, model):
+            profile = active_profile()
+            if profile is not None:
+                # Profiled analyses stay in-process so cProfile can observe them.
+                return await run_in_threadpool(
+                    profile.call, analyzer_service.analyze, temp_path
+                )
+            if process_backend is not None:
+                return await process_backend.analyze(temp_path)
+            return await run_in_threadpool(analyzer_service.analyze, temp_path)
+    finally:
+        admission.release(footprint)
+
+
+def _result_cache_key(content_hash: str) -> str:
+    """Build the result cache key for the analyzer's effective settings."""
+
+    return build_cache_key(
+        content_hash,
+        provider=analyzer_service.effective_provider,
+        model=analyzer_service.effective_model,
+        field_dictionary=analyzer_service.field_dictionary,
+    )
 
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request) -> HTMLResponse:
     """Render the upload form UI."""
 
-    return templates.TemplateResponse(
+    return _templates().TemplateResponse(
         request,
         "index.html",
         {"request": request},
@@ -101,12 +324,49 @@ async def health() -> HealthResponse:
         version=APP_VERSION,
         provider=provider,
         model=model,
+        ai_connections=ConnectionStatsResponse(
+            **analyzer_service.provider_pool.stats.snapshot()
+        ),
+        rate_limits=[
+            RateLimitStatsResponse(**limits)
+            for limits in analyzer_service.rate_limiter.snapshot()
+        ],
+        circuit_breakers=[
+            CircuitBreakerResponse(**breaker)
+            for breaker in analyzer_service.hedging.snapshot()
+        ],
+        admission=AdmissionResponse(**admission.snapshot()),
     )
 
 
-@app.post("/analyze", response_model=AnalyzeResponse)
-async def analyze(file: UploadFile = File(...)) -> JSONResponse:
-    """Analyze an uploaded Excel file and return extracted metadata."""
+@app.get(
+    "/ready",
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse}},
+)
+async def ready() -> JSONResponse:
+    """Report whether start-up warm-up has finished (readiness, not liveness)."""
+
+    body = ReadinessResponse(**startup.snapshot()).model_dump()
+    if startup.ready:
+        return JSONResponse(status_code=status.HTTP_200_OK, content=body)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=body,
+        headers={"Retry-After": str(READY_RETRY_AFTER_SECONDS)},
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Expose Prometheus metrics for every worker process."""
+
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+async def _receive_upload(file: UploadFile) -> tuple[Path, str]:
+    """Validate an upload and stream it to disk, returning its path and hash."""
 
     if not file.filename:
         raise HTTPException(
@@ -115,13 +375,208 @@ async def analyze(file: UploadFile = File(...)) -> JSONResponse:
         )
 
     _validate_file(file)
+    temp_path, content_hash = await _save_upload_to_temp(file)
+    report_stage("uploaded", filename=file.filename, bytes=file.size)
+    try:
+        temp_path = _preflight(temp_path)
+    except PreflightError as exc:
+        temp_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
+    report_stage("validated")
+    return temp_path, content_hash
+
+
+def _preflight(path: Path) -> Path:
+    """Reject unusable workbooks before they are cached, queued or parsed.
+
+    Only headers and the zip directory are read, so this runs inline. Returns
+    the path to analyze: an ``.xls`` upload that is really an OOXML workbook
+    is renamed to ``.xlsx`` so openpyxl accepts it.
+    """
+
+    if not preflight.enabled:
+        return path
+    with timed_stage("preflight", *_metric_labels()):
+        info = preflight.check(path)
+    suffix = f".{info.format}"
+    if path.suffix.lower() != suffix:
+        path = path.rename(path.with_suffix(suffix))
+    return path
+
+
+def _preflight_items(items: list[BatchItem]) -> None:
+    """Pre-flight extracted batch members, failing the ones that are rejected."""
+
+    for item in items:
+        if item.path is None:
+            continue
+        try:
+            item.path = _preflight(item.path)
+        except PreflightError as exc:
+            item.path.unlink(missing_ok=True)
+            item.path, item.error = None, str(exc)
+
+
+def _claim_upload(temp_path: Path) -> Path:
+    """Give a coalesced analysis its own path to the upload at ``temp_path``.
+
+    The flight outlives the request that started it, whose handler deletes
+    ``temp_path`` when it exits; followers still need the workbook.
+    """
+
+    flight_path = temp_path.with_name(f"{temp_path.stem}-flight{temp_path.suffix}")
+    try:
+        os.link(temp_path, flight_path)
+    except OSError:
+        shutil.copyfile(temp_path, flight_path)
+    return flight_path
+
+
+async def _analyze_flight(
+    flight_path: Path, cache_key: str, may_reject: bool
+) -> dict[str, Any]:
+    """Analyze a claimed upload for a flight, deleting it once settled."""
+
+    try:
+        result = await _run_analysis(flight_path, may_reject=may_reject)
+    finally:
+        flight_path.unlink(missing_ok=True)
+    result_cache.set(cache_key, result)
+    return result
+
+
+async def _analyze_cached(
+    temp_path: Path,
+    content_hash: str,
+    bypass_cache: bool = False,
+    may_reject: bool = True,
+) -> tuple[dict[str, Any], dict[str, str]]:
+    """Analyze a saved upload through the result cache.
+
+    Returns the analysis result and the cache headers describing how it was
+    served. ``may_reject`` is passed on to memory admission.
+    """
+
+    cache_key = _result_cache_key(content_hash)
+    if not bypass_cache:
+        with timed_stage("cache_lookup", *_metric_labels()):
+            result, cache_tier = result_cache.get(cache_key)
+        if result is not None:
+            return result, {
+                CACHE_HEADER: CACHE_STATUS_HIT,
+                CACHE_TIER_HEADER: cache_tier,
+            }
+
+    def _analyze_and_store() -> Awaitable[dict[str, Any]]:
+        # Called synchronously by the flight's leader, before its request can
+        # finish and delete ``temp_path``.
+        return _analyze_flight(_claim_upload(temp_path), cache_key, may_reject)
+
+    # Identical uploads analyzed concurrently share one run (and one AI call).
+    result, shared = await analysis_flights.do_async(cache_key, _analyze_and_store)
+    if shared:
+        record_coalesced(*_metric_labels())
+        return result, {CACHE_HEADER: CACHE_STATUS_COALESCED}
+    return result, {
+        CACHE_HEADER: CACHE_STATUS_BYPASS if bypass_cache else CACHE_STATUS_MISS
+    }
+
+
+def _describe_analysis_error(exc: Exception) -> str:
+    """Return the client-facing message for a failed analysis."""
+
+    if isinstance(exc, (AIProviderError, FileNotFoundError, AdmissionRejected)):
+        return str(exc)
+    return ERROR_ANALYSIS_FAILED
+
+
+async def _analyze_saved_upload(temp_path: Path, content_hash: str) -> dict[str, Any]:
+    """Analyze a saved upload for the job and batch APIs.
+
+    Background work waits for memory admission instead of being rejected.
+    """
+
+    with bind_log_context(file_hash=content_hash):
+        result, _ = await _analyze_cached(temp_path, content_hash, may_reject=False)
+    return result
+
+
+job_manager = JobManager(
+    store=InMemoryJobStore(
+        max_jobs=env_int(ENV_JOB_RETENTION, DEFAULT_JOB_RETENTION),
+    ),
+    runner=_analyze_saved_upload,
+    workers=env_int(ENV_JOB_WORKERS, DEFAULT_JOB_WORKERS),
+    max_queue_size=env_int(ENV_JOB_QUEUE_SIZE, DEFAULT_JOB_QUEUE_SIZE),
+    format_error=_describe_analysis_error,
+)
+
+
+def _analysis_response(
+    content: dict[str, Any], headers: dict[str, str], accept_encoding: str | None
+) -> EncodedJSONResponse:
+    """Serialize an ``/analyze`` body once and compress it for the client."""
+
+    with timed_stage("serialization", *_metric_labels()):
+        return response_encoder.response(content, accept_encoding, headers=headers)
+
+
+@app.post("/analyze", response_model=AnalyzeResponse)
+async def analyze(
+    request: Request,
+    file: UploadFile = File(...),  # noqa: B008
+    bypass_cache: bool = Query(
+        False, description="Skip the result cache lookup and re-run the analysis"
+    ),
+) -> EncodedJSONResponse:
+    """Analyze an uploaded Excel file and return extracted metadata."""
+
+    accept_encoding = request.headers.get("accept-encoding")
+    profile = request_profiler.begin(request.headers)
+    if profile is None:
+        content, headers = await _analyze_upload(file, bypass_cache)
+        return _analysis_response(content, headers, accept_encoding)
+
+    try:
+        with profile.activate():
+            content, headers = await _analyze_upload(file, bypass_cache)
+            headers[PROFILE_ID_HEADER] = profile.id
+            if not profile.inline:
+                return _analysis_response(content, headers, accept_encoding)
+    finally:
+        report = request_profiler.finish(profile)
+    # The inline report can only be serialized once profiling has finished.
+    return _analysis_response({**content, "profile": report}, headers, accept_encoding)
+
+
+async def _analyze_upload(
+    file: UploadFile, bypass_cache: bool
+) -> tuple[dict[str, Any], dict[str, str]]:
+    """Save and analyze one upload for ``/analyze``.
+
+    Returns the response body and headers. The body is built as a plain dict:
+    the result is already JSON-ready, so validating it into ``AnalyzeResponse``
+    and dumping it back would only copy it.
+    """
 
     temp_path: Path | None = None
     try:
-        temp_path = await _save_upload_to_temp(file)
-        result = await run_in_threadpool(analyzer_service.analyze, temp_path)
+        temp_path, content_hash = await _receive_upload(file)
+        with bind_log_context(file_hash=content_hash):
+            result, cache_headers = await _analyze_cached(
+                temp_path, content_hash, bypass_cache=bypass_cache
+            )
     except HTTPException:
         raise
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
     except AIProviderError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -132,7 +587,7 @@ async def analyze(file: UploadFile = File(...)) -> JSONResponse:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(exc),
         ) from exc
-    except Exception as exc:  # noqa: BLE001
+    except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=ERROR_ANALYSIS_FAILED,
@@ -141,9 +596,269 @@ async def analyze(file: UploadFile = File(...)) -> JSONResponse:
         if temp_path and temp_path.exists():
             temp_path.unlink(missing_ok=True)
 
+    return {"success": True, "data": result, "error": None}, cache_headers
+
+
+# Streamed analyses outlive their request handler; keep them referenced.
+_stream_tasks: set[asyncio.Task[None]] = set()
+
+
+async def _stream_analysis(
+    stream: ProgressStream, temp_path: Path, content_hash: str, bypass_cache: bool
+) -> None:
+    """Analyze a saved upload for ``/analyze/stream``, ending with its result.
+
+    Unlike ``_analyze_cached`` this never joins another request's in-flight
+    analysis: the run belongs to one client and stops when that client leaves.
+    """
+
+    provider, model = _metric_labels()
+    cache_key = _result_cache_key(content_hash)
+    try:
+        result = None
+        if not bypass_cache:
+            with timed_stage("cache_lookup", provider, model):
+                result, cache_tier = result_cache.get(cache_key)
+            if result is not None:
+                report_stage("cache_hit", tier=cache_tier)
+        if result is None:
+            with timed_stage("admission_wait", provider, model):
+                footprint = await admission.acquire(temp_path)
+            try:
+                with track_analysis(provider, model), timed_stage(
+                    "analysis", provider, model
+                ):
+                    result = await run_in_threadpool(
+                        analyzer_service.analyze, temp_path
+                    )
+            finally:
+                admission.release(footprint)
+            result_cache.set(cache_key, result)
+        stream.emit(SSE_EVENT_RESULT, {"success": True, "data": result, "error": None})
+    except AnalysisCancelled:
+        # Logged by the analyzer; the client is gone, so there is no one to tell.
+        pass
+    except AdmissionRejected as exc:
+        stream.emit(
+            SSE_EVENT_ERROR,
+            {
+                "success": False,
+                "data": None,
+                "error": str(exc),
+                "retry_after": exc.retry_after,
+            },
+        )
+    except Exception as exc:  # noqa: BLE001
+        stream.emit(
+            SSE_EVENT_ERROR,
+            {"success": False, "data": None, "error": _describe_analysis_error(exc)},
+        )
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+async def _progress_events(
+    stream: ProgressStream, task: asyncio.Task[None]
+) -> AsyncIterator[bytes]:
+    """Relay ``stream`` as Server-Sent Events until the result or an error."""
+
+    event_id = 0
+    try:
+        while True:
+            message = await stream.next(timeout=SSE_HEARTBEAT_SECONDS)
+            if message is None:
+                # Comment lines keep proxies from closing an idle connection.
+                yield SSE_HEARTBEAT
+                continue
+            event_id += 1
+            yield format_event(message, event_id)
+            if message.event in (SSE_EVENT_RESULT, SSE_EVENT_ERROR):
+                return
+    finally:
+        if not task.done():
+            stream.cancel()
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(
+    file: UploadFile = File(...),  # noqa: B008
+    bypass_cache: bool = Query(
+        False, description="Skip the result cache lookup and re-run the analysis"
+    ),
+) -> StreamingResponse:
+    """Analyze an uploaded Excel file, streaming progress as Server-Sent Events.
+
+    Emits ``stage`` events as the upload is received, validated, parsed and
+    classified, ``partial`` events with header fields as soon as they are
+    detected, and a final ``result`` (the ``/analyze`` body) or ``error``
+    event. Upload problems are rejected before the stream starts, with the
+    same 400 responses as ``/analyze``. The analysis always runs in this
+    process so its progress can be observed; disconnecting cancels it.
+    """
+
+    stream = ProgressStream()
+    with stream.activate():
+        temp_path, content_hash = await _receive_upload(file)
+        # The task copies the current context, so the stream and the log
+        # context stay active in it.
+        with bind_log_context(file_hash=content_hash):
+            task = asyncio.create_task(
+                _stream_analysis(stream, temp_path, content_hash, bypass_cache)
+            )
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+    return StreamingResponse(
+        _progress_events(stream, task),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _prepare_batch(
+    files: list[UploadFile],
+) -> tuple[list[BatchItem], list[Path]]:
+    """Save batch uploads to disk, expanding a single zip archive if given.
+
+    Returns the batch items and any temporary directories to remove later.
+    Invalid individual files become failed items instead of aborting.
+    """
+
+    if len(files) == 1 and Path(files[0].filename or "").suffix.lower() == ".zip":
+        archive_path, _ = await _save_upload_to_temp(
+            files[0], max_bytes=MAX_BATCH_ARCHIVE_SIZE_BYTES
+        )
+        try:
+            items, workdir = await run_in_threadpool(
+                extract_zip_archive, archive_path, MAX_BATCH_FILES
+            )
+        except BatchError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(exc),
+            ) from exc
+        finally:
+            archive_path.unlink(missing_ok=True)
+        await run_in_threadpool(_preflight_items, items)
+        if not items:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ERROR_BATCH_EMPTY_ARCHIVE,
+            )
+        return items, [workdir]
+
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_BATCH_TOO_MANY_FILES.format(max_files=MAX_BATCH_FILES),
+        )
+
+    items: list[BatchItem] = []
+    for upload in files:
+        item = BatchItem(filename=upload.filename or "")
+        try:
+            item.path, item.content_hash = await _receive_upload(upload)
+        except HTTPException as exc:
+            item.error = str(exc.detail)
+        items.append(item)
+    return items, []
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    files: list[UploadFile] = File(...),  # noqa: B008
+    parallelism: int | None = Query(
+        None,
+        ge=1,
+        le=MAX_BATCH_PARALLELISM,
+        description="Maximum number of files analyzed concurrently",
+    ),
+) -> StreamingResponse:
+    """Analyze many files (or one zip archive) and stream NDJSON results."""
+
+    items, workdirs = await _prepare_batch(files)
+    limit = parallelism or env_int(ENV_BATCH_PARALLELISM, DEFAULT_BATCH_PARALLELISM)
+
+    async def _results() -> AsyncIterator[bytes]:
+        try:
+            async for line in stream_batch(
+                items,
+                _analyze_saved_upload,
+                parallelism=min(limit, MAX_BATCH_PARALLELISM),
+                format_error=_describe_analysis_error,
+            ):
+                yield line
+        finally:
+            for item in items:
+                if item.path is not None:
+                    item.path.unlink(missing_ok=True)
+            for workdir in workdirs:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    return StreamingResponse(_results(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def _job_content(job: Job) -> dict[str, Any]:
+    """Return the ``JobResponse`` body for ``job`` without re-validating its result."""
+
+    return {
+        "job_id": job.id,
+        "status": job.status.value,
+        "filename": job.filename,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "data": job.result,
+        "error": job.error,
+    }
+
+
+@app.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(file: UploadFile = File(...)) -> JSONResponse:  # noqa: B008
+    """Queue an uploaded Excel file for background analysis."""
+
+    temp_path, content_hash = await _receive_upload(file)
+    try:
+        job = await job_manager.submit(temp_path, content_hash, file.filename or "")
+    except QueueFullError as exc:
+        temp_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=ERROR_JOB_QUEUE_FULL,
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
     return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=AnalyzeResponse(success=True, data=result, error=None).model_dump(),
+        status_code=status.HTTP_202_ACCEPTED,
+        content=_job_content(job),
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    request: Request,
+    job_id: str,
+    wait: float = Query(
+        0,
+        ge=0,
+        le=JOB_MAX_WAIT_SECONDS,
+        description="Seconds to wait for the job to finish before responding",
+    ),
+) -> EncodedJSONResponse:
+    """Return the status of a job, optionally long-polling until it finishes."""
+
+    job = await job_manager.store.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_JOB_NOT_FOUND,
+        )
+    return response_encoder.response(
+        _job_content(job), request.headers.get("accept-encoding")
     )
 
 
@@ -155,6 +870,7 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
     return JSONResponse(
         status_code=exc.status_code,
         content=error_response.model_dump(),
+        headers=exc.headers,
     )
 
 
@@ -0,0 +1,157 @@
+"""ASGI middleware shared by the FastAPI application."""
+
+from __future__ import annotations
+
+import re
+import time
+import uuid
+from collections.abc import Iterable
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.constants import (
+    ERROR_FILE_TOO_LARGE,
+    MAX_FILE_SIZE_MB,
+    MULTIPART_OVERHEAD_BYTES,
+    REQUEST_ID_HEADER,
+    REQUEST_ID_MAX_LENGTH,
+)
+from app.models import AnalyzeResponse
+from app.services.logs import bind_log_context
+from app.services.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    UNMATCHED_PATH,
+    labelled,
+)
+
+_REQUEST_ID_PATTERN = re.compile(rf"[A-Za-z0-9._:-]{{1,{REQUEST_ID_MAX_LENGTH}}}")
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized uploads from the Content-Length header.
+
+    The request body is never read, so an oversized upload is refused before
+    the multipart parser spools it to disk. Requests without a Content-Length
+    (chunked transfer) fall through to the streaming size check.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: Iterable[str],
+        max_size_mb: int = MAX_FILE_SIZE_MB,
+    ) -> None:
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_size_mb = max_size_mb
+        self.max_body_bytes = max_size_mb * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"] in self.paths
+            and self._content_length(scope) > self.max_body_bytes
+        ):
+            error_response = AnalyzeResponse(
+                success=False,
+                data=None,
+                error=ERROR_FILE_TOO_LARGE.format(max_size=self.max_size_mb),
+            )
+            response = JSONResponse(
+                status_code=400,
+                content=error_response.model_dump(),
+                headers={"Connection": "close"},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _content_length(scope: Scope) -> int:
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return 0
+        return 0
+
+
+class MetricsMiddleware:
+    """Count HTTP requests and time them by route template.
+
+    The route template (``/jobs/{job_id}``) is read from the scope after
+    routing, so path parameters never become label values.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = labelled(HTTP_REQUESTS_IN_PROGRESS, method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_PATH
+            labelled(HTTP_REQUEST_DURATION, method, path).observe(
+                time.perf_counter() - started
+            )
+            labelled(HTTP_REQUESTS, method, path, str(status_code)).inc()
+
+
+class RequestContextMiddleware:
+    """Bind a request id to the log context of every HTTP request.
+
+    A well-formed ``X-Request-ID`` from the client (or a proxy) is kept,
+    otherwise a new id is generated; either way it is echoed in the response.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self._incoming(scope) or uuid.uuid4().hex
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        with bind_log_context(request_id=request_id):
+            await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _incoming(scope: Scope) -> str | None:
+        header = REQUEST_ID_HEADER.lower().encode()
+        for name, value in scope["headers"]:
+            if name == header:
+                request_id = value.decode("latin-1")
+                return request_id if _REQUEST_ID_PATTERN.fullmatch(request_id) else None
+        return None
@@ -7,6 +7,74 @@ from typing import Any, Optional
 from pydantic import BaseModel, Field
 
 
+class ConnectionStatsResponse(BaseModel):
+    """Schema for AI provider HTTP connection counters."""
+
+    requests: int = Field(..., description="HTTP requests sent to the AI provider")
+    connections_opened: int = Field(
+        ..., description="New connections (TCP and TLS handshakes) opened"
+    )
+    connections_reused: int = Field(
+        ..., description="Requests served over an existing keep-alive connection"
+    )
+
+
+class RateLimitStatsResponse(BaseModel):
+    """Schema for the client-side rate limiter of one provider and model."""
+
+    provider: str = Field(..., description="AI provider")
+    model: str = Field(..., description="AI model")
+    concurrency_limit: int = Field(
+        ..., description="Current adaptive concurrency limit"
+    )
+    in_flight: int = Field(..., description="Provider calls currently running")
+    waiting: int = Field(..., description="Calls waiting for a concurrency slot")
+    requests_available: float = Field(
+        ..., description="Requests left in the per-minute bucket"
+    )
+    tokens_available: float = Field(
+        ..., description="Estimated tokens left in the per-minute bucket"
+    )
+    calls: int = Field(..., description="Provider call attempts made")
+    throttled: int = Field(..., description="Attempts rejected with HTTP 429")
+    retries: int = Field(..., description="Attempts retried after a transient failure")
+    paused_for_seconds: float = Field(
+        ..., description="Remaining pause requested by a Retry-After header"
+    )
+    avg_queue_wait_ms: float = Field(
+        ..., description="Mean time a call waited for the limiter"
+    )
+    avg_provider_latency_ms: float = Field(
+        ..., description="Mean time a call spent in the provider"
+    )
+
+
+class CircuitBreakerResponse(BaseModel):
+    """Schema for the circuit breaker of one provider and model."""
+
+    provider: str = Field(..., description="AI provider")
+    model: str = Field(..., description="AI model")
+    state: str = Field(..., description="Circuit state: closed, open or half_open")
+    consecutive_failures: int = Field(
+        ..., description="Failed calls since the last success"
+    )
+    times_opened: int = Field(..., description="How often the circuit has opened")
+
+
+class AdmissionResponse(BaseModel):
+    """Schema for the memory admission budget of this process."""
+
+    enabled: bool = Field(..., description="Whether memory admission is enforced")
+    budget_bytes: int = Field(..., description="Memory budget for running analyses")
+    in_use_bytes: int = Field(
+        ..., description="Estimated footprint of the analyses running now"
+    )
+    running: int = Field(..., description="Analyses currently admitted")
+    queued: int = Field(..., description="Analyses waiting for budget")
+    admitted: int = Field(..., description="Analyses admitted so far")
+    rejected: int = Field(..., description="Analyses rejected with 503 so far")
+
+
 class HealthResponse(BaseModel):
     """Schema for health check endpoint."""
 
@@ -14,6 +82,32 @@ class HealthResponse(BaseModel):
     version: str = Field(..., description="Application version")
     provider: str = Field(..., description="Configured AI provider")
     model: str = Field(..., description="Configured AI model")
+    ai_connections: Optional[ConnectionStatsResponse] = Field(
+        None, description="Connection reuse counters for this process"
+    )
+    rate_limits: list[RateLimitStatsResponse] = Field(
+        default_factory=list,
+        description="Client-side AI rate limiter state for this process",
+    )
+    circuit_breakers: list[CircuitBreakerResponse] = Field(
+        default_factory=list,
+        description="AI provider circuit breakers when hedging is enabled",
+    )
+    admission: Optional[AdmissionResponse] = Field(
+        None, description="Memory admission budget and its current use"
+    )
+
+
+class ReadinessResponse(BaseModel):
+    """Schema for the readiness endpoint."""
+
+    status: str = Field(
+        ..., description="Warm-up status: pending, warming, ready or failed"
+    )
+    steps_ms: dict[str, float] = Field(
+        default_factory=dict, description="Duration of each finished warm-up step"
+    )
+    error: Optional[str] = Field(None, description="Failed warm-up step, if any")
 
 
 class ErrorResponse(BaseModel):
@@ -30,3 +124,22 @@ class AnalyzeResponse(BaseModel):
         None, description="Extracted template metadata as JSON"
     )
     error: Optional[str] = Field(None, description="Error message if failed")
+
+
+class JobResponse(BaseModel):
+    """Schema for background analysis job status."""
+
+    job_id: str = Field(..., description="Job identifier")
+    status: str = Field(
+        ..., description="Job status: queued, running, succeeded or failed"
+    )
+    filename: str = Field(..., description="Name of the uploaded file")
+    created_at: float = Field(..., description="Submission time (Unix seconds)")
+    started_at: Optional[float] = Field(None, description="Start time (Unix seconds)")
+    finished_at: Optional[float] = Field(
+        None, description="Completion time (Unix seconds)"
+    )
+    data: Optional[dict[str, Any]] = Field(
+        None, description="Extracted template metadata once the job succeeds"
+    )
+    error: Optional[str] = Field(None, description="Error message if the job failed")
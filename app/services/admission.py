@@ -0,0 +1,275 @@
+"""Memory-aware admission control for concurrent analyses.
+
+A compressed upload says little about how much memory it needs: openpyxl
+keeps every loaded cell as an object, so a 10 MB ``.xlsx`` can take hundreds
+of megabytes once parsed. Each analysis is therefore given an estimated
+footprint from the workbook's zip directory and sheet ``<dimension>`` tags
+(the same cheap reads as pre-flight), and ``MemoryAdmission`` only lets work
+start while the footprints of running analyses fit the configured budget.
+
+Waiting work is admitted in arrival order. A request that could be rejected
+waits at most ``max_wait`` seconds in a queue of at most ``max_queue``
+entries and otherwise raises ``AdmissionRejected``, which ``/analyze`` turns
+into ``503`` with ``Retry-After``. Background work (jobs and batch items)
+waits for as long as it takes. A workbook larger than the whole budget is
+admitted once nothing else is running, so it is slow rather than refused.
+The budget is per process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import zipfile
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.config import env_flag, env_float, env_int
+from app.constants import (
+    ADMISSION_BASE_BYTES,
+    ADMISSION_RETRY_AFTER_SECONDS,
+    ADMISSION_XML_EXPANSION,
+    DEFAULT_ADMISSION_BYTES_PER_CELL,
+    DEFAULT_ADMISSION_ENABLED,
+    DEFAULT_ADMISSION_MAX_QUEUE,
+    DEFAULT_ADMISSION_MAX_WAIT_SECONDS,
+    DEFAULT_ADMISSION_MEMORY_BUDGET_MB,
+    ENV_ADMISSION_BYTES_PER_CELL,
+    ENV_ADMISSION_ENABLED,
+    ENV_ADMISSION_MAX_QUEUE,
+    ENV_ADMISSION_MAX_WAIT_SECONDS,
+    ENV_ADMISSION_MEMORY_BUDGET_MB,
+    ERROR_ADMISSION_REJECTED,
+)
+from app.services.metrics import (
+    ADMISSION_MEMORY_BUDGET,
+    ADMISSION_MEMORY_IN_USE,
+    ADMISSION_QUEUED,
+    ADMISSION_REJECTIONS,
+)
+from app.services.preflight import Preflight, PreflightError, WorkbookInfo
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when an analysis cannot be admitted within its wait limit."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(ERROR_ADMISSION_REJECTED.format(retry_after=retry_after))
+        self.retry_after = retry_after
+
+
+@dataclass(eq=False)
+class _Waiter:
+    footprint: int
+    future: asyncio.Future[None]
+    may_reject: bool
+    granted: bool = False
+
+
+def _resolve(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class MemoryAdmission:
+    """Admit analyses while their estimated memory fits a budget."""
+
+    def __init__(
+        self,
+        enabled: bool = DEFAULT_ADMISSION_ENABLED,
+        budget_bytes: int = DEFAULT_ADMISSION_MEMORY_BUDGET_MB * 1024 * 1024,
+        max_queue: int = DEFAULT_ADMISSION_MAX_QUEUE,
+        max_wait: float = DEFAULT_ADMISSION_MAX_WAIT_SECONDS,
+        bytes_per_cell: int = DEFAULT_ADMISSION_BYTES_PER_CELL,
+    ) -> None:
+        self.enabled = enabled
+        self.budget_bytes = budget_bytes
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.bytes_per_cell = bytes_per_cell
+        self.admitted = 0
+        self.rejected = 0
+        self._in_use = 0
+        self._running = 0
+        self._waiters: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+        # Uploads were already held to the configured limits by pre-flight;
+        # this reader only measures them.
+        self._inspector = Preflight(
+            max_uncompressed_bytes=sys.maxsize,
+            max_sheet_rows=sys.maxsize,
+            max_sheet_columns=sys.maxsize,
+            max_cells=sys.maxsize,
+        )
+        if enabled:
+            ADMISSION_MEMORY_BUDGET.set(budget_bytes)
+
+    @classmethod
+    def from_env(cls) -> MemoryAdmission:
+        """Create an admission controller configured from environment variables."""
+
+        return cls(
+            enabled=env_flag(ENV_ADMISSION_ENABLED, DEFAULT_ADMISSION_ENABLED),
+            budget_bytes=env_int(
+                ENV_ADMISSION_MEMORY_BUDGET_MB, DEFAULT_ADMISSION_MEMORY_BUDGET_MB
+            )
+            * 1024
+            * 1024,
+            max_queue=env_int(ENV_ADMISSION_MAX_QUEUE, DEFAULT_ADMISSION_MAX_QUEUE),
+            max_wait=env_float(
+                ENV_ADMISSION_MAX_WAIT_SECONDS, DEFAULT_ADMISSION_MAX_WAIT_SECONDS
+            ),
+            bytes_per_cell=env_int(
+                ENV_ADMISSION_BYTES_PER_CELL, DEFAULT_ADMISSION_BYTES_PER_CELL
+            ),
+        )
+
+    def estimate(self, info: WorkbookInfo) -> int:
+        """Estimate the memory needed to load and analyze a described workbook."""
+
+        return ADMISSION_BASE_BYTES + max(
+            info.cells * self.bytes_per_cell,
+            info.uncompressed_bytes * ADMISSION_XML_EXPANSION,
+        )
+
+    def footprint(self, path: Path) -> int:
+        """Estimate the memory needed to analyze the workbook at ``path``."""
+
+        try:
+            return self.estimate(self._inspector.check(path))
+        except (PreflightError, OSError, zipfile.BadZipFile):
+            # Unreadable files fail early in the pipeline; size them by bytes.
+            try:
+                size = path.stat().st_size
+            except OSError:
+                size = 0
+            return ADMISSION_BASE_BYTES + size * ADMISSION_XML_EXPANSION
+
+    async def acquire(self, path: Path, may_reject: bool = True) -> int:
+        """Wait until the analysis of ``path`` fits the budget; return its footprint.
+
+        Pass the returned footprint to ``release`` once the analysis finishes.
+        Raises ``AdmissionRejected`` when ``may_reject`` is set and the queue
+        is full or the wait exceeds ``max_wait``. Requests queue in the order
+        their workbooks have been sized.
+        """
+
+        if not self.enabled:
+            return 0
+        # Sizing opens the workbook; keep that file I/O off the event loop.
+        footprint = await asyncio.to_thread(self.footprint, path)
+        with self._lock:
+            if not self._waiters and self._fits(footprint):
+                self._take(footprint)
+                return footprint
+            if may_reject and self._rejectable_waiters() >= self.max_queue:
+                raise self._reject()
+            waiter = _Waiter(
+                footprint, asyncio.get_running_loop().create_future(), may_reject
+            )
+            self._waiters.append(waiter)
+            self._publish()
+
+        try:
+            await asyncio.wait_for(waiter.future, self.max_wait if may_reject else None)
+        # ``asyncio.wait_for`` raises ``asyncio.TimeoutError`` on Python 3.10.
+        except asyncio.TimeoutError:  # noqa: UP041
+            with self._lock:
+                # Admission may have been granted just as the wait ran out.
+                if not waiter.granted:
+                    self._withdraw(waiter)
+                    raise self._reject() from None
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._free(footprint)
+                else:
+                    self._withdraw(waiter)
+            raise
+        return footprint
+
+    def release(self, footprint: int) -> None:
+        """Return an admitted analysis's footprint to the budget."""
+
+        if not self.enabled:
+            return
+        with self._lock:
+            self._free(footprint)
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait before retrying."""
+
+        return ADMISSION_RETRY_AFTER_SECONDS
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the budget, its current use and the admission counters."""
+
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "budget_bytes": self.budget_bytes,
+                "in_use_bytes": self._in_use,
+                "running": self._running,
+                "queued": len(self._waiters),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+
+    # The helpers below are called with ``_lock`` held.
+
+    def _fits(self, footprint: int) -> bool:
+        # A workbook larger than the whole budget runs alone rather than never.
+        return self._running == 0 or self._in_use + footprint <= self.budget_bytes
+
+    def _rejectable_waiters(self) -> int:
+        return sum(1 for waiter in self._waiters if waiter.may_reject)
+
+    def _take(self, footprint: int) -> None:
+        self._in_use += footprint
+        self._running += 1
+        self.admitted += 1
+        self._publish()
+
+    def _free(self, footprint: int) -> None:
+        self._in_use -= footprint
+        self._running -= 1
+        self._grant()
+        self._publish()
+
+    def _withdraw(self, waiter: _Waiter) -> None:
+        self._waiters.remove(waiter)
+        # The withdrawn waiter may have been holding back smaller ones behind it.
+        self._grant()
+        self._publish()
+
+    def _grant(self) -> None:
+        while self._waiters and self._fits(self._waiters[0].footprint):
+            waiter = self._waiters.popleft()
+            try:
+                waiter.future.get_loop().call_soon_threadsafe(_resolve, waiter.future)
+            except RuntimeError:
+                # Its event loop is gone, so nobody is waiting any more.
+                continue
+            waiter.granted = True
+            self._take(waiter.footprint)
+
+    def _reject(self) -> AdmissionRejected:
+        self.rejected += 1
+        ADMISSION_REJECTIONS.inc()
+        logger.warning(
+            "Rejected analysis: %d bytes of %d budget in use, %d queued",
+            self._in_use,
+            self.budget_bytes,
+            len(self._waiters),
+        )
+        return AdmissionRejected(self.retry_after())
+
+    def _publish(self) -> None:
+        ADMISSION_MEMORY_IN_USE.set(self._in_use)
+        ADMISSION_QUEUED.set(len(self._waiters))
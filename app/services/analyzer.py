@@ -1,34 +1,53 @@
-"""Wrapper around Template Sense AnalyzerService with safe defaults."""
+"""Wrapper around Template Sense AnalyzerService with safe defaults.
+
+Template Sense's pipeline and AI provider modules import the OpenAI and
+Anthropic SDKs, which dominates process start-up. They are imported on first
+use (or by ``warm_up``) rather than when this module is imported.
+"""
 
 from __future__ import annotations
 
+import contextvars
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
+from app.config import env_int
 from app.constants import (
+    CACHE_STATUS_HIT,
+    CACHE_STATUS_MISS,
+    DEFAULT_AI_TIMEOUT_SECONDS,
     DEFAULT_FIELD_DICTIONARY,
     DEFAULT_MODEL,
     DEFAULT_PROVIDER,
-    DEFAULT_LOG_LEVEL,
-    ENV_LOG_LEVEL,
+    ENV_AI_TIMEOUT_SECONDS,
     ENV_MODEL,
     ENV_PROVIDER,
 )
-from template_sense.ai_providers.config import AIConfig
-from template_sense.analyzer import extract_template_structure
 from template_sense.errors import AIProviderError
 
+from app.services.cache import ResultCache, build_cache_key
+from app.services.cassette import Cassette
+from app.services.hedging import HedgingPolicy
+from app.services.logs import configure_logging, update_log_context
+from app.services.metrics import timed_stage
+from app.services.progress import AnalysisCancelled, report_stage
+from app.services.providers import ProviderPool
+from app.services.ratelimit import RateLimiter
+from app.services.sheets import SheetSplitter, merge_sheet_results, workbook_digest
+from app.services.trimming import TrimResult, WorkbookTrimmer
 
-logger = logging.getLogger(__name__)
-
+if TYPE_CHECKING:
+    from template_sense.ai_providers.config import AIConfig
 
-def configure_logging() -> None:
-    """Configure basic logging using environment configuration."""
+    from app.services.label_memory import LabelMemory
+    from app.services.layout import LayoutCache
+    from app.services.lexical import LexicalMatcher
 
-    log_level = os.getenv(ENV_LOG_LEVEL, DEFAULT_LOG_LEVEL).upper()
-    logging.basicConfig(level=getattr(logging, log_level, logging.INFO))
+logger = logging.getLogger(__name__)
 
 
 class AnalyzerService:
@@ -39,12 +58,37 @@ class AnalyzerService:
         ai_provider: str | None = None,
         ai_model: str | None = None,
         field_dictionary: dict[str, list[str]] | None = None,
+        layout_cache: LayoutCache | None = None,
+        provider_pool: ProviderPool | None = None,
+        lexical_matcher: LexicalMatcher | None = None,
+        rate_limiter: RateLimiter | None = None,
+        trimmer: WorkbookTrimmer | None = None,
+        splitter: SheetSplitter | None = None,
+        sheet_cache: ResultCache | None = None,
+        hedging: HedgingPolicy | None = None,
+        label_memory: LabelMemory | None = None,
+        cassette: Cassette | None = None,
     ) -> None:
         self.ai_provider = (
             ai_provider or os.getenv(ENV_PROVIDER) or DEFAULT_PROVIDER
         ).lower()
         self.ai_model = ai_model or os.getenv(ENV_MODEL) or DEFAULT_MODEL
         self.field_dictionary = field_dictionary or DEFAULT_FIELD_DICTIONARY
+        self._layout_cache = layout_cache
+        self._lexical_matcher = lexical_matcher
+        self._label_memory = label_memory
+        self._lazy_lock = threading.Lock()
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
+        self.trimmer = trimmer or WorkbookTrimmer.from_env()
+        self.splitter = splitter or SheetSplitter.from_env()
+        self._sheet_cache = sheet_cache
+        self.hedging = hedging or HedgingPolicy.from_env()
+        self.cassette = cassette or Cassette.from_env()
+        # The rate limiter retries transient failures itself; SDK retries on top
+        # would multiply attempts and ignore the shared backoff.
+        self.provider_pool = provider_pool or ProviderPool.from_env(
+            sdk_max_retries=0 if self.rate_limiter.enabled else None
+        )
 
         configure_logging()
         logger.debug(
@@ -53,8 +97,67 @@ class AnalyzerService:
             self.ai_model,
         )
 
-    def _build_ai_config(self) -> AIConfig:
-        provider = (os.getenv(ENV_PROVIDER) or self.ai_provider).lower()
+    @property
+    def layout_cache(self) -> LayoutCache:
+        """Layout-fingerprint cache, built on first use."""
+
+        with self._lazy_lock:
+            if self._layout_cache is None:
+                from app.services.layout import LayoutCache
+
+                self._layout_cache = LayoutCache.from_env()
+            return self._layout_cache
+
+    @property
+    def lexical_matcher(self) -> LexicalMatcher:
+        """Local label pre-matcher, built on first use."""
+
+        with self._lazy_lock:
+            if self._lexical_matcher is None:
+                from app.services.lexical import LexicalMatcher
+
+                self._lexical_matcher = LexicalMatcher.from_env()
+            return self._lexical_matcher
+
+    @property
+    def label_memory(self) -> LabelMemory:
+        """Learned memory of past label classifications, built on first use."""
+
+        with self._lazy_lock:
+            if self._label_memory is None:
+                from app.services.label_memory import LabelMemory
+
+                self._label_memory = LabelMemory.from_env()
+            return self._label_memory
+
+    @property
+    def sheet_cache(self) -> ResultCache:
+        """Cache of per-sheet results for split workbooks, built on first use."""
+
+        with self._lazy_lock:
+            if self._sheet_cache is None:
+                self._sheet_cache = ResultCache.from_env()
+            return self._sheet_cache
+
+    @property
+    def effective_provider(self) -> str:
+        """Provider used for the next analysis, honouring environment overrides."""
+
+        return (os.getenv(ENV_PROVIDER) or self.ai_provider).lower()
+
+    @property
+    def effective_model(self) -> str:
+        """Model used for the next analysis, honouring environment overrides."""
+
+        return os.getenv(ENV_MODEL) or self.ai_model
+
+    def _build_ai_config(
+        self, provider: str | None = None, model: str | None = None
+    ) -> AIConfig:
+        from template_sense.ai_providers.config import AIConfig
+
+        if provider is None:
+            provider, model = self.effective_provider, self.effective_model
         api_key_env = "OPENAI_API_KEY" if provider == "openai" else "ANTHROPIC_API_KEY"
         api_key = os.getenv(api_key_env)
 
@@ -64,8 +167,144 @@ class AnalyzerService:
                 error_details=f"Missing required environment variable: {api_key_env}",
             )
 
-        model = os.getenv(ENV_MODEL) or self.ai_model
-        return AIConfig(provider=provider, api_key=api_key, model=model)
+        return AIConfig(
+            provider=provider,
+            api_key=api_key,
+            model=model,
+            timeout_seconds=env_int(ENV_AI_TIMEOUT_SECONDS, DEFAULT_AI_TIMEOUT_SECONDS),
+        )
+
+    def _build_secondary_config(self) -> AIConfig | None:
+        """Configuration of the provider that hedges AI calls, if hedging is on."""
+
+        if not self.hedging.enabled:
+            return None
+        provider = self.hedging.secondary_provider(self.effective_provider)
+        try:
+            return self._build_ai_config(provider, self.hedging.model)
+        except AIProviderError as exc:
+            logger.warning("AI calls are not hedged: %s", exc)
+            return None
+
+    def preload(self) -> None:
+        """Import the pipeline and build its collaborators ahead of first use."""
+
+        import app.services.pipeline  # noqa: F401
+
+        self.layout_cache  # noqa: B018
+        self.lexical_matcher  # noqa: B018
+        self.label_memory  # noqa: B018
+
+    def warm_up(self) -> None:
+        """Build the pooled provider client ahead of the first analysis."""
+
+        try:
+            self.provider_pool.get(self._build_ai_config())
+        except AIProviderError as exc:
+            logger.warning("AI provider not initialized at startup: %s", exc)
+
+    def _trim(self, path: Path) -> TrimResult:
+        """Return the compact workbook to analyze in place of ``path``."""
+
+        if not self.trimmer.enabled:
+            return TrimResult(path=path)
+        try:
+            with timed_stage("trimming", self.effective_provider, self.effective_model):
+                return self.trimmer.trim(path)
+        except Exception as exc:  # noqa: BLE001
+            # Unreadable workbooks are left to Template Sense's own validation.
+            logger.warning("Skipping workbook trimming for %s: %s", path, exc)
+            return TrimResult(path=path)
+
+    def _split(self, path: Path) -> list[TrimResult] | None:
+        """Return one workbook per independent sheet, or ``None`` to analyze whole."""
+
+        if not self.splitter.enabled:
+            return None
+        try:
+            with timed_stage(
+                "sheet_split", self.effective_provider, self.effective_model
+            ):
+                return self.splitter.split(path, self.trimmer)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Skipping sheet split for %s: %s", path, exc)
+            return None
+
+    def _run(self, path: Path, ai_config: AIConfig) -> dict[str, Any]:
+        from app.services.pipeline import run_pipeline
+
+        return run_pipeline(
+            file_path=path,
+            field_dictionary=self.field_dictionary,
+            ai_config=ai_config,
+            layout_cache=self.layout_cache,
+            provider_pool=self.provider_pool,
+            lexical_matcher=self.lexical_matcher,
+            rate_limiter=self.rate_limiter,
+            hedging=self.hedging,
+            secondary_config=self._build_secondary_config(),
+            label_memory=self.label_memory,
+            cassette=self.cassette,
+        )
+
+    def _analyze_sheet(
+        self, part: TrimResult, ai_config: AIConfig
+    ) -> tuple[TrimResult, dict[str, Any], str]:
+        """Analyze one split sheet through the per-sheet cache."""
+
+        key = build_cache_key(
+            workbook_digest(part.path),
+            provider=ai_config.provider,
+            model=ai_config.model,
+            field_dictionary=self.field_dictionary,
+        )
+        result, _ = self.sheet_cache.get(key)
+        if result is not None:
+            return part, result, CACHE_STATUS_HIT
+        result = self._run(part.path, ai_config)
+        self.sheet_cache.set(key, result)
+        return part, result, CACHE_STATUS_MISS
+
+    def _analyze_sheets(
+        self, parts: list[TrimResult], ai_config: AIConfig
+    ) -> dict[str, Any]:
+        """Analyze split sheets concurrently and merge their results."""
+
+        report_stage("sheets_split", sheets=[part.sheet for part in parts])
+        # One context copy per sheet carries the request's profile and progress
+        # stream into the worker threads.
+        contexts = [contextvars.copy_context() for _ in parts]
+        try:
+            with ThreadPoolExecutor(
+                max_workers=min(self.splitter.max_workers, len(parts)),
+                thread_name_prefix="sheet-analysis",
+            ) as pool:
+                sheets = list(
+                    pool.map(
+                        lambda context, part: context.run(
+                            self._analyze_sheet, part, ai_config
+                        ),
+                        contexts,
+                        parts,
+                    )
+                )
+        finally:
+            for part in parts:
+                part.cleanup()
+        return merge_sheet_results(sheets)
+
+    def _analyze_workbook(self, path: Path, ai_config: AIConfig) -> dict[str, Any]:
+        """Analyze ``path`` as one workbook, trimmed when it is large."""
+
+        trimmed = self._trim(path)
+        try:
+            result = self._run(trimmed.path, ai_config)
+        finally:
+            trimmed.cleanup()
+
+        if trimmed.derived:
+            result.setdefault("metadata", {})["trimming"] = trimmed.summary()
+        return result
 
     def analyze(self, file_path: str | Path) -> dict[str, Any]:
         """Run the Template Sense analyzer and return extracted metadata."""
@@ -74,15 +313,18 @@ class AnalyzerService:
         if not path.exists():
             raise FileNotFoundError(f"File not found: {path}")
 
-        logger.info("Starting template analysis for %s", path)
-
         ai_config = self._build_ai_config()
+        update_log_context(provider=ai_config.provider, model=ai_config.model)
+        logger.info("Starting template analysis for %s", path)
         try:
-            result = extract_template_structure(
-                file_path=str(path),
-                field_dictionary=self.field_dictionary,
-                ai_config=ai_config,
-            )
+            parts = self._split(path)
+            if parts is None:
+                result = self._analyze_workbook(path, ai_config)
+            else:
+                result = self._analyze_sheets(parts, ai_config)
+        except AnalysisCancelled:
+            logger.info("Template analysis cancelled for %s", path)
+            raise
         except Exception as exc:  # noqa: BLE001
             logger.exception("Template analysis failed: %s", exc)
             raise
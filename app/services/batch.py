@@ -0,0 +1,186 @@
+"""Concurrent batch analysis with per-file results streamed as they finish."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import shutil
+import tempfile
+import time
+import zipfile
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from app.constants import (
+    ALLOWED_FILE_EXTENSIONS,
+    ERROR_FILE_TOO_LARGE,
+    ERROR_NO_FILE_CONTENT,
+    MAX_FILE_SIZE_BYTES,
+    MAX_FILE_SIZE_MB,
+    UPLOAD_CHUNK_SIZE_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+BatchAnalyzer = Callable[[Path, str], Awaitable[dict[str, Any]]]
+ErrorFormatter = Callable[[Exception], str]
+
+
+@dataclass
+class BatchItem:
+    """A single file in a batch, either saved to disk or already failed."""
+
+    filename: str
+    path: Path | None = None
+    content_hash: str | None = None
+    error: str | None = None
+
+
+class BatchError(ValueError):
+    """Raised when a batch request cannot be processed at all."""
+
+
+def extract_zip_archive(
+    archive_path: Path, max_members: int
+) -> tuple[list[BatchItem], Path]:
+    """Extract spreadsheet members of a zip archive into a temporary directory.
+
+    Members are streamed out one at a time and checked against the per-file
+    size limit. Returns the batch items and the directory holding them.
+    """
+
+    try:
+        archive = zipfile.ZipFile(archive_path)
+    except zipfile.BadZipFile as exc:
+        raise BatchError("Uploaded archive is not a valid zip file.") from exc
+
+    items: list[BatchItem] = []
+    with archive:
+        members = [
+            info
+            for info in archive.infolist()
+            if not info.is_dir()
+            and not PurePosixPath(info.filename).name.startswith(".")
+            and "__MACOSX" not in PurePosixPath(info.filename).parts
+            and PurePosixPath(info.filename).suffix.lower() in ALLOWED_FILE_EXTENSIONS
+        ]
+        if len(members) > max_members:
+            raise BatchError(
+                f"Archive contains {len(members)} spreadsheets; "
+                f"the maximum per batch is {max_members}."
+            )
+
+        workdir = Path(tempfile.mkdtemp(prefix="batch-"))
+        try:
+            for index, info in enumerate(members):
+                items.append(_extract_member(archive, info, workdir / f"{index:04d}"))
+        except (zipfile.BadZipFile, OSError, RuntimeError) as exc:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise BatchError(f"Failed to read archive: {exc}") from exc
+
+    return items, workdir
+
+
+def _extract_member(
+    archive: zipfile.ZipFile, info: zipfile.ZipInfo, prefix: Path
+) -> BatchItem:
+    item = BatchItem(filename=info.filename)
+    if info.file_size > MAX_FILE_SIZE_BYTES:
+        item.error = ERROR_FILE_TOO_LARGE.format(max_size=MAX_FILE_SIZE_MB)
+        return item
+    if info.file_size == 0:
+        item.error = ERROR_NO_FILE_CONTENT
+        return item
+
+    target = prefix.with_name(f"{prefix.name}-{PurePosixPath(info.filename).name}")
+    digest = hashlib.sha256()
+    size = 0
+    with archive.open(info) as source, target.open("wb") as destination:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE_BYTES):
+            size += len(chunk)
+            if size > MAX_FILE_SIZE_BYTES:
+                break
+            digest.update(chunk)
+            destination.write(chunk)
+
+    if size > MAX_FILE_SIZE_BYTES:
+        # The central directory under-reported the size; drop the member.
+        target.unlink(missing_ok=True)
+        item.error = ERROR_FILE_TOO_LARGE.format(max_size=MAX_FILE_SIZE_MB)
+        return item
+
+    item.path = target
+    item.content_hash = digest.hexdigest()
+    return item
+
+
+def _line(payload: dict[str, Any]) -> bytes:
+    return (json.dumps(payload, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+async def stream_batch(
+    items: list[BatchItem],
+    analyze: BatchAnalyzer,
+    parallelism: int,
+    format_error: ErrorFormatter = str,
+) -> AsyncIterator[bytes]:
+    """Analyze items concurrently and yield NDJSON lines as each one finishes.
+
+    Per-file failures are reported on their own line and never abort the
+    batch. The final line is a summary with the total wall time.
+    """
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, parallelism))
+
+    async def _analyze(item: BatchItem) -> dict[str, Any]:
+        if item.error is not None or item.path is None:
+            return {
+                "type": "result",
+                "filename": item.filename,
+                "success": False,
+                "data": None,
+                "error": item.error,
+                "elapsed_ms": 0.0,
+            }
+        async with semaphore:
+            item_started = time.perf_counter()
+            try:
+                data = await analyze(item.path, item.content_hash or "")
+                success, error = True, None
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Batch item %s failed: %s", item.filename, exc)
+                data, success, error = None, False, format_error(exc)
+            return {
+                "type": "result",
+                "filename": item.filename,
+                "success": success,
+                "data": data,
+                "error": error,
+                "elapsed_ms": round((time.perf_counter() - item_started) * 1000, 2),
+            }
+
+    tasks = [asyncio.ensure_future(_analyze(item)) for item in items]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            succeeded += int(result["success"])
+            yield _line(result)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield _line(
+        {
+            "type": "summary",
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "wall_time_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+    )
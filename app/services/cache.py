@@ -0,0 +1,266 @@
+"""Content-addressed cache for analysis results with memory and disk tiers."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from app.config import env_flag, env_int
+from app.constants import (
+    CACHE_TIER_DISK,
+    CACHE_TIER_MEMORY,
+    DEFAULT_CACHE_DISK_MAX_ENTRIES,
+    DEFAULT_CACHE_ENABLED,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    DEFAULT_CACHE_TTL_SECONDS,
+    ENV_CACHE_DISK_MAX_ENTRIES,
+    ENV_CACHE_ENABLED,
+    ENV_CACHE_MAX_ENTRIES,
+    ENV_CACHE_PATH,
+    ENV_CACHE_TTL_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def build_cache_key(
+    content_hash: str,
+    provider: str,
+    model: str,
+    field_dictionary: dict[str, Any],
+) -> str:
+    """Build a cache key from the file hash and effective analysis settings."""
+
+    material = json.dumps(
+        {
+            "content": content_hash,
+            "provider": provider,
+            "model": model,
+            "fields": field_dictionary,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(result: dict[str, Any]) -> bool:
+    """Return whether a result is complete enough to be served from cache.
+
+    Template Sense records AI failures as ``error`` recovery events instead of
+    raising, so degraded results must not be pinned in the cache.
+    """
+
+    events = result.get("recovery_events") or []
+    return not any(event.get("severity") == "error" for event in events)
+
+
+class MemoryCache:
+    """Thread-safe LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Persistent cache tier backed by a single SQLite file."""
+
+    def __init__(self, path: str | Path, max_entries: int, ttl_seconds: int) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE results SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return json.loads(value)
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        now = time.time()
+        payload = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, payload, now + self.ttl_seconds, now),
+            )
+            self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        return count
+
+
+class ResultCache:
+    """Two-tier result cache: in-memory LRU in front of an optional SQLite tier."""
+
+    def __init__(
+        self,
+        memory: MemoryCache | None = None,
+        disk: SQLiteCache | None = None,
+        enabled: bool = True,
+    ) -> None:
+        self.memory = memory
+        self.disk = disk
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls) -> ResultCache:
+        """Create a cache configured from environment variables."""
+
+        enabled = env_flag(ENV_CACHE_ENABLED, DEFAULT_CACHE_ENABLED)
+        ttl_seconds = env_int(ENV_CACHE_TTL_SECONDS, DEFAULT_CACHE_TTL_SECONDS)
+        memory = MemoryCache(
+            max_entries=env_int(ENV_CACHE_MAX_ENTRIES, DEFAULT_CACHE_MAX_ENTRIES),
+            ttl_seconds=ttl_seconds,
+        )
+
+        disk: SQLiteCache | None = None
+        cache_path = os.getenv(ENV_CACHE_PATH)
+        if enabled and cache_path:
+            try:
+                disk = SQLiteCache(
+                    cache_path,
+                    max_entries=env_int(
+                        ENV_CACHE_DISK_MAX_ENTRIES, DEFAULT_CACHE_DISK_MAX_ENTRIES
+                    ),
+                    ttl_seconds=ttl_seconds,
+                )
+            except sqlite3.Error as exc:
+                logger.warning(
+                    "Disk cache disabled, cannot open %s: %s", cache_path, exc
+                )
+
+        return cls(memory=memory, disk=disk, enabled=enabled)
+
+    def get(self, key: str) -> tuple[dict[str, Any] | None, str | None]:
+        """Return the cached value and the tier that served it."""
+
+        if not self.enabled:
+            return None, None
+
+        if self.memory is not None:
+            value = self.memory.get(key)
+            if value is not None:
+                return value, CACHE_TIER_MEMORY
+
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error as exc:
+                logger.warning("Disk cache read failed: %s", exc)
+                value = None
+            if value is not None:
+                if self.memory is not None:
+                    self.memory.set(key, value)
+                return value, CACHE_TIER_DISK
+
+        return None, None
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store a value in every configured tier."""
+
+        if not self.enabled or not is_cacheable(value):
+            return
+
+        if self.memory is not None:
+            self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except (sqlite3.Error, TypeError, ValueError) as exc:
+                logger.warning("Disk cache write failed: %s", exc)
+
+    def clear(self) -> None:
+        """Drop every entry from all tiers."""
+
+        if self.memory is not None:
+            self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
@@ -0,0 +1,209 @@
+"""Record and replay AI provider calls.
+
+In ``record`` mode every provider call made by an analysis is forwarded to
+the real provider and its response saved as a cassette file; in ``replay``
+mode the saved response is served instead and the provider is never called,
+so analyses (and the integration tests) run offline, deterministically and
+in seconds. A call is identified by a hash of the provider, model, method
+and arguments (the prompt material: classification payload, text to
+translate or prompt), so any change to the workbook, field dictionary or
+pre-processing records a new cassette rather than replaying a stale one.
+
+Each call is one JSON file under ``<directory>/<provider>/``, written
+atomically so parallel sheet analyses can record side by side. Files carry
+``CASSETTE_FORMAT_VERSION``; files of another version are not replayed.
+Replay sleeps the recorded call duration times ``latency_scale`` (``0`` by
+default) to simulate provider latency.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from template_sense.errors import AIProviderError
+
+from app.config import env_float
+from app.constants import (
+    CASSETTE_FORMAT_VERSION,
+    CASSETTE_MODE_OFF,
+    CASSETTE_MODE_RECORD,
+    CASSETTE_MODE_REPLAY,
+    CASSETTE_MODES,
+    DEFAULT_AI_CASSETTE_DIR,
+    DEFAULT_AI_CASSETTE_LATENCY_SCALE,
+    DEFAULT_AI_CASSETTE_MODE,
+    ENV_AI_CASSETTE_DIR,
+    ENV_AI_CASSETTE_LATENCY_SCALE,
+    ENV_AI_CASSETTE_MODE,
+    ERROR_CASSETTE_MISS,
+)
+
+if TYPE_CHECKING:
+    from template_sense.ai_providers.interface import AIProvider
+
+logger = logging.getLogger(__name__)
+
+
+class CassetteMiss(AIProviderError):
+    """Raised in replay mode for a call that was never recorded."""
+
+    def __init__(self, provider_name: str, method: str, key: str, directory: Path):
+        super().__init__(
+            provider_name=provider_name,
+            error_details=ERROR_CASSETTE_MISS.format(
+                method=method, key=key, directory=directory
+            ),
+            request_type=method,
+        )
+        self.key = key
+
+
+def call_key(provider: str, model: str, method: str, args: tuple[Any, ...]) -> str:
+    """Return the hash identifying a provider call."""
+
+    material = json.dumps(
+        {
+            "version": CASSETTE_FORMAT_VERSION,
+            "provider": provider,
+            "model": model,
+            "method": method,
+            "args": args,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Record provider calls to, or replay them from, a cassette directory."""
+
+    def __init__(
+        self,
+        mode: str = DEFAULT_AI_CASSETTE_MODE,
+        directory: str | Path = DEFAULT_AI_CASSETTE_DIR,
+        latency_scale: float = DEFAULT_AI_CASSETTE_LATENCY_SCALE,
+    ) -> None:
+        if mode not in CASSETTE_MODES:
+            raise ValueError(
+                f"Unknown cassette mode {mode!r}; expected one of {CASSETTE_MODES}"
+            )
+        self.mode = mode
+        self.directory = Path(directory)
+        self.latency_scale = latency_scale
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> Cassette:
+        """Create a cassette configured from environment variables."""
+
+        mode = os.getenv(ENV_AI_CASSETTE_MODE, "").strip().lower()
+        if mode and mode not in CASSETTE_MODES:
+            logger.warning("Ignoring invalid %s: %r", ENV_AI_CASSETTE_MODE, mode)
+            mode = ""
+        return cls(
+            mode=mode or DEFAULT_AI_CASSETTE_MODE,
+            directory=os.getenv(ENV_AI_CASSETTE_DIR) or DEFAULT_AI_CASSETTE_DIR,
+            latency_scale=env_float(
+                ENV_AI_CASSETTE_LATENCY_SCALE, DEFAULT_AI_CASSETTE_LATENCY_SCALE
+            ),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != CASSETTE_MODE_OFF
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == CASSETTE_MODE_REPLAY
+
+    def wrap(self, provider: AIProvider) -> AIProvider:
+        """Return ``provider`` with its calls recorded or replayed (unchanged if off)."""
+
+        if not self.enabled:
+            return provider
+        # Deferred: the AIProvider base class pulls in both provider SDKs.
+        from app.services.cassette_provider import CassetteProvider
+
+        return CassetteProvider(provider, self)
+
+    def path(self, provider: str, method: str, key: str) -> Path:
+        return self.directory / provider / f"{method}-{key[:32]}.json"
+
+    def call(
+        self,
+        provider: AIProvider,
+        method: str,
+        args: tuple[Any, ...],
+        forward: Callable[..., Any],
+    ) -> Any:
+        """Replay the recorded response of a call, or make and record it."""
+
+        name = provider.provider_name
+        key = call_key(name, provider.model, method, args)
+        path = self.path(name, method, key)
+        if self.replaying:
+            return self._replay(path, name, method, key)
+
+        started = time.perf_counter()
+        response = forward(*args)
+        duration = time.perf_counter() - started
+        if self.mode == CASSETTE_MODE_RECORD:
+            self._record(
+                path,
+                {
+                    "version": CASSETTE_FORMAT_VERSION,
+                    "key": key,
+                    "provider": name,
+                    "model": provider.model,
+                    "method": method,
+                    "request": args,
+                    "response": response,
+                    "duration_seconds": round(duration, 4),
+                },
+            )
+        return response
+
+    def _replay(self, path: Path, provider: str, method: str, key: str) -> Any:
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entry = None
+        if (
+            not isinstance(entry, dict)
+            or entry.get("version") != CASSETTE_FORMAT_VERSION
+            or entry.get("key") != key
+        ):
+            self.misses += 1
+            logger.warning("No cassette for %s call %s", method, key[:12])
+            raise CassetteMiss(provider, method, key, self.directory)
+        if self.latency_scale > 0:
+            time.sleep(entry.get("duration_seconds", 0.0) * self.latency_scale)
+        self.replayed += 1
+        return entry["response"]
+
+    def _record(self, path: Path, entry: dict[str, Any]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        encoded = json.dumps(entry, indent=2, ensure_ascii=False, default=str)
+        handle, temp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as file_handle:
+                file_handle.write(encoded + "\n")
+            os.replace(temp_name, path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+        self.recorded += 1
+        logger.debug("Recorded %s call to %s", entry["method"], path)
@@ -0,0 +1,75 @@
+"""``AIProvider`` wrapper that records or replays calls through a ``Cassette``.
+
+Kept apart from ``app.services.cassette`` because subclassing ``AIProvider``
+imports the provider SDKs.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from template_sense.ai_providers.interface import AIProvider
+
+from app.services.cassette import Cassette
+
+
+class CassetteProvider(AIProvider):
+    """Record every call of a provider to a cassette, or replay it from one."""
+
+    def __init__(self, provider: AIProvider, cassette: Cassette) -> None:
+        super().__init__(provider.config)
+        self.provider = provider
+        self.cassette = cassette
+
+    @property
+    def provider_name(self) -> str:
+        return self.provider.provider_name
+
+    @property
+    def model(self) -> str:
+        return self.provider.model
+
+    def classify_fields(
+        self, payload: dict[str, Any], context: str = "headers"
+    ) -> dict[str, Any]:
+        return self.cassette.call(
+            self.provider,
+            "classify_fields",
+            (payload, context),
+            self.provider.classify_fields,
+        )
+
+    def classify_all_fields(
+        self, payload: dict[str, Any], contexts: list[str] | None = None
+    ) -> dict[str, Any]:
+        return self.cassette.call(
+            self.provider,
+            "classify_all_fields",
+            (payload, contexts),
+            self.provider.classify_all_fields,
+        )
+
+    def translate_text(
+        self, text: str, source_lang: str, target_lang: str = "en"
+    ) -> str:
+        return self.cassette.call(
+            self.provider,
+            "translate_text",
+            (text, source_lang, target_lang),
+            self.provider.translate_text,
+        )
+
+    def generate_text(
+        self,
+        prompt: str,
+        system_message: str | None = None,
+        max_tokens: int = 150,
+        temperature: float = 0.0,
+        json_mode: bool = True,
+    ) -> str:
+        return self.cassette.call(
+            self.provider,
+            "generate_text",
+            (prompt, system_message, max_tokens, temperature, json_mode),
+            self.provider.generate_text,
+        )
@@ -0,0 +1,174 @@
+"""One-pass JSON serialization and negotiated compression for API responses.
+
+Analysis results are already plain JSON-compatible dicts, so they are written
+straight to bytes with orjson instead of being validated into a Pydantic
+model, dumped back to a dict and encoded again by the stdlib ``json`` module.
+Bodies above a size threshold are compressed with the best encoding the client
+accepts: zstd and brotli when their optional packages are installed, gzip
+always.
+"""
+
+from __future__ import annotations
+
+import gzip
+from collections.abc import Callable, Mapping
+from typing import Any
+
+import orjson
+from starlette.responses import Response
+
+from app.config import env_flag, env_int
+from app.constants import (
+    DEFAULT_RESPONSE_COMPRESSION_ENABLED,
+    DEFAULT_RESPONSE_COMPRESSION_MIN_BYTES,
+    ENV_RESPONSE_COMPRESSION_ENABLED,
+    ENV_RESPONSE_COMPRESSION_MIN_BYTES,
+    RESPONSE_COMPRESSION_LEVELS,
+)
+from app.services.metrics import RESPONSE_BYTES, labelled
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+IDENTITY = "identity"
+
+_COMPRESSORS: dict[str, Callable[[bytes, int], bytes]] = {
+    "gzip": lambda data, level: gzip.compress(data, compresslevel=level, mtime=0),
+}
+if brotli is not None:
+    _COMPRESSORS["br"] = lambda data, level: brotli.compress(data, quality=level)
+if zstandard is not None:
+    _COMPRESSORS["zstd"] = lambda data, level: zstandard.ZstdCompressor(
+        level=level
+    ).compress(data)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize ``content`` to compact UTF-8 JSON."""
+
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def parse_accept_encoding(header: str | None) -> dict[str, float]:
+    """Map each coding in an ``Accept-Encoding`` header to its q-value."""
+
+    accepted: dict[str, float] = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+class EncodedJSONResponse(Response):
+    """JSON response whose body was serialized (and maybe compressed) upfront."""
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        body: bytes,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        encoding: str | None = None,
+        vary: bool = True,
+    ) -> None:
+        headers = dict(headers or {})
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        if vary:
+            headers["Vary"] = "Accept-Encoding"
+        self.encoding = encoding
+        super().__init__(body, status_code=status_code, headers=headers)
+
+
+class ResponseEncoder:
+    """Serialize response payloads and compress them for the requesting client."""
+
+    def __init__(
+        self,
+        enabled: bool = DEFAULT_RESPONSE_COMPRESSION_ENABLED,
+        min_bytes: int = DEFAULT_RESPONSE_COMPRESSION_MIN_BYTES,
+        levels: Mapping[str, int] = RESPONSE_COMPRESSION_LEVELS,
+    ) -> None:
+        self.enabled = enabled
+        self.min_bytes = min_bytes
+        self.levels = dict(levels)
+        # Server preference order for equally acceptable codings.
+        self.encodings = tuple(name for name in self.levels if name in _COMPRESSORS)
+
+    @classmethod
+    def from_env(cls) -> ResponseEncoder:
+        """Create an encoder configured from environment variables."""
+
+        return cls(
+            enabled=env_flag(
+                ENV_RESPONSE_COMPRESSION_ENABLED, DEFAULT_RESPONSE_COMPRESSION_ENABLED
+            ),
+            min_bytes=env_int(
+                ENV_RESPONSE_COMPRESSION_MIN_BYTES,
+                DEFAULT_RESPONSE_COMPRESSION_MIN_BYTES,
+            ),
+        )
+
+    def negotiate(self, accept_encoding: str | None) -> str | None:
+        """Pick the compression for ``accept_encoding``, or ``None`` for identity."""
+
+        if not self.enabled:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_quality = None, 0.0
+        for name in self.encodings:
+            quality = accepted.get(name, wildcard)
+            if quality > best_quality:
+                best, best_quality = name, quality
+        return best
+
+    def compress(
+        self, body: bytes, accept_encoding: str | None
+    ) -> tuple[bytes, str | None]:
+        """Compress ``body`` when it is large enough and the client accepts it."""
+
+        encoding = None
+        if len(body) >= self.min_bytes:
+            encoding = self.negotiate(accept_encoding)
+        if encoding is not None:
+            body = _COMPRESSORS[encoding](body, self.levels[encoding])
+        labelled(RESPONSE_BYTES, encoding or IDENTITY).inc(len(body))
+        return body, encoding
+
+    def response(
+        self,
+        content: Any,
+        accept_encoding: str | None,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+    ) -> EncodedJSONResponse:
+        """Build a response for ``content`` encoded for ``accept_encoding``."""
+
+        body, encoding = self.compress(dumps(content), accept_encoding)
+        return EncodedJSONResponse(
+            body,
+            status_code=status_code,
+            headers=headers,
+            encoding=encoding,
+            vary=self.enabled,
+        )
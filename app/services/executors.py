@@ -0,0 +1,162 @@
+"""Execution backends that run analyses off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import env_int
+from app.constants import (
+    DEFAULT_EXECUTION_MODE,
+    DEFAULT_PROCESS_MAX_TASKS_PER_CHILD,
+    ENV_EXECUTION_MODE,
+    ENV_PROCESS_MAX_TASKS_PER_CHILD,
+    ENV_PROCESS_POOL_SIZE,
+    EXECUTION_MODE_PROCESS,
+    EXECUTION_MODE_THREAD,
+)
+from app.services.analyzer import AnalyzerService
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Per-process analyzer built once by the pool initializer.
+_worker_service: AnalyzerService | None = None
+
+
+def _init_worker(
+    ai_provider: str, ai_model: str, field_dictionary: dict[str, Any]
+) -> None:
+    """Pre-warm a pool process by importing Template Sense once."""
+
+    global _worker_service
+    import template_sense.analyzer  # noqa: F401
+
+    _worker_service = AnalyzerService(
+        ai_provider=ai_provider,
+        ai_model=ai_model,
+        field_dictionary=field_dictionary,
+    )
+
+
+def _analyze_in_worker(file_path: str) -> dict[str, Any]:
+    if _worker_service is None:
+        raise RuntimeError("Process pool worker was not initialized")
+    return _worker_service.analyze(file_path)
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+class ProcessPoolBackend:
+    """Run analyses in a persistent pool of pre-warmed worker processes.
+
+    Workers use the ``spawn`` start method so they never inherit the parent's
+    event loop or threads. ``max_tasks_per_child`` recycles workers to cap
+    memory growth from openpyxl (Python 3.11+ only).
+    """
+
+    def __init__(
+        self,
+        service: AnalyzerService,
+        max_workers: int,
+        max_tasks_per_child: int | None = None,
+    ) -> None:
+        self.service = service
+        self.max_workers = max(1, max_workers)
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Create the pool and wait until every worker has been spawned."""
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        options: dict[str, Any] = {}
+        if self.max_tasks_per_child and sys.version_info >= (3, 11):
+            options["max_tasks_per_child"] = self.max_tasks_per_child
+        elif self.max_tasks_per_child:
+            logger.warning("max_tasks_per_child requires Python 3.11+; ignoring it")
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                self.service.ai_provider,
+                self.service.ai_model,
+                self.service.field_dictionary,
+            ),
+            **options,
+        )
+        pids = {
+            future.result()
+            for future in [executor.submit(_ready) for _ in range(self.max_workers)]
+        }
+        logger.info("Process pool ready with %d worker(s)", len(pids))
+        return executor
+
+    def shutdown(self) -> None:
+        """Stop the pool, cancelling work that has not started."""
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run a picklable callable in the pool."""
+
+        if self._executor is None:
+            await run_in_threadpool(self.start)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def analyze(self, file_path: Path) -> dict[str, Any]:
+        """Analyze a file in a worker process."""
+
+        return await self.run(_analyze_in_worker, str(file_path))
+
+
+def create_process_backend(service: AnalyzerService) -> ProcessPoolBackend | None:
+    """Return a process pool backend when enabled by the environment."""
+
+    mode = (os.getenv(ENV_EXECUTION_MODE) or DEFAULT_EXECUTION_MODE).lower()
+    if mode == EXECUTION_MODE_THREAD:
+        return None
+    if mode != EXECUTION_MODE_PROCESS:
+        logger.warning(
+            "Unknown %s=%r; falling back to %s",
+            ENV_EXECUTION_MODE,
+            mode,
+            EXECUTION_MODE_THREAD,
+        )
+        return None
+
+    return ProcessPoolBackend(
+        service,
+        max_workers=env_int(ENV_PROCESS_POOL_SIZE, os.cpu_count() or 1),
+        max_tasks_per_child=env_int(
+            ENV_PROCESS_MAX_TASKS_PER_CHILD, DEFAULT_PROCESS_MAX_TASKS_PER_CHILD
+        ),
+    )
@@ -0,0 +1,409 @@
+"""Hedged AI calls and circuit breaking across two providers.
+
+When hedging is enabled, every AI call goes to the primary provider first.
+If it has not answered within a deadline taken from that provider's recent
+latencies (``TEMPLATE_SENSE_HEDGE_PERCENTILE`` of its last successful
+calls for the same method), the same call is sent to the secondary provider
+and whichever answer arrives first is used. A call the primary fails is
+retried once on the secondary.
+
+Each provider and model has a ``CircuitBreaker``: after
+``failure_threshold`` consecutive failures it opens and calls go straight to
+the other provider until ``reset_seconds`` have passed, after which a single
+trial call decides whether it closes again.
+
+Provider SDK calls cannot be interrupted, so the losing call is abandoned
+rather than cancelled: a queued one never starts, a running one finishes in
+the background and only its latency and outcome are recorded.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from app.config import env_flag, env_float, env_int
+from app.constants import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+    DEFAULT_CIRCUIT_RESET_SECONDS,
+    DEFAULT_HEDGE_ENABLED,
+    DEFAULT_HEDGE_INITIAL_DELAY_SECONDS,
+    DEFAULT_HEDGE_MIN_DELAY_SECONDS,
+    DEFAULT_HEDGE_PERCENTILE,
+    ENV_CIRCUIT_FAILURE_THRESHOLD,
+    ENV_CIRCUIT_RESET_SECONDS,
+    ENV_HEDGE_ENABLED,
+    ENV_HEDGE_INITIAL_DELAY_SECONDS,
+    ENV_HEDGE_MIN_DELAY_SECONDS,
+    ENV_HEDGE_MODEL,
+    ENV_HEDGE_PERCENTILE,
+    ENV_HEDGE_PROVIDER,
+    HEDGE_LATENCY_WINDOW,
+    HEDGE_MAX_WORKERS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_ROLE_PRIMARY,
+    HEDGE_ROLE_SECONDARY,
+)
+from app.services.metrics import (
+    AI_CIRCUIT_OPEN,
+    AI_FAILOVERS,
+    AI_HEDGE_LATENCY_SAVED,
+    AI_HEDGE_WINS,
+    labelled,
+)
+
+if TYPE_CHECKING:
+    from template_sense.ai_providers.interface import AIProvider
+
+logger = logging.getLogger(__name__)
+
+_PROVIDERS = ("openai", "anthropic")
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one provider and model."""
+
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = DEFAULT_CIRCUIT_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.provider = provider
+        self.model = model
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """Return whether a call may go to this provider now.
+
+        An open circuit lets one trial call through once ``reset_seconds``
+        have passed.
+        """
+
+        with self._lock:
+            if self._state == CIRCUIT_CLOSED:
+                return True
+            if (
+                self._state == CIRCUIT_OPEN
+                and self._clock() - self._opened_at >= self.reset_seconds
+            ):
+                self._state = CIRCUIT_HALF_OPEN
+            if self._state == CIRCUIT_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """Forget an allowed call that never ran."""
+
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+        labelled(AI_CIRCUIT_OPEN, self.provider, self.model).set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == CIRCUIT_OPEN:
+                return
+            if (
+                self._state == CIRCUIT_HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._state = CIRCUIT_OPEN
+                self._opened_at = self._clock()
+                self.opened += 1
+                logger.warning(
+                    "Circuit opened for %s/%s after %d consecutive failure(s)",
+                    self.provider,
+                    self.model,
+                    self._failures,
+                )
+        labelled(AI_CIRCUIT_OPEN, self.provider, self.model).set(
+            int(self.state != CIRCUIT_CLOSED)
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "model": self.model,
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.opened,
+            }
+
+
+class LatencyWindow:
+    """The most recent successful call latencies of one provider method."""
+
+    def __init__(self, size: int = HEDGE_LATENCY_WINDOW) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> float | None:
+        """Return the nearest-rank percentile.
+
+        ``None`` until the minimum sample count has been reached.
+        """
+
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        rank = max(int(len(samples) * percent / 100.0 + 0.5) - 1, 0)
+        return samples[min(rank, len(samples) - 1)]
+
+
+@dataclass
+class Route:
+    """One provider and model able to answer a call."""
+
+    provider: str
+    model: str
+    call: Callable[[], Any]
+
+
+class HedgingPolicy:
+    """Hedging deadlines, circuit breakers and the threads hedged calls run on."""
+
+    def __init__(
+        self,
+        enabled: bool = DEFAULT_HEDGE_ENABLED,
+        provider: str | None = None,
+        model: str | None = None,
+        percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        initial_delay: float = DEFAULT_HEDGE_INITIAL_DELAY_SECONDS,
+        min_delay: float = DEFAULT_HEDGE_MIN_DELAY_SECONDS,
+        failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = DEFAULT_CIRCUIT_RESET_SECONDS,
+    ) -> None:
+        self.enabled = enabled
+        self.provider = provider.lower() if provider else None
+        self.model = model
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._breakers: dict[tuple[str, str], CircuitBreaker] = {}
+        self._latencies: dict[tuple[str, str, str], LatencyWindow] = {}
+        self._executor: ThreadPoolExecutor | None = None
+
+    @classmethod
+    def from_env(cls) -> HedgingPolicy:
+        """Create a hedging policy configured from environment variables."""
+
+        return cls(
+            enabled=env_flag(ENV_HEDGE_ENABLED, DEFAULT_HEDGE_ENABLED),
+            provider=os.getenv(ENV_HEDGE_PROVIDER) or None,
+            model=os.getenv(ENV_HEDGE_MODEL) or None,
+            percentile=env_float(ENV_HEDGE_PERCENTILE, DEFAULT_HEDGE_PERCENTILE),
+            initial_delay=env_float(
+                ENV_HEDGE_INITIAL_DELAY_SECONDS, DEFAULT_HEDGE_INITIAL_DELAY_SECONDS
+            ),
+            min_delay=env_float(
+                ENV_HEDGE_MIN_DELAY_SECONDS, DEFAULT_HEDGE_MIN_DELAY_SECONDS
+            ),
+            failure_threshold=env_int(
+                ENV_CIRCUIT_FAILURE_THRESHOLD, DEFAULT_CIRCUIT_FAILURE_THRESHOLD
+            ),
+            reset_seconds=env_float(
+                ENV_CIRCUIT_RESET_SECONDS, DEFAULT_CIRCUIT_RESET_SECONDS
+            ),
+        )
+
+    def secondary_provider(self, primary: str) -> str:
+        """The provider hedged calls go to: the configured one, else the other one."""
+
+        if self.provider:
+            return self.provider
+        return next(name for name in _PROVIDERS if name != primary)
+
+    def breaker(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(
+                    provider, model, self.failure_threshold, self.reset_seconds
+                )
+            return breaker
+
+    def _window(self, route: Route, method: str) -> LatencyWindow:
+        key = (route.provider, route.model, method)
+        with self._lock:
+            window = self._latencies.get(key)
+            if window is None:
+                window = self._latencies[key] = LatencyWindow()
+            return window
+
+    def deadline(self, route: Route, method: str) -> float:
+        """Seconds to wait for ``route`` before hedging ``method``."""
+
+        observed = self._window(route, method).percentile(self.percentile)
+        if observed is None:
+            return self.initial_delay
+        return max(observed, self.min_delay)
+
+    def wrap(self, primary: AIProvider, secondary: AIProvider) -> AIProvider:
+        """Return ``primary`` hedged by ``secondary`` (unchanged if disabled)."""
+
+        if not self.enabled:
+            return primary
+        # Deferred: the AIProvider base class pulls in both provider SDKs.
+        from app.services.hedging_provider import HedgedProvider
+
+        return HedgedProvider(primary, secondary, self)
+
+    def _submit(self, route: Route, method: str) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="ai-hedge"
+                )
+            executor = self._executor
+        # Carry the request's profile and other context into the worker.
+        context = contextvars.copy_context()
+        return executor.submit(context.run, self._attempt, route, method)
+
+    def _attempt(self, route: Route, method: str) -> Any:
+        """Call ``route`` and record its latency and outcome."""
+
+        breaker = self.breaker(route.provider, route.model)
+        started = time.monotonic()
+        try:
+            result = route.call()
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        self._window(route, method).add(time.monotonic() - started)
+        return result
+
+    @staticmethod
+    def _record_failover(primary: Route, secondary: Route, method: str) -> None:
+        labelled(AI_FAILOVERS, primary.provider, primary.model).inc()
+        logger.warning(
+            "Sending %s to %s/%s instead of %s/%s",
+            method,
+            secondary.provider,
+            secondary.model,
+            primary.provider,
+            primary.model,
+        )
+
+    def _failover(self, primary: Route, secondary: Route, method: str) -> Any:
+        self._record_failover(primary, secondary, method)
+        return self._attempt(secondary, method)
+
+    def call(self, method: str, primary: Route, secondary: Route) -> Any:
+        """Run ``method`` on ``primary`` with ``secondary`` as hedge and failover."""
+
+        secondary_breaker = self.breaker(secondary.provider, secondary.model)
+        if not self.breaker(primary.provider, primary.model).allow():
+            if secondary_breaker.allow():
+                return self._failover(primary, secondary, method)
+            # Both circuits are open: the primary is still the best bet.
+            return self._attempt(primary, method)
+
+        first = self._submit(primary, method)
+        done, _ = wait([first], timeout=self.deadline(primary, method))
+        if done:
+            error = first.exception()
+            if error is None:
+                return first.result()
+            if not secondary_breaker.allow():
+                raise error
+            return self._failover(primary, secondary, method)
+
+        if not secondary_breaker.allow():
+            return first.result()
+        hedge = self._submit(secondary, method)
+        done, _ = wait([first, hedge], return_when=FIRST_COMPLETED)
+        if first in done and first.exception() is not None:
+            # The primary failed rather than lost: the hedge is now a failover.
+            self._record_failover(primary, secondary, method)
+            return hedge.result()
+        winner = first if first in done else hedge
+        if winner is hedge:
+            if hedge.exception() is not None:
+                # The hedge failed first; the primary may still answer.
+                return first.result()
+            if first.cancel():
+                self.breaker(primary.provider, primary.model).release()
+            self._record_hedge_win(primary, secondary, first)
+        else:
+            if hedge.cancel():
+                secondary_breaker.release()
+            labelled(
+                AI_HEDGE_WINS, primary.provider, primary.model, HEDGE_ROLE_PRIMARY
+            ).inc()
+        return winner.result()
+
+    @staticmethod
+    def _record_hedge_win(primary: Route, secondary: Route, abandoned: Future) -> None:
+        labelled(
+            AI_HEDGE_WINS, secondary.provider, secondary.model, HEDGE_ROLE_SECONDARY
+        ).inc()
+        won_at = time.monotonic()
+
+        def _saved(future: Future) -> None:
+            if not future.cancelled() and future.exception() is None:
+                labelled(
+                    AI_HEDGE_LATENCY_SAVED, primary.provider, primary.model
+                ).observe(time.monotonic() - won_at)
+
+        abandoned.add_done_callback(_saved)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """State of every circuit breaker seen so far."""
+
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [breaker.snapshot() for breaker in breakers]
+
+    def shutdown(self) -> None:
+        """Stop the hedging threads without waiting for abandoned calls."""
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,75 @@
+"""``AIProvider`` that hedges every call of one provider with another.
+
+Kept apart from ``app.services.hedging`` because subclassing ``AIProvider``
+imports the provider SDKs.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from template_sense.ai_providers.interface import AIProvider
+
+from app.services.hedging import HedgingPolicy, Route
+
+
+class HedgedProvider(AIProvider):
+    """Send each call to ``primary``, hedged by ``secondary`` per ``policy``."""
+
+    def __init__(
+        self, primary: AIProvider, secondary: AIProvider, policy: HedgingPolicy
+    ) -> None:
+        super().__init__(primary.config)
+        self.primary = primary
+        self.secondary = secondary
+        self.policy = policy
+
+    @property
+    def provider_name(self) -> str:
+        return self.primary.provider_name
+
+    @property
+    def model(self) -> str:
+        return self.primary.model
+
+    def _call(self, method: str, *args: Any) -> Any:
+        return self.policy.call(
+            method,
+            Route(
+                self.primary.provider_name,
+                self.primary.model,
+                lambda: getattr(self.primary, method)(*args),
+            ),
+            Route(
+                self.secondary.provider_name,
+                self.secondary.model,
+                lambda: getattr(self.secondary, method)(*args),
+            ),
+        )
+
+    def classify_fields(
+        self, payload: dict[str, Any], context: str = "headers"
+    ) -> dict[str, Any]:
+        return self._call("classify_fields", payload, context)
+
+    def classify_all_fields(
+        self, payload: dict[str, Any], contexts: list[str] | None = None
+    ) -> dict[str, Any]:
+        return self._call("classify_all_fields", payload, contexts)
+
+    def translate_text(
+        self, text: str, source_lang: str, target_lang: str = "en"
+    ) -> str:
+        return self._call("translate_text", text, source_lang, target_lang)
+
+    def generate_text(
+        self,
+        prompt: str,
+        system_message: str | None = None,
+        max_tokens: int = 150,
+        temperature: float = 0.0,
+        json_mode: bool = True,
+    ) -> str:
+        return self._call(
+            "generate_text", prompt, system_message, max_tokens, temperature, json_mode
+        )
@@ -0,0 +1,243 @@
+"""Background analysis jobs backed by a bounded queue and worker pool."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field, replace
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+from app.services.logs import bind_log_context
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Lifecycle states of an analysis job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    @property
+    def is_terminal(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+@dataclass
+class Job:
+    """State of a single analysis job."""
+
+    id: str
+    filename: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Job queue is full; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobStore(ABC):
+    """Persistence interface for job state."""
+
+    @abstractmethod
+    async def save(self, job: Job) -> None:
+        """Create or replace a job."""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Job | None:
+        """Return a job by id, or ``None`` when unknown."""
+
+    @abstractmethod
+    async def wait(self, job_id: str, timeout: float) -> Job | None:
+        """Return the job once it is terminal or ``timeout`` seconds elapse."""
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job store that keeps the most recent ``max_jobs`` jobs."""
+
+    def __init__(self, max_jobs: int = 1000) -> None:
+        self.max_jobs = max_jobs
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._done: dict[str, asyncio.Event] = {}
+
+    async def save(self, job: Job) -> None:
+        self._jobs[job.id] = replace(job)
+        self._jobs.move_to_end(job.id)
+        done = self._done.setdefault(job.id, asyncio.Event())
+        if job.status.is_terminal:
+            done.set()
+        self._evict()
+
+    async def get(self, job_id: str) -> Job | None:
+        job = self._jobs.get(job_id)
+        return replace(job) if job else None
+
+    async def wait(self, job_id: str, timeout: float) -> Job | None:
+        done = self._done.get(job_id)
+        if done is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            # ``asyncio.wait_for`` raises ``asyncio.TimeoutError`` on Python 3.10.
+            except asyncio.TimeoutError:  # noqa: UP041
+                pass
+        return await self.get(job_id)
+
+    def _evict(self) -> None:
+        # Only finished jobs are evicted; queued and running jobs stay visible.
+        overflow = len(self._jobs) - self.max_jobs
+        if overflow <= 0:
+            return
+        for job_id in [
+            job_id for job_id, job in self._jobs.items() if job.status.is_terminal
+        ][:overflow]:
+            del self._jobs[job_id]
+            self._done.pop(job_id, None)
+
+
+JobRunner = Callable[[Path, str], Awaitable[dict[str, Any]]]
+ErrorFormatter = Callable[[Exception], str]
+
+
+@dataclass
+class _QueuedJob:
+    job: Job
+    path: Path
+    content_hash: str
+
+
+class JobManager:
+    """Run submitted jobs on a fixed pool of asyncio workers.
+
+    ``submit`` never blocks: when the queue is full it raises
+    :class:`QueueFullError` with a ``Retry-After`` estimate derived from the
+    recent average job duration.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        runner: JobRunner,
+        workers: int,
+        max_queue_size: int,
+        format_error: ErrorFormatter = str,
+    ) -> None:
+        self.store = store
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self.format_error = format_error
+        self._queue: asyncio.Queue[_QueuedJob] | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+        self._avg_duration = 1.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"job-worker-{index}")
+            for index in range(self.workers)
+        ]
+        logger.info(
+            "Started %d job workers (queue size %d)", self.workers, self.max_queue_size
+        )
+
+    async def stop(self) -> None:
+        """Cancel workers and discard queued uploads."""
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while self._queue is not None and not self._queue.empty():
+            queued = self._queue.get_nowait()
+            queued.path.unlink(missing_ok=True)
+            queued.job.status = JobStatus.FAILED
+            queued.job.finished_at = time.time()
+            queued.job.error = "Job cancelled during shutdown."
+            await self.store.save(queued.job)
+
+    async def submit(self, path: Path, content_hash: str, filename: str) -> Job:
+        """Queue an uploaded file for analysis and return the new job."""
+
+        if self._queue is None:
+            raise RuntimeError("JobManager.start() must be called before submit()")
+        if self._queue.full():
+            raise QueueFullError(self.retry_after())
+
+        job = Job(id=uuid.uuid4().hex, filename=filename)
+        await self.store.save(job)
+        self._queue.put_nowait(
+            _QueuedJob(job=job, path=path, content_hash=content_hash)
+        )
+        return job
+
+    def retry_after(self) -> int:
+        """Estimate seconds until a queue slot frees up."""
+
+        backlog = self.queue_depth / self.workers
+        return max(1, math.ceil(self._avg_duration * max(backlog, 1.0)))
+
+    async def _work(self) -> None:
+        assert self._queue is not None
+        while True:
+            queued = await self._queue.get()
+            try:
+                await self._run(queued)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, queued: _QueuedJob) -> None:
+        job = queued.job
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        await self.store.save(job)
+
+        try:
+            with bind_log_context(job_id=job.id):
+                job.result = await self.runner(queued.path, queued.content_hash)
+            job.status = JobStatus.SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = JobStatus.FAILED
+            job.error = "Job cancelled during shutdown."
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Job %s failed: %s", job.id, exc)
+            job.status = JobStatus.FAILED
+            job.error = self.format_error(exc)
+        finally:
+            queued.path.unlink(missing_ok=True)
+            job.finished_at = time.time()
+            duration = job.finished_at - job.started_at
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            await self.store.save(job)
@@ -0,0 +1,414 @@
+"""Learned memory of past label classifications.
+
+Template Sense maps each label to a field dictionary key through translation,
+fuzzy matching and, failing those, AI semantic matching. The same label
+variants ("Gross Wt (kg)", "G.W.", "Total G/W") recur across templates, so
+every confident decision is remembered here: the normalized label, the key it
+resolved to and the match confidence, stored in SQLite and indexed in memory
+as hashed character-trigram vectors. Before the AI call, the lexical
+pre-matcher resolves labels whose nearest remembered label is similar enough
+(cosine similarity, one NumPy matrix product per dictionary section) exactly
+like near-verbatim dictionary labels.
+
+Entries are versioned by a hash of the dictionary section they were learned
+against, so changing the field dictionary discards them. When the store is
+full, the least recently used entries are evicted.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from template_sense.pipeline.stages import PipelineContext
+
+from app.config import env_flag, env_float, env_int
+from app.constants import (
+    DEFAULT_LABEL_MEMORY_ENABLED,
+    DEFAULT_LABEL_MEMORY_MAX_ENTRIES,
+    DEFAULT_LABEL_MEMORY_MIN_SIMILARITY,
+    ENV_LABEL_MEMORY_ENABLED,
+    ENV_LABEL_MEMORY_MAX_ENTRIES,
+    ENV_LABEL_MEMORY_MIN_SIMILARITY,
+    ENV_LABEL_MEMORY_PATH,
+    LABEL_MEMORY_AMBIGUITY_MARGIN,
+    LABEL_MEMORY_DIMENSIONS,
+    LABEL_MEMORY_EVICT_FRACTION,
+    LABEL_MEMORY_MIN_MATCH_SCORE,
+)
+from app.services.lexical import (
+    SOURCE_LEXICAL,
+    SOURCE_MEMORY,
+    LexicalMatch,
+    normalize,
+)
+from app.services.metrics import LABEL_MEMORY_ENTRIES, LABEL_MEMORY_LOOKUPS, labelled
+
+logger = logging.getLogger(__name__)
+
+SECTION_HEADERS = "headers"
+SECTION_COLUMNS = "columns"
+
+LOOKUP_HIT = "hit"
+LOOKUP_MISS = "miss"
+
+
+def dictionary_version(dictionary: dict[str, list[str]]) -> str:
+    """Return a short hash identifying one section of the field dictionary."""
+
+    material = json.dumps(
+        dictionary, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def vectorize(
+    phrases: list[str], dimensions: int = LABEL_MEMORY_DIMENSIONS
+) -> np.ndarray:
+    """Hash each phrase's character trigrams into an L2-normalized row."""
+
+    matrix = np.zeros((len(phrases), dimensions), dtype=np.float32)
+    for row, phrase in enumerate(phrases):
+        padded = f"  {phrase} "
+        for start in range(len(padded) - 2):
+            gram = padded[start : start + 3].encode("utf-8")
+            matrix[row, zlib.crc32(gram) % dimensions] += 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _variant(dictionary: dict[str, list[str]], key: str) -> str:
+    variants = dictionary.get(key) or []
+    return variants[0] if variants else key.replace("_", " ")
+
+
+class _Index:
+    """Vectors of the labels remembered for one dictionary section and version."""
+
+    def __init__(self, dimensions: int) -> None:
+        self.phrases: list[str] = []
+        self.keys: list[str] = []
+        self.confidences: list[float] = []
+        self.rows: dict[str, int] = {}
+        self._key_ids: dict[str, int] = {}
+        self._row_keys = np.zeros(0, dtype=np.int32)
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def upsert(
+        self,
+        phrases: list[str],
+        keys: list[str],
+        confidences: list[float],
+        vectors: np.ndarray,
+    ) -> None:
+        new_rows = []
+        for position, (phrase, key, confidence) in enumerate(
+            zip(phrases, keys, confidences)
+        ):
+            key_id = self._key_ids.setdefault(key, len(self._key_ids))
+            row = self.rows.get(phrase)
+            if row is not None:
+                self.keys[row] = key
+                self.confidences[row] = confidence
+                self._row_keys[row] = key_id
+                continue
+            self.rows[phrase] = len(self.keys)
+            self.phrases.append(phrase)
+            self.keys.append(key)
+            self.confidences.append(confidence)
+            new_rows.append((position, key_id))
+        if new_rows:
+            positions, key_ids = zip(*new_rows)
+            self._vectors = np.vstack([self._vectors, vectors[list(positions)]])
+            self._row_keys = np.concatenate(
+                [self._row_keys, np.asarray(key_ids, dtype=np.int32)]
+            )
+
+    def search(
+        self, queries: np.ndarray, min_similarity: float
+    ) -> list[tuple[int, float] | None]:
+        """Return the nearest row and its cosine for each query, if unambiguous."""
+
+        if not self.keys or not len(queries):
+            return [None] * len(queries)
+        scores = queries @ self._vectors.T
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(queries)), best]
+        # The closest label remembered for any *other* key must trail clearly.
+        same_key = self._row_keys[None, :] == self._row_keys[best][:, None]
+        rivals = np.where(same_key, -1.0, scores).max(axis=1)
+        found: list[tuple[int, float] | None] = []
+        for row, score, rival in zip(best, best_scores, rivals):
+            if score >= min_similarity and score - rival >= (
+                LABEL_MEMORY_AMBIGUITY_MARGIN
+            ):
+                found.append((int(row), float(score)))
+            else:
+                found.append(None)
+        return found
+
+
+class LabelMemory:
+    """Remember label classifications and recall them for similar labels."""
+
+    def __init__(
+        self,
+        enabled: bool = DEFAULT_LABEL_MEMORY_ENABLED,
+        path: str | Path | None = None,
+        max_entries: int = DEFAULT_LABEL_MEMORY_MAX_ENTRIES,
+        min_similarity: float = DEFAULT_LABEL_MEMORY_MIN_SIMILARITY,
+        dimensions: int = LABEL_MEMORY_DIMENSIONS,
+    ) -> None:
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.dimensions = dimensions
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._indexes: dict[tuple[str, str], _Index] = {}
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(path) if path is not None else ":memory:", check_same_thread=False
+        )
+        if path is not None:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS labels ("
+            " section TEXT NOT NULL,"
+            " version TEXT NOT NULL,"
+            " phrase TEXT NOT NULL,"
+            " field_key TEXT NOT NULL,"
+            " confidence REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (section, version, phrase))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS labels_accessed_at ON labels (accessed_at)"
+        )
+        self._conn.commit()
+        LABEL_MEMORY_ENTRIES.set(len(self))
+
+    @classmethod
+    def from_env(cls) -> LabelMemory:
+        """Create a label memory configured from environment variables."""
+
+        return cls(
+            enabled=env_flag(ENV_LABEL_MEMORY_ENABLED, DEFAULT_LABEL_MEMORY_ENABLED),
+            path=os.getenv(ENV_LABEL_MEMORY_PATH) or None,
+            max_entries=env_int(
+                ENV_LABEL_MEMORY_MAX_ENTRIES, DEFAULT_LABEL_MEMORY_MAX_ENTRIES
+            ),
+            min_similarity=env_float(
+                ENV_LABEL_MEMORY_MIN_SIMILARITY, DEFAULT_LABEL_MEMORY_MIN_SIMILARITY
+            ),
+        )
+
+    def lookup(
+        self, section: str, dictionary: dict[str, list[str]], labels: list[Any]
+    ) -> dict[str, LexicalMatch]:
+        """Recall the field for each label close to one remembered before.
+
+        Returns a match, keyed by the original label, for every label that was
+        recalled; the match names the first dictionary variant of the field so
+        Template Sense's fuzzy mapping assigns it without an AI call.
+        """
+
+        if not self.enabled:
+            return {}
+        phrases = {label: normalize(label) for label in labels}
+        phrases = {label: phrase for label, phrase in phrases.items() if phrase}
+        if not phrases:
+            return {}
+        unique = sorted(set(phrases.values()))
+        queries = vectorize(unique, self.dimensions)
+        version = dictionary_version(dictionary)
+
+        recalled: dict[str, tuple[str, float]] = {}
+        with self._lock:
+            index = self._index(section, version)
+            found = index.search(queries, self.min_similarity)
+            used = []
+            for phrase, nearest in zip(unique, found):
+                if nearest is None:
+                    continue
+                row, score = nearest
+                recalled[phrase] = (
+                    index.keys[row],
+                    round(score * index.confidences[row], 4),
+                )
+                used.append(index.phrases[row])
+            if used:
+                self._conn.executemany(
+                    "UPDATE labels SET accessed_at = ?"
+                    " WHERE section = ? AND version = ? AND phrase = ?",
+                    [(time.time(), section, version, phrase) for phrase in used],
+                )
+                self._conn.commit()
+
+        matches = {
+            label: LexicalMatch(
+                key=recalled[phrase][0],
+                variant=_variant(dictionary, recalled[phrase][0]),
+                score=recalled[phrase][1],
+                source=SOURCE_MEMORY,
+            )
+            for label, phrase in phrases.items()
+            if phrase in recalled and recalled[phrase][0] in dictionary
+        }
+        self._count(hits=len(matches), misses=len(phrases) - len(matches))
+        return matches
+
+    def learn(self, context: PipelineContext) -> int:
+        """Remember the confident label decisions of a finished analysis.
+
+        Labels that were themselves resolved locally are skipped. Returns the
+        number of labels stored.
+        """
+
+        if not self.enabled or self.max_entries <= 0:
+            return 0
+        learned = 0
+        for section, results, dictionary in (
+            (
+                SECTION_HEADERS,
+                context.header_match_results,
+                context.header_field_dictionary,
+            ),
+            (
+                SECTION_COLUMNS,
+                context.column_match_results,
+                context.column_field_dictionary,
+            ),
+        ):
+            decisions: dict[str, tuple[str, float]] = {}
+            for result in results or []:
+                if (
+                    result.canonical_key is None
+                    or result.match_score < LABEL_MEMORY_MIN_MATCH_SCORE
+                ):
+                    continue
+                translation = context.translation_map.get(result.original_text)
+                source = ((translation and translation.metadata) or {}).get("source")
+                if source in (SOURCE_LEXICAL, SOURCE_MEMORY):
+                    continue
+                phrase = normalize(result.original_text)
+                if phrase:
+                    decisions[phrase] = (
+                        result.canonical_key,
+                        round(result.match_score / 100, 4),
+                    )
+            if decisions:
+                self._store(section, dictionary_version(dictionary), decisions)
+                learned += len(decisions)
+        return learned
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM labels")
+            self._conn.commit()
+            self._indexes.clear()
+        LABEL_MEMORY_ENTRIES.set(0)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM labels").fetchone()
+        return count
+
+    def _count(self, hits: int, misses: int) -> None:
+        self.hits += hits
+        self.misses += misses
+        if hits:
+            labelled(LABEL_MEMORY_LOOKUPS, LOOKUP_HIT).inc(hits)
+        if misses:
+            labelled(LABEL_MEMORY_LOOKUPS, LOOKUP_MISS).inc(misses)
+
+    def _index(self, section: str, version: str) -> _Index:
+        """Return the index of ``section`` at ``version``; call with the lock held."""
+
+        index = self._indexes.get((section, version))
+        if index is not None:
+            return index
+        # Decisions learned against another dictionary no longer apply.
+        deleted = self._conn.execute(
+            "DELETE FROM labels WHERE section = ? AND version != ?", (section, version)
+        ).rowcount
+        self._conn.commit()
+        if deleted:
+            logger.info("Discarded %d labels learned for another %s", deleted, section)
+        rows = self._conn.execute(
+            "SELECT phrase, field_key, confidence FROM labels"
+            " WHERE section = ? AND version = ?",
+            (section, version),
+        ).fetchall()
+        index = _Index(self.dimensions)
+        if rows:
+            phrases, keys, confidences = (list(column) for column in zip(*rows))
+            index.upsert(
+                phrases, keys, confidences, vectorize(phrases, self.dimensions)
+            )
+        self._indexes = {
+            cached: value
+            for cached, value in self._indexes.items()
+            if cached[0] != section
+        }
+        self._indexes[(section, version)] = index
+        return index
+
+    def _store(
+        self, section: str, version: str, decisions: dict[str, tuple[str, float]]
+    ) -> None:
+        phrases = list(decisions)
+        keys = [decisions[phrase][0] for phrase in phrases]
+        confidences = [decisions[phrase][1] for phrase in phrases]
+        vectors = vectorize(phrases, self.dimensions)
+        now = time.time()
+        with self._lock:
+            index = self._index(section, version)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO labels"
+                " (section, version, phrase, field_key, confidence, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (section, version, phrase, key, confidence, now)
+                    for phrase, key, confidence in zip(phrases, keys, confidences)
+                ],
+            )
+            index.upsert(phrases, keys, confidences, vectors)
+            self._evict()
+            self._conn.commit()
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM labels").fetchone()
+        LABEL_MEMORY_ENTRIES.set(count)
+
+    def _evict(self) -> None:
+        """Drop least recently used labels once the store is full."""
+
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM labels").fetchone()
+        if count <= self.max_entries:
+            return
+        keep = int(self.max_entries * (1 - LABEL_MEMORY_EVICT_FRACTION))
+        self._conn.execute(
+            "DELETE FROM labels WHERE rowid IN ("
+            " SELECT rowid FROM labels ORDER BY accessed_at LIMIT ?)",
+            (count - keep,),
+        )
+        # Indexes are rebuilt from the store on next use.
+        self._indexes.clear()
+        logger.debug("Evicted %d learned labels", count - keep)
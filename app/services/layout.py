@@ -0,0 +1,699 @@
+"""Layout-fingerprint cache that replays AI classifications for known templates.
+
+Recurring uploads usually share a layout and differ only in their values. The
+first analysis of a layout records where the AI found each label and value;
+later workbooks with the same structural fingerprint are answered from that
+record, with every value re-read from the new grid.
+
+A layout is only reused when every recorded label is found, unchanged, at its
+recorded position, and it is only recorded when replaying it against the
+original workbook reproduces the AI response. Anything else falls back to a
+full AI analysis.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+from collections.abc import Iterable
+from typing import Any
+
+from template_sense.ai_providers.config import AIConfig
+from template_sense.ai_providers.interface import AIProvider
+from template_sense.errors import AIProviderError
+from template_sense.pipeline.stages import PipelineContext
+
+from app.config import env_flag, env_int
+from app.constants import (
+    DEFAULT_LAYOUT_CACHE_ENABLED,
+    DEFAULT_LAYOUT_CACHE_MAX_ENTRIES,
+    DEFAULT_LAYOUT_CACHE_TTL_SECONDS,
+    ENV_LAYOUT_CACHE_ENABLED,
+    ENV_LAYOUT_CACHE_MAX_ENTRIES,
+    ENV_LAYOUT_CACHE_PATH,
+    ENV_LAYOUT_CACHE_TTL_SECONDS,
+)
+from app.services.cache import MemoryCache, ResultCache, SQLiteCache, build_cache_key
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_VERSION = 1
+
+# Label/value separators used by same-cell patterns such as "Invoice No: 123".
+_SEPARATOR = re.compile(r"\s*[:：=|]\s*")
+_NUMBER_NOISE = re.compile(r"[,\s$€£¥₹]")
+# Candidate value positions relative to a label cell, nearest first.
+_VALUE_OFFSETS: tuple[tuple[int, int], ...] = (
+    (0, 1),
+    (0, 2),
+    (0, 3),
+    (1, 0),
+    (2, 0),
+    (3, 0),
+    (0, 0),
+)
+_MAX_SPAN = 5
+
+
+def normalize_label(value: Any) -> str:
+    """Normalize label text for exact structural comparison."""
+
+    if value is None:
+        return ""
+    return " ".join(str(value).split()).casefold().rstrip(":：").strip()
+
+
+def _label_part(value: Any) -> str:
+    if value is None:
+        return ""
+    return normalize_label(_SEPARATOR.split(str(value), maxsplit=1)[0])
+
+
+def _primitive(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        if value.time() == datetime.time():
+            return value.date().isoformat()
+        return value.isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _value_key(value: Any) -> str:
+    return re.sub(r"[\W_]+", "", str(_primitive(value))).casefold()
+
+
+def _as_number(value: Any) -> float | None:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(_NUMBER_NOISE.sub("", str(value)))
+    except ValueError:
+        return None
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def same_value(left: Any, right: Any) -> bool:
+    """Compare a grid value with an AI-reported value, ignoring formatting."""
+
+    if _is_empty(left) or _is_empty(right):
+        return _is_empty(left) and _is_empty(right)
+    if _value_key(left) == _value_key(right):
+        return True
+    left_number, right_number = _as_number(left), _as_number(right)
+    return (
+        left_number is not None
+        and right_number is not None
+        and abs(left_number - right_number) < 1e-9
+    )
+
+
+class _Sheet:
+    """1-based view of the grid with rows anchored to the table above them.
+
+    Rows below a table are addressed relative to that table's last row, so
+    footers such as totals keep their address when the item count changes.
+    """
+
+    def __init__(self, grid: list[list[Any]], table_blocks: list[dict[str, Any]]):
+        self.grid = grid
+        self.table_ends = [int(block["row_end"]) for block in table_blocks]
+
+    def cell(self, row: int, col: int) -> Any:
+        if row < 1 or col < 1 or row > len(self.grid):
+            return None
+        values = self.grid[row - 1]
+        return values[col - 1] if col <= len(values) else None
+
+    def anchor(self, row: int) -> list[int]:
+        above = [(end, index) for index, end in enumerate(self.table_ends) if end < row]
+        if not above:
+            return [-1, row]
+        end, index = max(above)
+        return [index, row - end]
+
+    def resolve(self, anchor: list[int]) -> int:
+        index, offset = anchor
+        return offset if index < 0 else self.table_ends[index] + offset
+
+    def read(self, row: int, col: int, locator: dict[str, Any]) -> Any:
+        kind = locator["kind"]
+        if kind == "none":
+            return None
+        if kind == "same":
+            parts = _SEPARATOR.split(str(self.cell(row, col) or ""), maxsplit=1)
+            return parts[1].strip() if len(parts) == 2 else None
+        if kind == "cell":
+            return _primitive(self.cell(row + locator["dr"], col + locator["dc"]))
+        values = [
+            self.cell(row + locator["dr"] * step, col + locator["dc"] * step)
+            for step in range(1, locator["length"] + 1)
+        ]
+        return ", ".join(str(_primitive(v)) for v in values if not _is_empty(v))
+
+
+def _table_blocks(context: PipelineContext) -> list[dict[str, Any]]:
+    return list((context.sheet_summary or {}).get("table_blocks") or [])
+
+
+def _header_row(block: dict[str, Any]) -> int:
+    header = block.get("header_row") or {}
+    return int(header.get("row_index") or block["row_start"])
+
+
+def _merged_ranges(context: PipelineContext, sheet: _Sheet) -> list[list[int]]:
+    # ExcelWorkbook does not expose merged cells; read them from openpyxl.
+    workbook = getattr(context.workbook, "_workbook", None)
+    try:
+        worksheet = workbook[context.sheet_name]
+        bounds = [rng.bounds for rng in worksheet.merged_cells.ranges]
+    except (AttributeError, KeyError, TypeError):
+        return []
+    return sorted(
+        [*sheet.anchor(min_row), min_col, *sheet.anchor(max_row), max_col]
+        for min_col, min_row, max_col, max_row in bounds
+    )
+
+
+def compute_fingerprint(context: PipelineContext) -> str:
+    """Return a structural fingerprint of the selected sheet.
+
+    Covers sheet names, merged-cell layout and each table's position and
+    normalized header row. Header candidates are not hashed because the
+    heuristics mix labels with values; recorded label cells are instead
+    verified one by one when a layout is replayed.
+    """
+
+    blocks = _table_blocks(context)
+    sheet = _Sheet(context.grid or [], blocks)
+    sheet_names = context.workbook.get_sheet_names() if context.workbook else []
+    material = {
+        "version": LAYOUT_VERSION,
+        "sheets": sheet_names,
+        "sheet": context.sheet_name,
+        "merged": _merged_ranges(context, sheet),
+        "tables": [
+            {
+                "header_row": sheet.anchor(_header_row(block)),
+                "cols": [block["col_start"], block["col_end"]],
+                "labels": [
+                    normalize_label(value)
+                    for value in (block.get("header_row") or {}).get("values") or []
+                ],
+            }
+            for block in blocks
+        ],
+    }
+    encoded = json.dumps(material, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _locate_value(
+    sheet: _Sheet, row: int, col: int, value: Any, hint: int = 0
+) -> dict[str, Any] | None:
+    if _is_empty(value):
+        return {"kind": "none"}
+
+    parts = _SEPARATOR.split(str(sheet.cell(row, col) or ""), maxsplit=1)
+    if len(parts) == 2 and same_value(parts[1], value):
+        return {"kind": "same"}
+
+    offsets: list[tuple[int, int]] = [(0, hint)] if hint > 0 else []
+    for dr, dc in [*offsets, *_VALUE_OFFSETS]:
+        if same_value(sheet.cell(row + dr, col + dc), value):
+            return {"kind": "cell", "dr": dr, "dc": dc}
+
+    # Multi-cell values such as addresses spread over consecutive rows.
+    for dr, dc in ((1, 0), (0, 1)):
+        for length in range(2, _MAX_SPAN + 1):
+            locator = {"kind": "span", "dr": dr, "dc": dc, "length": length}
+            if same_value(sheet.read(row, col, locator), value):
+                return locator
+    return None
+
+
+def _locate_columns(
+    sheet: _Sheet, rows: Iterable[int], items: list[Any]
+) -> dict[str, int] | None:
+    """Find the grid column holding each line-item key for all given rows."""
+
+    pairs = list(zip(rows, items))
+    width = max((len(values) for values in sheet.grid), default=0)
+    mapping: dict[str, int] = {}
+    for key in {key for _, item in pairs for key in item.columns}:
+        for col in range(1, width + 1):
+            if all(
+                same_value(sheet.cell(row, col), item.columns.get(key))
+                for row, item in pairs
+            ):
+                mapping[key] = col
+                break
+        else:
+            return None
+    return mapping
+
+
+def build_layout(context: PipelineContext) -> dict[str, Any] | None:
+    """Record the AI classification of ``context`` as a replayable layout.
+
+    Returns ``None`` when some value cannot be located in the grid, or when
+    replaying the record does not reproduce the AI response.
+    """
+
+    blocks = _table_blocks(context)
+    sheet = _Sheet(context.grid or [], blocks)
+
+    headers = []
+    for field in context.classified_headers:
+        locator = _locate_value(
+            sheet,
+            field.row_index,
+            field.col_index,
+            field.raw_value,
+            field.value_col_offset,
+        )
+        if locator is None:
+            logger.debug("Layout not recorded: cannot locate %r", field.raw_label)
+            return None
+        entry = dataclasses.asdict(field)
+        for name in ("canonical_key", "raw_value", "row_index"):
+            entry.pop(name)
+        entry["anchor"] = sheet.anchor(field.row_index)
+        entry["label"] = (
+            _label_part(sheet.cell(field.row_index, field.col_index))
+            if field.raw_label is not None
+            else None
+        )
+        entry["value"] = locator
+        headers.append(entry)
+
+    columns = []
+    for column in context.classified_columns:
+        entry = dataclasses.asdict(column)
+        for name in ("canonical_key", "sample_values", "row_index"):
+            entry.pop(name)
+        entry["anchor"] = sheet.anchor(column.row_index)
+        entry["label"] = normalize_label(sheet.cell(column.row_index, column.col_index))
+        columns.append(entry)
+
+    tables = []
+    for index, block in enumerate(blocks):
+        items = [i for i in context.extracted_line_items if i.table_index == index]
+        first, last = _header_row(block) + 1, int(block["row_end"])
+        data = [item for item in items if first <= item.row_index <= last]
+        footer = [item for item in items if item.row_index > last]
+        if len(data) + len(footer) != len(items):
+            return None
+
+        data_columns = _locate_columns(sheet, (i.row_index for i in data), data)
+        if data_columns is None:
+            return None
+        footer_entries = []
+        for item in footer:
+            mapping = _locate_columns(sheet, [item.row_index], [item])
+            if mapping is None:
+                return None
+            footer_entries.append(
+                {
+                    "anchor": sheet.anchor(item.row_index),
+                    "columns": mapping,
+                    "line_number": item.line_number,
+                    "is_subtotal": item.is_subtotal,
+                    "model_confidence": item.model_confidence,
+                }
+            )
+
+        confidences = [i.model_confidence for i in data if i.model_confidence]
+        tables.append(
+            {
+                "columns": data_columns,
+                "numbered": any(i.line_number is not None for i in data),
+                "subtotal_labels": sorted(
+                    {
+                        normalize_label(value)
+                        for item in data
+                        if item.is_subtotal
+                        for value in item.columns.values()
+                        if isinstance(value, str) and _as_number(value) is None
+                    }
+                ),
+                "model_confidence": min(confidences) if confidences else None,
+                "footer": footer_entries,
+            }
+        )
+
+    record = {
+        "version": LAYOUT_VERSION,
+        "headers": headers,
+        "columns": columns,
+        "tables": tables,
+        "translations": {
+            original: translated.translated_text
+            for original, translated in context.translation_map.items()
+        },
+    }
+
+    replayed = replay_layout(record, context)
+    if replayed is None or not _reproduces(context, replayed):
+        logger.debug("Layout not recorded: replay does not match the AI response")
+        return None
+    return record
+
+
+def _reproduces(context: PipelineContext, replayed: dict[str, Any]) -> bool:
+    if len(replayed["headers"]) != len(context.classified_headers) or len(
+        replayed["line_items"]
+    ) != len(context.extracted_line_items):
+        return False
+    if not all(
+        same_value(field.raw_value, entry["raw_value"])
+        for field, entry in zip(context.classified_headers, replayed["headers"])
+    ):
+        return False
+
+    expected = sorted(
+        context.extracted_line_items, key=lambda i: (i.table_index, i.row_index)
+    )
+    actual = sorted(
+        replayed["line_items"], key=lambda i: (i["table_index"], i["row_index"])
+    )
+    return all(
+        item.row_index == entry["row_index"]
+        and item.is_subtotal == entry["is_subtotal"]
+        and item.line_number == entry["line_number"]
+        and item.columns.keys() == entry["columns"].keys()
+        and all(same_value(v, entry["columns"][k]) for k, v in item.columns.items())
+        for item, entry in zip(expected, actual)
+    )
+
+
+def replay_layout(
+    record: dict[str, Any], context: PipelineContext
+) -> dict[str, Any] | None:
+    """Rebuild a batch classification response for ``context`` from a layout.
+
+    Returns ``None`` when any recorded label is missing or has changed.
+    """
+
+    if record.get("version") != LAYOUT_VERSION:
+        return None
+    blocks = _table_blocks(context)
+    if len(blocks) != len(record["tables"]):
+        return None
+    sheet = _Sheet(context.grid or [], blocks)
+
+    headers = []
+    for entry in record["headers"]:
+        row, col = sheet.resolve(entry["anchor"]), entry["col_index"]
+        if entry["label"] is not None and _label_part(sheet.cell(row, col)) != (
+            entry["label"]
+        ):
+            return None
+        field = {
+            key: value
+            for key, value in entry.items()
+            if key not in ("anchor", "label", "value")
+        }
+        field.update(row_index=row, raw_value=sheet.read(row, col, entry["value"]))
+        headers.append(field)
+
+    candidates = (context.ai_payload or {}).get("table_candidates") or []
+    columns = []
+    for entry in record["columns"]:
+        row, col = sheet.resolve(entry["anchor"]), entry["col_index"]
+        if normalize_label(sheet.cell(row, col)) != entry["label"]:
+            return None
+        index = entry["table_block_index"]
+        samples: list[Any] = []
+        if index < len(candidates):
+            offset = col - int(candidates[index].get("start_col", 1))
+            samples = [
+                values[offset]
+                for values in candidates[index].get("sample_data_rows") or []
+                if 0 <= offset < len(values)
+            ]
+        field = {
+            key: value for key, value in entry.items() if key not in ("anchor", "label")
+        }
+        field.update(row_index=row, sample_values=samples)
+        columns.append(field)
+
+    line_items = []
+    for index, (table, block) in enumerate(zip(record["tables"], blocks)):
+        line_number = 0
+        for row in range(_header_row(block) + 1, int(block["row_end"]) + 1):
+            values = {
+                key: _primitive(sheet.cell(row, col))
+                for key, col in table["columns"].items()
+            }
+            if not values or all(_is_empty(value) for value in values.values()):
+                continue
+            is_subtotal = any(
+                normalize_label(value) in table["subtotal_labels"]
+                for value in values.values()
+                if isinstance(value, str)
+            )
+            if not is_subtotal:
+                line_number += 1
+            line_items.append(
+                {
+                    "table_index": index,
+                    "row_index": row,
+                    "line_number": (
+                        line_number if table["numbered"] and not is_subtotal else None
+                    ),
+                    "is_subtotal": is_subtotal,
+                    "columns": values,
+                    "model_confidence": table["model_confidence"],
+                }
+            )
+        for footer in table["footer"]:
+            row = sheet.resolve(footer["anchor"])
+            line_items.append(
+                {
+                    "table_index": index,
+                    "row_index": row,
+                    "line_number": footer["line_number"],
+                    "is_subtotal": footer["is_subtotal"],
+                    "columns": {
+                        key: _primitive(sheet.cell(row, col))
+                        for key, col in footer["columns"].items()
+                    },
+                    "model_confidence": footer["model_confidence"],
+                }
+            )
+
+    return {"headers": headers, "columns": columns, "line_items": line_items}
+
+
+def _prompt_key(prompt: str, system_message: str | None) -> str:
+    material = json.dumps([system_message, prompt], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class RecordingProvider(AIProvider):
+    """Delegate to a real provider and record free-text generations.
+
+    Semantic field matching calls ``generate_text`` with prompts built only
+    from labels and the field dictionary, so the answers can be replayed for
+    any workbook sharing the layout.
+    """
+
+    def __init__(self, provider: AIProvider) -> None:
+        super().__init__(provider.config)
+        self.provider = provider
+        self.generated: dict[str, str] = {}
+        self.failed = False
+
+    @property
+    def provider_name(self) -> str:
+        return self.provider.provider_name
+
+    @property
+    def model(self) -> str:
+        return self.provider.model
+
+    def classify_fields(
+        self, payload: dict[str, Any], context: str = "headers"
+    ) -> dict[str, Any]:
+        return self.provider.classify_fields(payload, context)
+
+    def classify_all_fields(
+        self, payload: dict[str, Any], contexts: list[str] | None = None
+    ) -> dict[str, Any]:
+        return self.provider.classify_all_fields(payload, contexts)
+
+    def translate_text(
+        self, text: str, source_lang: str, target_lang: str = "en"
+    ) -> str:
+        return self.provider.translate_text(text, source_lang, target_lang)
+
+    def generate_text(
+        self,
+        prompt: str,
+        system_message: str | None = None,
+        max_tokens: int = 150,
+        temperature: float = 0.0,
+        json_mode: bool = True,
+    ) -> str:
+        try:
+            text = self.provider.generate_text(
+                prompt, system_message, max_tokens, temperature, json_mode
+            )
+        except Exception:
+            self.failed = True
+            raise
+        self.generated[_prompt_key(prompt, system_message)] = text
+        return text
+
+
+class LayoutReplayProvider(AIProvider):
+    """AI provider that answers from a recorded layout instead of the network."""
+
+    def __init__(
+        self,
+        config: AIConfig,
+        classification: dict[str, Any],
+        translations: dict[str, str],
+        generated: dict[str, str],
+    ) -> None:
+        super().__init__(config)
+        self.classification = classification
+        self.translations = translations
+        self.generated = generated
+
+    @property
+    def provider_name(self) -> str:
+        return self.config.provider
+
+    @property
+    def model(self) -> str:
+        return self.config.model or ""
+
+    def classify_fields(
+        self, payload: dict[str, Any], context: str = "headers"
+    ) -> dict[str, Any]:
+        return {context: self.classification.get(context, [])}
+
+    def classify_all_fields(
+        self, payload: dict[str, Any], contexts: list[str] | None = None
+    ) -> dict[str, Any]:
+        contexts = contexts or ["headers", "columns", "line_items"]
+        return {context: self.classification.get(context, []) for context in contexts}
+
+    def translate_text(
+        self, text: str, source_lang: str, target_lang: str = "en"
+    ) -> str:
+        return self.translations.get(text, text)
+
+    def generate_text(
+        self,
+        prompt: str,
+        system_message: str | None = None,
+        max_tokens: int = 150,
+        temperature: float = 0.0,
+        json_mode: bool = True,
+    ) -> str:
+        text = self.generated.get(_prompt_key(prompt, system_message))
+        if text is None:
+            raise AIProviderError(
+                provider_name=self.provider_name,
+                error_details="No recorded response for this prompt",
+                request_type="generate_text",
+            )
+        return text
+
+
+class LayoutCache:
+    """Store of recorded layouts keyed by fingerprint and analysis settings."""
+
+    def __init__(self, store: ResultCache) -> None:
+        self.store = store
+
+    @classmethod
+    def from_env(cls) -> LayoutCache:
+        """Create a layout cache configured from environment variables."""
+
+        enabled = env_flag(ENV_LAYOUT_CACHE_ENABLED, DEFAULT_LAYOUT_CACHE_ENABLED)
+        ttl_seconds = env_int(
+            ENV_LAYOUT_CACHE_TTL_SECONDS, DEFAULT_LAYOUT_CACHE_TTL_SECONDS
+        )
+        max_entries = env_int(
+            ENV_LAYOUT_CACHE_MAX_ENTRIES, DEFAULT_LAYOUT_CACHE_MAX_ENTRIES
+        )
+        memory = MemoryCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+        disk: SQLiteCache | None = None
+        layout_path = os.getenv(ENV_LAYOUT_CACHE_PATH)
+        if enabled and layout_path:
+            try:
+                disk = SQLiteCache(
+                    layout_path, max_entries=max_entries, ttl_seconds=ttl_seconds
+                )
+            except sqlite3.Error as exc:
+                logger.warning(
+                    "Disk layout cache disabled, cannot open %s: %s", layout_path, exc
+                )
+
+        return cls(ResultCache(memory=memory, disk=disk, enabled=enabled))
+
+    @property
+    def enabled(self) -> bool:
+        return self.store.enabled
+
+    @staticmethod
+    def key(fingerprint: str, ai_config: AIConfig | None, fields: dict) -> str:
+        provider = ai_config.provider if ai_config else ""
+        model = (ai_config.model if ai_config else None) or ""
+        return build_cache_key(fingerprint, provider, model, fields)
+
+    def match(
+        self, fingerprint: str, context: PipelineContext
+    ) -> LayoutReplayProvider | None:
+        """Return a replay provider when ``context`` exactly matches a layout."""
+
+        if not self.enabled or context.ai_config is None:
+            return None
+        key = self.key(fingerprint, context.ai_config, context.field_dictionary)
+        record, _ = self.store.get(key)
+        if record is None:
+            return None
+        classification = replay_layout(record, context)
+        if classification is None:
+            logger.info("Layout %s changed; running full analysis", fingerprint[:12])
+            return None
+        logger.info("Reusing classification for layout %s", fingerprint[:12])
+        return LayoutReplayProvider(
+            context.ai_config,
+            classification,
+            record["translations"],
+            record["generated"],
+        )
+
+    def remember(
+        self,
+        fingerprint: str,
+        context: PipelineContext,
+        record: dict[str, Any],
+        recorder: RecordingProvider,
+    ) -> None:
+        """Store a layout from :func:`build_layout` once the run has finished."""
+
+        if not self.enabled or recorder.failed:
+            return
+        key = self.key(fingerprint, context.ai_config, context.field_dictionary)
+        self.store.set(key, {**record, "generated": recorder.generated})
+
+    def clear(self) -> None:
+        self.store.clear()
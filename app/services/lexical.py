@@ -0,0 +1,383 @@
+"""Local lexical matching of labels against the field dictionary.
+
+Labels such as "Invoice No." or "N.W." usually name a dictionary field almost
+verbatim. ``LexicalMatcher`` resolves those locally before the AI call: the
+matched header candidates are removed from the classification payload, and
+matched headers and columns skip translation and semantic matching. Each
+resolved label is "translated" to the dictionary variant it matched, so
+Template Sense's own fuzzy mapping assigns the canonical key without an AI call.
+Labels the dictionary does not match are looked up in the learned label memory,
+when one is given, and resolved the same way.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from template_sense.ai.header_classification import ClassifiedHeaderField
+from template_sense.ai.table_column_classification import ClassifiedTableColumn
+from template_sense.ai.translation import TranslatedLabel
+from template_sense.constants import DEFAULT_TARGET_LANGUAGE
+from template_sense.pipeline.stages import PipelineContext
+
+from app.config import env_flag, env_float
+from app.constants import (
+    DEFAULT_LEXICAL_MATCHING_ENABLED,
+    DEFAULT_LEXICAL_MIN_SIMILARITY,
+    ENV_LEXICAL_MATCHING_ENABLED,
+    ENV_LEXICAL_MIN_SIMILARITY,
+    LEXICAL_ABBREVIATIONS,
+    LEXICAL_AMBIGUITY_MARGIN,
+)
+
+if TYPE_CHECKING:
+    from app.services.label_memory import LabelMemory
+
+logger = logging.getLogger(__name__)
+
+SOURCE_LEXICAL = "lexical"
+SOURCE_MEMORY = "memory"
+SOURCE_AI = "ai"
+
+_TOKEN_RE = re.compile(r"[^\W_]+|#", re.UNICODE)
+
+
+def normalize(text: Any) -> str:
+    """Lowercase, tokenize and expand abbreviations in a label.
+
+    Runs of single letters are joined first, so "N.W." and "P.O.L." become the
+    abbreviations ``nw`` and ``pol`` before expansion.
+    """
+
+    if not isinstance(text, str):
+        return ""
+    tokens = _TOKEN_RE.findall(unicodedata.normalize("NFKC", text).lower())
+    merged: list[str] = []
+    run = ""
+    for token in tokens:
+        if len(token) == 1 and token.isalpha():
+            run += token
+            continue
+        if run:
+            merged.append(run)
+            run = ""
+        merged.append(token)
+    if run:
+        merged.append(run)
+    return " ".join(LEXICAL_ABBREVIATIONS.get(token, token) for token in merged)
+
+
+def _trigrams(text: str) -> frozenset[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def _similarity(left: frozenset[str], right: frozenset[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return 2 * len(left & right) / (len(left) + len(right))
+
+
+@dataclass(frozen=True)
+class LexicalMatch:
+    """A dictionary field resolved for one label."""
+
+    key: str
+    variant: str
+    score: float
+    source: str = SOURCE_LEXICAL
+
+
+class FieldIndex:
+    """Exact and trigram index over one section of the field dictionary."""
+
+    def __init__(self, dictionary: dict[str, list[str]]) -> None:
+        exact: dict[str, set[tuple[str, str]]] = {}
+        self.entries: list[tuple[str, str, frozenset[str]]] = []
+        for key, variants in dictionary.items():
+            for variant in variants or [key.replace("_", " ")]:
+                phrase = normalize(variant)
+                if not phrase:
+                    continue
+                exact.setdefault(phrase, set()).add((key, variant))
+                self.entries.append((key, variant, _trigrams(phrase)))
+        # A phrase naming two different fields is ambiguous and never matched.
+        self.exact = {
+            phrase: next(iter(matches))
+            for phrase, matches in exact.items()
+            if len({key for key, _ in matches}) == 1
+        }
+
+    def match(self, label: Any, min_similarity: float) -> LexicalMatch | None:
+        phrase = normalize(label)
+        if not phrase:
+            return None
+        if phrase in self.exact:
+            key, variant = self.exact[phrase]
+            return LexicalMatch(key, variant, 1.0)
+
+        grams = _trigrams(phrase)
+        best: dict[str, tuple[float, str]] = {}
+        for key, variant, entry in self.entries:
+            score = _similarity(grams, entry)
+            if score > best.get(key, (0.0, ""))[0]:
+                best[key] = (score, variant)
+        ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)
+        if not ranked or ranked[0][1][0] < min_similarity:
+            return None
+        if (
+            len(ranked) > 1
+            and ranked[0][1][0] - ranked[1][1][0] < LEXICAL_AMBIGUITY_MARGIN
+        ):
+            return None
+        key, (score, variant) = ranked[0]
+        return LexicalMatch(key, variant, round(score, 4))
+
+
+@dataclass
+class Prematch:
+    """Fields resolved locally for one analysis, and the payload left for the AI."""
+
+    payload: dict[str, Any]
+    ai_payload: dict[str, Any]
+    headers: list[ClassifiedHeaderField] = field(default_factory=list)
+    columns: list[ClassifiedTableColumn] = field(default_factory=list)
+    translations: dict[str, TranslatedLabel] = field(default_factory=dict)
+    ai_headers: int = 0
+    ai_columns: int = 0
+
+    @property
+    def needs_ai(self) -> bool:
+        """Whether anything is left for the AI classification call."""
+
+        return bool(
+            self.ai_payload.get("header_candidates")
+            or self.ai_payload.get("table_candidates")
+        )
+
+    def exclude_resolved(self, context: PipelineContext) -> None:
+        """Drop AI classifications of cells that were resolved locally."""
+
+        headers = {(h.row_index, h.col_index) for h in self.headers}
+        columns = {(c.table_block_index, c.col_index) for c in self.columns}
+        context.classified_headers = [
+            h
+            for h in context.classified_headers
+            if (h.row_index, h.col_index) not in headers
+        ]
+        context.classified_columns = [
+            c
+            for c in context.classified_columns
+            if (c.table_block_index, c.col_index) not in columns
+        ]
+        self.ai_headers = len(context.classified_headers)
+        self.ai_columns = len(context.classified_columns)
+
+    def merge_into(self, context: PipelineContext) -> None:
+        """Add the local fields and translations and restore the full payload."""
+
+        context.classified_headers = sorted(
+            [*context.classified_headers, *self.headers],
+            key=lambda h: (h.row_index, h.col_index),
+        )
+        context.classified_columns = sorted(
+            [*context.classified_columns, *self.columns],
+            key=lambda c: (c.table_block_index, c.col_index),
+        )
+        context.translation_map.update(self.translations)
+        context.ai_payload = self.payload
+
+    def summary(self) -> dict[str, int]:
+        """Number of fields resolved locally, per source, and by the AI."""
+
+        counts = {SOURCE_LEXICAL: 0, SOURCE_MEMORY: 0}
+        for resolved in (*self.headers, *self.columns):
+            counts[resolved.metadata["source"]] += 1
+        return {**counts, SOURCE_AI: self.ai_headers + self.ai_columns}
+
+
+def _looks_like_label(value: Any) -> bool:
+    return isinstance(value, str) and value.rstrip().endswith((":", "："))
+
+
+class LexicalMatcher:
+    """Resolve near-verbatim dictionary labels without the AI provider."""
+
+    def __init__(
+        self,
+        enabled: bool = DEFAULT_LEXICAL_MATCHING_ENABLED,
+        min_similarity: float = DEFAULT_LEXICAL_MIN_SIMILARITY,
+    ) -> None:
+        self.enabled = enabled
+        self.min_similarity = min_similarity
+        self._indexes: dict[tuple[Any, ...], FieldIndex] = {}
+
+    @classmethod
+    def from_env(cls) -> LexicalMatcher:
+        """Create a matcher configured from environment variables."""
+
+        return cls(
+            enabled=env_flag(
+                ENV_LEXICAL_MATCHING_ENABLED, DEFAULT_LEXICAL_MATCHING_ENABLED
+            ),
+            min_similarity=env_float(
+                ENV_LEXICAL_MIN_SIMILARITY, DEFAULT_LEXICAL_MIN_SIMILARITY
+            ),
+        )
+
+    def index(self, dictionary: dict[str, list[str]]) -> FieldIndex:
+        """Return the (cached) index for a dictionary section."""
+
+        cache_key = tuple(
+            (key, tuple(variants)) for key, variants in dictionary.items()
+        )
+        index = self._indexes.get(cache_key)
+        if index is None:
+            index = self._indexes[cache_key] = FieldIndex(dictionary)
+        return index
+
+    def _match(
+        self, label: Any, index: FieldIndex, learned: dict[str, LexicalMatch]
+    ) -> LexicalMatch | None:
+        match = index.match(label, self.min_similarity) if self.enabled else None
+        if match is None and isinstance(label, str):
+            match = learned.get(label)
+        return match
+
+    def _unmatched(self, labels: list[Any], index: FieldIndex) -> list[str]:
+        return [
+            label
+            for label in labels
+            if isinstance(label, str)
+            and not (self.enabled and index.match(label, self.min_similarity))
+        ]
+
+    def _resolve_header(
+        self,
+        candidate: dict[str, Any],
+        index: FieldIndex,
+        learned: dict[str, LexicalMatch],
+        block_index: int,
+    ) -> tuple[ClassifiedHeaderField, LexicalMatch] | None:
+        value = candidate.get("value")
+        adjacent = candidate.get("adjacent_cells") or {}
+        # Only the unambiguous "Label: | value" layout; everything else needs the AI.
+        if value in (None, "") or adjacent.get("right_1") != value:
+            return None
+        if _looks_like_label(value) or index.match(value, self.min_similarity):
+            return None
+        match = self._match(candidate.get("label"), index, learned)
+        if match is None:
+            return None
+        header = ClassifiedHeaderField(
+            canonical_key=None,
+            raw_label=candidate["label"],
+            raw_value=value,
+            block_index=block_index,
+            row_index=candidate["row"],
+            col_index=candidate["col"],
+            label_col_offset=0,
+            value_col_offset=1,
+            pattern_type="multi_cell",
+            model_confidence=match.score,
+            metadata={"source": match.source},
+        )
+        return header, match
+
+    def prematch(
+        self, context: PipelineContext, memory: LabelMemory | None = None
+    ) -> Prematch:
+        """Resolve what it can and narrow ``context.ai_payload`` to the rest.
+
+        Dictionary matching runs when the matcher is enabled; labels it leaves
+        open are recalled from ``memory`` when one is given.
+        """
+
+        from app.services.label_memory import SECTION_COLUMNS, SECTION_HEADERS
+
+        payload = context.ai_payload or {}
+        prematch = Prematch(payload=payload, ai_payload=payload)
+        header_index = self.index(context.header_field_dictionary)
+        column_index = self.index(context.column_field_dictionary)
+        candidates = payload.get("header_candidates") or []
+        tables = payload.get("table_candidates") or []
+        learned_headers: dict[str, LexicalMatch] = {}
+        learned_columns: dict[str, LexicalMatch] = {}
+        if memory is not None and memory.enabled:
+            learned_headers = memory.lookup(
+                SECTION_HEADERS,
+                context.header_field_dictionary,
+                self._unmatched(
+                    [candidate.get("label") for candidate in candidates], header_index
+                ),
+            )
+            learned_columns = memory.lookup(
+                SECTION_COLUMNS,
+                context.column_field_dictionary,
+                self._unmatched(
+                    [
+                        cell.get("value")
+                        for table in tables
+                        for cell in (table.get("header_row") or {}).get("cells") or []
+                    ],
+                    column_index,
+                ),
+            )
+
+        remaining = []
+        for candidate in candidates:
+            resolved = self._resolve_header(
+                candidate, header_index, learned_headers, len(prematch.headers)
+            )
+            if resolved is None:
+                remaining.append(candidate)
+                continue
+            header, match = resolved
+            prematch.headers.append(header)
+            prematch.translations[header.raw_label] = self._translation(
+                header.raw_label, match
+            )
+
+        for table_index, table in enumerate(tables):
+            header_row = table.get("header_row") or {}
+            rows = table.get("sample_data_rows") or []
+            for position, cell in enumerate(header_row.get("cells") or []):
+                label = cell.get("value")
+                match = self._match(label, column_index, learned_columns)
+                if match is None:
+                    continue
+                prematch.columns.append(
+                    ClassifiedTableColumn(
+                        canonical_key=None,
+                        raw_label=label,
+                        raw_position=position,
+                        table_block_index=table_index,
+                        row_index=header_row.get("row_index", 0),
+                        col_index=cell.get("col", position + 1),
+                        sample_values=[
+                            row[position] for row in rows if position < len(row)
+                        ],
+                        model_confidence=match.score,
+                        metadata={"source": match.source},
+                    )
+                )
+                prematch.translations[label] = self._translation(label, match)
+
+        # Tables stay in the payload: the AI still extracts their line items.
+        prematch.ai_payload = {**payload, "header_candidates": remaining}
+        context.ai_payload = prematch.ai_payload
+        return prematch
+
+    @staticmethod
+    def _translation(label: str, match: LexicalMatch) -> TranslatedLabel:
+        return TranslatedLabel(
+            original_text=label,
+            translated_text=match.variant,
+            target_language=DEFAULT_TARGET_LANGUAGE,
+            model_confidence=match.score,
+            metadata={"source": match.source},
+        )
@@ -0,0 +1,365 @@
+"""Structured logging written off the request path.
+
+``configure_logging`` routes the root logger through a queue: the thread that
+logs only copies the record onto a bounded in-process queue, and a background
+listener thread formats it (tracebacks included) as one JSON line and writes
+it to stderr, so a slow log sink never adds latency to a request. When the
+queue is full the record is dropped and counted rather than blocking.
+
+Each record carries the fields bound with ``bind_log_context`` for the work it
+belongs to: the request id set by ``RequestContextMiddleware``, the upload's
+file hash, the provider and model, and the stage timings recorded so far.
+Repetitive warnings and errors (same logger, message template and exception
+type) are rate limited by ``ErrorRateLimiter``: a burst passes per window,
+then only every ``sample_every``-th record, carrying how many were
+suppressed since the last one that was written.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, TextIO
+
+import orjson
+
+from app.config import env_flag, env_float, env_int
+from app.constants import (
+    DEFAULT_LOG_ASYNC,
+    DEFAULT_LOG_ERROR_BURST,
+    DEFAULT_LOG_ERROR_SAMPLE_EVERY,
+    DEFAULT_LOG_ERROR_WINDOW_SECONDS,
+    DEFAULT_LOG_FORMAT,
+    DEFAULT_LOG_LEVEL,
+    DEFAULT_LOG_QUEUE_SIZE,
+    ENV_LOG_ASYNC,
+    ENV_LOG_ERROR_BURST,
+    ENV_LOG_ERROR_SAMPLE_EVERY,
+    ENV_LOG_ERROR_WINDOW_SECONDS,
+    ENV_LOG_FORMAT,
+    ENV_LOG_LEVEL,
+    ENV_LOG_QUEUE_SIZE,
+    LOG_DROP_REASON_QUEUE_FULL,
+    LOG_DROP_REASON_RATE_LIMITED,
+    LOG_FORMAT_JSON,
+    LOG_FORMATS,
+    LOG_RATE_LIMIT_MAX_KEYS,
+    LOG_TEXT_FORMAT,
+)
+
+logger = logging.getLogger(__name__)
+
+_log_context: ContextVar[dict[str, Any] | None] = ContextVar(
+    "log_context", default=None
+)
+
+
+@contextmanager
+def bind_log_context(**fields: Any) -> Iterator[dict[str, Any]]:
+    """Add ``fields`` to every record logged in the enclosed block.
+
+    The bound context inherits the enclosing one, and shares its stage
+    timings, so an analysis nested in a request adds to the request's.
+    """
+
+    context = {**(_log_context.get() or {}), **fields}
+    token = _log_context.set(context)
+    try:
+        yield context
+    finally:
+        _log_context.reset(token)
+
+
+def update_log_context(**fields: Any) -> None:
+    """Add ``fields`` to the current context, e.g. once the provider is known."""
+
+    context = _log_context.get()
+    if context is not None:
+        context.update(fields)
+
+
+def record_log_stage(stage: str, seconds: float) -> None:
+    """Add ``seconds`` spent in ``stage`` to the current context's timings."""
+
+    context = _log_context.get()
+    if context is not None:
+        stages = context.setdefault("stages_ms", {})
+        stages[stage] = round(stages.get(stage, 0.0) + seconds * 1000, 3)
+
+
+def _snapshot_context() -> dict[str, Any] | None:
+    context = _log_context.get()
+    if not context:
+        return None
+    snapshot = dict(context)
+    if "stages_ms" in snapshot:
+        snapshot["stages_ms"] = dict(snapshot["stages_ms"])
+    return snapshot
+
+
+def _count_dropped(reason: str) -> None:
+    # Deferred: app.services.metrics imports this module.
+    from app.services.metrics import LOG_RECORDS_DROPPED, labelled
+
+    labelled(LOG_RECORDS_DROPPED, reason).inc()
+
+
+class _Window:
+    __slots__ = ("count", "started", "suppressed")
+
+    def __init__(self, started: float, suppressed: int = 0) -> None:
+        self.started = started
+        self.count = 0
+        self.suppressed = suppressed
+
+
+class ErrorRateLimiter(logging.Filter):
+    """Drop repeats of the same warning or error beyond a burst per window.
+
+    Records below ``level`` always pass. Once ``burst`` records with the same
+    logger, message template and exception type have passed in a window,
+    only every ``sample_every``-th is kept (none when ``0``); the kept record
+    carries the number suppressed before it as ``suppressed``.
+    """
+
+    def __init__(
+        self,
+        burst: int = DEFAULT_LOG_ERROR_BURST,
+        window_seconds: float = DEFAULT_LOG_ERROR_WINDOW_SECONDS,
+        sample_every: int = DEFAULT_LOG_ERROR_SAMPLE_EVERY,
+        level: int = logging.WARNING,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        self.sample_every = sample_every
+        self.level = level
+        self.clock = clock
+        self.suppressed = 0
+        self._windows: dict[tuple[str, str, str], _Window] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level or self.burst <= 0:
+            return True
+        key = (
+            record.name,
+            str(record.msg),
+            (
+                record.exc_info[0].__name__
+                if record.exc_info and record.exc_info[0]
+                else ""
+            ),
+        )
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window.started >= self.window_seconds:
+                if window is None and len(self._windows) >= LOG_RATE_LIMIT_MAX_KEYS:
+                    self._expire(now)
+                window = _Window(now, window.suppressed if window else 0)
+                self._windows[key] = window
+            window.count += 1
+            extra = window.count - self.burst
+            if extra <= 0 or (self.sample_every > 0 and extra % self.sample_every == 0):
+                if window.suppressed:
+                    record.suppressed = window.suppressed
+                    window.suppressed = 0
+                return True
+            window.suppressed += 1
+            self.suppressed += 1
+        _count_dropped(LOG_DROP_REASON_RATE_LIMITED)
+        return False
+
+    def _expire(self, now: float) -> None:
+        expired = [
+            key
+            for key, window in self._windows.items()
+            if now - window.started >= self.window_seconds
+        ]
+        for key in expired:
+            del self._windows[key]
+        if len(self._windows) >= LOG_RATE_LIMIT_MAX_KEYS:
+            self._windows.clear()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        # ``datetime.UTC`` needs Python 3.11; the app supports 3.10.
+        created = datetime.fromtimestamp(record.created, timezone.utc)  # noqa: UP017
+        entry: dict[str, Any] = {
+            "time": created.isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        # Queued records carry a snapshot; records formatted where they were
+        # logged read the live context.
+        context = getattr(record, "context", None) or _snapshot_context()
+        if context:
+            entry.update(context)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class ContextQueueHandler(QueueHandler):
+    """Queue records with their log context; format them in the listener.
+
+    ``QueueHandler.prepare`` formats the message and traceback so the record
+    can be pickled. The queue here is in-process, so only the arguments are
+    merged and the context captured on the logging thread; exception
+    formatting is left to the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue[Any]) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        record.context = _snapshot_context()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            _count_dropped(LOG_DROP_REASON_QUEUE_FULL)
+
+
+class LogPipeline:
+    """Root logging through a rate limiter and, optionally, a writer thread."""
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        level: int | str = DEFAULT_LOG_LEVEL,
+        log_format: str = DEFAULT_LOG_FORMAT,
+        background: bool = DEFAULT_LOG_ASYNC,
+        queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+        rate_limiter: ErrorRateLimiter | None = None,
+    ) -> None:
+        if log_format not in LOG_FORMATS:
+            raise ValueError(
+                f"Unknown log format {log_format!r}; expected one of {LOG_FORMATS}"
+            )
+        self.level = (
+            logging.getLevelName(level.upper()) if isinstance(level, str) else level
+        )
+        self.sink = logging.StreamHandler(stream or sys.stderr)
+        self.sink.setFormatter(
+            JsonFormatter()
+            if log_format == LOG_FORMAT_JSON
+            else logging.Formatter(LOG_TEXT_FORMAT)
+        )
+        self.rate_limiter = rate_limiter or ErrorRateLimiter()
+        self.listener: QueueListener | None = None
+        if background:
+            self.queue: queue.Queue[Any] | None = queue.Queue(max(queue_size, 1))
+            self.handler: logging.Handler = ContextQueueHandler(self.queue)
+            self.listener = QueueListener(self.queue, self.sink)
+        else:
+            self.queue = None
+            self.handler = self.sink
+        self.handler.addFilter(self.rate_limiter)
+        self._logger: logging.Logger | None = None
+        self._running = False
+
+    @classmethod
+    def from_env(cls, stream: TextIO | None = None) -> LogPipeline:
+        """Create a pipeline configured from environment variables."""
+
+        level = os.getenv(ENV_LOG_LEVEL, DEFAULT_LOG_LEVEL).strip().upper()
+        if not isinstance(logging.getLevelName(level), int):
+            level = DEFAULT_LOG_LEVEL
+        log_format = os.getenv(ENV_LOG_FORMAT, "").strip().lower()
+        if log_format and log_format not in LOG_FORMATS:
+            logger.warning("Ignoring invalid %s: %r", ENV_LOG_FORMAT, log_format)
+            log_format = ""
+        return cls(
+            stream=stream,
+            level=level,
+            log_format=log_format or DEFAULT_LOG_FORMAT,
+            background=env_flag(ENV_LOG_ASYNC, DEFAULT_LOG_ASYNC),
+            queue_size=env_int(ENV_LOG_QUEUE_SIZE, DEFAULT_LOG_QUEUE_SIZE),
+            rate_limiter=ErrorRateLimiter(
+                burst=env_int(ENV_LOG_ERROR_BURST, DEFAULT_LOG_ERROR_BURST),
+                window_seconds=env_float(
+                    ENV_LOG_ERROR_WINDOW_SECONDS, DEFAULT_LOG_ERROR_WINDOW_SECONDS
+                ),
+                sample_every=env_int(
+                    ENV_LOG_ERROR_SAMPLE_EVERY, DEFAULT_LOG_ERROR_SAMPLE_EVERY
+                ),
+            ),
+        )
+
+    @property
+    def dropped(self) -> int:
+        """Records dropped because the queue was full."""
+
+        return getattr(self.handler, "dropped", 0)
+
+    def install(self, target: logging.Logger | None = None) -> LogPipeline:
+        """Attach to ``target`` (the root logger) and start the writer thread."""
+
+        self._logger = target or logging.getLogger()
+        self._logger.setLevel(self.level)
+        self._logger.addHandler(self.handler)
+        if self.listener is not None:
+            self.listener.start()
+            self._running = True
+        return self
+
+    def stop(self) -> None:
+        """Detach, then write every queued record before returning."""
+
+        if self._logger is not None:
+            self._logger.removeHandler(self.handler)
+            self._logger = None
+        if self._running and self.listener is not None:
+            self.listener.stop()
+            self._running = False
+        self.sink.flush()
+
+
+_pipeline: LogPipeline | None = None
+_pipeline_lock = threading.Lock()
+
+
+def configure_logging() -> LogPipeline | None:
+    """Install the environment-configured pipeline on the root logger once.
+
+    Like ``logging.basicConfig``, this does nothing when the root logger
+    already has handlers (e.g. ones installed by a test runner or host).
+    """
+
+    global _pipeline
+
+    with _pipeline_lock:
+        root = logging.getLogger()
+        if _pipeline is None and not root.handlers:
+            _pipeline = LogPipeline.from_env().install(root)
+            atexit.register(_pipeline.stop)
+        return _pipeline
@@ -0,0 +1,299 @@
+"""Prometheus metrics for HTTP traffic and the stages of an analysis.
+
+Metrics live in the default ``prometheus_client`` registry. When
+``PROMETHEUS_MULTIPROC_DIR`` is set (for ``uvicorn --workers N`` or the
+process execution mode), every process writes its samples to that directory
+and ``/metrics`` aggregates them, so any worker can serve a complete scrape.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from template_sense.errors import AIProviderError
+
+from app.constants import (
+    ENV_PROMETHEUS_MULTIPROC_DIR,
+    METRICS_LATENCY_BUCKETS,
+    METRICS_NAMESPACE,
+)
+from app.services.logs import record_log_stage
+from app.services.profiling import active_profile
+from app.services.progress import AnalysisCancelled
+
+# Route label for requests that matched no route, keeping label cardinality bounded.
+UNMATCHED_PATH = "unmatched"
+UNKNOWN_LABEL = "none"
+
+ERROR_TYPE_AI_PROVIDER = "AIProviderError"
+ERROR_TYPE_FILE_NOT_FOUND = "FileNotFoundError"
+ERROR_TYPE_CANCELLED = "cancelled"
+ERROR_TYPE_UNEXPECTED = "unexpected"
+
+HTTP_REQUESTS = Counter(
+    "http_requests",
+    "HTTP requests by method, route template and status code.",
+    ["method", "path", "status"],
+    namespace=METRICS_NAMESPACE,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled.",
+    ["method"],
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livesum",
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last response byte.",
+    ["method", "path"],
+    namespace=METRICS_NAMESPACE,
+    buckets=METRICS_LATENCY_BUCKETS,
+)
+ANALYSES_IN_PROGRESS = Gauge(
+    "analyses_in_progress",
+    "Analyses currently running or waiting for an execution slot.",
+    ["provider", "model"],
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livesum",
+)
+ANALYSIS_ERRORS = Counter(
+    "analysis_errors",
+    "Failed analyses by error type.",
+    ["error_type", "provider", "model"],
+    namespace=METRICS_NAMESPACE,
+)
+STAGE_DURATION = Histogram(
+    "analysis_stage_duration_seconds",
+    "Wall-clock time spent in each stage of an analysis.",
+    ["stage", "provider", "model"],
+    namespace=METRICS_NAMESPACE,
+    buckets=METRICS_LATENCY_BUCKETS,
+)
+AI_CONCURRENCY_LIMIT = Gauge(
+    "ai_concurrency_limit",
+    "Current adaptive limit on concurrent AI provider calls.",
+    ["provider", "model"],
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livemax",
+)
+AI_THROTTLED = Counter(
+    "ai_throttled",
+    "AI provider calls rejected with HTTP 429.",
+    ["provider", "model"],
+    namespace=METRICS_NAMESPACE,
+)
+AI_RETRIES = Counter(
+    "ai_retries",
+    "AI provider calls retried after a transient failure.",
+    ["provider", "model"],
+    namespace=METRICS_NAMESPACE,
+)
+AI_HEDGE_WINS = Counter(
+    "ai_hedge_wins",
+    "Hedged AI calls by the provider whose answer was used (role primary/secondary).",
+    ["provider", "model", "role"],
+    namespace=METRICS_NAMESPACE,
+)
+AI_HEDGE_LATENCY_SAVED = Histogram(
+    "ai_hedge_latency_saved_seconds",
+    "How much later the primary provider answered than the secondary that won.",
+    ["provider", "model"],
+    namespace=METRICS_NAMESPACE,
+    buckets=METRICS_LATENCY_BUCKETS,
+)
+AI_FAILOVERS = Counter(
+    "ai_failovers",
+    "AI calls sent to the secondary provider because the primary failed or its "
+    "circuit was open.",
+    ["provider", "model"],
+    namespace=METRICS_NAMESPACE,
+)
+AI_CIRCUIT_OPEN = Gauge(
+    "ai_circuit_open",
+    "Whether the circuit breaker for a provider and model is open (1) or not (0).",
+    ["provider", "model"],
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livemax",
+)
+ADMISSION_MEMORY_BUDGET = Gauge(
+    "admission_memory_budget_bytes",
+    "Estimated memory that concurrent analyses may use in this process.",
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livesum",
+)
+ADMISSION_MEMORY_IN_USE = Gauge(
+    "admission_memory_in_use_bytes",
+    "Estimated memory footprint of the analyses currently admitted.",
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued",
+    "Analyses waiting for memory budget to run.",
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections",
+    "Analyses rejected with 503 because the memory budget stayed exhausted.",
+    namespace=METRICS_NAMESPACE,
+)
+COALESCED_ANALYSES = Counter(
+    "coalesced_analyses",
+    "Requests served by joining an identical analysis already in flight.",
+    ["provider", "model"],
+    namespace=METRICS_NAMESPACE,
+)
+FIELDS_RESOLVED = Counter(
+    "fields_resolved",
+    "Classified header and column fields by who resolved them (lexical or ai).",
+    ["source", "provider", "model"],
+    namespace=METRICS_NAMESPACE,
+)
+LABEL_MEMORY_LOOKUPS = Counter(
+    "label_memory_lookups",
+    "Labels looked up in the learned label memory, by result (hit or miss).",
+    ["result"],
+    namespace=METRICS_NAMESPACE,
+)
+LABEL_MEMORY_ENTRIES = Gauge(
+    "label_memory_entries",
+    "Label classifications held in the learned label memory.",
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livemax",
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped",
+    "Log records not written, by reason (queue_full or rate_limited).",
+    ["reason"],
+    namespace=METRICS_NAMESPACE,
+)
+RESPONSE_BYTES = Counter(
+    "response_bytes",
+    "JSON response body bytes sent, by content encoding.",
+    ["encoding"],
+    namespace=METRICS_NAMESPACE,
+)
+
+# Bound label children by label values. ``labels()`` takes the metric's lock on
+# every call; a plain dict lookup keeps the hot path to the value update alone.
+_children: dict[tuple[Any, ...], Any] = {}
+
+
+def labelled(metric: Any, *labels: str) -> Any:
+    """Return the child of ``metric`` for ``labels``, caching it for reuse."""
+
+    key = (metric, *labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+
+def stage_name(stage: Any) -> str:
+    """Return the metric label for a Template Sense stage, e.g. ``file_loading``."""
+
+    name = type(stage).__name__.removesuffix("Stage")
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def error_type(exc: BaseException) -> str:
+    """Classify an analysis failure for the error counter."""
+
+    if isinstance(exc, AIProviderError):
+        return ERROR_TYPE_AI_PROVIDER
+    if isinstance(exc, FileNotFoundError):
+        return ERROR_TYPE_FILE_NOT_FOUND
+    if isinstance(exc, AnalysisCancelled):
+        return ERROR_TYPE_CANCELLED
+    return ERROR_TYPE_UNEXPECTED
+
+
+def observe_stage(
+    stage: str, provider: str | None, model: str | None, seconds: float
+) -> None:
+    """Record time spent in ``stage``, also in the request's profile and log context."""
+
+    labelled(
+        STAGE_DURATION, stage, provider or UNKNOWN_LABEL, model or UNKNOWN_LABEL
+    ).observe(seconds)
+    record_log_stage(stage, seconds)
+    profile = active_profile()
+    if profile is not None:
+        profile.record_stage(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage: str, provider: str | None, model: str | None) -> Iterator[None]:
+    """Time the enclosed block as ``stage``, including when it raises."""
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, provider, model, time.perf_counter() - started)
+
+
+def record_coalesced(provider: str, model: str) -> None:
+    """Count a request that shared another request's in-flight analysis."""
+
+    labelled(COALESCED_ANALYSES, provider, model).inc()
+
+
+def record_field_resolution(
+    counts: dict[str, int], provider: str | None, model: str | None
+) -> None:
+    """Count fields resolved per source, e.g. ``{"lexical": 3, "ai": 5}``."""
+
+    for source, count in counts.items():
+        labelled(
+            FIELDS_RESOLVED, source, provider or UNKNOWN_LABEL, model or UNKNOWN_LABEL
+        ).inc(count)
+
+
+@contextmanager
+def track_analysis(provider: str, model: str) -> Iterator[None]:
+    """Count an analysis as in progress and record its error type if it fails."""
+
+    in_progress = labelled(ANALYSES_IN_PROGRESS, provider, model)
+    in_progress.inc()
+    try:
+        yield
+    except Exception as exc:
+        labelled(ANALYSIS_ERRORS, error_type(exc), provider, model).inc()
+        raise
+    finally:
+        in_progress.dec()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Return the exposition body and its content type."""
+
+    if os.getenv(ENV_PROMETHEUS_MULTIPROC_DIR):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this process's live gauges from the multiprocess directory."""
+
+    if os.getenv(ENV_PROMETHEUS_MULTIPROC_DIR):
+        multiprocess.mark_process_dead(os.getpid())
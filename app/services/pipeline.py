@@ -0,0 +1,289 @@
+"""Template Sense extraction pipeline with app-level hooks around the AI stages."""
+
+from __future__ import annotations
+
+import logging
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any
+
+from template_sense.ai_providers.config import AIConfig
+from template_sense.ai_providers.factory import get_ai_provider
+from template_sense.ai_providers.interface import AIProvider
+from template_sense.errors import (
+    AIProviderError,
+    ExtractionError,
+    FileValidationError,
+    InvalidFieldDictionaryError,
+    UnsupportedFileTypeError,
+)
+from template_sense.pipeline.stages import (
+    AIClassificationStage,
+    AIPayloadBuildingStage,
+    AIProviderSetupStage,
+    CanonicalAggregationStage,
+    ConfidenceFilteringStage,
+    FileLoadingStage,
+    FuzzyMatchingStage,
+    GridExtractionStage,
+    MetadataStage,
+    NormalizedOutputStage,
+    PipelineContext,
+    TranslationStage,
+    ValidationStage,
+)
+from template_sense.recovery.error_recovery import RecoverySeverity
+
+from app.services.cassette import Cassette
+from app.services.hedging import HedgingPolicy
+from app.services.label_memory import LabelMemory
+from app.services.layout import (
+    LayoutCache,
+    RecordingProvider,
+    build_layout,
+    compute_fingerprint,
+)
+from app.services.lexical import LexicalMatcher, Prematch
+from app.services.metrics import record_field_resolution, stage_name, timed_stage
+from app.services.progress import (
+    AnalysisCancelled,
+    checkpoint,
+    report_partial,
+    report_stage,
+)
+from app.services.providers import ProviderPool
+from app.services.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+def _has_errors(context: PipelineContext) -> bool:
+    return any(
+        event.severity == RecoverySeverity.ERROR for event in context.recovery_events
+    )
+
+
+def _labels(context: PipelineContext) -> tuple[str | None, str | None]:
+    config = context.ai_config
+    return (config.provider, config.model) if config else (None, None)
+
+
+def _execute(stage: Any, context: PipelineContext) -> PipelineContext:
+    checkpoint()
+    with timed_stage(stage_name(stage), *_labels(context)):
+        return stage.execute(context)
+
+
+def _report_parsed(context: PipelineContext) -> None:
+    """Report the parsed sheet and its heuristic header candidates."""
+
+    report_stage("parsed", sheet=context.sheet_name, rows=len(context.grid or []))
+    payload = context.ai_payload or {}
+    report_partial(
+        "header_candidates",
+        [
+            {key: candidate.get(key) for key in ("label", "value", "row", "col")}
+            for candidate in payload.get("header_candidates", [])
+        ],
+        sheet=context.sheet_name,
+        tables=len(payload.get("table_candidates", [])),
+    )
+
+
+def _report_classified(context: PipelineContext) -> None:
+    """Report the end of AI classification and the header fields it found."""
+
+    report_stage("ai_classification_finished", sheet=context.sheet_name)
+    report_partial(
+        "classified_headers",
+        [
+            {
+                "raw_label": field.raw_label,
+                "raw_value": field.raw_value,
+                "row_index": field.row_index,
+                "col_index": field.col_index,
+                "model_confidence": field.model_confidence,
+            }
+            for field in context.classified_headers
+        ],
+        sheet=context.sheet_name,
+    )
+
+
+def _pooled_provider(
+    pool: ProviderPool, context: PipelineContext, leases: ExitStack
+) -> AIProvider:
+    if context.ai_config is None:
+        raise AIProviderError(
+            provider_name="unknown",
+            error_details="AI configuration is required for pooled providers",
+        )
+    try:
+        return leases.enter_context(pool.lease(context.ai_config))
+    except AIProviderError:
+        if context.workbook:
+            context.workbook.close()
+        raise
+
+
+def _secondary_provider(
+    config: AIConfig,
+    pool: ProviderPool | None,
+    rate_limiter: RateLimiter | None,
+    cassette: Cassette | None,
+    leases: ExitStack,
+) -> AIProvider:
+    if pool is not None:
+        provider = leases.enter_context(pool.lease(config))
+    else:
+        provider = get_ai_provider(config)
+    if rate_limiter is not None:
+        provider = rate_limiter.wrap(provider)
+    return cassette.wrap(provider) if cassette is not None else provider
+
+
+def run_pipeline(
+    file_path: str | Path,
+    field_dictionary: dict[str, Any],
+    ai_config: AIConfig | None = None,
+    layout_cache: LayoutCache | None = None,
+    provider_pool: ProviderPool | None = None,
+    lexical_matcher: LexicalMatcher | None = None,
+    rate_limiter: RateLimiter | None = None,
+    hedging: HedgingPolicy | None = None,
+    secondary_config: AIConfig | None = None,
+    label_memory: LabelMemory | None = None,
+    cassette: Cassette | None = None,
+) -> dict[str, Any]:
+    """Run the Template Sense stages and return the extraction result.
+
+    Mirrors ``template_sense.analyzer.extract_template_structure``, except that
+    payload building runs before provider setup so a recorded layout can stand
+    in for the AI provider when the workbook structure is already known, and
+    the provider comes from ``provider_pool`` when one is given. Labels that
+    ``lexical_matcher`` resolves locally are left out of the AI call and the
+    translation stage, as are labels recalled from ``label_memory``, which
+    learns the confident decisions of every successful run. Live provider
+    calls go through ``rate_limiter`` when one is given, and are hedged by the
+    ``secondary_config`` provider when ``hedging`` is enabled; ``cassette``
+    records or replays them. Each stage's wall-clock time is recorded in the
+    stage latency histogram. Progress goes to the active progress stream,
+    whose client can cancel the run between stages.
+    """
+
+    context = PipelineContext(
+        file_path=Path(file_path),
+        field_dictionary=field_dictionary,
+        ai_config=ai_config,
+    )
+    # Pooled providers stay leased until the run ends, so the pool does not
+    # close their HTTP clients under an in-flight call.
+    leases = ExitStack()
+    try:
+        for stage in (
+            ValidationStage(),
+            FileLoadingStage(),
+            GridExtractionStage(),
+            AIPayloadBuildingStage(),
+        ):
+            context = _execute(stage, context)
+        _report_parsed(context)
+
+        fingerprint = recorder = layout = None
+        prematch: Prematch | None = None
+        if layout_cache is not None and layout_cache.enabled:
+            with timed_stage("layout_match", *_labels(context)):
+                fingerprint = compute_fingerprint(context)
+                context.ai_provider = layout_cache.match(fingerprint, context)
+        # A replayed layout already costs no AI calls; only match fresh layouts.
+        if (
+            context.ai_provider is None
+            and lexical_matcher is not None
+            and (
+                lexical_matcher.enabled
+                or (label_memory is not None and label_memory.enabled)
+            )
+        ):
+            with timed_stage("lexical_matching", *_labels(context)):
+                prematch = lexical_matcher.prematch(context, memory=label_memory)
+        if context.ai_provider is None:
+            if provider_pool is not None:
+                context.ai_provider = _pooled_provider(provider_pool, context, leases)
+            else:
+                context = _execute(AIProviderSetupStage(), context)
+            if rate_limiter is not None:
+                context.ai_provider = rate_limiter.wrap(context.ai_provider)
+            # Replayed calls never reach the provider, so they skip its limiter.
+            if cassette is not None:
+                context.ai_provider = cassette.wrap(context.ai_provider)
+            if hedging is not None and hedging.enabled and secondary_config:
+                context.ai_provider = hedging.wrap(
+                    context.ai_provider,
+                    _secondary_provider(
+                        secondary_config,
+                        provider_pool,
+                        rate_limiter,
+                        cassette,
+                        leases,
+                    ),
+                )
+            if fingerprint is not None:
+                context.ai_provider = recorder = RecordingProvider(context.ai_provider)
+
+        checkpoint()
+        report_stage("ai_classification_started", sheet=context.sheet_name)
+        if prematch is None:
+            for stage in (AIClassificationStage(), TranslationStage()):
+                context = _execute(stage, context)
+        else:
+            if prematch.needs_ai:
+                context = _execute(AIClassificationStage(), context)
+            prematch.exclude_resolved(context)
+            context = _execute(TranslationStage(), context)
+            prematch.merge_into(context)
+        _report_classified(context)
+        # Snapshot before later stages filter the classified fields.
+        if recorder is not None:
+            layout = build_layout(context)
+
+        for stage in (
+            FuzzyMatchingStage(),
+            ConfidenceFilteringStage(),
+            CanonicalAggregationStage(),
+            NormalizedOutputStage(),
+            MetadataStage(),
+        ):
+            context = _execute(stage, context)
+        if prematch is not None:
+            resolution = prematch.summary()
+            context.metadata["field_resolution"] = resolution
+            record_field_resolution(resolution, *_labels(context))
+
+        # Degraded classifications (AI errors) must never become a layout.
+        if layout is not None and not _has_errors(context):
+            layout_cache.remember(fingerprint, context, layout, recorder)
+        if (
+            label_memory is not None
+            and label_memory.enabled
+            and not _has_errors(context)
+        ):
+            with timed_stage("label_learning", *_labels(context)):
+                label_memory.learn(context)
+    except (
+        FileValidationError,
+        UnsupportedFileTypeError,
+        InvalidFieldDictionaryError,
+        ExtractionError,
+        AIProviderError,
+        AnalysisCancelled,
+    ):
+        raise
+    except Exception as exc:
+        raise ExtractionError(
+            extraction_type="template_analysis",
+            reason=f"Unexpected error during template analysis: {exc}",
+        ) from exc
+    finally:
+        leases.close()
+
+    return context.to_dict()
@@ -0,0 +1,373 @@
+"""Fail-fast structural checks of uploaded workbooks.
+
+Runs before an upload is cached, queued or parsed: it only reads the file
+signature, the zip central directory, ``xl/workbook.xml`` and the start of
+each worksheet part (where ``<dimension>`` lives), so it finishes in
+milliseconds without loading a single cell. Renamed non-Excel files, legacy
+BIFF workbooks that openpyxl cannot read, password-protected workbooks, zip
+bombs and sheets too large to extract in reasonable time are rejected with a
+specific message instead of failing deep inside Template Sense.
+"""
+
+from __future__ import annotations
+
+import logging
+import posixpath
+import re
+import struct
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from xml.etree import ElementTree
+
+from app.config import env_flag, env_int
+from app.constants import (
+    ALLOWED_FILE_EXTENSIONS,
+    DEFAULT_PREFLIGHT_ENABLED,
+    DEFAULT_PREFLIGHT_MAX_CELLS,
+    DEFAULT_PREFLIGHT_MAX_SHEET_COLUMNS,
+    DEFAULT_PREFLIGHT_MAX_SHEET_ROWS,
+    DEFAULT_PREFLIGHT_MAX_UNCOMPRESSED_MB,
+    ENV_PREFLIGHT_ENABLED,
+    ENV_PREFLIGHT_MAX_CELLS,
+    ENV_PREFLIGHT_MAX_SHEET_COLUMNS,
+    ENV_PREFLIGHT_MAX_SHEET_ROWS,
+    ENV_PREFLIGHT_MAX_UNCOMPRESSED_MB,
+    ERROR_CORRUPT_WORKBOOK,
+    ERROR_ENCRYPTED_WORKBOOK,
+    ERROR_LEGACY_XLS,
+    ERROR_NOT_A_WORKBOOK,
+    ERROR_SHEET_TOO_LARGE,
+    ERROR_WORKBOOK_COMPRESSION_RATIO,
+    ERROR_WORKBOOK_TOO_MANY_CELLS,
+    ERROR_WORKBOOK_TOO_MANY_PARTS,
+    ERROR_WORKBOOK_UNCOMPRESSED_TOO_LARGE,
+    PREFLIGHT_DIMENSION_SCAN_BYTES,
+    PREFLIGHT_MAX_COMPRESSION_RATIO,
+    PREFLIGHT_MAX_ZIP_MEMBERS,
+    PREFLIGHT_OLE2_MAX_DIRECTORY_SECTORS,
+    PREFLIGHT_RATIO_MIN_BYTES,
+)
+
+logger = logging.getLogger(__name__)
+
+FORMAT_XLSX = "xlsx"
+FORMAT_XLS = "xls"
+
+OOXML_MAGIC = b"PK\x03\x04"
+OLE2_MAGIC = bytes.fromhex("d0cf11e0a1b11ae1")
+# Stream an encrypted OOXML package carries in its OLE2 container.
+OLE2_ENCRYPTION_INFO = "EncryptionInfo"
+_OLE2_HEADER_BYTES = 512
+_OLE2_DIRECTORY_ENTRY_BYTES = 128
+_OLE2_MAX_SECTOR = 0xFFFFFFFA
+
+_WORKBOOK_PART = "xl/workbook.xml"
+_WORKBOOK_RELS_PART = "xl/_rels/workbook.xml.rels"
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_PACKAGE_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_DIMENSION = re.compile(
+    rb"<(?:\w+:)?dimension\s+ref=\"([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?\""
+)
+_SHEET_DATA = re.compile(rb"<(?:\w+:)?sheetData\b")
+
+
+class PreflightError(ValueError):
+    """Raised when an upload fails pre-flight validation."""
+
+
+@dataclass
+class SheetDimensions:
+    """Used range of one worksheet as declared by its ``<dimension>``."""
+
+    name: str
+    rows: int | None = None
+    columns: int | None = None
+    hidden: bool = False
+
+    @property
+    def cells(self) -> int:
+        return (self.rows or 0) * (self.columns or 0)
+
+
+@dataclass
+class WorkbookInfo:
+    """What pre-flight learned about a workbook without parsing it."""
+
+    format: str
+    parts: int = 0
+    compressed_bytes: int = 0
+    uncompressed_bytes: int = 0
+    sheets: list[SheetDimensions] = field(default_factory=list)
+
+    @property
+    def cells(self) -> int:
+        return sum(sheet.cells for sheet in self.sheets)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "format": self.format,
+            "uncompressed_bytes": self.uncompressed_bytes,
+            "sheets": [
+                {
+                    "name": sheet.name,
+                    "rows": sheet.rows,
+                    "columns": sheet.columns,
+                    "hidden": sheet.hidden,
+                }
+                for sheet in self.sheets
+            ],
+        }
+
+
+def sniff_format(path: Path) -> str | None:
+    """Return ``xlsx`` or ``xls`` from the file signature, ``None`` otherwise."""
+
+    with path.open("rb") as handle:
+        head = handle.read(len(OLE2_MAGIC))
+    if head.startswith(OOXML_MAGIC):
+        return FORMAT_XLSX
+    if head == OLE2_MAGIC:
+        return FORMAT_XLS
+    return None
+
+
+def ole2_stream_names(path: Path) -> set[str]:
+    """Return the entry names in the directory of an OLE2 compound file.
+
+    Follows the directory sector chain through the FAT sectors listed in the
+    header; an unreadable or truncated container yields what was read so far.
+    """
+
+    names: set[str] = set()
+    with path.open("rb") as handle:
+        header = handle.read(_OLE2_HEADER_BYTES)
+        if len(header) < _OLE2_HEADER_BYTES:
+            return names
+        sector_size = 1 << struct.unpack_from("<H", header, 30)[0]
+        if sector_size not in (512, 4096):
+            return names
+        fat_sectors = struct.unpack_from("<109I", header, 76)
+        sector = struct.unpack_from("<I", header, 48)[0]
+        seen: set[int] = set()
+        while (
+            sector <= _OLE2_MAX_SECTOR
+            and sector not in seen
+            and len(seen) < PREFLIGHT_OLE2_MAX_DIRECTORY_SECTORS
+        ):
+            seen.add(sector)
+            handle.seek((sector + 1) * sector_size)
+            data = handle.read(sector_size)
+            for offset in range(0, len(data), _OLE2_DIRECTORY_ENTRY_BYTES):
+                entry = data[offset : offset + _OLE2_DIRECTORY_ENTRY_BYTES]
+                if len(entry) < _OLE2_DIRECTORY_ENTRY_BYTES:
+                    break
+                # The name length counts bytes, including the UTF-16 terminator.
+                length = struct.unpack_from("<H", entry, 64)[0]
+                if 2 < length <= 64:
+                    names.add(entry[: length - 2].decode("utf-16-le", "replace"))
+            fat_index, slot = divmod(sector, sector_size // 4)
+            if fat_index >= len(fat_sectors):
+                break
+            handle.seek((fat_sectors[fat_index] + 1) * sector_size + slot * 4)
+            raw = handle.read(4)
+            if len(raw) < 4:
+                break
+            sector = struct.unpack("<I", raw)[0]
+    return names
+
+
+def column_number(letters: str) -> int:
+    """Convert a column reference such as ``AB`` to its 1-based number."""
+
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+def _read_dimension(archive: zipfile.ZipFile, part: str) -> tuple[int, int] | None:
+    """Read rows and columns from the ``<dimension>`` at the top of a sheet part."""
+
+    head = b""
+    with archive.open(part) as stream:
+        while len(head) < PREFLIGHT_DIMENSION_SCAN_BYTES:
+            chunk = stream.read(4096)
+            if not chunk:
+                break
+            head += chunk
+            match = _DIMENSION.search(head)
+            if match:
+                first_col, first_row, last_col, last_row = match.groups()
+                if last_col is None:
+                    return 1, 1
+                rows = int(last_row) - int(first_row) + 1
+                columns = column_number(last_col.decode()) - column_number(
+                    first_col.decode()
+                )
+                return rows, columns + 1
+            if _SHEET_DATA.search(head):
+                break
+    return None
+
+
+class Preflight:
+    """Cheap structural validation of uploaded workbooks."""
+
+    def __init__(
+        self,
+        enabled: bool = DEFAULT_PREFLIGHT_ENABLED,
+        max_uncompressed_bytes: int = DEFAULT_PREFLIGHT_MAX_UNCOMPRESSED_MB
+        * 1024
+        * 1024,
+        max_sheet_rows: int = DEFAULT_PREFLIGHT_MAX_SHEET_ROWS,
+        max_sheet_columns: int = DEFAULT_PREFLIGHT_MAX_SHEET_COLUMNS,
+        max_cells: int = DEFAULT_PREFLIGHT_MAX_CELLS,
+    ) -> None:
+        self.enabled = enabled
+        self.max_uncompressed_bytes = max_uncompressed_bytes
+        self.max_sheet_rows = max_sheet_rows
+        self.max_sheet_columns = max_sheet_columns
+        self.max_cells = max_cells
+
+    @classmethod
+    def from_env(cls) -> Preflight:
+        """Create a validator configured from environment variables."""
+
+        return cls(
+            enabled=env_flag(ENV_PREFLIGHT_ENABLED, DEFAULT_PREFLIGHT_ENABLED),
+            max_uncompressed_bytes=env_int(
+                ENV_PREFLIGHT_MAX_UNCOMPRESSED_MB, DEFAULT_PREFLIGHT_MAX_UNCOMPRESSED_MB
+            )
+            * 1024
+            * 1024,
+            max_sheet_rows=env_int(
+                ENV_PREFLIGHT_MAX_SHEET_ROWS, DEFAULT_PREFLIGHT_MAX_SHEET_ROWS
+            ),
+            max_sheet_columns=env_int(
+                ENV_PREFLIGHT_MAX_SHEET_COLUMNS, DEFAULT_PREFLIGHT_MAX_SHEET_COLUMNS
+            ),
+            max_cells=env_int(ENV_PREFLIGHT_MAX_CELLS, DEFAULT_PREFLIGHT_MAX_CELLS),
+        )
+
+    def check(self, path: Path) -> WorkbookInfo:
+        """Validate the workbook at ``path`` and describe it.
+
+        Raises ``PreflightError`` with a client-facing message when the file
+        is not a readable ``.xlsx`` workbook or exceeds a size limit.
+        """
+
+        file_format = sniff_format(path)
+        if file_format is None:
+            raise PreflightError(
+                ERROR_NOT_A_WORKBOOK.format(
+                    extensions=", ".join(sorted(ALLOWED_FILE_EXTENSIONS))
+                )
+            )
+        if file_format == FORMAT_XLS:
+            # Encrypted .xlsx files are wrapped in an OLE2 container as well.
+            if OLE2_ENCRYPTION_INFO in ole2_stream_names(path):
+                raise PreflightError(ERROR_ENCRYPTED_WORKBOOK)
+            # openpyxl, which Template Sense loads workbooks with, has no BIFF reader.
+            raise PreflightError(ERROR_LEGACY_XLS)
+
+        try:
+            with zipfile.ZipFile(path) as archive:
+                info = self._check_archive(archive)
+        except zipfile.BadZipFile as exc:
+            raise PreflightError(ERROR_CORRUPT_WORKBOOK.format(reason=exc)) from exc
+        except (KeyError, ElementTree.ParseError) as exc:
+            raise PreflightError(
+                ERROR_CORRUPT_WORKBOOK.format(reason=f"invalid workbook part ({exc})")
+            ) from exc
+        self._check_sheets(info)
+        return info
+
+    def _check_archive(self, archive: zipfile.ZipFile) -> WorkbookInfo:
+        members = archive.infolist()
+        if len(members) > PREFLIGHT_MAX_ZIP_MEMBERS:
+            raise PreflightError(
+                ERROR_WORKBOOK_TOO_MANY_PARTS.format(
+                    parts=len(members), max_parts=PREFLIGHT_MAX_ZIP_MEMBERS
+                )
+            )
+
+        info = WorkbookInfo(format=FORMAT_XLSX, parts=len(members))
+        for member in members:
+            info.compressed_bytes += member.compress_size
+            info.uncompressed_bytes += member.file_size
+            if member.file_size >= PREFLIGHT_RATIO_MIN_BYTES:
+                ratio = member.file_size // max(member.compress_size, 1)
+                if ratio > PREFLIGHT_MAX_COMPRESSION_RATIO:
+                    raise PreflightError(
+                        ERROR_WORKBOOK_COMPRESSION_RATIO.format(
+                            part=member.filename, ratio=ratio
+                        )
+                    )
+        if info.uncompressed_bytes > self.max_uncompressed_bytes:
+            raise PreflightError(
+                ERROR_WORKBOOK_UNCOMPRESSED_TOO_LARGE.format(
+                    size_mb=info.uncompressed_bytes // (1024 * 1024),
+                    max_mb=self.max_uncompressed_bytes // (1024 * 1024),
+                )
+            )
+
+        names = {member.filename for member in members}
+        if _WORKBOOK_PART not in names:
+            raise PreflightError(
+                ERROR_CORRUPT_WORKBOOK.format(reason=f"{_WORKBOOK_PART} is missing")
+            )
+        targets = self._sheet_targets(archive, names)
+        workbook = ElementTree.fromstring(archive.read(_WORKBOOK_PART))
+        for sheet in workbook.iter(f"{_MAIN_NS}sheet"):
+            dimensions = SheetDimensions(
+                name=sheet.get("name", ""),
+                hidden=sheet.get("state", "visible") != "visible",
+            )
+            part = targets.get(sheet.get(_REL_ID, ""))
+            if part in names:
+                size = _read_dimension(archive, part)
+                if size is not None:
+                    dimensions.rows, dimensions.columns = size
+            info.sheets.append(dimensions)
+        return info
+
+    @staticmethod
+    def _sheet_targets(archive: zipfile.ZipFile, names: set[str]) -> dict[str, str]:
+        """Map workbook relationship ids to worksheet part names."""
+
+        if _WORKBOOK_RELS_PART not in names:
+            return {}
+        rels = ElementTree.fromstring(archive.read(_WORKBOOK_RELS_PART))
+        targets = {}
+        for rel in rels.iter(f"{_PACKAGE_REL}Relationship"):
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                part = target.lstrip("/")
+            else:
+                part = posixpath.normpath(posixpath.join("xl", target))
+            targets[rel.get("Id", "")] = part
+        return targets
+
+    def _check_sheets(self, info: WorkbookInfo) -> None:
+        for sheet in info.sheets:
+            if (sheet.rows or 0) > self.max_sheet_rows or (
+                sheet.columns or 0
+            ) > self.max_sheet_columns:
+                raise PreflightError(
+                    ERROR_SHEET_TOO_LARGE.format(
+                        sheet=sheet.name,
+                        rows=sheet.rows,
+                        columns=sheet.columns,
+                        max_rows=self.max_sheet_rows,
+                        max_columns=self.max_sheet_columns,
+                    )
+                )
+        if info.cells > self.max_cells:
+            raise PreflightError(
+                ERROR_WORKBOOK_TOO_MANY_CELLS.format(
+                    cells=info.cells, max_cells=self.max_cells
+                )
+            )
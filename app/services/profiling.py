@@ -0,0 +1,202 @@
+"""Opt-in profiling of individual ``/analyze`` requests.
+
+A request is profiled when it carries ``X-Profile-Token`` matching
+``TEMPLATE_SENSE_PROFILE_TOKEN`` or is picked by
+``TEMPLATE_SENSE_PROFILE_SAMPLE_RATE``. The analysis itself runs under
+``cProfile`` in its worker thread, and every stage timed by
+``app.services.metrics`` is added to a per-request wall-clock breakdown. With
+neither setting configured, ``RequestProfiler.begin`` returns ``None`` before
+looking at the request, so unprofiled requests pay nothing.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import random
+import tempfile
+import time
+import uuid
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, TypeVar
+
+from app.config import env_float
+from app.constants import (
+    DEFAULT_PROFILE_DIR_NAME,
+    DEFAULT_PROFILE_SAMPLE_RATE,
+    ENV_PROFILE_DIR,
+    ENV_PROFILE_SAMPLE_RATE,
+    ENV_PROFILE_TOKEN,
+    PROFILE_OUTPUT_HEADER,
+    PROFILE_OUTPUT_INLINE,
+    PROFILE_TOKEN_HEADER,
+    PROFILE_TOP_FUNCTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_active_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "active_profile", default=None
+)
+
+
+def active_profile() -> RequestProfile | None:
+    """Return the profile of the request being handled, if it is profiled."""
+
+    return _active_profile.get()
+
+
+class RequestProfile:
+    """Profiler state and stage timings for one request."""
+
+    def __init__(self, inline: bool = False, sampled: bool = False) -> None:
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.inline = inline
+        self.sampled = sampled
+        self.stages: dict[str, float] = {}
+        self.profiler = cProfile.Profile()
+        self.profiled = False
+        self.started = time.perf_counter()
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def activate(self) -> Iterator[RequestProfile]:
+        """Make this the active profile for the current context."""
+
+        token = _active_profile.set(self)
+        try:
+            yield self
+        finally:
+            _active_profile.reset(token)
+
+    def call(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn`` under the profiler in the calling thread."""
+
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Only one profiler may be active at a time on Python 3.12+.
+            logger.warning("Profiler busy; request %s gets stage timings only", self.id)
+            return fn(*args)
+        self.profiled = True
+        try:
+            return fn(*args)
+        finally:
+            self.profiler.disable()
+
+    def top_functions(self, limit: int = PROFILE_TOP_FUNCTIONS) -> list[dict[str, Any]]:
+        """Return the ``limit`` functions with the highest cumulative time."""
+
+        if not self.profiled:
+            return []
+        stats = pstats.Stats(self.profiler).stats  # type: ignore[attr-defined]
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+        return [
+            {
+                "function": f"{path}:{line}({name})",
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for (path, line, name), (_, calls, total, cumulative, _) in rows[:limit]
+        ]
+
+    def report(self) -> dict[str, Any]:
+        """Summarize the request so far as a JSON-serializable dict."""
+
+        wall_time = time.perf_counter() - self.started
+        return {
+            "id": self.id,
+            "sampled": self.sampled,
+            "wall_time_ms": round(wall_time * 1000, 3),
+            "stages_ms": {
+                stage: round(seconds * 1000, 3)
+                for stage, seconds in self.stages.items()
+            },
+            "top_functions": self.top_functions(),
+        }
+
+
+class RequestProfiler:
+    """Decide which requests to profile and store their profiles."""
+
+    def __init__(
+        self,
+        token: str | None = None,
+        sample_rate: float = DEFAULT_PROFILE_SAMPLE_RATE,
+        directory: str | Path | None = None,
+    ) -> None:
+        self.token = token or None
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.directory = (
+            Path(directory)
+            if directory
+            else Path(tempfile.gettempdir()) / DEFAULT_PROFILE_DIR_NAME
+        )
+
+    @classmethod
+    def from_env(cls) -> RequestProfiler:
+        """Create a profiler configured from environment variables."""
+
+        return cls(
+            token=os.getenv(ENV_PROFILE_TOKEN),
+            sample_rate=env_float(ENV_PROFILE_SAMPLE_RATE, DEFAULT_PROFILE_SAMPLE_RATE),
+            directory=os.getenv(ENV_PROFILE_DIR),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None or self.sample_rate > 0
+
+    def begin(self, headers: Mapping[str, str]) -> RequestProfile | None:
+        """Return a profile for this request, or ``None`` if it is not profiled."""
+
+        if not self.enabled:
+            return None
+        supplied = headers.get(PROFILE_TOKEN_HEADER)
+        if (
+            self.token is not None
+            and supplied is not None
+            and hmac.compare_digest(supplied.encode(), self.token.encode())
+        ):
+            output = (headers.get(PROFILE_OUTPUT_HEADER) or "").lower()
+            return RequestProfile(inline=output == PROFILE_OUTPUT_INLINE)
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return RequestProfile(sampled=True)
+        return None
+
+    def finish(self, profile: RequestProfile) -> dict[str, Any]:
+        """Build the report and, unless returned inline, write it to disk.
+
+        Writes ``<id>.json`` with the report and ``<id>.prof`` with the raw
+        ``cProfile`` data (readable by ``pstats`` or snakeviz).
+        """
+
+        report = profile.report()
+        if profile.inline:
+            return report
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if profile.profiled:
+                prof_path = self.directory / f"{profile.id}.prof"
+                profile.profiler.dump_stats(prof_path)
+                report["profile_file"] = str(prof_path)
+            (self.directory / f"{profile.id}.json").write_text(
+                json.dumps(report, indent=2)
+            )
+        except OSError as exc:
+            logger.warning("Could not write profile %s: %s", profile.id, exc)
+        else:
+            logger.info("Wrote request profile %s to %s", profile.id, self.directory)
+        return report
@@ -0,0 +1,133 @@
+"""Progress events for analyses streamed over Server-Sent Events.
+
+A ``ProgressStream`` is made active for a ``/analyze/stream`` request the same
+way a ``RequestProfile`` is. Code on the analysis path reports stages and
+partial results through ``report_stage`` and ``report_partial``, which do
+nothing when no stream is active, so ``/analyze`` and the job and batch APIs
+pay nothing. Events are handed from the analysis thread to the event loop
+with ``call_soon_threadsafe``.
+
+Cancellation is cooperative: once the client disconnects, ``checkpoint``,
+called before every pipeline stage, raises ``AnalysisCancelled``. A provider
+call already in flight is allowed to finish first.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+import orjson
+
+from app.constants import SSE_EVENT_PARTIAL, SSE_EVENT_STAGE
+
+_active_stream: ContextVar[ProgressStream | None] = ContextVar(
+    "active_stream", default=None
+)
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside an analysis whose client has gone away."""
+
+
+def active_stream() -> ProgressStream | None:
+    """Return the progress stream of the request being handled, if any."""
+
+    return _active_stream.get()
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """One Server-Sent Event: its type and JSON data."""
+
+    event: str
+    data: dict[str, Any]
+
+
+class ProgressStream:
+    """Queue of progress events for one request, plus its cancellation flag."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None) -> None:
+        self._loop = loop or asyncio.get_running_loop()
+        self._queue: asyncio.Queue[ProgressEvent] = asyncio.Queue()
+        self._cancelled = threading.Event()
+        self.started = time.perf_counter()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Ask the analysis to stop at its next checkpoint."""
+
+        self._cancelled.set()
+
+    def emit(self, event: str, data: dict[str, Any]) -> None:
+        """Queue ``event`` from any thread, stamped with the elapsed time."""
+
+        elapsed_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        message = ProgressEvent(event, {**data, "elapsed_ms": elapsed_ms})
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+        except RuntimeError:
+            # The loop has shut down; nobody is left to read the event.
+            pass
+
+    async def next(self, timeout: float) -> ProgressEvent | None:
+        """Return the next event, or ``None`` if none arrives within ``timeout``."""
+
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        # ``asyncio.wait_for`` raises ``asyncio.TimeoutError`` on Python 3.10.
+        except asyncio.TimeoutError:  # noqa: UP041
+            return None
+
+    @contextmanager
+    def activate(self) -> Iterator[ProgressStream]:
+        """Make this the active progress stream for the current context."""
+
+        token = _active_stream.set(self)
+        try:
+            yield self
+        finally:
+            _active_stream.reset(token)
+
+
+def report_stage(stage: str, **data: Any) -> None:
+    """Report that the active analysis reached ``stage``."""
+
+    stream = _active_stream.get()
+    if stream is not None:
+        stream.emit(SSE_EVENT_STAGE, {"stage": stage, **data})
+
+
+def report_partial(kind: str, items: list[dict[str, Any]], **data: Any) -> None:
+    """Report partial results of the active analysis, e.g. detected headers."""
+
+    stream = _active_stream.get()
+    if stream is not None:
+        stream.emit(SSE_EVENT_PARTIAL, {"kind": kind, "items": items, **data})
+
+
+def checkpoint() -> None:
+    """Raise ``AnalysisCancelled`` if the active stream's client disconnected."""
+
+    stream = _active_stream.get()
+    if stream is not None and stream.cancelled:
+        raise AnalysisCancelled("Client disconnected")
+
+
+def format_event(message: ProgressEvent, event_id: int) -> bytes:
+    """Encode ``message`` in the Server-Sent Events wire format."""
+
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (
+        event_id,
+        message.event.encode(),
+        orjson.dumps(message.data, option=orjson.OPT_NON_STR_KEYS),
+    )
@@ -0,0 +1,262 @@
+"""Long-lived AI provider clients with pooled keep-alive HTTP connections.
+
+Importing ``template_sense.ai_providers`` loads both provider SDKs, which
+takes seconds; it is deferred until the first provider is built so importing
+this module (and answering ``/health``) stays cheap.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+
+import httpx2
+from template_sense.errors import AIProviderError
+
+from app.config import env_float, env_int
+from app.constants import (
+    AI_PROVIDER_POOL_MAX_ENTRIES,
+    DEFAULT_AI_KEEPALIVE_EXPIRY_SECONDS,
+    DEFAULT_AI_MAX_CONNECTIONS,
+    DEFAULT_AI_MAX_KEEPALIVE_CONNECTIONS,
+    ENV_AI_KEEPALIVE_EXPIRY_SECONDS,
+    ENV_AI_MAX_CONNECTIONS,
+    ENV_AI_MAX_KEEPALIVE_CONNECTIONS,
+)
+
+if TYPE_CHECKING:
+    from template_sense.ai_providers.config import AIConfig
+    from template_sense.ai_providers.interface import AIProvider
+
+logger = logging.getLogger(__name__)
+
+# Trace events emitted by httpcore only when a new socket is opened.
+_CONNECT_EVENTS = frozenset(
+    {"connection.connect_tcp.complete", "connection.connect_unix_socket.complete"}
+)
+
+
+class ConnectionStats:
+    """Thread-safe counters of provider HTTP requests and new connections."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    @property
+    def connections_reused(self) -> int:
+        return max(0, self.requests - self.connections_opened)
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": max(0, self.requests - self.connections_opened),
+            }
+
+
+class CountingTransport(httpx2.HTTPTransport):
+    """HTTP transport that counts requests and newly opened connections."""
+
+    def __init__(self, stats: ConnectionStats, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def handle_request(self, request: httpx2.Request) -> httpx2.Response:
+        self.stats.record_request()
+        previous = request.extensions.get("trace")
+
+        def trace(event_name: str, info: dict[str, Any]) -> None:
+            if event_name in _CONNECT_EVENTS:
+                self.stats.record_connection()
+            if previous is not None:
+                previous(event_name, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        return super().handle_request(request)
+
+
+def _sdk_client(
+    config: AIConfig, http_client: httpx2.Client, max_retries: int | None = None
+) -> Any:
+    # ``None`` keeps the SDK's own retry default.
+    retries = {} if max_retries is None else {"max_retries": max_retries}
+    if config.provider == "openai":
+        from openai import OpenAI
+
+        return OpenAI(
+            api_key=config.api_key,
+            timeout=config.timeout_seconds,
+            http_client=http_client,
+            **retries,
+        )
+    if config.provider == "anthropic":
+        from anthropic import Anthropic
+
+        return Anthropic(
+            api_key=config.api_key,
+            timeout=config.timeout_seconds,
+            http_client=http_client,
+            **retries,
+        )
+    raise AIProviderError(
+        provider_name=config.provider,
+        error_details="Connection pooling is not supported for this provider",
+        request_type="initialization",
+    )
+
+
+class _Entry:
+    """A pooled provider, its HTTP client and the analyses holding it."""
+
+    __slots__ = ("http_client", "leases", "provider", "retired")
+
+    def __init__(self, provider: AIProvider, http_client: httpx2.Client) -> None:
+        self.provider = provider
+        self.http_client = http_client
+        self.leases = 0
+        self.retired = False
+
+
+class ProviderPool:
+    """Share one AI provider and its HTTP connection pool across analyses.
+
+    Template Sense builds a new SDK client, and therefore new TLS connections,
+    for every analysis. The pool keeps one provider and HTTP client per
+    settings tuple (provider, model, API key and timeout), so a hedged primary
+    and secondary are both reused, and evicts the least recently used one
+    beyond ``max_entries``. Analyses hold a provider through ``lease``; an
+    evicted provider's HTTP client is closed once the last analysis holding it
+    has finished.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_AI_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_AI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_AI_KEEPALIVE_EXPIRY_SECONDS,
+        sdk_max_retries: int | None = None,
+        max_entries: int = AI_PROVIDER_POOL_MAX_ENTRIES,
+    ) -> None:
+        self.limits = httpx2.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.sdk_max_retries = sdk_max_retries
+        self.max_entries = max(1, max_entries)
+        self.stats = ConnectionStats()
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[Any, ...], _Entry] = OrderedDict()
+        # Evicted entries still leased by running analyses.
+        self._retired: list[_Entry] = []
+
+    @classmethod
+    def from_env(cls, sdk_max_retries: int | None = None) -> ProviderPool:
+        """Create a pool configured from environment variables."""
+
+        return cls(
+            max_connections=env_int(ENV_AI_MAX_CONNECTIONS, DEFAULT_AI_MAX_CONNECTIONS),
+            max_keepalive_connections=env_int(
+                ENV_AI_MAX_KEEPALIVE_CONNECTIONS, DEFAULT_AI_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            keepalive_expiry=env_float(
+                ENV_AI_KEEPALIVE_EXPIRY_SECONDS, DEFAULT_AI_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            sdk_max_retries=sdk_max_retries,
+        )
+
+    @staticmethod
+    def _settings_key(config: AIConfig) -> tuple[Any, ...]:
+        key_digest = hashlib.sha256(config.api_key.encode("utf-8")).hexdigest()
+        return (config.provider, config.model, key_digest, config.timeout_seconds)
+
+    def get(self, config: AIConfig) -> AIProvider:
+        """Return the shared provider for ``config``, building it if needed.
+
+        The provider is not leased: evicting it closes its client right away
+        unless an analysis holds it through ``lease``.
+        """
+
+        with self._lock:
+            return self._current(config).provider
+
+    @contextmanager
+    def lease(self, config: AIConfig) -> Iterator[AIProvider]:
+        """Hold the shared provider for ``config`` for the enclosed analysis."""
+
+        with self._lock:
+            entry = self._current(config)
+            entry.leases += 1
+        try:
+            yield entry.provider
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                closing = entry.retired and entry.leases == 0
+                if closing:
+                    self._retired.remove(entry)
+            if closing:
+                entry.http_client.close()
+
+    def _current(self, config: AIConfig) -> _Entry:
+        key = self._settings_key(config)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        entry = self._entries[key] = self._build(config)
+        while len(self._entries) > self.max_entries:
+            self._retire(self._entries.popitem(last=False)[1])
+        return entry
+
+    def _retire(self, entry: _Entry) -> None:
+        entry.retired = True
+        if entry.leases:
+            self._retired.append(entry)
+        else:
+            entry.http_client.close()
+
+    def _build(self, config: AIConfig) -> _Entry:
+        from template_sense.ai_providers.factory import get_ai_provider
+
+        provider = get_ai_provider(config)
+        http_client = httpx2.Client(
+            transport=CountingTransport(self.stats, limits=self.limits),
+            timeout=config.timeout_seconds,
+        )
+        # Swap the per-provider SDK client for one on the shared transport.
+        provider.client = _sdk_client(config, http_client, self.sdk_max_retries)
+        logger.info(
+            "Built pooled %s provider (model=%s, max_connections=%s)",
+            config.provider,
+            config.model or "default",
+            self.limits.max_connections,
+        )
+        return _Entry(provider, http_client)
+
+    def close(self) -> None:
+        """Close every HTTP client created by the pool."""
+
+        with self._lock:
+            entries, self._retired = self._retired, []
+            entries.extend(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.retired = True
+            entry.http_client.close()
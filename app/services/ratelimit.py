@@ -0,0 +1,419 @@
+"""Client-side rate limiting, adaptive concurrency and retries for AI calls.
+
+Every provider call goes through the ``ProviderLimiter`` for its provider and
+model, which
+
+* charges token buckets for requests per minute and (estimated) tokens per
+  minute, waiting when either is exhausted;
+* caps concurrent calls with an AIMD limit that halves on every 429 and grows
+  back by one after a full window of successful calls;
+* retries throttled, timed-out and 5xx calls with full-jitter exponential
+  backoff, never sooner than the provider's ``Retry-After`` (which also pauses
+  every other caller of that limiter).
+
+Limits are per process. Time spent waiting for the limiter and time spent in
+the provider are recorded separately (``ai_queue_wait`` and ``ai_request`` in
+the stage histogram and in request profiles).
+"""
+
+from __future__ import annotations
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from template_sense.errors import AIProviderError
+
+from app.config import env_flag, env_float, env_int
+from app.constants import (
+    DEFAULT_RATE_LIMIT_ENABLED,
+    DEFAULT_RATE_LIMIT_MAX_BACKOFF_SECONDS,
+    DEFAULT_RATE_LIMIT_MAX_CONCURRENCY,
+    DEFAULT_RATE_LIMIT_MAX_RETRIES,
+    DEFAULT_RATE_LIMIT_RPM,
+    DEFAULT_RATE_LIMIT_TPM,
+    ENV_RATE_LIMIT_ENABLED,
+    ENV_RATE_LIMIT_MAX_BACKOFF_SECONDS,
+    ENV_RATE_LIMIT_MAX_CONCURRENCY,
+    ENV_RATE_LIMIT_MAX_RETRIES,
+    ENV_RATE_LIMIT_RPM,
+    ENV_RATE_LIMIT_TPM,
+    RATE_LIMIT_BACKOFF_BASE_SECONDS,
+    RATE_LIMIT_DECREASE_FACTOR,
+    RATE_LIMIT_MIN_CONCURRENCY,
+)
+from app.services.metrics import (
+    AI_CONCURRENCY_LIMIT,
+    AI_RETRIES,
+    AI_THROTTLED,
+    labelled,
+    observe_stage,
+)
+
+if TYPE_CHECKING:
+    from template_sense.ai_providers.interface import AIProvider
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Exception class names (checked by name, like Template Sense does) for
+# transport failures worth retrying.
+_RETRYABLE_ERROR_NAMES = frozenset(
+    {"APITimeoutError", "APIConnectionError", "TimeoutException", "ConnectError"}
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``per_minute``.
+
+    ``reserve`` always succeeds and may leave the bucket in debt; the caller
+    sleeps for the returned delay, which keeps waiters in arrival order.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = max(float(per_minute), 1.0)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens and return how long to wait before using them."""
+
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit that halves on throttling and recovers additively."""
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = RATE_LIMIT_MIN_CONCURRENCY,
+        decrease_factor: float = RATE_LIMIT_DECREASE_FACTOR,
+    ) -> None:
+        self.maximum = max(maximum, 1)
+        self.minimum = min(max(minimum, 1), self.maximum)
+        self.decrease_factor = decrease_factor
+        self.limit = self.maximum
+        self.in_flight = 0
+        self.waiting = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            self.waiting += 1
+            try:
+                while self.in_flight >= self.limit:
+                    self._condition.wait()
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False, succeeded: bool = True) -> None:
+        """Free a slot; only successful calls count toward growing the limit."""
+
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, int(self.limit * self.decrease_factor))
+                self._successes = 0
+            elif succeeded and self.limit < self.maximum:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+@dataclass(frozen=True)
+class RetryDecision:
+    """How a failed provider call should be handled."""
+
+    retryable: bool
+    throttled: bool = False
+    retry_after: float | None = None
+
+
+def _parse_retry_after(headers: Any) -> float | None:
+    if headers is None:
+        return None
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return max(float(milliseconds) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+def classify_failure(exc: BaseException) -> RetryDecision:
+    """Decide whether a provider failure is retryable.
+
+    Template Sense wraps SDK exceptions in ``AIProviderError``; the original
+    exception (with its HTTP status and headers) is on the cause chain.
+    """
+
+    seen: set[int] = set()
+    error: BaseException | None = exc
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        status = getattr(error, "status_code", None)
+        if isinstance(status, int):
+            response = getattr(error, "response", None)
+            retry_after = _parse_retry_after(getattr(response, "headers", None))
+            if status == 429:
+                return RetryDecision(True, throttled=True, retry_after=retry_after)
+            if status in (408, 409) or status >= 500:
+                return RetryDecision(True, retry_after=retry_after)
+            return RetryDecision(False)
+        if type(error).__name__ in _RETRYABLE_ERROR_NAMES:
+            return RetryDecision(True)
+        error = error.__cause__ or error.__context__
+    return RetryDecision(False)
+
+
+class ProviderLimiter:
+    """Rate limits, concurrency and retry policy for one provider and model."""
+
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        requests_per_minute: int = DEFAULT_RATE_LIMIT_RPM,
+        tokens_per_minute: int = DEFAULT_RATE_LIMIT_TPM,
+        max_concurrency: int = DEFAULT_RATE_LIMIT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_RATE_LIMIT_MAX_RETRIES,
+        max_backoff: float = DEFAULT_RATE_LIMIT_MAX_BACKOFF_SECONDS,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.provider = provider
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max(max_retries, 0)
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.queue_wait_seconds = 0.0
+        self.provider_seconds = 0.0
+        labelled(AI_CONCURRENCY_LIMIT, provider, model).set(self.concurrency.limit)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every new call until ``seconds`` from now (a ``Retry-After``)."""
+
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def backoff(self, attempt: int, retry_after: float | None) -> float:
+        """Full-jitter exponential delay, but never shorter than ``retry_after``."""
+
+        ceiling = min(self.max_backoff, RATE_LIMIT_BACKOFF_BASE_SECONDS * 2**attempt)
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    def _acquire(self, tokens: int) -> float:
+        started = time.monotonic()
+        with self._lock:
+            paused = self._paused_until - started
+        if paused > 0:
+            self._sleep(paused)
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if delay > 0:
+            self._sleep(delay)
+        self.concurrency.acquire()
+        return time.monotonic() - started
+
+    def _record(self, queued: float, elapsed: float, throttled: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.queue_wait_seconds += queued
+            self.provider_seconds += elapsed
+            if throttled:
+                self.throttled += 1
+        observe_stage("ai_queue_wait", self.provider, self.model, queued)
+        observe_stage("ai_request", self.provider, self.model, elapsed)
+
+    def call(self, fn: Callable[..., T], *args: Any, tokens: int = 0) -> T:
+        """Run ``fn(*args)`` within the limits, retrying transient failures."""
+
+        attempt = 0
+        while True:
+            queued = self._acquire(tokens)
+            started = time.monotonic()
+            decision = RetryDecision(False)
+            succeeded = False
+            try:
+                result = fn(*args)
+                succeeded = True
+                return result
+            except AIProviderError as exc:
+                decision = classify_failure(exc)
+                if not decision.retryable or attempt >= self.max_retries:
+                    raise
+            finally:
+                self.concurrency.release(decision.throttled, succeeded)
+                self._record(queued, time.monotonic() - started, decision.throttled)
+                labelled(AI_CONCURRENCY_LIMIT, self.provider, self.model).set(
+                    self.concurrency.limit
+                )
+
+            if decision.throttled:
+                labelled(AI_THROTTLED, self.provider, self.model).inc()
+                if decision.retry_after:
+                    self.pause(decision.retry_after)
+            delay = self.backoff(attempt, decision.retry_after)
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            labelled(AI_RETRIES, self.provider, self.model).inc()
+            logger.warning(
+                "Retrying %s call in %.2fs (attempt %d of %d%s)",
+                self.provider,
+                delay,
+                attempt,
+                self.max_retries,
+                ", rate limited" if decision.throttled else "",
+            )
+            self._sleep(delay)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Current limits and cumulative queueing versus provider time."""
+
+        with self._lock:
+            calls = self.calls
+            queued, spent = self.queue_wait_seconds, self.provider_seconds
+            stats = {
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "paused_for_seconds": round(
+                    max(self._paused_until - time.monotonic(), 0.0), 3
+                ),
+            }
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "concurrency_limit": self.concurrency.limit,
+            "in_flight": self.concurrency.in_flight,
+            "waiting": self.concurrency.waiting,
+            "requests_available": round(self.requests.available(), 2),
+            "tokens_available": round(self.tokens.available(), 2),
+            "calls": calls,
+            **stats,
+            "avg_queue_wait_ms": round(queued / calls * 1000, 3) if calls else 0.0,
+            "avg_provider_latency_ms": round(spent / calls * 1000, 3) if calls else 0.0,
+        }
+
+
+class RateLimiter:
+    """Registry of ``ProviderLimiter`` instances keyed by provider and model."""
+
+    def __init__(
+        self,
+        enabled: bool = DEFAULT_RATE_LIMIT_ENABLED,
+        requests_per_minute: int = DEFAULT_RATE_LIMIT_RPM,
+        tokens_per_minute: int = DEFAULT_RATE_LIMIT_TPM,
+        max_concurrency: int = DEFAULT_RATE_LIMIT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_RATE_LIMIT_MAX_RETRIES,
+        max_backoff: float = DEFAULT_RATE_LIMIT_MAX_BACKOFF_SECONDS,
+    ) -> None:
+        self.enabled = enabled
+        self.settings = {
+            "requests_per_minute": requests_per_minute,
+            "tokens_per_minute": tokens_per_minute,
+            "max_concurrency": max_concurrency,
+            "max_retries": max_retries,
+            "max_backoff": max_backoff,
+        }
+        self._lock = threading.Lock()
+        self._limiters: dict[tuple[str, str], ProviderLimiter] = {}
+
+    @classmethod
+    def from_env(cls) -> RateLimiter:
+        """Create a rate limiter configured from environment variables."""
+
+        return cls(
+            enabled=env_flag(ENV_RATE_LIMIT_ENABLED, DEFAULT_RATE_LIMIT_ENABLED),
+            requests_per_minute=env_int(ENV_RATE_LIMIT_RPM, DEFAULT_RATE_LIMIT_RPM),
+            tokens_per_minute=env_int(ENV_RATE_LIMIT_TPM, DEFAULT_RATE_LIMIT_TPM),
+            max_concurrency=env_int(
+                ENV_RATE_LIMIT_MAX_CONCURRENCY, DEFAULT_RATE_LIMIT_MAX_CONCURRENCY
+            ),
+            max_retries=env_int(
+                ENV_RATE_LIMIT_MAX_RETRIES, DEFAULT_RATE_LIMIT_MAX_RETRIES
+            ),
+            max_backoff=env_float(
+                ENV_RATE_LIMIT_MAX_BACKOFF_SECONDS,
+                DEFAULT_RATE_LIMIT_MAX_BACKOFF_SECONDS,
+            ),
+        )
+
+    def limiter(self, provider: str, model: str) -> ProviderLimiter:
+        """Return the limiter for ``provider`` and ``model``, creating it if needed."""
+
+        key = (provider, model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = ProviderLimiter(
+                    provider, model, **self.settings
+                )
+            return limiter
+
+    def wrap(self, provider: AIProvider) -> AIProvider:
+        """Return ``provider`` routed through its limiter (unchanged if disabled)."""
+
+        if not self.enabled:
+            return provider
+        # Deferred: the AIProvider base class pulls in both provider SDKs.
+        from app.services.ratelimit_provider import RateLimitedProvider
+
+        return RateLimitedProvider(
+            provider, self.limiter(provider.provider_name, provider.model)
+        )
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return [limiter.snapshot() for limiter in limiters]
@@ -0,0 +1,89 @@
+"""``AIProvider`` wrapper that routes every call through a ``ProviderLimiter``.
+
+Kept apart from ``app.services.ratelimit`` because subclassing ``AIProvider``
+imports the provider SDKs; the limiter itself is needed by ``/health`` long
+before the first analysis.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from template_sense.ai_providers.interface import AIProvider
+
+from app.constants import RATE_LIMIT_CHARS_PER_TOKEN, RATE_LIMIT_COMPLETION_TOKENS
+from app.services.ratelimit import ProviderLimiter
+
+
+def _estimate_tokens(*parts: Any) -> int:
+    size = sum(
+        len(part) if isinstance(part, str) else len(json.dumps(part, default=str))
+        for part in parts
+        if part is not None
+    )
+    return size // RATE_LIMIT_CHARS_PER_TOKEN
+
+
+class RateLimitedProvider(AIProvider):
+    """Route every call of a provider through its ``ProviderLimiter``."""
+
+    def __init__(self, provider: AIProvider, limiter: ProviderLimiter) -> None:
+        super().__init__(provider.config)
+        self.provider = provider
+        self.limiter = limiter
+
+    @property
+    def provider_name(self) -> str:
+        return self.provider.provider_name
+
+    @property
+    def model(self) -> str:
+        return self.provider.model
+
+    def classify_fields(
+        self, payload: dict[str, Any], context: str = "headers"
+    ) -> dict[str, Any]:
+        tokens = _estimate_tokens(payload) + RATE_LIMIT_COMPLETION_TOKENS
+        return self.limiter.call(
+            self.provider.classify_fields, payload, context, tokens=tokens
+        )
+
+    def classify_all_fields(
+        self, payload: dict[str, Any], contexts: list[str] | None = None
+    ) -> dict[str, Any]:
+        tokens = _estimate_tokens(payload) + RATE_LIMIT_COMPLETION_TOKENS
+        return self.limiter.call(
+            self.provider.classify_all_fields, payload, contexts, tokens=tokens
+        )
+
+    def translate_text(
+        self, text: str, source_lang: str, target_lang: str = "en"
+    ) -> str:
+        tokens = 2 * _estimate_tokens(text) + RATE_LIMIT_COMPLETION_TOKENS
+        return self.limiter.call(
+            self.provider.translate_text,
+            text,
+            source_lang,
+            target_lang,
+            tokens=tokens,
+        )
+
+    def generate_text(
+        self,
+        prompt: str,
+        system_message: str | None = None,
+        max_tokens: int = 150,
+        temperature: float = 0.0,
+        json_mode: bool = True,
+    ) -> str:
+        tokens = _estimate_tokens(prompt, system_message) + max_tokens
+        return self.limiter.call(
+            self.provider.generate_text,
+            prompt,
+            system_message,
+            max_tokens,
+            temperature,
+            json_mode,
+            tokens=tokens,
+        )
@@ -0,0 +1,237 @@
+"""Split multi-sheet workbooks into sheets that can be analyzed concurrently.
+
+Template Sense analyzes one sheet per workbook: the first one not hidden.
+Templates made of several visible sheets (invoice, packing list,
+certificate) therefore either lose every sheet but the first or, when
+analyzed one after another, pay the sum of their latencies.
+``SheetSplitter`` writes each visible, non-empty sheet to a workbook of its
+own so ``AnalyzerService`` can analyze them with a bounded fan-out, and
+``merge_sheet_results`` folds the per-sheet results back into one result.
+
+Sheets whose formulas reference another analyzed sheet, directly or through
+a defined name, describe one document and are analyzed as a whole workbook
+instead. References to hidden sheets (lookup tables) do not prevent a split.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import html
+import logging
+import re
+import zipfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from app.config import env_flag, env_int
+from app.constants import (
+    DEFAULT_SHEET_SPLIT_ENABLED,
+    DEFAULT_SHEET_SPLIT_MAX_WORKERS,
+    ENV_SHEET_SPLIT_ENABLED,
+    ENV_SHEET_SPLIT_MAX_WORKERS,
+    SHEET_SCAN_CHUNK_BYTES,
+    SHEET_SCAN_TAIL_BYTES,
+)
+from app.services.trimming import TrimResult, WorkbookTrimmer
+
+logger = logging.getLogger(__name__)
+
+# Sheet state Template Sense skips when it picks the sheet to analyze.
+_HIDDEN_STATE = "hidden"
+
+_FORMULA = re.compile(rb"<(?:\w+:)?f\b[^>]*>([^<]*)</(?:\w+:)?f>")
+# ``Sheet1!A1``, ``'Packing List'!A1`` and ``'O''Brien'!A1``.
+_SHEET_REFERENCE = re.compile(r"(?:'((?:[^']|'')+)'|([\w.]+))!")
+_NAME_TOKEN = re.compile(r"[A-Za-z_\\][\w.]*")
+# Package metadata such as the save timestamp differs on every write.
+_VOLATILE_PARTS = ("docProps/",)
+
+
+def _referenced_sheets(text: str) -> set[str]:
+    return {
+        quoted.replace("''", "'") if quoted else bare
+        for quoted, bare in _SHEET_REFERENCE.findall(text)
+    }
+
+
+def _formulas(sheet: Any) -> Iterator[str]:
+    """Yield the text of every formula in a read-only worksheet's XML part."""
+
+    buffer = b""
+    with sheet._get_source() as source:
+        while chunk := source.read(SHEET_SCAN_CHUNK_BYTES):
+            buffer += chunk
+            end = 0
+            for match in _FORMULA.finditer(buffer):
+                yield html.unescape(match.group(1).decode("utf-8", "replace"))
+                end = match.end()
+            buffer = buffer[end:][-SHEET_SCAN_TAIL_BYTES:]
+
+
+def _defined_name_targets(workbook: Any) -> dict[str, set[str]]:
+    """Map each workbook-level defined name to the sheets it refers to."""
+
+    return {
+        name.lower(): _referenced_sheets(defined.attr_text or "")
+        for name, defined in workbook.defined_names.items()
+    }
+
+
+def workbook_digest(path: Path) -> str:
+    """Hash a workbook's parts, ignoring metadata that changes on every save.
+
+    Two derived workbooks written from the same sheet content hash alike, so
+    the digest can key a cache of per-sheet results.
+    """
+
+    digest = hashlib.sha256()
+    with zipfile.ZipFile(path) as archive:
+        for member in sorted(archive.infolist(), key=lambda info: info.filename):
+            if member.filename.startswith(_VOLATILE_PARTS):
+                continue
+            digest.update(member.filename.encode("utf-8") + b"\0")
+            digest.update(archive.read(member))
+    return digest.hexdigest()
+
+
+class SheetSplitter:
+    """Split workbooks with several independent visible sheets."""
+
+    def __init__(
+        self,
+        enabled: bool = DEFAULT_SHEET_SPLIT_ENABLED,
+        max_workers: int = DEFAULT_SHEET_SPLIT_MAX_WORKERS,
+    ) -> None:
+        self.enabled = enabled
+        self.max_workers = max(1, max_workers)
+
+    @classmethod
+    def from_env(cls) -> SheetSplitter:
+        """Create a splitter configured from environment variables."""
+
+        return cls(
+            enabled=env_flag(ENV_SHEET_SPLIT_ENABLED, DEFAULT_SHEET_SPLIT_ENABLED),
+            max_workers=env_int(
+                ENV_SHEET_SPLIT_MAX_WORKERS, DEFAULT_SHEET_SPLIT_MAX_WORKERS
+            ),
+        )
+
+    def split(self, path: Path, trimmer: WorkbookTrimmer) -> list[TrimResult] | None:
+        """Write every analyzable sheet of ``path`` to a workbook of its own.
+
+        Returns ``None`` when the workbook should be analyzed as a whole: it
+        has fewer than two non-empty visible sheets or they reference each
+        other. Otherwise the caller removes the parts with ``cleanup()``.
+        """
+
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        parts: list[TrimResult] = []
+        try:
+            sheets = [
+                sheet
+                for sheet in workbook.worksheets
+                if sheet.sheet_state != _HIDDEN_STATE
+            ]
+            if len(sheets) < 2 or self._linked(path, workbook, sheets):
+                return None
+            for sheet in sheets:
+                part = trimmer.extract(path, sheet)
+                if part.derived:
+                    parts.append(part)
+        except BaseException:
+            for part in parts:
+                part.cleanup()
+            raise
+        finally:
+            workbook.close()
+
+        if len(parts) < 2:
+            for part in parts:
+                part.cleanup()
+            return None
+        logger.info("Split %s into %d sheets", path.name, len(parts))
+        return parts
+
+    @staticmethod
+    def _linked(path: Path, workbook: Any, sheets: list[Any]) -> bool:
+        """Return whether a formula on one sheet reads another of ``sheets``."""
+
+        titles = {sheet.title.lower() for sheet in sheets}
+        names = _defined_name_targets(workbook)
+        for sheet in sheets:
+            others = titles - {sheet.title.lower()}
+            for formula in _formulas(sheet):
+                targets = {title.lower() for title in _referenced_sheets(formula)}
+                for token in _NAME_TOKEN.findall(formula):
+                    targets |= {title.lower() for title in names.get(token.lower(), ())}
+                linked = targets & others
+                if linked:
+                    logger.info(
+                        "Analyzing %s as one workbook: sheet %r references %s",
+                        path.name,
+                        sheet.title,
+                        ", ".join(sorted(linked)),
+                    )
+                    return True
+        return False
+
+
+def _tag(entries: list[dict[str, Any]], sheet_name: str) -> list[dict[str, Any]]:
+    return [{**entry, "sheet_name": sheet_name} for entry in entries]
+
+
+def merge_sheet_results(
+    sheets: list[tuple[TrimResult, dict[str, Any], str]],
+) -> dict[str, Any]:
+    """Fold per-sheet results into the single-result schema.
+
+    ``sheets`` holds, in workbook order, each part, its analysis result and
+    how it was served (``HIT`` or ``MISS``). Headers, tables and recovery
+    events are concatenated and tagged with their ``sheet_name``, tables are
+    renumbered and summary counts are summed. The first sheet supplies
+    ``sheet_name`` and the remaining metadata, as in whole-workbook analysis.
+    Cached results are shared, so nothing in them is modified.
+    """
+
+    matched: list[dict[str, Any]] = []
+    unmatched: list[dict[str, Any]] = []
+    tables: list[dict[str, Any]] = []
+    events: list[dict[str, Any]] = []
+    summary: dict[str, int] = {}
+    described: list[dict[str, Any]] = []
+    for part, result, cache_status in sheets:
+        name = part.sheet or ""
+        output = result.get("normalized_output") or {}
+        headers = output.get("headers") or {}
+        matched += _tag(headers.get("matched") or [], name)
+        unmatched += _tag(headers.get("unmatched") or [], name)
+        for table in output.get("tables") or []:
+            tables.append({**table, "table_index": len(tables), "sheet_name": name})
+        for key, value in (output.get("summary") or {}).items():
+            if isinstance(value, int):
+                summary[key] = summary.get(key, 0) + value
+        events += _tag(result.get("recovery_events") or [], name)
+        described.append(
+            {
+                "sheet_name": name,
+                "cache": cache_status,
+                "rows_before": part.rows_before,
+                "rows_kept": part.rows_kept,
+            }
+        )
+
+    first = sheets[0][1]
+    first_output = first.get("normalized_output") or {}
+    return {
+        "normalized_output": {
+            **first_output,
+            "headers": {"matched": matched, "unmatched": unmatched},
+            "tables": tables,
+            "summary": summary,
+        },
+        "recovery_events": events,
+        "metadata": {**(first.get("metadata") or {}), "sheets": described},
+    }
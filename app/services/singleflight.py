@@ -0,0 +1,116 @@
+"""Coalesce concurrent identical computations into one shared call.
+
+The first caller for a key becomes the leader and runs the computation; every
+caller that arrives while it is in flight waits for the same outcome, result or
+exception. Flights are tracked in a ``concurrent.futures.Future`` behind a
+thread lock, so async handlers on the event loop and blocking callers in
+worker threads coalesce with each other. A key is released as soon as its
+computation finishes; later callers start a new flight (and usually hit the
+result cache instead).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    def __init__(self) -> None:
+        self.future: Future[T] = Future()
+        self.followers = 0
+        self.task: asyncio.Future[T] | None = None
+
+
+class SingleFlight:
+    """Share one in-flight computation between concurrent callers of a key."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight[Any]] = {}
+
+    def _join(self, key: str) -> tuple[_Flight[Any], bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _settle(
+        self, key: str, flight: _Flight[Any], result: Any, exc: BaseException | None
+    ) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if exc is None:
+            flight.future.set_result(result)
+        else:
+            flight.future.set_exception(exc)
+
+    def _settle_task(
+        self, key: str, flight: _Flight[Any], task: asyncio.Future[Any]
+    ) -> None:
+        if task.cancelled():
+            self._settle(key, flight, None, asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._settle(key, flight, None, task.exception())
+        else:
+            self._settle(key, flight, task.result(), None)
+
+    def followers(self, key: str) -> int:
+        """Return how many callers are waiting on the in-flight call for ``key``."""
+
+        with self._lock:
+            flight = self._flights.get(key)
+            return flight.followers if flight is not None else 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def do(self, key: str, fn: Callable[..., T], *args: Any) -> tuple[T, bool]:
+        """Run ``fn(*args)`` once per in-flight ``key``, blocking the caller.
+
+        Returns the result and whether it was shared from another caller.
+        """
+
+        flight, leader = self._join(key)
+        if not leader:
+            return flight.future.result(), True
+        try:
+            result = fn(*args)
+        except BaseException as exc:
+            self._settle(key, flight, None, exc)
+            raise
+        self._settle(key, flight, result, None)
+        return result, False
+
+    async def do_async(
+        self, key: str, fn: Callable[[], Awaitable[T]]
+    ) -> tuple[T, bool]:
+        """Await ``fn()`` once per in-flight ``key``.
+
+        The leader's computation runs as its own task, so a leader whose
+        request is cancelled (e.g. the client disconnected) does not cancel the
+        result its followers are waiting for.
+        """
+
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                coroutine = fn()
+            except BaseException as exc:
+                self._settle(key, flight, None, exc)
+                raise
+            # Keep a strong reference: the event loop only holds tasks weakly.
+            flight.task = task = asyncio.ensure_future(coroutine)
+            task.add_done_callback(lambda done: self._settle_task(key, flight, done))
+        result = await asyncio.shield(asyncio.wrap_future(flight.future))
+        return result, not leader
@@ -0,0 +1,274 @@
+"""Trim large workbooks down to their template structure before analysis.
+
+Template structure lives in the header area and the first rows of each
+table, but Template Sense loads every cell of every sheet. For workbooks with
+many filled-in rows, ``WorkbookTrimmer`` streams the analyzed sheet in
+read-only mode and writes a compact derived workbook that keeps:
+
+- only the sheet Template Sense analyzes (the first one not hidden), so
+  hidden filler and unrelated sheets are never loaded;
+- only non-empty cells, so empty trailing rows and columns disappear;
+- every row outside a table, plus the first rows of each table run (a run
+  is consecutive rows filling mostly the same columns).
+
+Kept cells stay at their original coordinates, as do hidden row and column
+flags, so locations in the result still point into the uploaded file.
+Workbooks whose sheets all have at most ``min_rows`` rows are analyzed
+unchanged.
+"""
+
+from __future__ import annotations
+
+import logging
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.config import env_flag, env_int
+from app.constants import (
+    DEFAULT_TRIM_ENABLED,
+    DEFAULT_TRIM_MIN_ROWS,
+    DEFAULT_TRIM_SAMPLE_ROWS,
+    ENV_TRIM_ENABLED,
+    ENV_TRIM_MIN_ROWS,
+    ENV_TRIM_SAMPLE_ROWS,
+    TRIM_ROW_SIMILARITY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Sheet state Template Sense skips when it picks the sheet to analyze.
+_HIDDEN_STATE = "hidden"
+
+
+def _is_blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _similar(a: frozenset[int], b: frozenset[int]) -> bool:
+    if not a or not b:
+        return False
+    return len(a & b) / len(a | b) >= TRIM_ROW_SIMILARITY
+
+
+@dataclass
+class TrimResult:
+    """Outcome of trimming one workbook."""
+
+    path: Path
+    derived: bool = False
+    sheet: str | None = None
+    rows_before: int = 0
+    rows_kept: int = 0
+    tables_trimmed: int = 0
+    sheets_dropped: list[str] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "sheet": self.sheet,
+            "rows_before": self.rows_before,
+            "rows_kept": self.rows_kept,
+            "tables_trimmed": self.tables_trimmed,
+            "sheets_dropped": self.sheets_dropped,
+        }
+
+    def cleanup(self) -> None:
+        """Delete the derived workbook, if one was written."""
+
+        if self.derived:
+            self.path.unlink(missing_ok=True)
+
+
+@dataclass
+class _Run:
+    """Consecutive table-like rows filling mostly the same columns."""
+
+    columns: frozenset[int] = frozenset()
+    length: int = 0
+
+
+class WorkbookTrimmer:
+    """Write a compact copy of large workbooks for analysis."""
+
+    def __init__(
+        self,
+        enabled: bool = DEFAULT_TRIM_ENABLED,
+        sample_rows: int = DEFAULT_TRIM_SAMPLE_ROWS,
+        min_rows: int = DEFAULT_TRIM_MIN_ROWS,
+    ) -> None:
+        self.enabled = enabled
+        self.sample_rows = sample_rows
+        self.min_rows = min_rows
+
+    @classmethod
+    def from_env(cls) -> WorkbookTrimmer:
+        """Create a trimmer configured from environment variables."""
+
+        return cls(
+            enabled=env_flag(ENV_TRIM_ENABLED, DEFAULT_TRIM_ENABLED),
+            sample_rows=env_int(ENV_TRIM_SAMPLE_ROWS, DEFAULT_TRIM_SAMPLE_ROWS),
+            min_rows=env_int(ENV_TRIM_MIN_ROWS, DEFAULT_TRIM_MIN_ROWS),
+        )
+
+    def trim(self, path: Path) -> TrimResult:
+        """Return the workbook to analyze for ``path``.
+
+        ``result.path`` is ``path`` itself when nothing needed trimming;
+        otherwise it is a derived workbook the caller removes with
+        ``result.cleanup()``.
+        """
+
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            sheets = workbook.worksheets
+            analyzed = next(
+                (sheet for sheet in sheets if sheet.sheet_state != _HIDDEN_STATE), None
+            )
+            if analyzed is None:
+                return TrimResult(path=path)
+            others = [sheet for sheet in sheets if sheet is not analyzed]
+            result = TrimResult(
+                path=path,
+                sheet=analyzed.title,
+                sheets_dropped=[sheet.title for sheet in others],
+            )
+            rows, row_dimensions, column_dimensions = self._read_sheet(
+                analyzed, result, self.sample_rows
+            )
+            # Other sheets are judged by their declared size; they are not read.
+            large_others = any((sheet.max_row or 0) > self.min_rows for sheet in others)
+        finally:
+            workbook.close()
+
+        if result.rows_before <= self.min_rows and not large_others:
+            return TrimResult(path=path, sheet=result.sheet)
+        result.rows_kept = len(rows)
+        result.path = self._write(
+            path, analyzed.title, rows, row_dimensions, column_dimensions
+        )
+        result.derived = True
+        logger.info(
+            "Trimmed %s: %d -> %d rows, %d table(s) sampled, %d sheet(s) dropped",
+            path.name,
+            result.rows_before,
+            result.rows_kept,
+            result.tables_trimmed,
+            len(result.sheets_dropped),
+        )
+        return result
+
+    def extract(self, path: Path, sheet: Any) -> TrimResult:
+        """Write ``sheet`` of the read-only workbook at ``path`` as its own workbook.
+
+        Tables are sampled as in ``trim`` when trimming is enabled and the sheet
+        declares more than ``min_rows`` rows. An empty sheet yields a result
+        that is not ``derived`` and writes nothing.
+        """
+
+        result = TrimResult(path=path, sheet=sheet.title)
+        sample_rows = None
+        if self.enabled and (sheet.max_row or 0) > self.min_rows:
+            sample_rows = self.sample_rows
+        rows, row_dimensions, column_dimensions = self._read_sheet(
+            sheet, result, sample_rows
+        )
+        if not rows:
+            return result
+        result.rows_kept = len(rows)
+        result.path = self._write(
+            path, sheet.title, rows, row_dimensions, column_dimensions
+        )
+        result.derived = True
+        return result
+
+    def _read_sheet(
+        self, sheet: Any, result: TrimResult, sample_rows: int | None
+    ) -> tuple[list[tuple[int, list[tuple[int, Any]]]], dict[str, Any], dict[str, Any]]:
+        """Stream ``sheet`` and return the kept rows and dimension attributes.
+
+        Rows beyond the first ``sample_rows`` of each table are dropped unless
+        ``sample_rows`` is ``None``.
+        """
+
+        from openpyxl.worksheet._reader import WorkSheetParser
+
+        workbook = sheet.parent
+        kept: list[tuple[int, list[tuple[int, Any]]]] = []
+        run = _Run()
+        trimmed_run = False
+        previous_row = 0
+        # The parser is what ``ReadOnlyWorksheet`` iterates over; using it
+        # directly also exposes the hidden row and column flags.
+        with sheet._get_source() as source:
+            parser = WorkSheetParser(
+                source,
+                sheet._shared_strings,
+                data_only=True,
+                epoch=workbook.epoch,
+                date_formats=workbook._date_formats,
+                timedelta_formats=workbook._timedelta_formats,
+            )
+            for row_index, cells in parser.parse():
+                values = [
+                    (cell["column"], cell["value"])
+                    for cell in cells
+                    if not _is_blank(cell["value"])
+                ]
+                if not values:
+                    continue
+                result.rows_before += 1
+                columns = frozenset(column for column, _ in values)
+                if row_index == previous_row + 1 and _similar(columns, run.columns):
+                    run.length += 1
+                else:
+                    run, trimmed_run = _Run(length=1), False
+                run.columns = columns
+                previous_row = row_index
+                # A run's first row is usually the table header.
+                if sample_rows is not None and run.length > sample_rows + 1:
+                    if not trimmed_run:
+                        result.tables_trimmed += 1
+                        trimmed_run = True
+                    continue
+                kept.append((row_index, values))
+        return kept, parser.row_dimensions, parser.column_dimensions
+
+    @staticmethod
+    def _write(
+        source: Path,
+        title: str,
+        rows: list[tuple[int, list[tuple[int, Any]]]],
+        row_dimensions: dict[str, Any],
+        column_dimensions: dict[str, Any],
+    ) -> Path:
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = title
+        for row_index, values in rows:
+            for column, value in values:
+                sheet.cell(row=row_index, column=column, value=value)
+            attrs = row_dimensions.get(str(row_index), {})
+            if attrs.get("hidden") in ("1", "true"):
+                sheet.row_dimensions[row_index].hidden = True
+        for attrs in column_dimensions.values():
+            if attrs.get("hidden") not in ("1", "true"):
+                continue
+            for column in range(int(attrs["min"]), int(attrs["max"]) + 1):
+                sheet.column_dimensions[get_column_letter(column)].hidden = True
+
+        with tempfile.NamedTemporaryFile(
+            delete=False, prefix=f"{source.stem}.", suffix=".trimmed.xlsx"
+        ) as handle:
+            derived = Path(handle.name)
+        try:
+            workbook.save(derived)
+        except BaseException:
+            derived.unlink(missing_ok=True)
+            raise
+        return derived
@@ -0,0 +1,81 @@
+"""Background warm-up of slow start-up work, with a readiness signal.
+
+The application lifespan starts ``WarmUp`` and yields straight away, so the
+server accepts connections (and ``/health`` answers) while heavy imports, the
+pooled AI client and the process pool are prepared in a worker thread.
+``/ready`` reports whether that has finished. Requests that arrive earlier
+still work; they just pay for whatever has not been loaded yet.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_WARMING = "warming"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+class WarmUp:
+    """Run named start-up steps in order, off the event loop."""
+
+    def __init__(self, steps: Sequence[tuple[str, Callable[[], Any]]]) -> None:
+        self.steps = list(steps)
+        self.status = STATUS_PENDING
+        self.durations: dict[str, float] = {}
+        self.error: str | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == STATUS_READY
+
+    def start(self) -> asyncio.Task[None]:
+        """Start the steps in the background and return the task running them."""
+
+        self.status = STATUS_WARMING
+        self.durations = {}
+        self.error = None
+        self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def _run(self) -> None:
+        started = time.perf_counter()
+        for name, step in self.steps:
+            step_started = time.perf_counter()
+            try:
+                await run_in_threadpool(step)
+            except Exception as exc:
+                logger.exception("Warm-up step %s failed", name)
+                self.status = STATUS_FAILED
+                self.error = f"{name}: {exc}"
+                return
+            finally:
+                self.durations[name] = time.perf_counter() - step_started
+        self.status = STATUS_READY
+        logger.info("Warm-up finished in %.2fs", time.perf_counter() - started)
+
+    async def wait(self) -> None:
+        """Wait for a started warm-up to finish (used on shutdown)."""
+
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "status": self.status,
+            "steps_ms": {
+                name: round(seconds * 1000, 3)
+                for name, seconds in self.durations.items()
+            },
+            "error": self.error,
+        }
@@ -0,0 +1 @@
+"""Performance benchmarks for the Template Sense integration API."""
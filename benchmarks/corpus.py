@@ -0,0 +1,259 @@
+"""Synthetic invoice and packing-list workbooks for scaling benchmarks.
+
+``TemplateSpec`` describes one workbook: its kind, line-item rows, sheet
+count, merged regions, cell styling, formulas and file format. ``write_template``
+renders it with openpyxl and ``dimension_specs`` derives the corpus that
+varies one dimension at a time from a base spec, so each dimension yields a
+curve.
+
+openpyxl cannot write the legacy BIFF (Excel 97-2003) format, so the ``xls``
+format is an OOXML workbook saved under an ``.xls`` name (which the API
+renames and analyzes), and the ``biff`` format is an OLE2-signed stub with
+an ``.xls`` name, enough to time how quickly real legacy files are rejected.
+
+Usage:
+    python -m benchmarks.corpus --output-dir /tmp/corpus
+    python -m benchmarks.corpus --output-dir /tmp/corpus --rows 100,10000 --sheets 1,8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any
+
+from app.services.preflight import OLE2_MAGIC
+
+KIND_INVOICE = "invoice"
+KIND_PACKING_LIST = "packing_list"
+KINDS = (KIND_INVOICE, KIND_PACKING_LIST)
+
+FORMAT_XLSX = "xlsx"
+FORMAT_XLS = "xls"
+FORMAT_BIFF = "biff"
+FORMATS = (FORMAT_XLSX, FORMAT_XLS, FORMAT_BIFF)
+
+# Header block (label, value) and table columns per kind. The second column
+# is the wide one that merged regions span.
+_LAYOUTS: dict[str, dict[str, Any]] = {
+    KIND_INVOICE: {
+        "title": "COMMERCIAL INVOICE",
+        "headers": [
+            ("Invoice No", "INV-2024-{sheet:03d}"),
+            ("Invoice Date", "2024-01-31"),
+            ("Shipper", "ACME Trading Co."),
+            ("Consignee", "Example Imports Ltd."),
+            ("Port of Loading", "Yokohama"),
+            ("Terms of Payment", "T/T 30 days"),
+        ],
+        "columns": ["Item No", "Description", "", "Quantity", "Unit Price", "Amount"],
+    },
+    KIND_PACKING_LIST: {
+        "title": "PACKING LIST",
+        "headers": [
+            ("Packing List No", "PL-2024-{sheet:03d}"),
+            ("Date", "2024-01-31"),
+            ("Shipper", "ACME Trading Co."),
+            ("Consignee", "Example Imports Ltd."),
+            ("Vessel", "Ocean Star V.12"),
+            ("Total Boxes", "{rows}"),
+        ],
+        "columns": ["Box No", "Description", "", "Quantity", "N.W. (kg)", "G.W. (kg)"],
+    },
+}
+
+DEFAULT_DIMENSIONS: dict[str, list[Any]] = {
+    "rows": [100, 1000, 5000, 20000],
+    "sheets": [1, 2, 4, 8],
+    "merged_regions": [0, 100, 1000],
+    "styled": [False, True],
+    "formulas": [False, True],
+    "file_format": list(FORMATS),
+    "kind": list(KINDS),
+}
+
+
+@dataclass(frozen=True)
+class TemplateSpec:
+    """Shape of one synthetic workbook."""
+
+    kind: str = KIND_INVOICE
+    rows: int = 500
+    sheets: int = 1
+    merged_regions: int = 0
+    styled: bool = False
+    formulas: bool = False
+    file_format: str = FORMAT_XLSX
+
+    @property
+    def filename(self) -> str:
+        suffix = "xlsx" if self.file_format == FORMAT_XLSX else "xls"
+        return (
+            f"{self.kind}-r{self.rows}-s{self.sheets}-m{self.merged_regions}"
+            f"{'-styled' if self.styled else ''}"
+            f"{'-formulas' if self.formulas else ''}"
+            f"{'-biff' if self.file_format == FORMAT_BIFF else ''}.{suffix}"
+        )
+
+
+def _style_table(sheet: Any, first_row: int, last_row: int, width: int) -> None:
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+    thin = Side(style="thin", color="999999")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header_fill = PatternFill("solid", fgColor="DDEBF7")
+    for row in sheet.iter_rows(
+        min_row=first_row, max_row=last_row, min_col=1, max_col=width
+    ):
+        for cell in row:
+            cell.border = border
+            if cell.row == first_row:
+                cell.font = Font(bold=True)
+                cell.fill = header_fill
+                cell.alignment = Alignment(horizontal="center", wrap_text=True)
+            elif cell.column >= width - 1:
+                cell.number_format = "#,##0.00"
+    for letter, size in zip("ABCDEF", (10, 36, 4, 12, 14, 16)):
+        sheet.column_dimensions[letter].width = size
+
+
+def _fill_sheet(sheet: Any, spec: TemplateSpec, index: int) -> None:
+    layout = _LAYOUTS[spec.kind]
+    sheet.append([layout["title"]])
+    sheet.append([])
+    for label, value in layout["headers"]:
+        sheet.append([label, value.format(sheet=index + 1, rows=spec.rows)])
+    sheet.append([])
+
+    columns = layout["columns"]
+    header_row = sheet.max_row + 1
+    sheet.append(columns)
+    amount = 0.0
+    for item in range(spec.rows):
+        row = header_row + 1 + item
+        quantity, unit = 1 + item % 12, round(2.5 + item % 40 * 0.75, 2)
+        if spec.kind == KIND_INVOICE:
+            last = f"=D{row}*E{row}" if spec.formulas else quantity * unit
+            amount += quantity * unit
+        else:
+            last = f"=E{row}*1.08" if spec.formulas else round(unit * 1.08, 2)
+        sheet.append([item + 1, f"Product {item % 97}", None, quantity, unit, last])
+    last_row = header_row + spec.rows
+    if spec.kind == KIND_INVOICE:
+        total = f"=SUM(F{header_row + 1}:F{last_row})" if spec.formulas else amount
+        sheet.append([None, None, None, None, "Total", total])
+
+    if spec.merged_regions:
+        sheet.merge_cells(start_row=1, start_column=1, end_row=1, end_column=6)
+        # The remaining regions join the description with its spacer column.
+        for offset in range(min(spec.merged_regions - 1, spec.rows + 1)):
+            row = header_row + offset
+            sheet.merge_cells(start_row=row, start_column=2, end_row=row, end_column=3)
+    if spec.styled:
+        from openpyxl.styles import Font
+
+        sheet["A1"].font = Font(bold=True, size=16)
+        _style_table(sheet, header_row, last_row, len(columns))
+
+
+def write_template(spec: TemplateSpec, directory: Path) -> Path:
+    """Write the workbook described by ``spec`` into ``directory``."""
+
+    path = Path(directory) / spec.filename
+    if spec.file_format == FORMAT_BIFF:
+        # Signature plus padding: real BIFF content is never parsed.
+        path.write_bytes(OLE2_MAGIC + bytes(4096 - len(OLE2_MAGIC)))
+        return path
+
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for index in range(spec.sheets):
+        title = "Invoice" if spec.kind == KIND_INVOICE else "Packing List"
+        _fill_sheet(
+            workbook.create_sheet(
+                title if spec.sheets == 1 else f"{title} {index + 1}"
+            ),
+            spec,
+            index,
+        )
+    workbook.save(path)
+    return path
+
+
+def dimension_specs(
+    base: TemplateSpec, dimensions: dict[str, list[Any]]
+) -> dict[str, list[TemplateSpec]]:
+    """Vary each dimension in turn, keeping the others at ``base``."""
+
+    return {
+        name: [replace(base, **{name: value}) for value in values]
+        for name, values in dimensions.items()
+    }
+
+
+def parse_dimensions(args: argparse.Namespace) -> dict[str, list[Any]]:
+    """Read the ``--<dimension>`` comma-separated value lists of ``add_arguments``."""
+
+    def _values(text: str, cast: Any) -> list[Any]:
+        return [cast(value) for value in text.split(",") if value]
+
+    def _flag(value: str) -> bool:
+        return value.strip().lower() in {"1", "true", "yes", "on"}
+
+    casts = {
+        "rows": int,
+        "sheets": int,
+        "merged_regions": int,
+        "styled": _flag,
+        "formulas": _flag,
+        "file_format": str,
+        "kind": str,
+    }
+    return {
+        name: _values(getattr(args, name), cast)
+        for name, cast in casts.items()
+        if getattr(args, name)
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the base spec and per-dimension value options to ``parser``."""
+
+    for name, values in DEFAULT_DIMENSIONS.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            dest=name,
+            default=",".join(str(value).lower() for value in values),
+            help=f"Comma-separated values for the {name} curve ('' to skip it)",
+        )
+    parser.add_argument(
+        "--base-rows",
+        type=int,
+        default=TemplateSpec.rows,
+        help="Line-item rows of the base workbook the other dimensions vary from",
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output-dir", type=Path, required=True)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    base = TemplateSpec(rows=args.base_rows)
+    written = {}
+    for specs in dimension_specs(base, parse_dimensions(args)).values():
+        for spec in specs:
+            path = write_template(spec, args.output_dir)
+            written[path.name] = {**asdict(spec), "bytes": path.stat().st_size}
+    print(json.dumps(written, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
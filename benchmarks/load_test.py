@@ -0,0 +1,305 @@
+"""HTTP load test of the real app under uvicorn against a stub AI provider.
+
+Starts the stub provider in-process and the app in a uvicorn subprocess
+pointed at it, then drives each endpoint at a fixed concurrency and reports
+throughput and p50/p95/p99 latency. Result and layout caches are disabled by
+default so every ``/analyze`` request runs the full pipeline.
+
+Usage:
+    python -m benchmarks.load_test --requests 200 --concurrency 16 --latency-ms 150
+    python -m benchmarks.load_test --save-baseline
+    python -m benchmarks.load_test --baseline benchmarks/baselines/load_test.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx2
+
+from app.constants import (
+    ENV_CACHE_ENABLED,
+    ENV_LAYOUT_CACHE_ENABLED,
+    ENV_LOG_LEVEL,
+    ENV_MODEL,
+    ENV_PROVIDER,
+)
+from benchmarks.stub_provider import StubProvider
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_FIXTURE = ROOT / "tests" / "fixtures" / "sample_template.xlsx"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "load_test.json"
+ENDPOINTS: tuple[str, ...] = ("analyze", "health", "root")
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(
+    port: int, workers: int, stub_url: str, caches: bool
+) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        ENV_PROVIDER: "openai",
+        ENV_MODEL: "stub-model",
+        ENV_LOG_LEVEL: "WARNING",
+        "OPENAI_API_KEY": "sk-stub",
+        "OPENAI_BASE_URL": stub_url,
+    }
+    # The layout cache is opt-in, the result cache on by default.
+    env[ENV_LAYOUT_CACHE_ENABLED] = str(caches).lower()
+    if not caches:
+        env[ENV_CACHE_ENABLED] = "false"
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+def _wait_until_ready(
+    base_url: str, server: subprocess.Popen, timeout: float = 60.0
+) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            # /ready, not /health, so warm-up is not part of the timings.
+            if httpx2.get(f"{base_url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx2.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not become ready in time")
+
+
+async def _drive(
+    client: httpx2.AsyncClient,
+    endpoint: str,
+    requests: int,
+    concurrency: int,
+    fixture: bytes,
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def send() -> httpx2.Response:
+        if endpoint == "analyze":
+            files = {"file": ("sample_template.xlsx", fixture, XLSX_MEDIA_TYPE)}
+            return await client.post("/analyze", files=files)
+        return await client.get("/health" if endpoint == "health" else "/")
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await send()
+                failed = response.status_code >= 400
+            except httpx2.HTTPError:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += int(failed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "throughput_rps": round(requests / wall_time, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies, default=0.0), 2),
+        },
+    }
+
+
+async def _run_load(
+    base_url: str, endpoints: list[str], requests: int, concurrency: int, fixture: bytes
+) -> dict[str, Any]:
+    limits = httpx2.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx2.AsyncClient(
+        base_url=base_url, limits=limits, timeout=300.0
+    ) as client:
+        # One warm-up request per endpoint so imports and pools are not timed.
+        for endpoint in endpoints:
+            await _drive(client, endpoint, 1, 1, fixture)
+        return {
+            endpoint: await _drive(client, endpoint, requests, concurrency, fixture)
+            for endpoint in endpoints
+        }
+
+
+def compare_to_baseline(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Return a description of every metric that regressed beyond ``tolerance``."""
+
+    regressions = []
+    for endpoint, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if previous is None:
+            continue
+        for pct in ("p95", "p99"):
+            before, after = previous["latency_ms"][pct], current["latency_ms"][pct]
+            if before and after > before * (1 + tolerance):
+                regressions.append(f"{endpoint} {pct} latency {before}ms -> {after}ms")
+        before, after = previous["throughput_rps"], current["throughput_rps"]
+        if after < before * (1 - tolerance):
+            regressions.append(f"{endpoint} throughput {before} -> {after} req/s")
+        before, after = previous["error_rate"], current["error_rate"]
+        if after > before + 0.05:
+            regressions.append(f"{endpoint} error rate {before} -> {after}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--requests", type=int, default=100, help="Requests per endpoint"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="uvicorn worker processes"
+    )
+    parser.add_argument(
+        "--endpoints",
+        default=",".join(ENDPOINTS),
+        help="Comma-separated subset of endpoints",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=100.0, help="Stub AI latency"
+    )
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--with-caches", action="store_true", help="Keep result caches on"
+    )
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="Fail when results regress vs. this file"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed relative change"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        type=Path,
+        help=f"Store results as the new baseline (default {DEFAULT_BASELINE.relative_to(ROOT)})",
+    )
+    args = parser.parse_args(argv)
+
+    endpoints = [name for name in args.endpoints.split(",") if name]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    stub = StubProvider(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    ).start()
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = _start_server(port, args.workers, stub.base_url, args.with_caches)
+    try:
+        _wait_until_ready(base_url, server)
+        endpoint_results = asyncio.run(
+            _run_load(
+                base_url,
+                endpoints,
+                args.requests,
+                args.concurrency,
+                args.fixture.read_bytes(),
+            )
+        )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        stub.stop()
+
+    results = {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "stub_latency_ms": args.latency_ms,
+            "stub_jitter_ms": args.jitter_ms,
+            "stub_failure_rate": args.failure_rate,
+            "caches": args.with_caches,
+            "cpu_count": os.cpu_count(),
+        },
+        "endpoints": endpoint_results,
+        "stub": {"requests": stub.requests, "failures": stub.failures},
+    }
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(report + "\n")
+
+    if args.baseline:
+        regressions = compare_to_baseline(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
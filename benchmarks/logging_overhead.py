@@ -0,0 +1,220 @@
+"""Per-request logging overhead: stdlib handler on the request thread vs. the queue.
+
+Replays the records one ``/analyze`` request logs (start, completion, and for
+``--error-rate`` of requests a failure with its traceback) from ``--threads``
+concurrent request threads, and times the logging calls each request makes.
+Records go to a sink that takes ``--sink-latency-ms`` per write, standing in
+for slow stdout on the platform. Modes:
+
+- ``basic``: ``logging.basicConfig``-style ``StreamHandler`` with a text
+  format, as the app used before ``app.services.logs``.
+- ``sync_json``: ``LogPipeline`` without the writer thread (JSON, rate limited).
+- ``queued``: ``LogPipeline`` as configured by default.
+
+``drain_ms`` is the time the writer thread needed after the last request to
+write its backlog; it is off the request path.
+
+Usage:
+    python -m benchmarks.logging_overhead
+    python -m benchmarks.logging_overhead --requests 2000 --threads 8 --sink-latency-ms 5
+    python -m benchmarks.logging_overhead --save-baseline
+    python -m benchmarks.logging_overhead --baseline benchmarks/baselines/logging_overhead.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from app.constants import LOG_TEXT_FORMAT
+from app.services.logs import LogPipeline, bind_log_context, record_log_stage
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = (
+    Path(__file__).resolve().parent / "baselines" / "logging_overhead.json"
+)
+MODES = ("basic", "sync_json", "queued")
+
+
+class SlowStream:
+    """A text stream whose every write takes ``latency`` seconds."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.latency)
+        self.writes += 1
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def _fail(depth: int) -> None:
+    if depth:
+        _fail(depth - 1)
+    raise RuntimeError("AI provider returned an invalid response")
+
+
+def _request(target: logging.Logger, index: int, error_every: int) -> float:
+    """Log what one analysis request logs and return the time spent logging."""
+
+    spent = 0.0
+    with bind_log_context(request_id=f"req-{index}", file_hash=f"{index:064x}"):
+        started = time.perf_counter()
+        target.info("Starting template analysis for %s", f"/tmp/upload-{index}.xlsx")
+        target.debug("Initialized provider %s", "openai")
+        spent += time.perf_counter() - started
+        for stage in ("upload_read", "preflight", "file_loading", "ai_classification"):
+            record_log_stage(stage, 0.001)
+        started = time.perf_counter()
+        if error_every and index % error_every == 0:
+            try:
+                _fail(20)
+            except RuntimeError as exc:
+                target.exception("Template analysis failed: %s", exc)
+        else:
+            target.info(
+                "Template analysis completed for %s", f"/tmp/upload-{index}.xlsx"
+            )
+        spent += time.perf_counter() - started
+    return spent
+
+
+def run_mode(
+    mode: str, requests: int, threads: int, sink_latency: float, error_every: int
+) -> dict[str, Any]:
+    stream = SlowStream(sink_latency)
+    target = logging.getLogger(f"benchmarks.logging_overhead.{mode}")
+    target.propagate = False
+    pipeline = None
+    if mode == "basic":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(LOG_TEXT_FORMAT))
+        target.addHandler(handler)
+        target.setLevel(logging.INFO)
+    else:
+        pipeline = LogPipeline(
+            stream=stream, level=logging.INFO, background=mode == "queued"
+        ).install(target)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = list(
+            pool.map(
+                lambda index: _request(target, index, error_every), range(requests)
+            )
+        )
+    elapsed = time.perf_counter() - started
+    drain_started = time.perf_counter()
+    if pipeline is not None:
+        pipeline.stop()
+    else:
+        target.handlers.clear()
+    drain = time.perf_counter() - drain_started
+
+    samples_us = sorted(sample * 1_000_000 for sample in samples)
+    return {
+        "mean_us": round(statistics.fmean(samples_us), 1),
+        "p50_us": round(samples_us[len(samples_us) // 2], 1),
+        "p99_us": round(samples_us[int(len(samples_us) * 0.99) - 1], 1),
+        "requests_per_second": round(requests / elapsed, 1),
+        "written": stream.writes,
+        "suppressed": pipeline.rate_limiter.suppressed if pipeline else 0,
+        "dropped": pipeline.dropped if pipeline else 0,
+        "drain_ms": round(drain * 1000, 1),
+    }
+
+
+def compare_to_baseline(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Return a description of every metric that regressed beyond ``tolerance``."""
+
+    regressions = []
+    for mode in ("sync_json", "queued"):
+        before, after = baseline["modes"].get(mode), results["modes"].get(mode)
+        if before is None or after is None:
+            continue
+        for key in ("mean_us", "p99_us"):
+            if after[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{mode} {key} {before[key]} -> {after[key]}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests replayed")
+    parser.add_argument("--threads", type=int, default=4, help="Request threads")
+    parser.add_argument(
+        "--sink-latency-ms", type=float, default=2.0, help="Time per sink write"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.05, help="Share of failing requests"
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="Fail when results regress vs. this file"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5, help="Allowed relative change"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        type=Path,
+        help=f"Store results as the new baseline (default {DEFAULT_BASELINE.relative_to(ROOT)})",
+    )
+    args = parser.parse_args(argv)
+
+    error_every = round(1 / args.error_rate) if args.error_rate > 0 else 0
+    results = {
+        "config": {
+            "requests": args.requests,
+            "threads": args.threads,
+            "sink_latency_ms": args.sink_latency_ms,
+            "error_rate": args.error_rate,
+            "cpu_count": os.cpu_count(),
+        },
+        "modes": {
+            mode: run_mode(
+                mode,
+                args.requests,
+                args.threads,
+                args.sink_latency_ms / 1000,
+                error_every,
+            )
+            for mode in MODES
+        },
+    }
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(report + "\n")
+
+    if args.baseline:
+        regressions = compare_to_baseline(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
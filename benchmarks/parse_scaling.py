@@ -0,0 +1,321 @@
+"""Analysis time and peak memory versus workbook shape, one curve per dimension.
+
+Generates the ``benchmarks.corpus`` workbooks that vary row count, sheet count,
+merged regions, styling, formulas, file format and template kind one at a
+time from a base workbook, and runs each through pre-flight and
+``AnalyzerService.analyze``. The AI provider is an in-process stand-in that
+answers instantly and accepts every candidate, so the time measured is the
+non-AI part of an analysis: trimming, sheet splitting, workbook loading, grid
+extraction, payload building, lexical matching and the post-AI stages.
+Result, layout and label caches, rate limiting and hedging are disabled;
+trimming and sheet splitting follow the environment as in the app (set
+``TEMPLATE_SENSE_SHEET_SPLIT_ENABLED=true`` for per-sheet analysis curves).
+
+Each workbook is timed over ``--repeat`` runs (the median is reported) and
+then analyzed once more under ``tracemalloc`` for its peak Python heap.
+
+Usage:
+    python -m benchmarks.parse_scaling
+    python -m benchmarks.parse_scaling --rows 100,1000,10000 --sheets 1,4 --repeat 5
+    python -m benchmarks.parse_scaling --save-baseline
+    python -m benchmarks.parse_scaling --baseline benchmarks/baselines/parse_scaling.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from app.constants import (
+    ENV_AI_CASSETTE_MODE,
+    ENV_CACHE_ENABLED,
+    ENV_HEDGE_ENABLED,
+    ENV_LABEL_MEMORY_ENABLED,
+    ENV_LAYOUT_CACHE_ENABLED,
+    ENV_LOG_LEVEL,
+    ENV_RATE_LIMIT_ENABLED,
+)
+from benchmarks.corpus import (
+    TemplateSpec,
+    add_arguments,
+    dimension_specs,
+    parse_dimensions,
+    write_template,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "parse_scaling.json"
+STATUS_OK = "ok"
+STATUS_REJECTED = "rejected"
+STATUS_FAILED = "failed"
+
+
+class _StaticPool:
+    """Stands in for ``ProviderPool``, always handing out the same provider."""
+
+    def __init__(self, provider: Any) -> None:
+        self.provider = provider
+
+    def get(self, config: Any) -> Any:
+        return self.provider
+
+    @contextmanager
+    def lease(self, config: Any) -> Iterator[Any]:
+        yield self.provider
+
+
+def build_service() -> Any:
+    """An ``AnalyzerService`` whose AI calls return instantly."""
+
+    from template_sense.ai_providers.config import AIConfig
+    from template_sense.ai_providers.interface import AIProvider
+
+    from app.services.analyzer import AnalyzerService
+
+    class EchoProvider(AIProvider):
+        """Accepts every header candidate and table column without a network call."""
+
+        @property
+        def provider_name(self) -> str:
+            return "openai"
+
+        @property
+        def model(self) -> str:
+            return "echo"
+
+        def classify_fields(self, payload, context="headers"):
+            return {}
+
+        def generate_text(self, prompt, system_message=None, *args, **kwargs):
+            return '{"canonical_key": null, "confidence": 0.0}'
+
+        def translate_text(self, text, source_lang, target_lang="en"):
+            return text
+
+        def classify_all_fields(self, payload, contexts=None):
+            headers = [
+                {
+                    "raw_label": candidate["label"],
+                    "raw_value": candidate["value"],
+                    "block_index": 0,
+                    "row_index": candidate["row"],
+                    "col_index": candidate["col"],
+                    "model_confidence": 0.9,
+                }
+                for candidate in payload.get("header_candidates") or []
+            ]
+            columns = [
+                {
+                    "raw_label": cell["value"],
+                    "raw_position": position,
+                    "table_block_index": index,
+                    "row_index": table["header_row"]["row_index"],
+                    "col_index": cell["col"],
+                    "sample_values": [],
+                    "model_confidence": 0.9,
+                }
+                for index, table in enumerate(payload.get("table_candidates") or [])
+                for position, cell in enumerate(table["header_row"]["cells"])
+            ]
+            return {"headers": headers, "columns": columns, "line_items": []}
+
+    for name in (
+        ENV_CACHE_ENABLED,
+        ENV_LAYOUT_CACHE_ENABLED,
+        ENV_LABEL_MEMORY_ENABLED,
+        ENV_RATE_LIMIT_ENABLED,
+        ENV_HEDGE_ENABLED,
+    ):
+        os.environ[name] = "false"
+    os.environ[ENV_AI_CASSETTE_MODE] = "off"
+    os.environ.setdefault(ENV_LOG_LEVEL, "WARNING")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    provider = EchoProvider(AIConfig(provider="openai", api_key="benchmark"))
+    return AnalyzerService(
+        ai_provider="openai", ai_model="echo", provider_pool=_StaticPool(provider)
+    )
+
+
+def analyze(service: Any, preflight: Any, path: Path) -> tuple[Path, dict[str, Any]]:
+    """Pre-flight and analyze ``path`` as ``/analyze`` does.
+
+    Returns the path analyzed (pre-flight may rename it) and the result, or an
+    empty result when pre-flight rejects the file.
+    """
+
+    from app.services.preflight import PreflightError
+
+    try:
+        info = preflight.check(path)
+    except PreflightError:
+        return path, {}
+    suffix = f".{info.format}"
+    if path.suffix.lower() != suffix:
+        path = path.rename(path.with_suffix(suffix))
+    return path, service.analyze(path)
+
+
+def describe(result: dict[str, Any]) -> dict[str, Any]:
+    """Outcome of one analysis: its status and how much of the workbook it read."""
+
+    if not result:
+        return {"status": STATUS_REJECTED, "trimmed": False, "sheets_analyzed": 0}
+    errors = [
+        event
+        for event in result.get("recovery_events") or []
+        if event.get("severity") == "error"
+    ]
+    metadata = result.get("metadata") or {}
+    return {
+        "status": STATUS_FAILED if errors else STATUS_OK,
+        "trimmed": "trimming" in metadata
+        or any(
+            sheet["rows_kept"] < sheet["rows_before"]
+            for sheet in metadata.get("sheets") or []
+        ),
+        "sheets_analyzed": len(metadata.get("sheets") or [None]),
+    }
+
+
+def measure(
+    service: Any, preflight: Any, spec: TemplateSpec, workdir: Path, repeat: int
+) -> dict[str, Any]:
+    directory = workdir / spec.filename.replace(".", "_")
+    directory.mkdir()
+    path = write_template(spec, directory)
+    file_bytes = path.stat().st_size
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        path, result = analyze(service, preflight, path)
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        analyze(service, preflight, path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "file_bytes": file_bytes,
+        **describe(result),
+        "ms": round(statistics.median(timings) * 1000, 1),
+        "peak_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def run(
+    service: Any, base: TemplateSpec, dimensions: dict[str, list[Any]], repeat: int
+) -> dict[str, list[dict[str, Any]]]:
+    from app.services.preflight import Preflight
+
+    preflight = Preflight.from_env()
+    # The first analysis pays one-off imports; keep it out of the curves.
+    with tempfile.TemporaryDirectory() as workdir:
+        measure(service, preflight, base, Path(workdir), 1)
+
+    # The base workbook lies on every curve; it is measured once.
+    measured: dict[TemplateSpec, dict[str, Any]] = {}
+    curves: dict[str, list[dict[str, Any]]] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, specs in dimension_specs(base, dimensions).items():
+            curves[name] = []
+            for spec in specs:
+                if spec not in measured:
+                    measured[spec] = measure(
+                        service, preflight, spec, Path(workdir), repeat
+                    )
+                curves[name].append({"value": getattr(spec, name), **measured[spec]})
+    return curves
+
+
+def compare_to_baseline(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Return a description of every point that regressed beyond ``tolerance``."""
+
+    regressions = []
+    for name, points in results["dimensions"].items():
+        previous = {
+            json.dumps(point["value"]): point
+            for point in baseline["dimensions"].get(name, [])
+        }
+        for point in points:
+            before = previous.get(json.dumps(point["value"]))
+            if before is None:
+                continue
+            for key in ("ms", "peak_mb"):
+                old, new = before[key], point[key]
+                if old and new > old * (1 + tolerance):
+                    regressions.append(f"{name}={point['value']}: {key} {old} -> {new}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per workbook")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="Fail when results regress vs. this file"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5, help="Allowed relative change"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        type=Path,
+        help=f"Store results as the new baseline (default {DEFAULT_BASELINE.relative_to(ROOT)})",
+    )
+    args = parser.parse_args(argv)
+
+    base = TemplateSpec(rows=args.base_rows)
+    service = build_service()
+    results = {
+        "config": {
+            "base": base.filename,
+            "repeat": args.repeat,
+            "trimming": service.trimmer.enabled,
+            "sheet_split": service.splitter.enabled,
+            "cpu_count": os.cpu_count(),
+        },
+        "dimensions": run(service, base, parse_dimensions(args), args.repeat),
+    }
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(report + "\n")
+
+    if args.baseline:
+        regressions = compare_to_baseline(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
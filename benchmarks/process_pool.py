@@ -0,0 +1,112 @@
+"""Compare analysis throughput of the thread and process execution modes.
+
+Runs the CPU-bound, non-AI part of the pipeline on a fixture workbook with an
+increasing number of workers. Thread mode is limited by the GIL, so its
+throughput stays flat; process mode should scale with the number of cores.
+
+Usage:
+    python -m benchmarks.process_pool --tasks 64 --max-workers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.constants import ENV_LOG_LEVEL, EXECUTION_MODE_PROCESS, EXECUTION_MODE_THREAD
+
+DEFAULT_FIXTURE = (
+    Path(__file__).resolve().parent.parent
+    / "tests"
+    / "fixtures"
+    / "sample_template.xlsx"
+)
+
+
+async def _run_threads(fixture: Path, workers: int, tasks: int) -> None:
+    from benchmarks.workloads import parse_workbook
+
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, parse_workbook, str(fixture))
+                for _ in range(tasks)
+            )
+        )
+
+
+async def _run_processes(fixture: Path, workers: int, tasks: int) -> float:
+    from app.services.analyzer import AnalyzerService
+    from app.services.executors import ProcessPoolBackend
+    from benchmarks.workloads import parse_workbook
+
+    backend = ProcessPoolBackend(AnalyzerService(), max_workers=workers)
+    # Pre-warm outside the timed section, as the app lifespan does.
+    backend.start()
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(backend.run(parse_workbook, str(fixture)) for _ in range(tasks))
+        )
+        return time.perf_counter() - started
+    finally:
+        backend.shutdown()
+
+
+def _measure(mode: str, fixture: Path, workers: int, tasks: int) -> dict[str, float]:
+    if mode == EXECUTION_MODE_THREAD:
+        started = time.perf_counter()
+        asyncio.run(_run_threads(fixture, workers, tasks))
+        elapsed = time.perf_counter() - started
+    else:
+        elapsed = asyncio.run(_run_processes(fixture, workers, tasks))
+    return {
+        "workers": workers,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(tasks / elapsed, 2),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    # Stage logging is noisy at INFO and would skew the timings.
+    os.environ.setdefault(ENV_LOG_LEVEL, "WARNING")
+
+    from benchmarks.workloads import parse_workbook
+
+    parse_workbook(str(args.fixture))  # warm imports in the parent
+
+    worker_counts = sorted({1, *range(2, args.max_workers + 1, 2), args.max_workers})
+    results = {
+        mode: [
+            _measure(mode, args.fixture, workers, args.tasks)
+            for workers in worker_counts
+        ]
+        for mode in (EXECUTION_MODE_THREAD, EXECUTION_MODE_PROCESS)
+    }
+
+    report = {
+        "cpu_count": os.cpu_count(),
+        "tasks": args.tasks,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
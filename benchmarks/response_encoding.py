@@ -0,0 +1,212 @@
+"""Serialization time and bytes on the wire of ``/analyze`` response bodies.
+
+Builds a synthetic normalized Template Sense result of a configurable size and
+compares the previous response path (validate into ``AnalyzeResponse``,
+``model_dump()``, stdlib ``json`` via ``JSONResponse``) with the one-pass
+orjson path, then times every compression codec available in this
+environment at its configured level.
+
+Usage:
+    python -m benchmarks.response_encoding --line-items 2000
+    python -m benchmarks.response_encoding --save-baseline
+    python -m benchmarks.response_encoding --baseline benchmarks/baselines/response_encoding.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+from app.models import AnalyzeResponse
+from app.services.encoding import _COMPRESSORS, ResponseEncoder, dumps
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = (
+    Path(__file__).resolve().parent / "baselines" / "response_encoding.json"
+)
+
+
+def synthetic_result(line_items: int, columns: int = 8) -> dict[str, Any]:
+    """Return a result shaped like Template Sense's normalized output."""
+
+    keys = [f"column_{index}" for index in range(columns)]
+    return {
+        "version": "1.0",
+        "sheet_name": "Invoice",
+        "header_fields": {
+            "matched": [
+                {
+                    "canonical_key": f"header_{index}",
+                    "original_label": f"請求書ヘッダー {index}",
+                    "translated_label": f"Invoice header {index}",
+                    "value": f"VALUE-{index:05d}",
+                    "location": {"row": index + 1, "col": 2},
+                }
+                for index in range(20)
+            ],
+            "unmatched": [],
+        },
+        "tables": [
+            {
+                "table_block_index": 0,
+                "row_start": 25,
+                "row_end": 25 + line_items,
+                "columns": [
+                    {
+                        "canonical_key": key,
+                        "original_label": f"列 {key}",
+                        "translated_label": key.replace("_", " ").title(),
+                        "column_position": position,
+                        "sample_values": [f"sample {n}" for n in range(3)],
+                    }
+                    for position, key in enumerate(keys)
+                ],
+                "line_items": [
+                    {
+                        "row_index": 25 + row,
+                        "columns": {
+                            key: (row * 1.25 if position % 2 else f"item {row}-{key}")
+                            for position, key in enumerate(keys)
+                        },
+                        "is_subtotal": row % 50 == 49,
+                    }
+                    for row in range(line_items)
+                ],
+            }
+        ],
+    }
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def run(line_items: int, repeat: int) -> dict[str, Any]:
+    result = synthetic_result(line_items)
+    content = {"success": True, "data": result, "error": None}
+
+    def _pydantic_stdlib() -> bytes:
+        model = AnalyzeResponse(success=True, data=result, error=None)
+        return JSONResponse(content=model.model_dump()).body
+
+    def _orjson() -> bytes:
+        return dumps(content)
+
+    body = _orjson()
+    encoder = ResponseEncoder()
+    codecs = {}
+    for name in encoder.encodings:
+        level = encoder.levels[name]
+        compressed = _COMPRESSORS[name](body, level)
+        codecs[name] = {
+            "level": level,
+            "compress_ms": _median_ms(
+                lambda name=name, level=level: _COMPRESSORS[name](body, level), repeat
+            ),
+            "bytes": len(compressed),
+            "ratio": round(len(body) / len(compressed), 2),
+        }
+
+    return {
+        "serialization": {
+            "pydantic_stdlib_ms": _median_ms(_pydantic_stdlib, repeat),
+            "orjson_ms": _median_ms(_orjson, repeat),
+        },
+        "bytes": {
+            "pydantic_stdlib": len(_pydantic_stdlib()),
+            "orjson": len(body),
+        },
+        "compression": codecs,
+    }
+
+
+def compare_to_baseline(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Return a description of every metric that regressed beyond ``tolerance``."""
+
+    regressions = []
+    before = baseline["serialization"]["orjson_ms"]
+    after = results["serialization"]["orjson_ms"]
+    if after > before * (1 + tolerance):
+        regressions.append(f"orjson serialization {before}ms -> {after}ms")
+    for name, current in results["compression"].items():
+        previous = baseline["compression"].get(name)
+        if previous is None:
+            continue
+        if current["compress_ms"] > previous["compress_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name} compression {previous['compress_ms']}ms -> "
+                f"{current['compress_ms']}ms"
+            )
+        if current["bytes"] > previous["bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{name} size {previous['bytes']} -> {current['bytes']} bytes"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--line-items", type=int, default=2000, help="Table rows in the result"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Timed repetitions")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="Fail when results regress vs. this file"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5, help="Allowed relative change"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        type=Path,
+        help=f"Store results as the new baseline (default {DEFAULT_BASELINE.relative_to(ROOT)})",
+    )
+    args = parser.parse_args(argv)
+
+    results = {
+        "config": {
+            "line_items": args.line_items,
+            "repeat": args.repeat,
+            "cpu_count": os.cpu_count(),
+        },
+        **run(args.line_items, args.repeat),
+    }
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(report + "\n")
+
+    if args.baseline:
+        regressions = compare_to_baseline(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,229 @@
+"""Cold-start benchmark: import-time breakdown and time to liveness/readiness.
+
+Runs ``python -X importtime -c "import app.main"`` in fresh interpreters and
+reports the total import time, the slowest modules (self and cumulative time)
+and whether any of the known heavy modules were imported eagerly. It then
+starts uvicorn and measures how long it takes until ``/health`` (liveness) and
+``/ready`` (warm-up finished) first answer 200.
+
+Usage:
+    python -m benchmarks.startup_time --runs 5
+    python -m benchmarks.startup_time --save-baseline
+    python -m benchmarks.startup_time --baseline benchmarks/baselines/startup_time.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx2
+
+from app.constants import ENV_LOG_LEVEL, ENV_MODEL, ENV_PROVIDER
+from benchmarks.load_test import _free_port
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "startup_time.json"
+# Modules that must only be imported on first use or by the warm-up phase.
+HEAVY_MODULES: tuple[str, ...] = (
+    "openai",
+    "anthropic",
+    "template_sense.ai_providers",
+    "template_sense.pipeline",
+    "jinja2",
+)
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> list[dict[str, Any]]:
+    """Parse ``-X importtime`` output into ``{module, self_us, cumulative_us}``."""
+
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append(
+                {
+                    "module": match.group(4),
+                    "self_us": int(match.group(1)),
+                    "cumulative_us": int(match.group(2)),
+                    "depth": (len(match.group(3)) - 1) // 2,
+                }
+            )
+    return entries
+
+
+def _import_once(module: str) -> list[dict[str, Any]]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env={**os.environ, ENV_LOG_LEVEL: "WARNING"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(completed.stderr)
+
+
+def measure_imports(module: str, runs: int, top: int) -> dict[str, Any]:
+    """Median import time of ``module`` over ``runs`` fresh interpreters."""
+
+    totals = []
+    entries: list[dict[str, Any]] = []
+    for _ in range(runs):
+        entries = _import_once(module)
+        # Top-level entries are disjoint, so their cumulative times add up.
+        totals.append(sum(e["cumulative_us"] for e in entries if e["depth"] == 0))
+    imported = {entry["module"] for entry in entries}
+
+    def _slowest(key: str) -> list[dict[str, Any]]:
+        ranked = sorted(entries, key=lambda entry: entry[key], reverse=True)
+        return [
+            {"module": entry["module"], "ms": round(entry[key] / 1000, 2)}
+            for entry in ranked[:top]
+        ]
+
+    return {
+        "module": module,
+        "total_ms": round(statistics.median(totals) / 1000, 2),
+        "modules_imported": len(imported),
+        "eager_heavy_modules": [name for name in HEAVY_MODULES if name in imported],
+        "slowest_self": _slowest("self_us"),
+        "slowest_cumulative": _slowest("cumulative_us"),
+    }
+
+
+def measure_server_start(timeout: float = 60.0) -> dict[str, float | None]:
+    """Seconds from spawning uvicorn until /health and /ready first return 200."""
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        ENV_PROVIDER: "openai",
+        ENV_MODEL: "stub-model",
+        ENV_LOG_LEVEL: "WARNING",
+        "OPENAI_API_KEY": "sk-stub",
+    }
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    reached: dict[str, float | None] = {"health": None, "ready": None}
+    try:
+        deadline = started + timeout
+        while None in reached.values() and time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            for name, seconds in reached.items():
+                if seconds is not None:
+                    continue
+                try:
+                    response = httpx2.get(f"{base_url}/{name}", timeout=1.0)
+                except httpx2.TransportError:
+                    break
+                if response.status_code == 200:
+                    reached[name] = round(time.perf_counter() - started, 3)
+            time.sleep(0.02)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {f"{name}_seconds": seconds for name, seconds in reached.items()}
+
+
+def compare_to_baseline(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Return a description of every metric that regressed beyond ``tolerance``."""
+
+    regressions = []
+    before, after = baseline["imports"]["total_ms"], results["imports"]["total_ms"]
+    if after > before * (1 + tolerance):
+        regressions.append(f"import time {before}ms -> {after}ms")
+    for name in results["imports"]["eager_heavy_modules"]:
+        if name not in baseline["imports"]["eager_heavy_modules"]:
+            regressions.append(f"{name} is imported eagerly again")
+    for key, after in results.get("server", {}).items():
+        before = baseline.get("server", {}).get(key)
+        if before and (after is None or after > before * (1 + tolerance)):
+            regressions.append(f"{key} {before}s -> {after}s")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules shown")
+    parser.add_argument(
+        "--skip-server", action="store_true", help="Only measure imports"
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="Fail when results regress vs. this file"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5, help="Allowed relative change"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        type=Path,
+        help=f"Store results as the new baseline (default {DEFAULT_BASELINE.relative_to(ROOT)})",
+    )
+    args = parser.parse_args(argv)
+
+    results: dict[str, Any] = {
+        "config": {
+            "module": args.module,
+            "runs": args.runs,
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+        },
+        "imports": measure_imports(args.module, args.runs, args.top),
+    }
+    if not args.skip_server:
+        results["server"] = measure_server_start()
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(report + "\n")
+
+    if args.baseline:
+        regressions = compare_to_baseline(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
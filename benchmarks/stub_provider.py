@@ -0,0 +1,241 @@
+"""Deterministic OpenAI-compatible stand-in for the AI provider.
+
+Serves ``POST /v1/chat/completions`` with answers derived from the request
+itself, after a configurable delay and with a configurable failure rate.
+Point the app at it with ``OPENAI_BASE_URL=http://127.0.0.1:<port>/v1``.
+
+Usage:
+    python -m benchmarks.stub_provider --port 8900 --latency-ms 200 --failure-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+# Labels the stub treats as header fields, mirroring the sample fixture.
+HEADER_LABEL_HINTS: tuple[str, ...] = (
+    "invoice",
+    "date",
+    "total",
+    "shipper",
+    "consignee",
+)
+
+
+def _extract_payload(message: str) -> dict[str, Any]:
+    start = message.find("{")
+    if start < 0:
+        return {}
+    try:
+        payload, _ = json.JSONDecoder().raw_decode(message[start:])
+    except json.JSONDecodeError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def classify_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    """Build a batch classification response from an AI payload."""
+
+    headers = [
+        {
+            "raw_label": candidate.get("label"),
+            "raw_value": candidate.get("value"),
+            "block_index": 0,
+            "row_index": candidate.get("row", 1),
+            "col_index": candidate.get("col", 1),
+            "model_confidence": 0.9,
+        }
+        for candidate in payload.get("header_candidates") or []
+        if any(
+            hint in str(candidate.get("label", "")).lower()
+            for hint in HEADER_LABEL_HINTS
+        )
+    ]
+
+    columns: list[dict[str, Any]] = []
+    line_items: list[dict[str, Any]] = []
+    for index, table in enumerate(payload.get("table_candidates") or []):
+        header_row = table.get("header_row") or {}
+        cells = header_row.get("cells") or []
+        rows = table.get("sample_data_rows") or []
+        for position, cell in enumerate(cells):
+            columns.append(
+                {
+                    "raw_label": cell.get("value"),
+                    "raw_position": position,
+                    "table_block_index": index,
+                    "row_index": header_row.get("row_index", 1),
+                    "col_index": cell.get("col", position + 1),
+                    "sample_values": [r[position] for r in rows if position < len(r)],
+                    "model_confidence": 0.9,
+                }
+            )
+        for offset, values in enumerate(rows):
+            line_items.append(
+                {
+                    "table_index": index,
+                    "row_index": header_row.get("row_index", 0) + 1 + offset,
+                    "line_number": offset + 1,
+                    "is_subtotal": False,
+                    "columns": {
+                        str(cell.get("value")): value
+                        for cell, value in zip(cells, values)
+                    },
+                    "model_confidence": 0.9,
+                }
+            )
+    return {"headers": headers, "columns": columns, "line_items": line_items}
+
+
+def answer(messages: list[dict[str, Any]]) -> str:
+    """Return the completion text for a chat request."""
+
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in messages if m.get("role") == "user"), "")
+    if "translator" in system:
+        return user
+    if "field mapping expert" in system:
+        return json.dumps(
+            {"canonical_key": None, "confidence": 0.0, "reasoning": "stub"}
+        )
+    return json.dumps(classify_payload(_extract_payload(user)))
+
+
+class StubProvider:
+    """Threaded HTTP server answering chat completions deterministically."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _draw(self) -> tuple[float, bool]:
+        with self._random_lock:
+            self.requests += 1
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            failed = self._random.random() < self.failure_rate
+            self.failures += int(failed)
+        return delay / 1000, failed
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                delay, failed = stub._draw()
+                time.sleep(delay)
+                if failed:
+                    self._send(
+                        500,
+                        {"error": {"message": "stub failure", "type": "server_error"}},
+                    )
+                    return
+                self._send(
+                    200,
+                    {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {
+                                    "role": "assistant",
+                                    "content": answer(request.get("messages") or []),
+                                },
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": 0,
+                            "completion_tokens": 0,
+                            "total_tokens": 0,
+                        },
+                    },
+                )
+
+            def _send(self, status: int, body: dict[str, Any]) -> None:
+                encoded = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> StubProvider:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    stub = StubProvider(
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    print(f"Stub provider listening on {stub.base_url}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+"""Compare peak memory of buffered versus streaming upload handling.
+
+Each mode runs in a fresh subprocess so ``ru_maxrss`` reflects only that mode.
+Uploads are backed by files on disk, mirroring how Starlette spools multipart
+bodies larger than 1 MB before the endpoint runs.
+
+Usage:
+    python -m benchmarks.upload_memory --concurrency 50 --size-mb 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from starlette.datastructures import UploadFile
+
+MODES: tuple[str, ...] = ("buffered", "streaming")
+
+
+async def _buffered_save(upload: UploadFile) -> Path:
+    """Baseline: the original read-everything implementation."""
+
+    content = await upload.read()
+    suffix = Path(upload.filename or "").suffix
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_file.write(content)
+        return Path(temp_file.name)
+
+
+async def _streaming_save(upload: UploadFile) -> Path:
+    from app.main import _save_upload_to_temp
+
+    temp_path, _ = await _save_upload_to_temp(upload)
+    return temp_path
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _run_mode(mode: str, source: Path, concurrency: int) -> dict[str, float]:
+    save = _buffered_save if mode == "buffered" else _streaming_save
+    if mode == "streaming":
+        # Import the app up front so its footprint is part of the baseline.
+        import app.main  # noqa: F401
+
+    handles = [source.open("rb") for _ in range(concurrency)]
+    uploads = [UploadFile(file=handle, filename="upload.xlsx") for handle in handles]
+
+    baseline_mb = _peak_rss_mb()
+    started = time.perf_counter()
+    paths = await asyncio.gather(*(save(upload) for upload in uploads))
+    elapsed = time.perf_counter() - started
+    peak_mb = _peak_rss_mb()
+
+    for handle in handles:
+        handle.close()
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+    return {
+        "baseline_rss_mb": round(baseline_mb, 1),
+        "peak_rss_mb": round(peak_mb, 1),
+        "delta_rss_mb": round(peak_mb - baseline_mb, 1),
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+def _child(mode: str, source: Path, concurrency: int) -> None:
+    result = asyncio.run(_run_mode(mode, source, concurrency))
+    print(json.dumps(result))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--size-mb", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--source", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child, args.source, args.concurrency)
+        return 0
+
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        source = Path(workdir) / "upload.xlsx"
+        # Slightly under the limit so the streaming path accepts the file.
+        source.write_bytes(b"\0" * (args.size_mb * 1024 * 1024 - 1024))
+        for mode in MODES:
+            completed = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.upload_memory",
+                    "--child",
+                    mode,
+                    "--source",
+                    str(source),
+                    "--concurrency",
+                    str(args.concurrency),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            results[mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    report = {
+        "concurrency": args.concurrency,
+        "size_mb": args.size_mb,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
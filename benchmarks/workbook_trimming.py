@@ -0,0 +1,206 @@
+"""Parse time and AI prompt size versus workbook row count, with and without trimming.
+
+Generates invoice workbooks (a header block, one line-item table and a total
+row) with increasing numbers of line items and, for each, runs the non-AI
+Template Sense stages on the original and on the trimmed copy. Reports the
+trimming cost, the parse time and the estimated prompt tokens of the AI
+payload for both.
+
+Usage:
+    python -m benchmarks.workbook_trimming --rows 100,1000,5000,20000
+    python -m benchmarks.workbook_trimming --save-baseline
+    python -m benchmarks.workbook_trimming --baseline benchmarks/baselines/workbook_trimming.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from app.constants import (
+    DEFAULT_FIELD_DICTIONARY,
+    DEFAULT_TRIM_MIN_ROWS,
+    DEFAULT_TRIM_SAMPLE_ROWS,
+    RATE_LIMIT_CHARS_PER_TOKEN,
+)
+from app.services.trimming import WorkbookTrimmer
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = (
+    Path(__file__).resolve().parent / "baselines" / "workbook_trimming.json"
+)
+DEFAULT_ROWS = "100,1000,5000,20000"
+
+
+def write_invoice(path: Path, line_items: int) -> Path:
+    """Write an invoice workbook with ``line_items`` table rows."""
+
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Invoice")
+    for label, value in (
+        ("Invoice No", "INV-2024-001"),
+        ("Invoice Date", "2024-01-31"),
+        ("Shipper", "ACME Trading Co."),
+        ("Consignee", "Example Imports Ltd."),
+        ("Port of Loading", "Yokohama"),
+    ):
+        sheet.append([label, value])
+    sheet.append([])
+    sheet.append(["Item No", "Description", "Quantity", "Unit Price", "Amount"])
+    for item in range(line_items):
+        sheet.append([item + 1, f"Product {item % 97}", 3, 12.5, 37.5])
+    sheet.append([None, None, None, "Total", 37.5 * line_items])
+    workbook.save(path)
+    return path
+
+
+def parse(path: Path) -> tuple[float, int]:
+    """Seconds for the non-AI stages and estimated tokens of the AI payload."""
+
+    from template_sense.pipeline.stages import (
+        AIPayloadBuildingStage,
+        FileLoadingStage,
+        GridExtractionStage,
+        PipelineContext,
+        ValidationStage,
+    )
+
+    started = time.perf_counter()
+    context = PipelineContext(file_path=path, field_dictionary=DEFAULT_FIELD_DICTIONARY)
+    try:
+        for stage in (
+            ValidationStage(),
+            FileLoadingStage(),
+            GridExtractionStage(),
+            AIPayloadBuildingStage(),
+        ):
+            context = stage.execute(context)
+    finally:
+        if context.workbook is not None:
+            context.workbook.close()
+    seconds = time.perf_counter() - started
+    payload = json.dumps(context.ai_payload, default=str)
+    return seconds, len(payload) // RATE_LIMIT_CHARS_PER_TOKEN
+
+
+def run(rows: list[int], trimmer: WorkbookTrimmer) -> list[dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for line_items in rows:
+            source = write_invoice(
+                Path(workdir) / f"invoice_{line_items}.xlsx", line_items
+            )
+            parse_seconds, tokens = parse(source)
+
+            started = time.perf_counter()
+            trimmed = trimmer.trim(source)
+            trim_seconds = time.perf_counter() - started
+            try:
+                trimmed_parse_seconds, trimmed_tokens = parse(trimmed.path)
+            finally:
+                trimmed.cleanup()
+
+            results.append(
+                {
+                    "line_items": line_items,
+                    "file_bytes": source.stat().st_size,
+                    "original": {
+                        "parse_ms": round(parse_seconds * 1000, 1),
+                        "prompt_tokens": tokens,
+                    },
+                    "trimmed": {
+                        "derived": trimmed.derived,
+                        "rows_kept": trimmed.rows_kept if trimmed.derived else None,
+                        "trim_ms": round(trim_seconds * 1000, 1),
+                        "parse_ms": round(trimmed_parse_seconds * 1000, 1),
+                        "total_ms": round(
+                            (trim_seconds + trimmed_parse_seconds) * 1000, 1
+                        ),
+                        "prompt_tokens": trimmed_tokens,
+                    },
+                }
+            )
+    return results
+
+
+def compare_to_baseline(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Return a description of every metric that regressed beyond ``tolerance``."""
+
+    previous = {entry["line_items"]: entry for entry in baseline["workbooks"]}
+    regressions = []
+    for entry in results["workbooks"]:
+        before = previous.get(entry["line_items"])
+        if before is None:
+            continue
+        for key in ("total_ms", "prompt_tokens"):
+            old, new = before["trimmed"][key], entry["trimmed"][key]
+            if old and new > old * (1 + tolerance):
+                regressions.append(
+                    f"{entry['line_items']} rows: trimmed {key} {old} -> {new}"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", default=DEFAULT_ROWS, help="Comma-separated line-item counts"
+    )
+    parser.add_argument("--sample-rows", type=int, default=DEFAULT_TRIM_SAMPLE_ROWS)
+    parser.add_argument("--min-rows", type=int, default=DEFAULT_TRIM_MIN_ROWS)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="Fail when results regress vs. this file"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5, help="Allowed relative change"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        type=Path,
+        help=f"Store results as the new baseline (default {DEFAULT_BASELINE.relative_to(ROOT)})",
+    )
+    args = parser.parse_args(argv)
+
+    rows = [int(value) for value in args.rows.split(",") if value]
+    trimmer = WorkbookTrimmer(sample_rows=args.sample_rows, min_rows=args.min_rows)
+    results = {
+        "config": {
+            "sample_rows": args.sample_rows,
+            "min_rows": args.min_rows,
+            "cpu_count": os.cpu_count(),
+        },
+        "workbooks": run(rows, trimmer),
+    }
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(report + "\n")
+
+    if args.baseline:
+        regressions = compare_to_baseline(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
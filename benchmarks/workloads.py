@@ -0,0 +1,43 @@
+"""CPU-bound workloads shared by benchmarks.
+
+These live in an importable module so ``spawn``-started worker processes can
+unpickle them by reference.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from app.constants import DEFAULT_FIELD_DICTIONARY
+
+
+def parse_workbook(file_path: str) -> int:
+    """Run the non-AI Template Sense stages and return the extracted row count.
+
+    Covers validation, workbook loading, grid extraction and payload building,
+    which is the CPU-bound part of an analysis that the GIL serialises.
+    """
+
+    from template_sense.pipeline.stages import (
+        AIPayloadBuildingStage,
+        FileLoadingStage,
+        GridExtractionStage,
+        PipelineContext,
+        ValidationStage,
+    )
+
+    context = PipelineContext(
+        file_path=Path(file_path), field_dictionary=DEFAULT_FIELD_DICTIONARY
+    )
+    try:
+        for stage in (
+            ValidationStage(),
+            FileLoadingStage(),
+            GridExtractionStage(),
+            AIPayloadBuildingStage(),
+        ):
+            context = stage.execute(context)
+    finally:
+        if context.workbook is not None:
+            context.workbook.close()
+    return len(context.grid or [])
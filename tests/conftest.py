@@ -12,6 +12,28 @@ ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from app.constants import (
+    CASSETTE_MODES,
+    ENV_AI_CASSETTE_DIR,
+    ENV_AI_CASSETTE_MODE,
+)
+from app.services.cassette import Cassette
+
+CASSETTE_DIR = Path(__file__).parent / "cassettes"
+
+
+def pytest_addoption(parser):
+    """Add ``--ai-cassette`` to record or replay AI provider calls."""
+    parser.addoption(
+        "--ai-cassette",
+        choices=CASSETTE_MODES,
+        default=None,
+        help=(
+            "Record AI provider calls of integration tests to tests/cassettes, "
+            f"or replay them offline (default: ${ENV_AI_CASSETTE_MODE} or off)."
+        ),
+    )
+
 
 def pytest_configure(config):
     """Load environment variables before running tests."""
@@ -30,6 +52,9 @@ def validate_environment(request):
     # Skip validation if explicitly excluding integration tests
     if marker_expr == "not integration":
         return
+    # Replayed provider calls need no credentials.
+    if request.getfixturevalue("ai_cassette").replaying:
+        return
 
     has_openai = bool(os.getenv("OPENAI_API_KEY"))
     has_anthropic = bool(os.getenv("ANTHROPIC_API_KEY"))
@@ -39,3 +64,62 @@ def validate_environment(request):
             "ERROR: No AI provider API key found. "
             "Set OPENAI_API_KEY or ANTHROPIC_API_KEY in .env file"
         )
+
+
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    """Keep cached results from leaking between tests."""
+    # Only tests that load the app have a result cache to clear.
+    main = sys.modules.get("app.main")
+    if main is not None:
+        main.result_cache.clear()
+    yield
+    main = sys.modules.get("app.main")
+    if main is not None:
+        main.result_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def ai_cassette(request):
+    """Cassette selected by ``--ai-cassette`` or the environment."""
+    configured = Cassette.from_env()
+    return Cassette(
+        mode=request.config.getoption("--ai-cassette") or configured.mode,
+        directory=os.getenv(ENV_AI_CASSETTE_DIR) or CASSETTE_DIR,
+        latency_scale=configured.latency_scale,
+    )
+
+
+@pytest.fixture(autouse=True)
+def use_ai_cassette(request, monkeypatch):
+    """Route the AI provider calls of integration tests through the cassette.
+
+    Covers both Template Sense's own provider setup and ``AnalyzerService``
+    instances created by the test. A replayed test fails if any of its calls
+    was never recorded.
+    """
+    if request.node.get_closest_marker("integration") is None:
+        yield
+        return
+    cassette = request.getfixturevalue("ai_cassette")
+    if not cassette.enabled:
+        yield
+        return
+
+    from template_sense.pipeline.stages import ai_provider_setup
+
+    original = ai_provider_setup.get_ai_provider
+    monkeypatch.setattr(
+        ai_provider_setup,
+        "get_ai_provider",
+        lambda config: cassette.wrap(original(config)),
+    )
+    monkeypatch.setenv(ENV_AI_CASSETTE_MODE, cassette.mode)
+    monkeypatch.setenv(ENV_AI_CASSETTE_DIR, str(cassette.directory))
+    misses = cassette.misses
+    yield
+    if cassette.misses > misses:
+        pytest.fail(
+            f"{cassette.misses - misses} AI provider call(s) have no cassette in "
+            f"{cassette.directory}; record them with --ai-cassette=record"
+        )
@@ -0,0 +1,150 @@
+"""Tests for memory-aware admission control."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import openpyxl
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.constants import ADMISSION_BASE_BYTES
+from app.main import analyzer_service, app
+from app.services.admission import AdmissionRejected, MemoryAdmission
+
+client = TestClient(app)
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+MB = 1024 * 1024
+
+
+def _sized(monkeypatch, admission: MemoryAdmission) -> MemoryAdmission:
+    """Make ``footprint`` read the size in MB from the file name, e.g. ``40``."""
+
+    monkeypatch.setattr(admission, "footprint", lambda path: int(path.name) * MB)
+    return admission
+
+
+async def _until_queued(admission: MemoryAdmission, waiters: int) -> None:
+    while admission.snapshot()["queued"] < waiters:
+        await asyncio.sleep(0.001)
+
+
+def test_footprint_follows_sheet_dimensions(tmp_path):
+    path = tmp_path / "wide.xlsx"
+    workbook = openpyxl.Workbook()
+    for row in range(1000):
+        workbook.active.append([f"item {row}", row, row * 1.5, "JPY", row % 7])
+    workbook.save(path)
+    admission = MemoryAdmission(bytes_per_cell=512)
+
+    assert admission.footprint(path) >= ADMISSION_BASE_BYTES + 5000 * 512
+    assert admission.footprint(FIXTURE) < admission.footprint(path)
+    # Files pre-flight cannot read are sized by their bytes instead.
+    notes = tmp_path / "notes.xlsx"
+    notes.write_bytes(b"x" * 1000)
+    assert admission.footprint(notes) > ADMISSION_BASE_BYTES
+
+
+def test_waiting_work_is_admitted_in_order_as_memory_frees(monkeypatch):
+    admission = _sized(monkeypatch, MemoryAdmission(budget_bytes=100 * MB))
+    order = []
+
+    async def _run(name: str) -> None:
+        footprint = await admission.acquire(Path(name))
+        order.append(name)
+        await asyncio.sleep(0.01)
+        admission.release(footprint)
+
+    async def _scenario() -> None:
+        first = await admission.acquire(Path("80"))
+        waiting = []
+        for queued, name in enumerate(("60", "10"), start=1):
+            waiting.append(asyncio.create_task(_run(name)))
+            await _until_queued(admission, queued)
+        # The small job does not overtake the larger one queued before it.
+        assert order == []
+        assert admission.snapshot()["queued"] == 2
+        admission.release(first)
+        await asyncio.gather(*waiting)
+
+    asyncio.run(_scenario())
+
+    assert order == ["60", "10"]
+    snapshot = admission.snapshot()
+    assert snapshot["in_use_bytes"] == 0
+    assert (snapshot["running"], snapshot["queued"], snapshot["admitted"]) == (0, 0, 3)
+
+
+def test_requests_are_rejected_when_the_budget_stays_exhausted(monkeypatch):
+    admission = _sized(
+        monkeypatch,
+        MemoryAdmission(budget_bytes=100 * MB, max_queue=1, max_wait=0.05),
+    )
+
+    async def _scenario() -> None:
+        held = await admission.acquire(Path("90"))
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await admission.acquire(Path("20"))
+        assert timed_out.value.retry_after > 0
+
+        queued = asyncio.create_task(admission.acquire(Path("30")))
+        await _until_queued(admission, 1)
+        with pytest.raises(AdmissionRejected):
+            await admission.acquire(Path("5"))  # the queue is full
+        # Background work is never rejected; it waits past max_wait.
+        background = asyncio.create_task(admission.acquire(Path("20"), False))
+        with pytest.raises(AdmissionRejected):
+            await queued
+        await asyncio.sleep(0.1)
+        assert not background.done()
+        admission.release(held)
+        admission.release(await background)
+
+    asyncio.run(_scenario())
+
+    assert admission.snapshot()["rejected"] == 3
+    assert admission.snapshot()["in_use_bytes"] == 0
+
+
+def test_oversized_workbook_runs_alone(monkeypatch):
+    admission = _sized(monkeypatch, MemoryAdmission(budget_bytes=100 * MB))
+
+    async def _scenario() -> None:
+        huge = await admission.acquire(Path("500"))
+        small = asyncio.create_task(admission.acquire(Path("1")))
+        await asyncio.sleep(0.01)
+        assert not small.done()
+        admission.release(huge)
+        admission.release(await small)
+
+    asyncio.run(_scenario())
+
+
+def test_analyze_returns_503_with_retry_after_while_memory_is_exhausted(
+    monkeypatch,
+):
+    admission = MemoryAdmission(budget_bytes=32 * MB, max_queue=0)
+    monkeypatch.setattr(main_module, "admission", admission)
+    monkeypatch.setattr(analyzer_service, "analyze", lambda path: {"ok": True})
+
+    def _post():
+        with FIXTURE.open("rb") as file_handle:
+            return client.post("/analyze", files={"file": (FIXTURE.name, file_handle)})
+
+    held = asyncio.run(admission.acquire(FIXTURE))
+    response = _post()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(admission.retry_after())
+    assert response.json()["success"] is False
+    health = client.get("/health").json()["admission"]
+    assert health["in_use_bytes"] == held
+    assert health["rejected"] == 1
+
+    admission.release(held)
+    response = _post()
+    assert response.status_code == 200
+    assert response.json()["data"] == {"ok": True}
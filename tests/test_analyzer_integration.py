@@ -42,9 +42,12 @@ def field_dictionary():
 
 
 @pytest.fixture
-def api_key(validate_environment):
+def api_key(validate_environment, ai_cassette):
     """Get AI provider API key from environment."""
     key = os.getenv("OPENAI_API_KEY") or os.getenv("ANTHROPIC_API_KEY")
+    if not key and ai_cassette.replaying:
+        # Replayed calls never reach the provider.
+        return "replay"
     if not key:
         pytest.skip("No AI provider API key found in environment")
     return key
@@ -2,13 +2,18 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import io
 from pathlib import Path
 
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from starlette.datastructures import UploadFile
 
-from app.main import app, analyzer_service
+from app.constants import MAX_FILE_SIZE_BYTES, UPLOAD_CHUNK_SIZE_BYTES
+from app.main import _save_upload_to_temp, analyzer_service, app
 
 client = TestClient(app)
 
@@ -89,3 +94,77 @@ def test_analyze_oversize_file():
     assert response.status_code == 400
     payload = response.json()
     assert "too large" in payload["error"].lower()
+
+
+def test_analyze_serves_repeat_uploads_from_cache(sample_file_path, monkeypatch):
+    calls: list[str] = []
+
+    def _counting_analyze(file_path: str):
+        calls.append(str(file_path))
+        return {"normalized_output": {}, "recovery_events": [], "metadata": {}}
+
+    monkeypatch.setattr(analyzer_service, "analyze", _counting_analyze)
+    content = sample_file_path.read_bytes()
+
+    first = client.post("/analyze", files={"file": ("a.xlsx", content)})
+    second = client.post("/analyze", files={"file": ("b.xlsx", content)})
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.headers["X-Cache-Tier"] == "memory"
+    assert second.json()["data"] == first.json()["data"]
+    assert len(calls) == 1
+
+
+def test_analyze_bypass_cache_reruns_analysis(sample_file_path, monkeypatch):
+    calls: list[str] = []
+
+    def _counting_analyze(file_path: str):
+        calls.append(str(file_path))
+        return {"normalized_output": {}, "recovery_events": [], "metadata": {}}
+
+    monkeypatch.setattr(analyzer_service, "analyze", _counting_analyze)
+    content = sample_file_path.read_bytes()
+
+    client.post("/analyze", files={"file": ("a.xlsx", content)})
+    response = client.post(
+        "/analyze?bypass_cache=true", files={"file": ("a.xlsx", content)}
+    )
+
+    assert response.headers["X-Cache"] == "BYPASS"
+    assert len(calls) == 2
+
+
+class _CountingStream(io.BytesIO):
+    """In-memory stream that records how many bytes were read from it."""
+
+    bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def test_save_upload_streams_content_and_hash(sample_file_path):
+    content = sample_file_path.read_bytes()
+    upload = UploadFile(file=io.BytesIO(content), filename="sample.xlsx")
+
+    temp_path, content_hash = asyncio.run(_save_upload_to_temp(upload))
+    try:
+        assert temp_path.suffix == ".xlsx"
+        assert temp_path.read_bytes() == content
+        assert content_hash == hashlib.sha256(content).hexdigest()
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def test_save_upload_aborts_once_limit_is_crossed():
+    stream = _CountingStream(b"0" * (MAX_FILE_SIZE_BYTES + 5 * UPLOAD_CHUNK_SIZE_BYTES))
+    upload = UploadFile(file=stream, filename="big.xlsx")
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(_save_upload_to_temp(upload))
+
+    assert exc_info.value.status_code == 400
+    assert stream.bytes_read <= MAX_FILE_SIZE_BYTES + UPLOAD_CHUNK_SIZE_BYTES
@@ -0,0 +1,112 @@
+"""Tests for the batch analysis endpoint."""
+
+from __future__ import annotations
+
+import io
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import analyzer_service, app, result_cache
+from app.services.batch import BatchError, extract_zip_archive
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def sample_bytes() -> bytes:
+    return (Path(__file__).parent / "fixtures" / "sample_template.xlsx").read_bytes()
+
+
+@pytest.fixture(autouse=True)
+def mock_analyzer(monkeypatch):
+    """Echo the file size, failing for files whose content ends with BAD."""
+
+    result_cache.clear()
+
+    def _mock_analyze(file_path):
+        path = Path(file_path)
+        if path.read_bytes().endswith(b"BAD"):
+            raise FileNotFoundError(f"File not found: {path.name}")
+        return {"size": path.stat().st_size, "recovery_events": []}
+
+    monkeypatch.setattr(analyzer_service, "analyze", _mock_analyze)
+    yield
+    result_cache.clear()
+
+
+def _parse_ndjson(response) -> tuple[list[dict], dict]:
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    return lines[:-1], lines[-1]
+
+
+def test_batch_streams_results_and_summary(sample_bytes):
+    response = client.post(
+        "/analyze/batch",
+        params={"parallelism": 2},
+        files=[
+            ("files", ("one.xlsx", sample_bytes)),
+            ("files", ("two.xlsx", sample_bytes + b"\0")),
+            ("files", ("notes.txt", b"hello")),
+            ("files", ("bad.xlsx", sample_bytes + b"BAD")),
+        ],
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results, summary = _parse_ndjson(response)
+    by_name = {result["filename"]: result for result in results}
+
+    assert set(by_name) == {"one.xlsx", "two.xlsx", "notes.txt", "bad.xlsx"}
+    assert by_name["one.xlsx"]["success"] is True
+    assert by_name["one.xlsx"]["data"]["size"] == len(sample_bytes)
+    assert "Invalid file type" in by_name["notes.txt"]["error"]
+    assert by_name["bad.xlsx"]["success"] is False
+    assert all("elapsed_ms" in result for result in results)
+    assert summary["type"] == "summary"
+    assert summary["total"] == 4
+    assert summary["succeeded"] == 2
+    assert summary["failed"] == 2
+    assert summary["wall_time_ms"] >= 0
+
+
+def test_batch_accepts_zip_archive(sample_bytes):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("suppliers/a.xlsx", sample_bytes)
+        archive.writestr("suppliers/b.xls", sample_bytes)
+        archive.writestr("suppliers/readme.md", b"ignored")
+        archive.writestr("__MACOSX/suppliers/._a.xlsx", b"ignored")
+
+    response = client.post(
+        "/analyze/batch", files={"files": ("batch.zip", buffer.getvalue())}
+    )
+
+    results, summary = _parse_ndjson(response)
+    assert sorted(result["filename"] for result in results) == [
+        "suppliers/a.xlsx",
+        "suppliers/b.xls",
+    ]
+    assert summary["succeeded"] == 2
+
+
+def test_batch_rejects_invalid_archive():
+    response = client.post(
+        "/analyze/batch", files={"files": ("batch.zip", b"not a zip")}
+    )
+
+    assert response.status_code == 400
+    assert response.json()["success"] is False
+
+
+def test_extract_zip_archive_enforces_member_limit(tmp_path, sample_bytes):
+    archive_path = tmp_path / "batch.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        for index in range(3):
+            archive.writestr(f"{index}.xlsx", sample_bytes)
+
+    with pytest.raises(BatchError):
+        extract_zip_archive(archive_path, max_members=2)
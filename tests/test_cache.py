@@ -0,0 +1,80 @@
+"""Unit tests for the analysis result cache."""
+
+from __future__ import annotations
+
+from app.constants import CACHE_TIER_DISK, CACHE_TIER_MEMORY, DEFAULT_FIELD_DICTIONARY
+from app.services.cache import MemoryCache, ResultCache, SQLiteCache, build_cache_key
+
+RESULT = {"normalized_output": {"headers": {"matched": []}}, "recovery_events": []}
+
+
+def test_cache_key_depends_on_settings():
+    base = build_cache_key("abc", "openai", "gpt-4o-mini", DEFAULT_FIELD_DICTIONARY)
+
+    assert base == build_cache_key(
+        "abc", "openai", "gpt-4o-mini", DEFAULT_FIELD_DICTIONARY
+    )
+    assert base != build_cache_key("abd", "openai", "gpt-4o-mini", {})
+    assert base != build_cache_key(
+        "abc", "anthropic", "gpt-4o-mini", DEFAULT_FIELD_DICTIONARY
+    )
+    assert base != build_cache_key("abc", "openai", "gpt-4o", DEFAULT_FIELD_DICTIONARY)
+    assert base != build_cache_key("abc", "openai", "gpt-4o-mini", {"headers": {}})
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("b") is None
+    assert cache.get("c") == {"v": 3}
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(max_entries=2, ttl_seconds=0)
+    cache.set("a", {"v": 1})
+
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    first = ResultCache(
+        memory=MemoryCache(8, 60), disk=SQLiteCache(path, max_entries=8, ttl_seconds=60)
+    )
+    first.set("key", RESULT)
+    first.disk.close()
+
+    second = ResultCache(
+        memory=MemoryCache(8, 60), disk=SQLiteCache(path, max_entries=8, ttl_seconds=60)
+    )
+    assert second.get("key") == (RESULT, CACHE_TIER_DISK)
+    assert second.get("key") == (RESULT, CACHE_TIER_MEMORY)
+
+
+def test_disk_tier_enforces_max_entries(tmp_path):
+    disk = SQLiteCache(tmp_path / "cache.sqlite3", max_entries=2, ttl_seconds=60)
+    for index in range(5):
+        disk.set(f"key-{index}", {"v": index})
+
+    assert len(disk) == 2
+    assert disk.get("key-4") == {"v": 4}
+    assert disk.get("key-0") is None
+
+
+def test_degraded_results_are_not_cached():
+    cache = ResultCache(memory=MemoryCache(8, 60))
+    cache.set("key", {"recovery_events": [{"severity": "error"}]})
+
+    assert cache.get("key") == (None, None)
+
+
+def test_disabled_cache_is_a_no_op():
+    cache = ResultCache(memory=MemoryCache(8, 60), enabled=False)
+    cache.set("key", RESULT)
+
+    assert cache.get("key") == (None, None)
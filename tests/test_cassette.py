@@ -0,0 +1,158 @@
+"""Tests for recording and replaying AI provider calls."""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, ClassVar
+
+import pytest
+from template_sense.ai_providers.config import AIConfig
+from template_sense.ai_providers.interface import AIProvider
+
+from app.constants import DEFAULT_FIELD_DICTIONARY
+from app.services.analyzer import AnalyzerService
+from app.services.cassette import Cassette, CassetteMiss
+from app.services.pipeline import run_pipeline
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+class FakeProvider(AIProvider):
+    """Counts calls and accepts every header candidate."""
+
+    calls: ClassVar[int] = 0
+
+    @property
+    def provider_name(self) -> str:
+        return "openai"
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    def classify_fields(self, payload, context="headers"):
+        raise NotImplementedError
+
+    def generate_text(self, prompt, system_message=None, *args, **kwargs):
+        FakeProvider.calls += 1
+        return '{"canonical_key": null, "confidence": 0.0}'
+
+    def translate_text(self, text, source_lang, target_lang="en"):
+        FakeProvider.calls += 1
+        return text
+
+    def classify_all_fields(self, payload, contexts=None):
+        FakeProvider.calls += 1
+        time.sleep(0.05)
+        headers = [
+            {
+                "raw_label": candidate["label"],
+                "raw_value": candidate["value"],
+                "block_index": 0,
+                "row_index": candidate["row"],
+                "col_index": candidate["col"],
+                "model_confidence": 0.9,
+            }
+            for candidate in payload["header_candidates"]
+        ]
+        return {"headers": headers, "columns": [], "line_items": []}
+
+
+class UnreachableProvider(FakeProvider):
+    """Fails every call, as a provider without network access would."""
+
+    def classify_all_fields(self, payload, contexts=None):
+        raise AssertionError("replay must not call the provider")
+
+    def translate_text(self, text, source_lang, target_lang="en"):
+        raise AssertionError("replay must not call the provider")
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    FakeProvider.calls = 0
+
+
+def _use_provider(monkeypatch, provider: type[AIProvider]) -> None:
+    monkeypatch.setattr(
+        "template_sense.pipeline.stages.ai_provider_setup.get_ai_provider",
+        lambda config: provider(config),
+    )
+
+
+def _analyze(cassette: Cassette, **settings: Any) -> dict[str, Any]:
+    result = run_pipeline(
+        FIXTURE,
+        DEFAULT_FIELD_DICTIONARY,
+        AIConfig(provider="openai", api_key="test", model="fake"),
+        cassette=cassette,
+        **settings,
+    )
+    # Timing metadata differs between runs.
+    result["metadata"].pop("timing", None)
+    return result
+
+
+def test_replay_serves_recorded_calls_without_the_provider(monkeypatch, tmp_path):
+    _use_provider(monkeypatch, FakeProvider)
+    recorder = Cassette("record", tmp_path)
+    recorded = _analyze(recorder)
+
+    assert recorder.recorded == FakeProvider.calls > 0
+    files = sorted((tmp_path / "openai").glob("*.json"))
+    assert len(files) == recorder.recorded
+    entry = json.loads(files[0].read_text())
+    assert entry["version"] == 1
+    assert {"key", "method", "request", "response", "duration_seconds"} <= set(entry)
+
+    _use_provider(monkeypatch, UnreachableProvider)
+    player = Cassette("replay", tmp_path)
+    replayed = _analyze(player)
+
+    assert player.replayed == recorder.recorded
+    assert player.misses == 0
+    assert replayed["normalized_output"] == recorded["normalized_output"]
+
+
+def test_replay_simulates_recorded_latency(monkeypatch, tmp_path):
+    _use_provider(monkeypatch, FakeProvider)
+    _analyze(Cassette("record", tmp_path))
+    _use_provider(monkeypatch, UnreachableProvider)
+
+    started = time.perf_counter()
+    _analyze(Cassette("replay", tmp_path, latency_scale=2.0))
+
+    assert time.perf_counter() - started >= 0.1
+
+
+def test_unrecorded_and_outdated_calls_are_misses(tmp_path):
+    provider = FakeProvider(AIConfig(provider="openai", api_key="test", model="fake"))
+    Cassette("record", tmp_path).wrap(provider).translate_text("Invoice", "en")
+    replay = Cassette("replay", tmp_path).wrap(provider)
+
+    with pytest.raises(CassetteMiss):
+        replay.translate_text("Invoice No", "en")
+
+    (path,) = (tmp_path / "openai").glob("*.json")
+    entry = json.loads(path.read_text())
+    assert replay.translate_text("Invoice", "en") == "Invoice"
+    path.write_text(json.dumps({**entry, "version": 0}))
+    with pytest.raises(CassetteMiss):
+        replay.translate_text("Invoice", "en")
+    assert replay.cassette.misses == 2
+
+
+def test_cassette_is_configured_from_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("TEMPLATE_SENSE_AI_CASSETTE_MODE", "Replay")
+    monkeypatch.setenv("TEMPLATE_SENSE_AI_CASSETTE_DIR", str(tmp_path))
+
+    service = AnalyzerService(ai_provider="openai")
+    assert service.cassette.replaying
+    assert service.cassette.directory == tmp_path
+
+    monkeypatch.setenv("TEMPLATE_SENSE_AI_CASSETTE_MODE", "sometimes")
+    assert not Cassette.from_env().enabled
+    with pytest.raises(ValueError):
+        Cassette("sometimes")
@@ -0,0 +1,107 @@
+"""Tests for JSON response serialization and compression negotiation."""
+
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import analyzer_service, app
+from app.services import encoding
+from app.services.encoding import ResponseEncoder, dumps, parse_accept_encoding
+
+client = TestClient(app)
+SAMPLE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+@pytest.fixture
+def all_codecs(monkeypatch):
+    """Pretend the optional brotli and zstd codecs are installed."""
+
+    monkeypatch.setitem(encoding._COMPRESSORS, "br", lambda data, _: b"br:" + data)
+    monkeypatch.setitem(encoding._COMPRESSORS, "zstd", lambda data, _: b"zs:" + data)
+
+
+def test_parse_accept_encoding_reads_q_values():
+    assert parse_accept_encoding("gzip;q=0.5, br, *;q=0, zstd;q=bad") == {
+        "gzip": 0.5,
+        "br": 1.0,
+        "*": 0.0,
+        "zstd": 0.0,
+    }
+    assert parse_accept_encoding(None) == {}
+
+
+@pytest.mark.usefixtures("all_codecs")
+def test_negotiate_prefers_highest_q_then_server_order():
+    encoder = ResponseEncoder()
+
+    assert encoder.negotiate("gzip, br, zstd") == "zstd"
+    assert encoder.negotiate("gzip, br;q=0.9") == "gzip"
+    assert encoder.negotiate("*") == "zstd"
+    assert encoder.negotiate("*, zstd;q=0") == "br"
+    assert encoder.negotiate("identity") is None
+    assert encoder.negotiate(None) is None
+    assert ResponseEncoder(enabled=False).negotiate("gzip") is None
+
+
+def test_negotiate_skips_codecs_that_are_not_installed(monkeypatch):
+    monkeypatch.delitem(encoding._COMPRESSORS, "br", raising=False)
+
+    assert ResponseEncoder().negotiate("br, gzip;q=0.5") == "gzip"
+    assert ResponseEncoder().negotiate("br") is None
+
+
+def test_compress_only_above_threshold():
+    encoder = ResponseEncoder(min_bytes=100)
+
+    assert encoder.compress(b"x" * 99, "gzip") == (b"x" * 99, None)
+    body, chosen = encoder.compress(b"x" * 100, "gzip")
+    assert chosen == "gzip"
+    assert gzip.decompress(body) == b"x" * 100
+
+
+def test_dumps_matches_stdlib_json():
+    payload = {"a": [1, 2.5, None, True], "ü": "日本", 3: {"nested": "ok"}}
+
+    assert json.loads(dumps(payload)) == json.loads(json.dumps(payload))
+
+
+def _post(headers: dict[str, str]):
+    with SAMPLE.open("rb") as handle:
+        return client.post(
+            "/analyze",
+            files={
+                "file": ("sample_template.xlsx", handle, "application/octet-stream")
+            },
+            headers=headers,
+        )
+
+
+def test_analyze_compresses_large_results(monkeypatch):
+    rows = [{"label": f"field {i}", "value": i} for i in range(500)]
+    monkeypatch.setattr(analyzer_service, "analyze", lambda _: {"rows": rows})
+
+    response = _post({"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(dumps({"rows": rows}))
+    assert response.json() == {"success": True, "data": {"rows": rows}, "error": None}
+
+    response = _post({"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.json()["data"] == {"rows": rows}
+
+
+def test_analyze_leaves_small_results_uncompressed(monkeypatch):
+    monkeypatch.setattr(analyzer_service, "analyze", lambda _: {"status": "ok"})
+
+    response = _post({"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"success": True, "data": {"status": "ok"}, "error": None}
@@ -0,0 +1,51 @@
+"""Unit tests for the execution backends."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+from app.constants import (
+    ENV_EXECUTION_MODE,
+    ENV_PROCESS_MAX_TASKS_PER_CHILD,
+    ENV_PROCESS_POOL_SIZE,
+)
+from app.services.analyzer import AnalyzerService
+from app.services.executors import ProcessPoolBackend, _ready, create_process_backend
+
+
+def test_thread_mode_is_default(monkeypatch):
+    monkeypatch.delenv(ENV_EXECUTION_MODE, raising=False)
+
+    assert create_process_backend(AnalyzerService()) is None
+
+
+def test_unknown_mode_falls_back_to_threads(monkeypatch):
+    monkeypatch.setenv(ENV_EXECUTION_MODE, "fibers")
+
+    assert create_process_backend(AnalyzerService()) is None
+
+
+def test_process_mode_reads_pool_settings(monkeypatch):
+    monkeypatch.setenv(ENV_EXECUTION_MODE, "process")
+    monkeypatch.setenv(ENV_PROCESS_POOL_SIZE, "3")
+    monkeypatch.setenv(ENV_PROCESS_MAX_TASKS_PER_CHILD, "7")
+
+    backend = create_process_backend(AnalyzerService())
+
+    assert isinstance(backend, ProcessPoolBackend)
+    assert backend.max_workers == 3
+    assert backend.max_tasks_per_child == 7
+    assert not backend.started
+
+
+def test_process_pool_runs_in_worker_process():
+    backend = ProcessPoolBackend(AnalyzerService(), max_workers=1)
+    try:
+        pid = asyncio.run(backend.run(_ready))
+        assert backend.started
+        assert pid != os.getpid()
+    finally:
+        backend.shutdown()
+
+    assert not backend.started
@@ -0,0 +1,259 @@
+"""Tests for hedged AI calls and provider circuit breakers."""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from prometheus_client import REGISTRY
+from template_sense.ai_providers.config import AIConfig
+from template_sense.ai_providers.interface import AIProvider
+from template_sense.errors import AIProviderError
+
+from app.constants import DEFAULT_FIELD_DICTIONARY
+from app.services.hedging import CircuitBreaker, HedgingPolicy, Route
+from app.services.pipeline import run_pipeline
+from app.services.providers import ProviderPool
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(f"template_sense_{name}", labels) or 0.0
+
+
+def _failing(provider: str):
+    def _call():
+        raise AIProviderError(provider, "unavailable", "classify_all_fields")
+
+    return _call
+
+
+def _slow(value: str, release: threading.Event):
+    def _call():
+        release.wait(timeout=5)
+        return value
+
+    return _call
+
+
+def test_circuit_opens_after_failures_and_half_opens_after_reset():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        "openai", "m", failure_threshold=2, reset_seconds=10, clock=lambda: now[0]
+    )
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] = 10.0
+    assert breaker.allow()  # the single trial call
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_slow_primary_is_hedged_and_secondary_answer_wins():
+    policy = HedgingPolicy(enabled=True, initial_delay=0.05)
+    release = threading.Event()
+    before = _sample(
+        "ai_hedge_wins_total", provider="anthropic", model="b", role="secondary"
+    )
+
+    result = policy.call(
+        "classify_all_fields",
+        Route("openai", "a", _slow("primary", release)),
+        Route("anthropic", "b", lambda: "secondary"),
+    )
+    release.set()
+
+    assert result == "secondary"
+    assert (
+        _sample(
+            "ai_hedge_wins_total", provider="anthropic", model="b", role="secondary"
+        )
+        == before + 1
+    )
+    # Latency saved is known once the abandoned primary call finishes.
+    deadline = time.monotonic() + 5
+    while not _sample(
+        "ai_hedge_latency_saved_seconds_count", provider="openai", model="a"
+    ):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    policy.shutdown()
+
+
+def test_fast_primary_never_reaches_secondary():
+    policy = HedgingPolicy(enabled=True, initial_delay=5)
+    secondary_calls = []
+
+    result = policy.call(
+        "translate_text",
+        Route("openai", "a", lambda: "primary"),
+        Route("anthropic", "b", lambda: secondary_calls.append(1)),
+    )
+
+    assert result == "primary"
+    assert secondary_calls == []
+    policy.shutdown()
+
+
+def test_failures_fail_over_and_then_route_around_the_open_circuit():
+    policy = HedgingPolicy(enabled=True, failure_threshold=2, reset_seconds=60)
+    primary_calls = []
+
+    def _primary():
+        primary_calls.append(1)
+        raise AIProviderError("openai", "503 Service Unavailable", "generate_text")
+
+    for _ in range(3):
+        assert (
+            policy.call(
+                "generate_text",
+                Route("openai", "a", _primary),
+                Route("anthropic", "b", lambda: "secondary"),
+            )
+            == "secondary"
+        )
+
+    assert len(primary_calls) == 2
+    states = {entry["provider"]: entry["state"] for entry in policy.snapshot()}
+    assert states == {"openai": "open", "anthropic": "closed"}
+    with pytest.raises(AIProviderError):
+        policy.call(
+            "generate_text",
+            Route("openai", "a", _failing("openai")),
+            Route("anthropic", "b", _failing("anthropic")),
+        )
+    policy.shutdown()
+
+
+def test_primary_failing_after_the_hedge_counts_as_a_failover():
+    policy = HedgingPolicy(enabled=True, initial_delay=0.05)
+    failed = threading.Event()
+
+    def _primary():
+        time.sleep(0.1)
+        failed.set()
+        raise AIProviderError("openai", "503 Service Unavailable", "generate_text")
+
+    def _secondary():
+        # Answer only after the primary has failed, while the hedge is pending.
+        failed.wait(timeout=5)
+        time.sleep(0.05)
+        return "secondary"
+
+    labels = {"provider": "openai", "model": "a"}
+    failovers = _sample("ai_failovers_total", **labels)
+    wins = _sample(
+        "ai_hedge_wins_total", provider="anthropic", model="b", role="secondary"
+    )
+
+    result = policy.call(
+        "generate_text",
+        Route("openai", "a", _primary),
+        Route("anthropic", "b", _secondary),
+    )
+
+    assert result == "secondary"
+    assert _sample("ai_failovers_total", **labels) == failovers + 1
+    assert (
+        _sample(
+            "ai_hedge_wins_total", provider="anthropic", model="b", role="secondary"
+        )
+        == wins
+    )
+    policy.shutdown()
+
+
+def test_deadline_follows_observed_latency_percentile():
+    policy = HedgingPolicy(enabled=True, percentile=90, initial_delay=7, min_delay=0.2)
+    route = Route("openai", "a", lambda: None)
+    assert policy.deadline(route, "classify_all_fields") == 7
+
+    window = policy._window(route, "classify_all_fields")
+    for index in range(1, 21):
+        window.add(index / 10)
+
+    assert policy.deadline(route, "classify_all_fields") == pytest.approx(1.8)
+    assert policy.deadline(route, "translate_text") == 7
+
+
+class _Provider(AIProvider):
+    def __init__(self, name: str, delay: float) -> None:
+        super().__init__(AIConfig(provider=name, api_key="sk-test", model=name))
+        self.delay = delay
+
+    @property
+    def provider_name(self) -> str:
+        return self.config.provider
+
+    @property
+    def model(self) -> str:
+        return self.config.model
+
+    def classify_fields(self, payload, context="headers"):
+        raise NotImplementedError
+
+    def classify_all_fields(self, payload, contexts=None):
+        time.sleep(self.delay)
+        return {"answered_by": self.provider_name}
+
+    def translate_text(self, text, source_lang, target_lang="en"):
+        return f"{self.provider_name}:{text}"
+
+    def generate_text(self, prompt, system_message=None, *args, **kwargs):
+        raise NotImplementedError
+
+
+def test_hedged_provider_wraps_every_call():
+    policy = HedgingPolicy(enabled=True, initial_delay=0.05)
+    provider = policy.wrap(_Provider("openai", delay=1), _Provider("anthropic", 0))
+
+    assert provider.provider_name == "openai"
+    assert provider.classify_all_fields({}) == {"answered_by": "anthropic"}
+    assert provider.translate_text("請求書", "ja") == "openai:請求書"
+    primary = _Provider("openai", 0)
+    assert HedgingPolicy(enabled=False).wrap(primary, primary) is primary
+    policy.shutdown()
+
+
+def test_hedged_analyses_reuse_the_pooled_primary_and_secondary(monkeypatch):
+    built = []
+
+    def _build(config):
+        built.append(config.provider)
+        return _Provider(config.provider, 0)
+
+    monkeypatch.setattr("template_sense.ai_providers.factory.get_ai_provider", _build)
+    pool = ProviderPool()
+    policy = HedgingPolicy(enabled=True, initial_delay=0.05)
+    try:
+        for _ in range(2):
+            run_pipeline(
+                FIXTURE,
+                DEFAULT_FIELD_DICTIONARY,
+                AIConfig(provider="openai", api_key="sk-test", model="a"),
+                provider_pool=pool,
+                hedging=policy,
+                secondary_config=AIConfig(
+                    provider="anthropic", api_key="sk-test", model="b"
+                ),
+            )
+    finally:
+        policy.shutdown()
+        pool.close()
+
+    assert built == ["openai", "anthropic"]
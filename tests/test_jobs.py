@@ -0,0 +1,167 @@
+"""Tests for the background job manager and /jobs endpoints."""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import analyzer_service, app, job_manager, result_cache
+from app.services.jobs import (
+    InMemoryJobStore,
+    Job,
+    JobManager,
+    JobStatus,
+    QueueFullError,
+)
+
+
+@pytest.fixture
+def sample_file_path() -> Path:
+    return Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+@pytest.fixture
+def client():
+    result_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+    result_cache.clear()
+
+
+def _touch(tmp_path: Path, name: str) -> Path:
+    path = tmp_path / name
+    path.write_bytes(b"data")
+    return path
+
+
+def test_job_manager_runs_jobs_and_removes_uploads(tmp_path):
+    async def scenario():
+        async def runner(path: Path, content_hash: str):
+            return {"hash": content_hash}
+
+        manager = JobManager(InMemoryJobStore(), runner, workers=2, max_queue_size=4)
+        await manager.start()
+        path = _touch(tmp_path, "a.xlsx")
+        job = await manager.submit(path, "abc", "a.xlsx")
+        finished = await manager.store.wait(job.id, timeout=5)
+        await manager.stop()
+        return path, finished
+
+    path, finished = asyncio.run(scenario())
+
+    assert finished.status is JobStatus.SUCCEEDED
+    assert finished.result == {"hash": "abc"}
+    assert not path.exists()
+
+
+def test_job_manager_records_failures(tmp_path):
+    async def scenario():
+        async def runner(path: Path, content_hash: str):
+            raise ValueError("boom")
+
+        manager = JobManager(
+            InMemoryJobStore(),
+            runner,
+            workers=1,
+            max_queue_size=1,
+            format_error=lambda exc: f"failed: {exc}",
+        )
+        await manager.start()
+        job = await manager.submit(_touch(tmp_path, "a.xlsx"), "abc", "a.xlsx")
+        finished = await manager.store.wait(job.id, timeout=5)
+        await manager.stop()
+        return finished
+
+    finished = asyncio.run(scenario())
+
+    assert finished.status is JobStatus.FAILED
+    assert finished.error == "failed: boom"
+
+
+def test_job_manager_rejects_when_queue_is_full(tmp_path):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def runner(path: Path, content_hash: str):
+            await release.wait()
+            return {}
+
+        manager = JobManager(InMemoryJobStore(), runner, workers=1, max_queue_size=1)
+        await manager.start()
+        await manager.submit(_touch(tmp_path, "a.xlsx"), "a", "a.xlsx")
+        await asyncio.sleep(0)  # let the worker pick up the first job
+        await manager.submit(_touch(tmp_path, "b.xlsx"), "b", "b.xlsx")
+        with pytest.raises(QueueFullError) as exc_info:
+            await manager.submit(_touch(tmp_path, "c.xlsx"), "c", "c.xlsx")
+        release.set()
+        await manager.stop()
+        return exc_info.value
+
+    error = asyncio.run(scenario())
+
+    assert error.retry_after >= 1
+
+
+def test_in_memory_store_evicts_oldest_finished_jobs():
+    async def scenario():
+        store = InMemoryJobStore(max_jobs=2)
+        for index in range(3):
+            await store.save(
+                Job(id=str(index), filename="f", status=JobStatus.SUCCEEDED)
+            )
+        return [await store.get(str(index)) for index in range(3)]
+
+    first, second, third = asyncio.run(scenario())
+
+    assert first is None
+    assert second is not None and third is not None
+
+
+def test_create_job_and_long_poll_result(client, sample_file_path, monkeypatch):
+    monkeypatch.setattr(
+        analyzer_service,
+        "analyze",
+        lambda file_path: {"normalized_output": {}, "recovery_events": []},
+    )
+
+    with sample_file_path.open("rb") as file_handle:
+        response = client.post(
+            "/jobs", files={"file": (sample_file_path.name, file_handle)}
+        )
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.headers["Location"] == f"/jobs/{job_id}"
+
+    status_response = client.get(f"/jobs/{job_id}", params={"wait": 5})
+    payload = status_response.json()
+    assert status_response.status_code == 200
+    assert payload["status"] == "succeeded"
+    assert payload["data"] == {"normalized_output": {}, "recovery_events": []}
+
+
+def test_create_job_returns_429_when_queue_is_full(
+    client, sample_file_path, monkeypatch
+):
+    async def _full(*args, **kwargs):
+        raise QueueFullError(retry_after=7)
+
+    monkeypatch.setattr(job_manager, "submit", _full)
+
+    with sample_file_path.open("rb") as file_handle:
+        response = client.post(
+            "/jobs", files={"file": (sample_file_path.name, file_handle)}
+        )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert response.json()["success"] is False
+
+
+def test_get_unknown_job_returns_404(client):
+    response = client.get("/jobs/does-not-exist")
+
+    assert response.status_code == 404
@@ -0,0 +1,214 @@
+"""Tests for the learned label memory."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, ClassVar
+
+import pytest
+from prometheus_client import REGISTRY
+from template_sense.ai_providers.config import AIConfig
+from template_sense.ai_providers.interface import AIProvider
+from template_sense.mapping.fuzzy_field_matching import FieldMatchResult
+from template_sense.pipeline.stages import PipelineContext
+
+from app.constants import DEFAULT_FIELD_DICTIONARY
+from app.services.label_memory import (
+    SECTION_COLUMNS,
+    SECTION_HEADERS,
+    LabelMemory,
+    vectorize,
+)
+from app.services.lexical import SOURCE_MEMORY, LexicalMatcher
+from app.services.pipeline import run_pipeline
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+HEADERS = {
+    "gross_weight": ["Gross weight"],
+    "invoice_date": ["Invoice date"],
+    "consignee": ["Consignee"],
+}
+
+
+class FakeProvider(AIProvider):
+    """Records the header candidates sent to the AI and accepts all of them."""
+
+    labels: ClassVar[list[list[str]]] = []
+
+    @property
+    def provider_name(self) -> str:
+        return "openai"
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    def classify_fields(self, payload, context="headers"):
+        raise NotImplementedError
+
+    def generate_text(self, prompt, system_message=None, *args, **kwargs):
+        return '{"canonical_key": null, "confidence": 0.0}'
+
+    def translate_text(self, text, source_lang, target_lang="en"):
+        return text
+
+    def classify_all_fields(self, payload, contexts=None):
+        candidates = payload["header_candidates"]
+        FakeProvider.labels.append([candidate["label"] for candidate in candidates])
+        headers = [
+            {
+                "raw_label": candidate["label"],
+                "raw_value": candidate["value"],
+                "block_index": 0,
+                "row_index": candidate["row"],
+                "col_index": candidate["col"],
+                "model_confidence": 0.9,
+            }
+            for candidate in candidates
+        ]
+        columns = [
+            {
+                "raw_label": cell["value"],
+                "raw_position": position,
+                "table_block_index": index,
+                "row_index": table["header_row"]["row_index"],
+                "col_index": cell["col"],
+                "sample_values": [],
+                "model_confidence": 0.9,
+            }
+            for index, table in enumerate(payload["table_candidates"])
+            for position, cell in enumerate(table["header_row"]["cells"])
+        ]
+        return {"headers": headers, "columns": columns, "line_items": []}
+
+
+@pytest.fixture(autouse=True)
+def fake_provider(monkeypatch):
+    FakeProvider.labels = []
+    monkeypatch.setattr(
+        "template_sense.pipeline.stages.ai_provider_setup.get_ai_provider",
+        lambda config: FakeProvider(config),
+    )
+
+
+def _context(headers: dict[str, str], dictionary=HEADERS) -> PipelineContext:
+    """A finished analysis whose header labels matched the given keys."""
+
+    context = PipelineContext(file_path=FIXTURE, field_dictionary={})
+    context.header_field_dictionary = dictionary
+    context.column_field_dictionary = {}
+    context.header_match_results = [
+        FieldMatchResult(label, label, key, 95.0, dictionary[key][0])
+        for label, key in headers.items()
+    ]
+    return context
+
+
+def _lookups(result: str) -> float:
+    sample = "template_sense_label_memory_lookups_total"
+    return REGISTRY.get_sample_value(sample, {"result": result}) or 0.0
+
+
+def test_similar_labels_have_close_vectors():
+    vectors = vectorize(["gross weight kg", "gross weight kgs", "invoice date"])
+
+    similarity = vectors @ vectors.T
+    assert similarity[0, 1] > 0.85
+    assert similarity[0, 2] < 0.3
+
+
+def test_unseen_but_similar_labels_are_recalled():
+    memory = LabelMemory(enabled=True)
+    assert memory.learn(_context({"Gross Weight (KG)": "gross_weight"})) == 1
+    hits, misses = _lookups("hit"), _lookups("miss")
+
+    recalled = memory.lookup(
+        SECTION_HEADERS, HEADERS, ["GROSS WEIGHT KGS", "Consignee Name", None]
+    )
+
+    assert set(recalled) == {"GROSS WEIGHT KGS"}
+    match = recalled["GROSS WEIGHT KGS"]
+    assert (match.key, match.variant, match.source) == (
+        "gross_weight",
+        "Gross weight",
+        SOURCE_MEMORY,
+    )
+    assert 0.85 <= match.score <= 0.95
+    # Sections are remembered separately.
+    assert memory.lookup(SECTION_COLUMNS, HEADERS, ["Gross Weight (KG)"]) == {}
+    assert (memory.hits, memory.misses) == (1, 2)
+    assert _lookups("hit") == hits + 1
+    assert _lookups("miss") == misses + 2
+
+
+def test_labels_close_to_two_fields_are_not_recalled():
+    memory = LabelMemory(enabled=True, min_similarity=0.5)
+    memory.learn(
+        _context({"Invoice date 1": "invoice_date", "Invoice date 2": "consignee"})
+    )
+
+    assert memory.lookup(SECTION_HEADERS, HEADERS, ["Invoice date"]) == {}
+    assert set(memory.lookup(SECTION_HEADERS, HEADERS, ["Invoice date 1"])) == {
+        "Invoice date 1"
+    }
+
+
+def test_changing_the_dictionary_discards_learned_labels(tmp_path):
+    path = tmp_path / "labels.db"
+    memory = LabelMemory(enabled=True, path=path)
+    memory.learn(_context({"Gross Weight (KG)": "gross_weight"}))
+    memory.close()
+
+    reopened = LabelMemory(enabled=True, path=path)
+    assert set(reopened.lookup(SECTION_HEADERS, HEADERS, ["Gross Weight KG"])) == {
+        "Gross Weight KG"
+    }
+    changed = {**HEADERS, "net_weight": ["Net weight"]}
+    assert reopened.lookup(SECTION_HEADERS, changed, ["Gross Weight KG"]) == {}
+    assert len(reopened) == 0
+
+
+def test_least_recently_used_labels_are_evicted():
+    memory = LabelMemory(enabled=True, max_entries=10)
+    dictionary = {f"field_{n}": [f"Field {n}"] for n in range(12)}
+    memory.learn(_context({"Field 0": "field_0"}, dictionary))
+    for n in range(1, 10):
+        memory.learn(_context({f"Field {n}": f"field_{n}"}, dictionary))
+    memory.lookup(SECTION_HEADERS, dictionary, ["Field 0"])
+
+    memory.learn(_context({"Field 10": "field_10", "Field 11": "field_11"}, dictionary))
+
+    assert len(memory) <= 10
+    recalled = memory.lookup(SECTION_HEADERS, dictionary, ["Field 0", "Field 1"])
+    assert set(recalled) == {"Field 0"}
+
+
+def test_second_analysis_recalls_labels_learned_from_the_first():
+    memory = LabelMemory(enabled=True)
+
+    def _analyze() -> dict[str, Any]:
+        return run_pipeline(
+            FIXTURE,
+            DEFAULT_FIELD_DICTIONARY,
+            AIConfig(provider="openai", api_key="test", model="fake"),
+            lexical_matcher=LexicalMatcher(enabled=False),
+            label_memory=memory,
+        )
+
+    first = _analyze()
+    assert first["metadata"]["field_resolution"]["memory"] == 0
+    learned = len(memory)
+    assert learned > 0
+    second = _analyze()
+
+    assert "Invoice Date" in FakeProvider.labels[0]
+    assert "Invoice Date" not in FakeProvider.labels[1]
+    # The header and the four table columns; title-like labels still go to the AI.
+    assert second["metadata"]["field_resolution"]["memory"] == 5
+    matched = {
+        header["canonical_key"]
+        for header in second["normalized_output"]["headers"]["matched"]
+    }
+    assert "invoice_date" in matched
+    # Recalled labels are not learned a second time.
+    assert len(memory) == learned
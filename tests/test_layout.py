@@ -0,0 +1,183 @@
+"""Tests for the layout-fingerprint cache."""
+
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+from typing import Any
+
+import openpyxl
+import pytest
+from template_sense.ai_providers.config import AIConfig
+from template_sense.ai_providers.interface import AIProvider
+
+from app.constants import DEFAULT_FIELD_DICTIONARY
+from app.services.cache import MemoryCache, ResultCache
+from app.services.layout import LayoutCache, same_value
+from app.services.pipeline import run_pipeline
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+HEADER_LABELS = {"Invoice No", "Invoice Date", "Subtotal", "Grand Total"}
+
+
+class FakeProvider(AIProvider):
+    """Deterministic stand-in for the AI that reads answers off the payload."""
+
+    calls = 0
+
+    @property
+    def provider_name(self) -> str:
+        return "openai"
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    def classify_fields(self, payload, context="headers"):
+        raise NotImplementedError
+
+    def generate_text(self, prompt, system_message=None, *args, **kwargs):
+        FakeProvider.calls += 1
+        return '{"canonical_key": null, "confidence": 0.0}'
+
+    def translate_text(self, text, source_lang, target_lang="en"):
+        FakeProvider.calls += 1
+        return text
+
+    def classify_all_fields(self, payload, contexts=None):
+        FakeProvider.calls += 1
+        headers = [
+            {
+                "raw_label": candidate["label"],
+                "raw_value": candidate["value"],
+                "block_index": 0,
+                "row_index": candidate["row"],
+                "col_index": candidate["col"],
+                "model_confidence": 0.9,
+            }
+            for candidate in payload["header_candidates"]
+            if candidate["label"] in HEADER_LABELS
+        ]
+        columns, line_items = [], []
+        for index, table in enumerate(payload["table_candidates"]):
+            cells = table["header_row"]["cells"]
+            for position, cell in enumerate(cells):
+                columns.append(
+                    {
+                        "raw_label": cell["value"],
+                        "raw_position": position,
+                        "table_block_index": index,
+                        "row_index": table["header_row"]["row_index"],
+                        "col_index": cell["col"],
+                        "sample_values": [
+                            values[position] for values in table["sample_data_rows"]
+                        ],
+                        "model_confidence": 0.9,
+                    }
+                )
+            for offset, values in enumerate(table["sample_data_rows"]):
+                line_items.append(
+                    {
+                        "table_index": index,
+                        "row_index": table["header_row"]["row_index"] + 1 + offset,
+                        "line_number": offset + 1,
+                        "is_subtotal": False,
+                        "columns": {
+                            cell["value"]: value for cell, value in zip(cells, values)
+                        },
+                        "model_confidence": 0.9,
+                    }
+                )
+        return {"headers": headers, "columns": columns, "line_items": line_items}
+
+
+@pytest.fixture(autouse=True)
+def fake_provider(monkeypatch):
+    FakeProvider.calls = 0
+    monkeypatch.setattr(
+        "template_sense.pipeline.stages.ai_provider_setup.get_ai_provider",
+        lambda config: FakeProvider(config),
+    )
+
+
+@pytest.fixture
+def layout_cache() -> LayoutCache:
+    memory = MemoryCache(max_entries=16, ttl_seconds=60)
+    return LayoutCache(ResultCache(memory=memory))
+
+
+def _analyze(path: Path, layout_cache: LayoutCache) -> dict[str, Any]:
+    return run_pipeline(
+        path,
+        DEFAULT_FIELD_DICTIONARY,
+        AIConfig(provider="openai", api_key="test", model="fake"),
+        layout_cache,
+    )
+
+
+def _header_values(result: dict[str, Any]) -> dict[str, Any]:
+    headers = result["normalized_output"]["headers"]
+    return {
+        header["original_label"]: header["value"]
+        for header in headers["matched"] + headers["unmatched"]
+    }
+
+
+def _edited_copy(tmp_path: Path, edit) -> Path:
+    target = tmp_path / "edited.xlsx"
+    shutil.copy(FIXTURE, target)
+    workbook = openpyxl.load_workbook(target)
+    edit(workbook.active)
+    workbook.save(target)
+    return target
+
+
+def test_same_value_ignores_formatting():
+    assert same_value("$1,250.00", 1250)
+    assert same_value("INV-001", "inv 001")
+    assert same_value(None, "")
+    assert not same_value("10", "11")
+
+
+def test_recurring_layout_skips_ai(layout_cache):
+    first = _analyze(FIXTURE, layout_cache)
+    calls = FakeProvider.calls
+
+    second = _analyze(FIXTURE, layout_cache)
+
+    assert calls > 0
+    assert FakeProvider.calls == calls
+    assert second == first
+
+
+def test_new_values_are_read_from_the_grid(layout_cache, tmp_path):
+    def edit(sheet):
+        sheet["B3"] = "INV-2025-777"
+        sheet.insert_rows(16)
+        for col, value in enumerate(["Widget C", 2, "$10.00", "$20.00"], start=1):
+            sheet.cell(row=16, column=col, value=value)
+        sheet["D18"] = "$620.00"
+
+    _analyze(FIXTURE, layout_cache)
+    calls = FakeProvider.calls
+
+    result = _analyze(_edited_copy(tmp_path, edit), layout_cache)
+
+    assert FakeProvider.calls == calls
+    values = _header_values(result)
+    assert values["Invoice No"] == "INV-2025-777"
+    assert values["Subtotal"] == "$620.00"
+    items = result["normalized_output"]["tables"][0]["line_items"]
+    assert [item["row_index"] for item in items] == [13, 14, 15, 16]
+
+
+def test_changed_label_falls_back_to_ai(layout_cache, tmp_path):
+    def edit(sheet):
+        sheet["A3"] = "Reference No:"
+
+    _analyze(FIXTURE, layout_cache)
+    calls = FakeProvider.calls
+
+    _analyze(_edited_copy(tmp_path, edit), layout_cache)
+
+    assert FakeProvider.calls > calls
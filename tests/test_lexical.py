@@ -0,0 +1,142 @@
+"""Tests for the local lexical pre-matcher."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, ClassVar
+
+import pytest
+from template_sense.ai_providers.config import AIConfig
+from template_sense.ai_providers.interface import AIProvider
+
+from app.constants import DEFAULT_FIELD_DICTIONARY
+from app.services.lexical import FieldIndex, LexicalMatcher, normalize
+from app.services.pipeline import run_pipeline
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+HEADER_LABELS = {"Invoice No", "Invoice Date", "Subtotal", "Grand Total"}
+
+
+class FakeProvider(AIProvider):
+    """Records every payload and translation the pipeline sends to the AI."""
+
+    payloads: ClassVar[list[dict[str, Any]]] = []
+    translated: ClassVar[list[str]] = []
+
+    @property
+    def provider_name(self) -> str:
+        return "openai"
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    def classify_fields(self, payload, context="headers"):
+        raise NotImplementedError
+
+    def generate_text(self, prompt, system_message=None, *args, **kwargs):
+        return '{"canonical_key": null, "confidence": 0.0}'
+
+    def translate_text(self, text, source_lang, target_lang="en"):
+        FakeProvider.translated.append(text)
+        return text
+
+    def classify_all_fields(self, payload, contexts=None):
+        FakeProvider.payloads.append(payload)
+        headers = [
+            {
+                "raw_label": candidate["label"],
+                "raw_value": candidate["value"],
+                "block_index": 0,
+                "row_index": candidate["row"],
+                "col_index": candidate["col"],
+                "model_confidence": 0.9,
+            }
+            for candidate in payload["header_candidates"]
+            if candidate["label"] in HEADER_LABELS
+        ]
+        columns = [
+            {
+                "raw_label": cell["value"],
+                "raw_position": position,
+                "table_block_index": index,
+                "row_index": table["header_row"]["row_index"],
+                "col_index": cell["col"],
+                "sample_values": [],
+                "model_confidence": 0.9,
+            }
+            for index, table in enumerate(payload["table_candidates"])
+            for position, cell in enumerate(table["header_row"]["cells"])
+        ]
+        return {"headers": headers, "columns": columns, "line_items": []}
+
+
+@pytest.fixture(autouse=True)
+def fake_provider(monkeypatch):
+    FakeProvider.payloads = []
+    FakeProvider.translated = []
+    monkeypatch.setattr(
+        "template_sense.pipeline.stages.ai_provider_setup.get_ai_provider",
+        lambda config: FakeProvider(config),
+    )
+
+
+def _analyze(matcher: LexicalMatcher | None) -> dict[str, Any]:
+    return run_pipeline(
+        FIXTURE,
+        DEFAULT_FIELD_DICTIONARY,
+        AIConfig(provider="openai", api_key="test", model="fake"),
+        lexical_matcher=matcher,
+    )
+
+
+def test_normalize_expands_abbreviations():
+    assert normalize("Invoice No.") == "invoice number"
+    assert normalize("N.W. (kg)") == "net weight kg"
+    assert normalize("Inv #") == "invoice number"
+    assert normalize(None) == ""
+
+
+def test_index_matches_abbreviated_labels():
+    headers = FieldIndex({"invoice_number": ["Invoice number"], "etd": ["ETD"]})
+    columns = FieldIndex({"net_weight": ["Net weight"], "quantity": ["Quantity"]})
+
+    assert headers.match("INVOICE NO:", 0.9).key == "invoice_number"
+    assert columns.match("N.W.", 0.9).key == "net_weight"
+    assert columns.match("Qty", 0.9).key == "quantity"
+    assert columns.match("Unit Price", 0.9) is None
+
+
+def test_index_rejects_ambiguous_labels():
+    index = FieldIndex({"gross_weight": ["Gross weights"], "net": ["Gross weighs"]})
+
+    assert index.match("Gross weight", 0.5) is None
+
+
+def test_resolved_headers_skip_the_ai():
+    result = _analyze(LexicalMatcher(enabled=True))
+
+    (payload,) = FakeProvider.payloads
+    sent = {candidate["label"] for candidate in payload["header_candidates"]}
+    assert "Invoice No" not in sent and "Invoice Date" not in sent
+    assert payload["table_candidates"]
+    assert "Invoice No" not in FakeProvider.translated
+    assert "Quantity" not in FakeProvider.translated
+
+    matched = {
+        header["canonical_key"]: header["value"]
+        for header in result["normalized_output"]["headers"]["matched"]
+    }
+    assert matched["invoice_number"] == "INV-2024-001"
+    resolution = result["metadata"]["field_resolution"]
+    assert resolution["lexical"] == 3
+    assert resolution["ai"] > 0
+
+
+def test_matching_disabled_sends_every_label():
+    result = _analyze(LexicalMatcher(enabled=False))
+
+    (payload,) = FakeProvider.payloads
+    sent = {candidate["label"] for candidate in payload["header_candidates"]}
+    assert {"Invoice No", "Invoice Date"} <= sent
+    assert "field_resolution" not in result["metadata"]
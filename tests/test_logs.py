@@ -0,0 +1,171 @@
+"""Tests for the queued structured logging pipeline."""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.constants import REQUEST_ID_HEADER
+from app.main import analyzer_service, app, result_cache
+from app.services.logs import (
+    ErrorRateLimiter,
+    JsonFormatter,
+    LogPipeline,
+    bind_log_context,
+    record_log_stage,
+)
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def sample_file_path() -> Path:
+    return Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+@pytest.fixture
+def log_logger() -> logging.Logger:
+    target = logging.getLogger("tests.logs")
+    target.propagate = False
+    yield target
+    target.handlers.clear()
+
+
+def _lines(stream: io.StringIO) -> list[dict]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_are_written_as_json_by_the_listener_thread(monkeypatch, log_logger):
+    threads = []
+    format_record = JsonFormatter.format
+
+    def _format(self, record):
+        threads.append(threading.current_thread())
+        return format_record(self, record)
+
+    monkeypatch.setattr(JsonFormatter, "format", _format)
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream=stream).install(log_logger)
+
+    with bind_log_context(request_id="req-1", file_hash="abc"):
+        record_log_stage("preflight", 0.0125)
+        log_logger.info("Analyzed %s", "invoice.xlsx")
+        try:
+            raise ValueError("bad workbook")
+        except ValueError:
+            log_logger.exception("Analysis failed")
+    log_logger.info("Outside any request")
+    pipeline.stop()
+
+    info, error, outside = _lines(stream)
+    assert threads and threading.current_thread() not in threads
+    assert info["message"] == "Analyzed invoice.xlsx"
+    assert info["level"] == "INFO"
+    assert info["request_id"] == "req-1"
+    assert info["file_hash"] == "abc"
+    assert info["stages_ms"] == {"preflight": 12.5}
+    assert "ValueError: bad workbook" in error["exception"]
+    assert "request_id" not in outside
+
+
+def test_repeated_errors_are_rate_limited_and_sampled():
+    now = [0.0]
+    limiter = ErrorRateLimiter(
+        burst=2, window_seconds=60, sample_every=3, clock=lambda: now[0]
+    )
+
+    def _record(level=logging.ERROR, msg="Provider failed: %s"):
+        return logging.LogRecord("app", level, __file__, 1, msg, ("x",), None)
+
+    passed = [limiter.filter(_record()) for _ in range(7)]
+    assert passed == [True, True, False, False, True, False, False]
+    assert limiter.suppressed == 4
+    assert limiter.filter(_record(msg="Another failure"))
+    assert all(limiter.filter(_record(level=logging.INFO)) for _ in range(10))
+
+    now[0] = 61.0
+    record = _record()
+    assert limiter.filter(record)
+    assert record.suppressed == 2
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    pipeline = LogPipeline(stream=io.StringIO(), queue_size=2)
+    target = logging.getLogger("tests.logs.full")
+    target.propagate = False
+    target.addHandler(pipeline.handler)
+    try:
+        # The listener is not started, so nothing drains the queue.
+        for index in range(5):
+            target.warning("Queued %d", index)
+    finally:
+        target.removeHandler(pipeline.handler)
+
+    assert pipeline.queue.qsize() == 2
+    assert pipeline.dropped == 3
+
+
+def test_pipeline_is_configured_from_the_environment(monkeypatch):
+    monkeypatch.setenv("TEMPLATE_SENSE_LOG_LEVEL", "warning")
+    monkeypatch.setenv("TEMPLATE_SENSE_LOG_FORMAT", "text")
+    monkeypatch.setenv("TEMPLATE_SENSE_LOG_ASYNC", "false")
+    monkeypatch.setenv("TEMPLATE_SENSE_LOG_ERROR_BURST", "3")
+
+    pipeline = LogPipeline.from_env()
+    assert pipeline.level == logging.WARNING
+    assert pipeline.listener is None
+    assert pipeline.handler is pipeline.sink
+    assert not isinstance(pipeline.sink.formatter, JsonFormatter)
+    assert pipeline.rate_limiter.burst == 3
+
+    monkeypatch.setenv("TEMPLATE_SENSE_LOG_FORMAT", "xml")
+    assert isinstance(LogPipeline.from_env().sink.formatter, JsonFormatter)
+    with pytest.raises(ValueError):
+        LogPipeline(log_format="xml")
+
+
+def test_requests_log_with_their_request_id_and_file_hash(
+    monkeypatch, sample_file_path
+):
+    analyzer_logger = logging.getLogger("app.services.analyzer")
+
+    def _analyze(file_path):
+        analyzer_logger.warning("Analyzing %s", Path(file_path).name)
+        return {"file": str(file_path)}
+
+    monkeypatch.setattr(analyzer_service, "analyze", _analyze)
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream=stream).install(analyzer_logger)
+    result_cache.clear()
+    try:
+        with sample_file_path.open("rb") as file_handle:
+            response = client.post(
+                "/analyze",
+                files={"file": (sample_file_path.name, file_handle)},
+                headers={REQUEST_ID_HEADER: "client-req-42"},
+            )
+        with sample_file_path.open("rb") as file_handle:
+            generated = client.post(
+                "/analyze",
+                files={"file": (sample_file_path.name, file_handle)},
+                headers={REQUEST_ID_HEADER: "not a valid id"},
+                params={"bypass_cache": "true"},
+            )
+    finally:
+        pipeline.stop()
+        analyzer_logger.setLevel(logging.NOTSET)
+        result_cache.clear()
+
+    assert response.headers[REQUEST_ID_HEADER] == "client-req-42"
+    assert generated.headers[REQUEST_ID_HEADER] not in ("", "not a valid id")
+    first, second = _lines(stream)
+    assert first["request_id"] == "client-req-42"
+    assert second["request_id"] == generated.headers[REQUEST_ID_HEADER]
+    assert len(first["file_hash"]) == 64
+    assert {"upload_read", "preflight", "cache_lookup"} <= set(first["stages_ms"])
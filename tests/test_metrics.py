@@ -0,0 +1,167 @@
+"""Tests for the Prometheus metrics endpoint and instrumentation."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from template_sense.errors import AIProviderError, FileValidationError
+from template_sense.pipeline.stages import FileLoadingStage
+
+from app.constants import ENV_PROMETHEUS_MULTIPROC_DIR
+from app.main import analyzer_service, app
+from app.services.metrics import stage_name
+from app.services.pipeline import run_pipeline
+
+client = TestClient(app)
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def sample_file_path() -> Path:
+    return Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _stage_count(stage: str, provider: str, model: str) -> float:
+    return _sample(
+        "template_sense_analysis_stage_duration_seconds_count",
+        stage=stage,
+        provider=provider,
+        model=model,
+    )
+
+
+def _post(sample_file_path: Path):
+    with sample_file_path.open("rb") as file_handle:
+        return client.post(
+            "/analyze", files={"file": (sample_file_path.name, file_handle)}
+        )
+
+
+def test_analyze_records_requests_and_stage_latencies(monkeypatch, sample_file_path):
+    monkeypatch.setattr(analyzer_service, "analyze", lambda path: {"file": str(path)})
+    provider = analyzer_service.effective_provider
+    model = analyzer_service.effective_model
+    stages = (
+        "upload_read",
+        "temp_write",
+        "preflight",
+        "cache_lookup",
+        "analysis",
+        "serialization",
+    )
+    before = {stage: _stage_count(stage, provider, model) for stage in stages}
+    requests_before = _sample(
+        "template_sense_http_requests_total",
+        method="POST",
+        path="/analyze",
+        status="200",
+    )
+
+    assert _post(sample_file_path).status_code == 200
+
+    for stage in stages:
+        assert _stage_count(stage, provider, model) == before[stage] + 1
+    assert (
+        _sample(
+            "template_sense_http_requests_total",
+            method="POST",
+            path="/analyze",
+            status="200",
+        )
+        == requests_before + 1
+    )
+    assert _sample("template_sense_http_requests_in_progress", method="POST") == 0
+    assert (
+        _sample("template_sense_analyses_in_progress", provider=provider, model=model)
+        == 0
+    )
+
+
+@pytest.mark.parametrize(
+    ("exc", "label"),
+    [
+        (
+            AIProviderError(provider_name="openai", error_details="boom"),
+            "AIProviderError",
+        ),
+        (FileNotFoundError("missing"), "FileNotFoundError"),
+        (RuntimeError("boom"), "unexpected"),
+    ],
+)
+def test_analysis_errors_are_counted_by_type(monkeypatch, sample_file_path, exc, label):
+    def _fail(path):
+        raise exc
+
+    monkeypatch.setattr(analyzer_service, "analyze", _fail)
+    labels = {
+        "error_type": label,
+        "provider": analyzer_service.effective_provider,
+        "model": analyzer_service.effective_model,
+    }
+    before = _sample("template_sense_analysis_errors_total", **labels)
+
+    assert _post(sample_file_path).status_code >= 400
+
+    assert _sample("template_sense_analysis_errors_total", **labels) == before + 1
+
+
+def test_metrics_endpoint_uses_route_templates():
+    client.get("/jobs/does-not-exist")
+    client.get("/no-such-page")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'path="/jobs/{job_id}",status="404"' in body
+    assert 'path="unmatched",status="404"' in body
+    assert "does-not-exist" not in body
+
+
+def test_pipeline_stages_are_timed(tmp_path):
+    missing = tmp_path / "missing.xlsx"
+    before = _stage_count("validation", "none", "none")
+
+    with pytest.raises(FileValidationError):
+        run_pipeline(missing, field_dictionary={"headers": {}, "columns": {}})
+
+    assert _stage_count("validation", "none", "none") == before + 1
+    assert stage_name(FileLoadingStage()) == "file_loading"
+
+
+def test_multiprocess_mode_aggregates_worker_samples(tmp_path):
+    env = {**os.environ, ENV_PROMETHEUS_MULTIPROC_DIR: str(tmp_path)}
+    record = (
+        "from app.services.metrics import HTTP_REQUESTS, labelled;"
+        "labelled(HTTP_REQUESTS, 'GET', '/health', '200').inc()"
+    )
+    render = "from app.services.metrics import render_metrics;print(render_metrics()[0].decode())"
+
+    def _run(code: str) -> str:
+        return subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    _run(record)
+    _run(record)
+
+    assert (
+        'template_sense_http_requests_total{method="GET",path="/health",status="200"} 2.0'
+        in _run(render)
+    )
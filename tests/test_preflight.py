@@ -0,0 +1,142 @@
+"""Tests for workbook pre-flight validation."""
+
+from __future__ import annotations
+
+import struct
+import zipfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+
+from app.constants import ERROR_ENCRYPTED_WORKBOOK, ERROR_LEGACY_XLS
+from app.main import analyzer_service, app
+from app.services.preflight import OLE2_MAGIC, Preflight, PreflightError
+
+client = TestClient(app)
+SAMPLE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+def _workbook(path: Path, cells: dict[str, str], hidden_sheet: bool = False) -> Path:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Invoice"
+    for ref, value in cells.items():
+        sheet[ref] = value
+    if hidden_sheet:
+        workbook.create_sheet("Lookup").sheet_state = "hidden"
+    workbook.save(path)
+    return path
+
+
+def test_reads_sheet_dimensions_without_loading_cells(tmp_path):
+    info = Preflight().check(
+        _workbook(tmp_path / "book.xlsx", {"B2": "x", "E40": "y"}, hidden_sheet=True)
+    )
+
+    assert info.format == "xlsx"
+    invoice, lookup = info.sheets
+    assert (invoice.name, invoice.rows, invoice.columns) == ("Invoice", 39, 4)
+    assert not invoice.hidden
+    assert lookup.hidden
+    assert Preflight().check(SAMPLE).sheets[0].rows == 19
+
+
+def test_rejects_files_that_are_not_workbooks(tmp_path):
+    pdf = tmp_path / "invoice.xlsx"
+    pdf.write_bytes(b"%PDF-1.7\n" + b"0" * 100)
+    legacy = tmp_path / "invoice.xls"
+    legacy.write_bytes(OLE2_MAGIC + b"\0" * 504)
+
+    with pytest.raises(PreflightError, match="not an Excel workbook"):
+        Preflight().check(pdf)
+    with pytest.raises(PreflightError) as excinfo:
+        Preflight().check(legacy)
+    assert str(excinfo.value) == ERROR_LEGACY_XLS
+
+
+def _ole2_container(path: Path, *streams: str) -> Path:
+    """Write an OLE2 file whose one directory sector lists ``streams``."""
+
+    header = bytearray(OLE2_MAGIC + b"\0" * 504)
+    struct.pack_into("<H", header, 30, 9)  # 512-byte sectors
+    struct.pack_into("<I", header, 48, 0)  # directory in sector 0
+    struct.pack_into("<109I", header, 76, 1, *[0xFFFFFFFF] * 108)  # FAT in sector 1
+    directory = bytearray()
+    for name in ("Root Entry", *streams):
+        encoded = name.encode("utf-16-le") + b"\0\0"
+        entry = bytearray(128)
+        entry[: len(encoded)] = encoded
+        struct.pack_into("<H", entry, 64, len(encoded))
+        directory += entry
+    fat = struct.pack("<2I", 0xFFFFFFFE, 0xFFFFFFFD) + b"\xff" * 504
+    path.write_bytes(bytes(header) + bytes(directory.ljust(512, b"\0")) + fat)
+    return path
+
+
+def test_encrypted_workbooks_are_not_reported_as_legacy_xls(tmp_path):
+    encrypted = _ole2_container(
+        tmp_path / "invoice.xlsx", "EncryptionInfo", "EncryptedPackage"
+    )
+    legacy = _ole2_container(tmp_path / "invoice.xls", "Workbook")
+
+    with pytest.raises(PreflightError) as excinfo:
+        Preflight().check(encrypted)
+    assert str(excinfo.value) == ERROR_ENCRYPTED_WORKBOOK
+    with pytest.raises(PreflightError) as excinfo:
+        Preflight().check(legacy)
+    assert str(excinfo.value) == ERROR_LEGACY_XLS
+
+
+def test_rejects_zip_bombs_and_oversized_archives(tmp_path):
+    bomb = tmp_path / "bomb.xlsx"
+    with zipfile.ZipFile(bomb, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("xl/worksheets/sheet1.xml", b"\0" * (4 * 1024 * 1024))
+
+    with pytest.raises(PreflightError, match="zip bomb"):
+        Preflight().check(bomb)
+    with pytest.raises(PreflightError, match="expands to"):
+        Preflight(max_uncompressed_bytes=1024).check(SAMPLE)
+
+
+def test_rejects_oversized_sheets(tmp_path):
+    tall = _workbook(tmp_path / "tall.xlsx", {"A1": "x", "A120000": "y"})
+
+    with pytest.raises(PreflightError, match="'Invoice' spans 120000 rows x 1"):
+        Preflight().check(tall)
+    with pytest.raises(PreflightError, match="cells across its sheets"):
+        Preflight(max_cells=50).check(SAMPLE)
+
+
+def test_api_rejects_before_analysis(monkeypatch, tmp_path):
+    def _unexpected(_):
+        raise AssertionError("analysis must not run")
+
+    monkeypatch.setattr(analyzer_service, "analyze", _unexpected)
+    response = client.post(
+        "/analyze",
+        files={"file": ("renamed.xlsx", b"%PDF-1.7 not a workbook", "application/pdf")},
+    )
+
+    assert response.status_code == 400
+    assert "not an Excel workbook" in response.json()["error"]
+
+
+def test_api_renames_ooxml_uploaded_as_xls(monkeypatch):
+    seen: list[str] = []
+
+    def _analyze(path):
+        seen.append(Path(path).suffix)
+        return {"status": "ok"}
+
+    monkeypatch.setattr(analyzer_service, "analyze", _analyze)
+    response = client.post(
+        "/analyze",
+        files={
+            "file": ("template.xls", SAMPLE.read_bytes(), "application/vnd.ms-excel")
+        },
+    )
+
+    assert response.status_code == 200
+    assert seen == [".xlsx"]
@@ -0,0 +1,128 @@
+"""Tests for opt-in request profiling."""
+
+from __future__ import annotations
+
+import json
+import pstats
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.constants import PROFILE_ID_HEADER, PROFILE_OUTPUT_HEADER, PROFILE_TOKEN_HEADER
+from app.main import analyzer_service, app
+from app.services.metrics import timed_stage
+from app.services.profiling import RequestProfiler
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def sample_file_path() -> Path:
+    return Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+@pytest.fixture(autouse=True)
+def mock_analyzer(monkeypatch):
+    def _analyze(file_path):
+        with timed_stage("grid_extraction", "openai", "test-model"):
+            total = sum(i * i for i in range(1000))
+        return {"file": str(file_path), "total": total}
+
+    monkeypatch.setattr(analyzer_service, "analyze", _analyze)
+
+
+def _use_profiler(monkeypatch, **kwargs) -> RequestProfiler:
+    profiler = RequestProfiler(**kwargs)
+    monkeypatch.setattr(main_module, "request_profiler", profiler)
+    return profiler
+
+
+def _post(sample_file_path: Path, headers: dict[str, str] | None = None):
+    with sample_file_path.open("rb") as file_handle:
+        return client.post(
+            "/analyze",
+            files={"file": (sample_file_path.name, file_handle)},
+            headers=headers or {},
+        )
+
+
+def test_profiling_disabled_by_default(monkeypatch, sample_file_path, tmp_path):
+    profiler = _use_profiler(monkeypatch, directory=tmp_path)
+
+    response = _post(sample_file_path, {PROFILE_TOKEN_HEADER: "anything"})
+
+    assert not profiler.enabled
+    assert response.status_code == 200
+    assert PROFILE_ID_HEADER not in response.headers
+    assert "profile" not in response.json()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_token_header_returns_profile_inline(monkeypatch, sample_file_path, tmp_path):
+    _use_profiler(monkeypatch, token="secret", directory=tmp_path)
+
+    response = _post(
+        sample_file_path,
+        {PROFILE_TOKEN_HEADER: "secret", PROFILE_OUTPUT_HEADER: "inline"},
+    )
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["success"] is True
+    profile = payload["profile"]
+    assert profile["id"] == response.headers[PROFILE_ID_HEADER]
+    for stage in ("upload_read", "temp_write", "analysis", "grid_extraction"):
+        assert stage in profile["stages_ms"]
+    assert profile["wall_time_ms"] >= profile["stages_ms"]["analysis"]
+    assert any("_analyze" in row["function"] for row in profile["top_functions"])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_token_header_writes_profile_files(monkeypatch, sample_file_path, tmp_path):
+    _use_profiler(monkeypatch, token="secret", directory=tmp_path)
+
+    response = _post(sample_file_path, {PROFILE_TOKEN_HEADER: "secret"})
+
+    profile_id = response.headers[PROFILE_ID_HEADER]
+    assert "profile" not in response.json()
+    report = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert report["profile_file"] == str(tmp_path / f"{profile_id}.prof")
+    assert pstats.Stats(report["profile_file"]).total_calls > 0
+
+
+def test_wrong_token_is_not_profiled(monkeypatch, sample_file_path, tmp_path):
+    _use_profiler(monkeypatch, token="secret", directory=tmp_path)
+
+    response = _post(sample_file_path, {PROFILE_TOKEN_HEADER: "guess"})
+
+    assert PROFILE_ID_HEADER not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sampled_requests_are_written_to_disk(monkeypatch, sample_file_path, tmp_path):
+    _use_profiler(monkeypatch, sample_rate=1.0, directory=tmp_path)
+
+    response = _post(sample_file_path, {PROFILE_OUTPUT_HEADER: "inline"})
+
+    profile_id = response.headers[PROFILE_ID_HEADER]
+    assert "profile" not in response.json()
+    report = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert report["sampled"] is True
+
+
+def test_failed_request_profile_is_still_written(
+    monkeypatch, sample_file_path, tmp_path
+):
+    _use_profiler(monkeypatch, token="secret", directory=tmp_path)
+
+    def _fail(file_path):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(analyzer_service, "analyze", _fail)
+
+    response = _post(sample_file_path, {PROFILE_TOKEN_HEADER: "secret"})
+
+    assert response.status_code == 500
+    assert len(list(tmp_path.glob("*.json"))) == 1
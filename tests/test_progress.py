@@ -0,0 +1,211 @@
+"""Tests for Server-Sent Events progress streaming of analyses."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import shutil
+import threading
+from pathlib import Path
+from typing import Any
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from template_sense.ai_providers.config import AIConfig
+from template_sense.ai_providers.interface import AIProvider
+
+import app.main as main_module
+from app.constants import DEFAULT_FIELD_DICTIONARY
+from app.main import analyzer_service, app
+from app.services.pipeline import run_pipeline
+from app.services.progress import ProgressStream
+
+client = TestClient(app)
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+class FakeProvider(AIProvider):
+    """Stand-in for the AI that accepts every header candidate."""
+
+    @property
+    def provider_name(self) -> str:
+        return "openai"
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    def classify_fields(self, payload, context="headers"):
+        raise NotImplementedError
+
+    def generate_text(self, prompt, system_message=None, *args, **kwargs):
+        return '{"canonical_key": null, "confidence": 0.0}'
+
+    def translate_text(self, text, source_lang, target_lang="en"):
+        return text
+
+    def classify_all_fields(self, payload, contexts=None):
+        headers = [
+            {
+                "raw_label": candidate["label"],
+                "raw_value": candidate["value"],
+                "block_index": 0,
+                "row_index": candidate["row"],
+                "col_index": candidate["col"],
+                "model_confidence": 0.9,
+            }
+            for candidate in payload["header_candidates"]
+        ]
+        return {"headers": headers, "columns": [], "line_items": []}
+
+
+def _use_provider(monkeypatch, provider: type[AIProvider]) -> None:
+    monkeypatch.setattr(
+        "template_sense.pipeline.stages.ai_provider_setup.get_ai_provider",
+        lambda config: provider(config),
+    )
+    monkeypatch.setattr(
+        analyzer_service,
+        "analyze",
+        lambda path: run_pipeline(
+            path,
+            DEFAULT_FIELD_DICTIONARY,
+            AIConfig(provider="openai", api_key="test", model="fake"),
+        ),
+    )
+
+
+def _events(body: str) -> list[tuple[str, dict[str, Any]]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if ": " in line
+        )
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _stream(path: Path = FIXTURE):
+    with path.open("rb") as file_handle:
+        return client.post("/analyze/stream", files={"file": (path.name, file_handle)})
+
+
+def test_stream_reports_stages_partial_headers_and_result(monkeypatch):
+    _use_provider(monkeypatch, FakeProvider)
+
+    response = _stream()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    stages = [data["stage"] for kind, data in events if kind == "stage"]
+    assert stages == [
+        "uploaded",
+        "validated",
+        "parsed",
+        "ai_classification_started",
+        "ai_classification_finished",
+    ]
+    partials = {data["kind"]: data for kind, data in events if kind == "partial"}
+    candidates = {item["label"] for item in partials["header_candidates"]["items"]}
+    assert {"Invoice No", "Invoice Date"} <= candidates
+    classified = {item["raw_label"] for item in partials["classified_headers"]["items"]}
+    assert classified == candidates
+    # Partial headers arrive before the final result, which comes last.
+    kind, final = events[-1]
+    assert kind == "result"
+    assert final["success"] is True
+    assert final["data"]["normalized_output"]["headers"]
+
+    cached = _events(_stream().text)
+    assert [data.get("stage") for _, data in cached[:-1]] == [
+        "uploaded",
+        "validated",
+        "cache_hit",
+    ]
+    assert cached[-1][1]["data"] == final["data"]
+
+
+def test_stream_rejects_bad_uploads_before_streaming(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("not a workbook")
+
+    response = _stream(path)
+
+    assert response.status_code == 400
+    assert response.json()["success"] is False
+
+
+def test_stream_rejects_oversize_uploads_by_content_length(monkeypatch):
+    async def _receive_upload(*args, **kwargs):
+        raise AssertionError("the size limit applies before the body is read")
+
+    monkeypatch.setattr(main_module, "_receive_upload", _receive_upload)
+
+    response = client.post(
+        "/analyze/stream",
+        files={"file": ("big.xlsx", b"0" * (11 * 1024 * 1024))},
+    )
+
+    assert response.status_code == 400
+    assert "too large" in response.json()["error"].lower()
+
+
+def test_stream_reports_analysis_errors(monkeypatch):
+    def _fail(path):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(analyzer_service, "analyze", _fail)
+
+    kind, data = _events(_stream().text)[-1]
+
+    assert kind == "error"
+    assert data["success"] is False
+    assert "boom" not in data["error"]
+
+
+def test_disconnect_cancels_the_analysis(monkeypatch, tmp_path):
+    classifying, release = threading.Event(), threading.Event()
+
+    class BlockingProvider(FakeProvider):
+        def classify_all_fields(self, payload, contexts=None):
+            classifying.set()
+            release.wait(timeout=5)
+            return super().classify_all_fields(payload, contexts)
+
+    _use_provider(monkeypatch, BlockingProvider)
+    path = tmp_path / "upload.xlsx"
+    shutil.copy(FIXTURE, path)
+    labels = {
+        "error_type": "cancelled",
+        "provider": main_module._metric_labels()[0],
+        "model": main_module._metric_labels()[1],
+    }
+    sample = "template_sense_analysis_errors_total"
+    before = REGISTRY.get_sample_value(sample, labels) or 0.0
+
+    async def _disconnect_mid_analysis() -> None:
+        stream = ProgressStream()
+        with stream.activate():
+            task = asyncio.create_task(
+                main_module._stream_analysis(stream, path, "digest", True)
+            )
+        events = main_module._progress_events(stream, task)
+        while b"ai_classification_started" not in await anext(events):
+            pass
+        # Disconnect only once the provider call is in progress.
+        assert await asyncio.to_thread(classifying.wait, 5)
+        await events.aclose()
+        assert stream.cancelled
+        release.set()
+        await task
+        # The run stopped at the next stage: no result was ever produced.
+        assert await stream.next(timeout=0.05) is None
+
+    asyncio.run(_disconnect_mid_analysis())
+
+    assert classifying.is_set()
+    assert REGISTRY.get_sample_value(sample, labels) == before + 1
+    assert not path.exists()
@@ -0,0 +1,82 @@
+"""Tests for pooled AI provider clients."""
+
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx2
+import pytest
+from template_sense.ai_providers.config import AIConfig
+
+from app.services.providers import ConnectionStats, CountingTransport, ProviderPool
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_counting_transport_reports_connection_reuse(server_url):
+    stats = ConnectionStats()
+    with httpx2.Client(transport=CountingTransport(stats)) as client:
+        for _ in range(3):
+            assert client.get(server_url).status_code == 200
+
+    assert stats.snapshot() == {
+        "requests": 3,
+        "connections_opened": 1,
+        "connections_reused": 2,
+    }
+
+
+def test_pool_reuses_provider_until_settings_change():
+    pool = ProviderPool()
+    config = AIConfig(provider="openai", api_key="sk-test", model="gpt-4o-mini")
+    try:
+        provider = pool.get(config)
+
+        assert pool.get(AIConfig(**vars(config))) is provider
+        assert pool.get(AIConfig(**{**vars(config), "model": "gpt-4o"})) is not provider
+        rebuilt = pool.get(AIConfig(**{**vars(config), "api_key": "sk-other"}))
+        assert rebuilt.config.api_key == "sk-other"
+        assert pool.get(config) is provider
+    finally:
+        pool.close()
+
+
+def test_evicted_clients_are_closed_once_released():
+    pool = ProviderPool(max_entries=1)
+    config = AIConfig(provider="openai", api_key="sk-test", model="gpt-4o-mini")
+    try:
+        with pool.lease(config):
+            (leased,) = [entry.http_client for entry in pool._entries.values()]
+            pool.get(AIConfig(**{**vars(config), "model": "gpt-4o"}))
+            assert not leased.is_closed
+        assert leased.is_closed
+
+        (unleased,) = [entry.http_client for entry in pool._entries.values()]
+        pool.get(config)
+        assert unleased.is_closed
+    finally:
+        pool.close()
+    assert not pool._entries and not pool._retired
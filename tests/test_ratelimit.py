@@ -0,0 +1,189 @@
+"""Tests for the client-side AI rate limiter."""
+
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx2
+import openai
+import pytest
+from template_sense.ai_providers.config import AIConfig
+from template_sense.errors import AIProviderError
+
+from app.services.providers import ProviderPool
+from app.services.ratelimit import (
+    AdaptiveConcurrency,
+    ProviderLimiter,
+    RateLimiter,
+    TokenBucket,
+    classify_failure,
+)
+
+
+def _status_error(status: int, headers: dict[str, str] | None = None):
+    request = httpx2.Request("POST", "http://provider.test/v1/chat/completions")
+    response = httpx2.Response(status, headers=headers or {}, request=request)
+    cls = openai.RateLimitError if status == 429 else openai.APIStatusError
+    try:
+        raise cls("provider said no", response=response, body=None)
+    except openai.APIStatusError as exc:
+        # Mirror how Template Sense wraps SDK exceptions.
+        error = AIProviderError("openai", str(exc), "generate_text")
+        error.__cause__ = exc
+        return error
+
+
+def test_token_bucket_charges_debt_as_delay():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(2) == pytest.approx(2.0)
+    now[0] = 2.0
+    assert bucket.available() == pytest.approx(0.0)
+
+
+def test_concurrency_halves_on_throttle_and_recovers_gradually():
+    concurrency = AdaptiveConcurrency(8)
+
+    concurrency.acquire()
+    concurrency.release(throttled=True)
+    assert concurrency.limit == 4
+
+    for _ in range(4):
+        concurrency.acquire()
+        concurrency.release()
+    assert concurrency.limit == 5
+
+
+def test_classify_failure_reads_status_and_retry_after():
+    throttled = classify_failure(_status_error(429, {"retry-after": "7"}))
+    assert throttled.retryable and throttled.throttled
+    assert throttled.retry_after == 7.0
+
+    assert (
+        classify_failure(_status_error(429, {"retry-after-ms": "250"})).retry_after
+        == 0.25
+    )
+    assert classify_failure(_status_error(503)).retryable
+    assert not classify_failure(_status_error(401)).retryable
+    assert not classify_failure(AIProviderError("openai", "bad json")).retryable
+
+
+def test_limiter_retries_with_backoff_that_respects_retry_after():
+    sleeps: list[float] = []
+    limiter = ProviderLimiter("openai", "test", max_concurrency=4, sleep=sleeps.append)
+    failures = [_status_error(429, {"retry-after": "3"}), _status_error(500)]
+
+    def _call():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    assert limiter.call(_call) == "ok"
+
+    # The throttled attempt backs off for at least Retry-After.
+    assert sleeps[0] >= 3.0
+    state = limiter.snapshot()
+    assert state["calls"] == 3
+    assert state["retries"] == 2
+    assert state["throttled"] == 1
+    assert state["concurrency_limit"] == 2
+    assert state["paused_for_seconds"] > 0
+
+
+def test_limiter_gives_up_after_max_retries_and_skips_permanent_errors():
+    sleeps: list[float] = []
+    limiter = ProviderLimiter("openai", "test", max_retries=2, sleep=sleeps.append)
+
+    def _throttled():
+        raise _status_error(429)
+
+    with pytest.raises(AIProviderError):
+        limiter.call(_throttled)
+    assert len(sleeps) == 2
+
+    def _unauthorized():
+        raise _status_error(401)
+
+    with pytest.raises(AIProviderError):
+        limiter.call(_unauthorized)
+    assert len(sleeps) == 2
+    assert limiter.concurrency.in_flight == 0
+
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible endpoint that rejects the first request with a 429."""
+
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).requests += 1
+        if type(self).requests == 1:
+            body = {"error": {"message": "slow down", "type": "rate_limit"}}
+            self._send(429, body, {"retry-after-ms": "20"})
+            return
+        self._send(
+            200,
+            {
+                "id": "chatcmpl-test",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "test",
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": '{"ok": true}'},
+                    }
+                ],
+            },
+        )
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_pooled_provider_retries_real_429(monkeypatch):
+    _ThrottlingHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv(
+        "OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}"
+    )
+    pool = ProviderPool(sdk_max_retries=0)
+    limiter = RateLimiter()
+    try:
+        provider = limiter.wrap(
+            pool.get(AIConfig(provider="openai", api_key="sk-test", model="test"))
+        )
+
+        assert provider.generate_text("Say ok") == '{"ok": true}'
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
+
+    assert _ThrottlingHandler.requests == 2
+    (state,) = limiter.snapshot()
+    assert state["throttled"] == 1
+    assert state["retries"] == 1
+
+
+def test_disabled_limiter_returns_provider_unchanged():
+    provider = object()
+
+    assert RateLimiter(enabled=False).wrap(provider) is provider
@@ -0,0 +1,139 @@
+"""Tests for parallel per-sheet analysis of multi-sheet workbooks."""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.workbook.defined_name import DefinedName
+
+from app.services import pipeline
+from app.services.analyzer import AnalyzerService
+from app.services.cache import MemoryCache, ResultCache
+from app.services.sheets import SheetSplitter
+from app.services.trimming import WorkbookTrimmer
+
+
+def _workbook(path: Path, packing_note: str = "Fragile") -> Workbook:
+    workbook = Workbook()
+    invoice = workbook.active
+    invoice.title = "Invoice"
+    invoice["A1"], invoice["B1"] = "Invoice No", "INV-1"
+    packing = workbook.create_sheet("Packing List")
+    packing["A1"], packing["B1"] = "Note", packing_note
+    workbook.create_sheet("Blank")
+    lookup = workbook.create_sheet("Lookup")
+    lookup.sheet_state = "hidden"
+    lookup["A1"] = "USD"
+    invoice["C1"] = "=Lookup!A1"
+    workbook.save(path)
+    return workbook
+
+
+def _fake_pipeline(monkeypatch, barrier: threading.Barrier | None = None):
+    analyzed: list[str] = []
+
+    def _run_pipeline(file_path, **_):
+        sheet = load_workbook(file_path).active
+        analyzed.append(sheet.title)
+        if barrier is not None:
+            barrier.wait(timeout=5)
+        header = {"original_label": sheet["A1"].value, "value": sheet["B1"].value}
+        return {
+            "normalized_output": {
+                "version": "1.0",
+                "sheet_name": sheet.title,
+                "headers": {"matched": [header], "unmatched": []},
+                "tables": [{"table_index": 0, "columns": []}],
+                "summary": {"total_header_fields": 1, "total_tables": 1},
+            },
+            "recovery_events": [],
+            "metadata": {"sheet_name": sheet.title},
+        }
+
+    monkeypatch.setattr(pipeline, "run_pipeline", _run_pipeline)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    return analyzed
+
+
+def _service() -> AnalyzerService:
+    return AnalyzerService(
+        ai_provider="openai",
+        splitter=SheetSplitter(enabled=True, max_workers=4),
+        sheet_cache=ResultCache(memory=MemoryCache(max_entries=16, ttl_seconds=60)),
+    )
+
+
+def test_analyzes_visible_sheets_concurrently_and_merges(monkeypatch, tmp_path):
+    # Both sheets must be in flight at once for the barrier to open.
+    analyzed = _fake_pipeline(monkeypatch, barrier=threading.Barrier(2))
+    source = tmp_path / "template.xlsx"
+    _workbook(source)
+
+    result = _service().analyze(source)
+
+    assert sorted(analyzed) == ["Invoice", "Packing List"]
+    output = result["normalized_output"]
+    assert output["sheet_name"] == "Invoice"
+    assert [
+        (header["sheet_name"], header["value"])
+        for header in output["headers"]["matched"]
+    ] == [("Invoice", "INV-1"), ("Packing List", "Fragile")]
+    assert [table["table_index"] for table in output["tables"]] == [0, 1]
+    assert output["summary"] == {"total_header_fields": 2, "total_tables": 2}
+    assert [sheet["cache"] for sheet in result["metadata"]["sheets"]] == [
+        "MISS",
+        "MISS",
+    ]
+    assert not list(tmp_path.glob("*.trimmed.xlsx"))
+
+
+def test_caches_each_sheet_independently(monkeypatch, tmp_path):
+    analyzed = _fake_pipeline(monkeypatch)
+    service = _service()
+    _workbook(tmp_path / "first.xlsx")
+    _workbook(tmp_path / "second.xlsx", packing_note="Keep dry")
+
+    service.analyze(tmp_path / "first.xlsx")
+    result = service.analyze(tmp_path / "second.xlsx")
+
+    assert sorted(analyzed) == ["Invoice", "Packing List", "Packing List"]
+    assert [
+        (sheet["sheet_name"], sheet["cache"]) for sheet in result["metadata"]["sheets"]
+    ] == [("Invoice", "HIT"), ("Packing List", "MISS")]
+
+
+def test_sheets_that_reference_each_other_are_analyzed_whole(monkeypatch, tmp_path):
+    analyzed = _fake_pipeline(monkeypatch)
+    source = tmp_path / "linked.xlsx"
+    workbook = _workbook(source)
+    workbook["Packing List"]["C1"] = "='Invoice'!B1"
+    workbook.save(source)
+
+    result = _service().analyze(source)
+
+    assert analyzed == ["Invoice"]
+    assert "sheets" not in result["metadata"]
+
+
+def test_defined_names_count_as_references(tmp_path):
+    source = tmp_path / "named.xlsx"
+    workbook = _workbook(source)
+    workbook.defined_names["InvoiceNo"] = DefinedName(
+        "InvoiceNo", attr_text="Invoice!$B$1"
+    )
+    workbook["Packing List"]["C1"] = "=InvoiceNo"
+    workbook.save(source)
+    splitter, trimmer = SheetSplitter(enabled=True), WorkbookTrimmer()
+
+    assert splitter.split(source, trimmer) is None
+
+    workbook["Packing List"]["C1"] = "=Lookup!A1"
+    workbook.save(source)
+    parts = splitter.split(source, trimmer)
+    try:
+        assert [part.sheet for part in parts] == ["Invoice", "Packing List"]
+    finally:
+        for part in parts:
+            part.cleanup()
@@ -0,0 +1,203 @@
+"""Tests for coalescing concurrent identical analyses."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.constants import CACHE_HEADER, CACHE_STATUS_COALESCED, CACHE_STATUS_MISS
+from app.main import analyzer_service, app
+from app.services.singleflight import SingleFlight
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def test_concurrent_async_callers_share_one_call():
+    flights = SingleFlight()
+    calls = 0
+
+    async def _compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    async def _main():
+        return await asyncio.gather(
+            *(flights.do_async("key", _compute) for _ in range(5))
+        )
+
+    results = asyncio.run(_main())
+
+    assert calls == 1
+    assert all(result == {"value": 42} for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    assert len(flights) == 0
+
+
+def test_errors_are_shared_and_the_key_released():
+    flights = SingleFlight()
+    calls = 0
+
+    async def _fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    async def _main():
+        return await asyncio.gather(
+            *(flights.do_async("key", _fail) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(_main())
+
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(flights) == 0
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flights = SingleFlight()
+
+    async def _compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def _main():
+        leader = asyncio.ensure_future(flights.do_async("key", _compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do_async("key", _compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(_main()) == ("done", True)
+
+
+def test_thread_and_async_callers_coalesce():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = 0
+
+    def _blocking():
+        nonlocal calls
+        calls += 1
+        release.wait(5)
+        return "shared"
+
+    async def _async():
+        raise AssertionError("the thread caller should lead")
+
+    async def _main():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = loop.run_in_executor(pool, flights.do, "key", _blocking)
+            await asyncio.to_thread(_wait_for, lambda: len(flights) == 1)
+            thread_follower = loop.run_in_executor(pool, flights.do, "key", _blocking)
+            async_follower = asyncio.ensure_future(flights.do_async("key", _async))
+            await asyncio.to_thread(_wait_for, lambda: flights.followers("key") == 2)
+            release.set()
+            return await asyncio.gather(leader, thread_follower, async_follower)
+
+    results = asyncio.run(_main())
+
+    assert calls == 1
+    assert results == [("shared", False), ("shared", True), ("shared", True)]
+
+
+def test_identical_uploads_make_one_provider_call(monkeypatch):
+    requests = 4
+    cache_key = main_module._result_cache_key(
+        hashlib.sha256(FIXTURE.read_bytes()).hexdigest()
+    )
+    calls = 0
+
+    def _analyze(file_path):
+        nonlocal calls
+        calls += 1
+        # Hold the leader until every other request has joined its flight.
+        _wait_for(
+            lambda: main_module.analysis_flights.followers(cache_key) == requests - 1
+        )
+        return {"file": "shared"}
+
+    monkeypatch.setattr(analyzer_service, "analyze", _analyze)
+
+    def _post(client: TestClient):
+        with FIXTURE.open("rb") as file_handle:
+            return client.post("/analyze", files={"file": (FIXTURE.name, file_handle)})
+
+    with TestClient(app) as client, ThreadPoolExecutor(max_workers=requests) as pool:
+        responses = list(pool.map(lambda _: _post(client), range(requests)))
+
+    assert calls == 1
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.json()["data"] == {"file": "shared"} for response in responses)
+    statuses = sorted(response.headers[CACHE_HEADER] for response in responses)
+    assert statuses == [CACHE_STATUS_COALESCED] * (requests - 1) + [CACHE_STATUS_MISS]
+
+
+def test_followers_get_a_result_when_the_leader_is_cancelled_in_admission(
+    monkeypatch,
+):
+    cache_key = main_module._result_cache_key(
+        hashlib.sha256(FIXTURE.read_bytes()).hexdigest()
+    )
+    analyzed = []
+
+    def _analyze(file_path):
+        analyzed.append(Path(file_path))
+        return {"readable": Path(file_path).exists()}
+
+    async def _main():
+        waiting, admit = asyncio.Event(), asyncio.Event()
+
+        async def _acquire(path, may_reject=True):
+            waiting.set()
+            await admit.wait()
+            return 0
+
+        monkeypatch.setattr(main_module.admission, "acquire", _acquire)
+        monkeypatch.setattr(main_module.admission, "release", lambda footprint: None)
+
+        def _upload():
+            return UploadFile(io.BytesIO(FIXTURE.read_bytes()), filename=FIXTURE.name)
+
+        leader = asyncio.ensure_future(main_module._analyze_upload(_upload(), False))
+        await waiting.wait()
+        follower = asyncio.ensure_future(main_module._analyze_upload(_upload(), False))
+        while main_module.analysis_flights.followers(cache_key) < 1:
+            await asyncio.sleep(0.005)
+        # The leader's handler exits and deletes its upload mid-admission.
+        leader.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await leader
+        admit.set()
+        return await follower
+
+    monkeypatch.setattr(analyzer_service, "analyze", _analyze)
+    body, headers = asyncio.run(_main())
+
+    assert body["data"] == {"readable": True}
+    assert headers[CACHE_HEADER] == CACHE_STATUS_COALESCED
+    assert len(analyzed) == 1 and not analyzed[0].exists()
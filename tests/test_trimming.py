@@ -0,0 +1,113 @@
+"""Tests for the workbook trimming stage."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+
+from app.services import pipeline
+from app.services.analyzer import AnalyzerService
+from app.services.trimming import WorkbookTrimmer
+
+SAMPLE = Path(__file__).parent / "fixtures" / "sample_template.xlsx"
+COLUMNS = ("No", "Description", "Qty", "Unit price", "Amount")
+
+
+def _invoice(path: Path, line_items: int, filler_rows: int = 0) -> Path:
+    """Header block, one line-item table and a total row below it."""
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Invoice"
+    for row, (label, value) in enumerate(
+        [("Invoice No", "INV-1"), ("Date", "2024-01-31"), ("Customer", "ACME")],
+        start=1,
+    ):
+        sheet.cell(row=row, column=1, value=label)
+        sheet.cell(row=row, column=2, value=value)
+    sheet.row_dimensions[2].hidden = True
+    sheet.column_dimensions["G"].hidden = True
+    for column, label in enumerate(COLUMNS, start=1):
+        sheet.cell(row=6, column=column, value=label)
+    for item in range(line_items):
+        row = 7 + item
+        for column, value in enumerate(
+            (item + 1, f"Item {item}", 2, 9.5, 19.0), start=1
+        ):
+            sheet.cell(row=row, column=column, value=value)
+    sheet.cell(row=7 + line_items, column=4, value="Total")
+    sheet.cell(row=7 + line_items, column=5, value=19.0 * line_items)
+    if filler_rows:
+        filler = workbook.create_sheet("Lookup")
+        filler.sheet_state = "hidden"
+        for row in range(1, filler_rows + 1):
+            filler.cell(row=row, column=1, value=row)
+    workbook.save(path)
+    return path
+
+
+def test_keeps_header_first_table_rows_and_footer_in_place(tmp_path):
+    source = _invoice(tmp_path / "big.xlsx", line_items=500)
+
+    result = WorkbookTrimmer(sample_rows=10, min_rows=50).trim(source)
+
+    try:
+        assert result.derived
+        assert result.rows_before == 3 + 1 + 500 + 1
+        assert result.rows_kept == 3 + 1 + 10 + 1
+        assert result.tables_trimmed == 1
+        sheet = load_workbook(result.path).active
+        assert sheet["B1"].value == "INV-1"
+        assert sheet["B16"].value == "Item 9"
+        assert sheet["B17"].value is None
+        assert sheet["D507"].value == "Total"
+        assert sheet.row_dimensions[2].hidden
+        assert sheet.column_dimensions["G"].hidden
+    finally:
+        result.cleanup()
+    assert not result.path.exists()
+    assert source.exists()
+
+
+def test_drops_hidden_filler_sheets(tmp_path):
+    source = _invoice(tmp_path / "filler.xlsx", line_items=5, filler_rows=500)
+
+    result = WorkbookTrimmer(min_rows=100).trim(source)
+
+    try:
+        assert result.derived
+        assert result.sheets_dropped == ["Lookup"]
+        assert result.tables_trimmed == 0
+        assert load_workbook(result.path).sheetnames == ["Invoice"]
+    finally:
+        result.cleanup()
+
+
+def test_small_workbooks_are_analyzed_unchanged():
+    result = WorkbookTrimmer().trim(SAMPLE)
+
+    assert not result.derived
+    assert result.path == SAMPLE
+
+
+def test_analyzer_runs_pipeline_on_trimmed_copy(monkeypatch, tmp_path):
+    analyzed: list[Path] = []
+
+    def _run_pipeline(file_path, **_):
+        analyzed.append(file_path)
+        assert file_path.exists()
+        return {"normalized_output": {}, "metadata": {}}
+
+    monkeypatch.setattr(pipeline, "run_pipeline", _run_pipeline)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    service = AnalyzerService(
+        ai_provider="openai", trimmer=WorkbookTrimmer(sample_rows=5, min_rows=50)
+    )
+    source = _invoice(tmp_path / "big.xlsx", line_items=200)
+
+    result = service.analyze(source)
+
+    assert analyzed[0] != source
+    assert not analyzed[0].exists()
+    assert result["metadata"]["trimming"]["rows_kept"] == 3 + 1 + 5 + 1
@@ -0,0 +1,109 @@
+"""Tests for lazy imports, background warm-up and the readiness endpoint."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.services.warmup import WarmUp
+from benchmarks.startup_time import HEAVY_MODULES, parse_importtime
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_importing_app_defers_provider_sdks():
+    script = (
+        "import json, sys; import app.main; "
+        f"print(json.dumps([m for m in {list(HEAVY_MODULES)!r} if m in sys.modules]))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert json.loads(completed.stdout.splitlines()[-1]) == []
+
+
+def test_warm_up_runs_steps_in_order_and_reports_durations():
+    calls: list[str] = []
+    warm_up = WarmUp(
+        [
+            ("first", lambda: calls.append("first")),
+            ("second", lambda: calls.append("second")),
+        ]
+    )
+
+    async def _run():
+        assert warm_up.status == "pending"
+        warm_up.start()
+        await warm_up.wait()
+
+    asyncio.run(_run())
+
+    assert calls == ["first", "second"]
+    assert warm_up.ready
+    snapshot = warm_up.snapshot()
+    assert list(snapshot["steps_ms"]) == ["first", "second"]
+    assert snapshot["error"] is None
+
+
+def test_failed_step_stops_warm_up():
+    def _broken():
+        raise RuntimeError("no pool")
+
+    never: list[str] = []
+    warm_up = WarmUp([("pool", _broken), ("later", lambda: never.append("x"))])
+
+    async def _run():
+        warm_up.start()
+        await warm_up.wait()
+
+    asyncio.run(_run())
+
+    assert warm_up.status == "failed"
+    assert warm_up.error == "pool: no pool"
+    assert never == []
+
+
+def test_health_answers_while_ready_waits_for_warm_up(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(main, "startup", WarmUp([("slow", lambda: release.wait(10))]))
+
+    with TestClient(main.app) as client:
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert response.json()["status"] == "warming"
+
+        release.set()
+        client.portal.call(main.startup.wait)
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert "slow" in response.json()["steps_ms"]
+
+
+def test_parse_importtime_reads_self_and_cumulative_times():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:       300 |        420 | json\n"
+    )
+
+    entries = parse_importtime(stderr)
+
+    assert entries == [
+        {"module": "json.decoder", "self_us": 120, "cumulative_us": 120, "depth": 1},
+        {"module": "json", "self_us": 300, "cumulative_us": 420, "depth": 0},
+    ]